@@ -0,0 +1,327 @@
+import asyncio
+import importlib.util
+import threading
+import uuid
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# --- PUNTOS DE CONTROL (CHECKPOINTS) DEL SISTEMA DE AGENTES ---
+#
+# Sin checkpointer, el estado del Coronel vivía solo dentro de una invocación: si
+# el worker caía a mitad de una orden con varias misiones, se perdía todo y había
+# que repetir cada llamada al LLM. Ahora el grafo del Coronel se compila con un
+# checkpointer compartido y cada orden usa como `thread_id` el id de su
+# `AgentTask`. LangGraph guarda un punto de control tras cada nodo y los
+# sub-grafos (Capitanes, Tenientes, Sargentos) heredan el mismo checkpointer en
+# su propio espacio de nombres, así que al reanudar una tarea solo se repite el
+# trabajo que no había terminado.
+#
+# Backends (`settings.AGENT_CHECKPOINTS["BACKEND"]`):
+#   - "sqlite": archivo local (desarrollo). Requiere `langgraph-checkpoint-sqlite`.
+#   - "postgres": la base de datos de producción. Requiere `langgraph-checkpoint-postgres`.
+#   - "memory": solo en memoria del proceso (pruebas).
+#   - "auto": Postgres si hay `POSTGRES_URL` y el paquete está instalado; si no, SQLite.
+#
+# Las conexiones de aiosqlite/psycopg quedan atadas al event loop que las abrió,
+# por eso (igual que el pool HTTP de los LLM) se abre un saver real por loop.
+
+DEFAULT_CHECKPOINT_SETTINGS = {
+    "ENABLED": True,
+    "BACKEND": "auto",
+    "SQLITE_PATH": "agent_checkpoints.sqlite3",
+    "POSTGRES_URL": None,
+    "RETENTION_DAYS": 7,
+}
+
+MODEL_MARKER = "__django_model__"
+ANONYMOUS_USER = "auth.anonymoususer"
+# Campos que nunca se copian al almacén de checkpoints.
+EXCLUDED_MODEL_FIELDS = {"password"}
+
+
+def get_checkpoint_settings() -> Dict[str, Any]:
+    config = dict(DEFAULT_CHECKPOINT_SETTINGS)
+    try:
+        from django.conf import settings
+        config.update(getattr(settings, "AGENT_CHECKPOINTS", {}) or {})
+    except Exception:
+        pass
+    return config
+
+
+def postgres_available() -> bool:
+    """El backend de Postgres requiere `langgraph-checkpoint-postgres` (y con él psycopg 3)."""
+    return importlib.util.find_spec("langgraph.checkpoint.postgres") is not None
+
+
+def resolve_backend(config: Optional[Dict[str, Any]] = None) -> str:
+    """Decide el backend efectivo a partir de la configuración."""
+    config = config or get_checkpoint_settings()
+    backend = (config["BACKEND"] or "auto").lower()
+    if backend == "auto":
+        backend = "postgres" if config["POSTGRES_URL"] else "sqlite"
+    if backend == "postgres" and not (config["POSTGRES_URL"] and postgres_available()):
+        print("[Checkpoints] ⚠️ Postgres no disponible para los checkpoints (falta URL o paquete); se usa SQLite.")
+        backend = "sqlite"
+    return backend
+
+
+# --- SERIALIZACIÓN DEL ESTADO ---
+
+def _dehydrate(value: Any) -> Any:
+    """Sustituye las instancias de modelos Django (el usuario del `app_context`) por un marcador."""
+    from django.db.models import Model
+
+    if isinstance(value, dict):
+        return {key: _dehydrate(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_dehydrate(item) for item in value]
+    if isinstance(value, Model):
+        fields = {
+            field.attname: getattr(value, field.attname)
+            for field in value._meta.concrete_fields
+            if field.attname not in EXCLUDED_MODEL_FIELDS
+        }
+        return {MODEL_MARKER: value._meta.label_lower, "fields": fields}
+    if getattr(value, "is_anonymous", False) is True and type(value).__name__ == "AnonymousUser":
+        return {MODEL_MARKER: ANONYMOUS_USER}
+    return value
+
+
+def _rehydrate(value: Any) -> Any:
+    """
+    Reconstruye los modelos marcados sin consultar la base de datos (los nodos son
+    asíncronos y el ORM no puede usarse desde el event loop). La instancia es una
+    foto del registro al guardarse el checkpoint; los campos excluidos quedan diferidos.
+    """
+    if isinstance(value, list):
+        return [_rehydrate(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if MODEL_MARKER not in value:
+        return {key: _rehydrate(item) for key, item in value.items()}
+
+    if value[MODEL_MARKER] == ANONYMOUS_USER:
+        from django.contrib.auth.models import AnonymousUser
+        return AnonymousUser()
+
+    from django.apps import apps
+    model = apps.get_model(value[MODEL_MARKER])
+    fields = value["fields"]
+    return model.from_db("default", list(fields), list(fields.values()))
+
+
+class AgentStateSerializer(JsonPlusSerializer):
+    """`JsonPlusSerializer` que además sabe guardar las instancias de modelos Django del estado."""
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return super().dumps_typed(_dehydrate(obj))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return _rehydrate(super().loads_typed(data))
+
+
+# --- CHECKPOINTER COMPARTIDO ---
+
+class AgentCheckpointer(BaseCheckpointSaver):
+    """
+    Checkpointer con el que se compilan los grafos: delega cada operación en el saver
+    real del event loop en curso, que se abre la primera vez que se necesita.
+
+    Solo implementa la interfaz asíncrona (`ainvoke`/`astream`), que es la que usa
+    todo el sistema de agentes.
+    """
+
+    def __init__(self):
+        super().__init__(serde=AgentStateSerializer())
+        self._savers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = weakref.WeakKeyDictionary()
+        self._memory_saver: Optional[InMemorySaver] = None
+        self._lock = threading.Lock()
+
+    # --- Apertura de los savers reales ---
+
+    async def _open_sqlite(self, config: Dict[str, Any]) -> Tuple[BaseCheckpointSaver, Any]:
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        path = str(config["SQLITE_PATH"])
+        connection = aiosqlite.connect(path)
+        # aiosqlite usa un hilo por conexión: como demonio no retiene el proceso al salir
+        # de un loop efímero (asyncio.run en comandos de gestión).
+        connection.daemon = True
+        conn = await connection
+        await conn.execute("PRAGMA journal_mode=WAL")
+        saver = AsyncSqliteSaver(conn, serde=self.serde)
+        await saver.setup()
+        print(f"[Checkpoints] Almacén SQLite abierto en '{path}'.")
+        return saver, conn
+
+    async def _open_postgres(self, config: Dict[str, Any]) -> Tuple[BaseCheckpointSaver, Any]:
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        from psycopg import AsyncConnection
+        from psycopg.rows import dict_row
+
+        conn = await AsyncConnection.connect(
+            config["POSTGRES_URL"], autocommit=True, prepare_threshold=0, row_factory=dict_row
+        )
+        saver = AsyncPostgresSaver(conn, serde=self.serde)
+        await saver.setup()
+        print("[Checkpoints] Almacén Postgres conectado.")
+        return saver, conn
+
+    async def _open(self) -> Tuple[str, BaseCheckpointSaver, Any]:
+        config = get_checkpoint_settings()
+        backend = resolve_backend(config)
+        if backend == "memory":
+            with self._lock:
+                if self._memory_saver is None:
+                    self._memory_saver = InMemorySaver(serde=self.serde)
+            return backend, self._memory_saver, None
+        if backend == "postgres":
+            saver, conn = await self._open_postgres(config)
+        else:
+            saver, conn = await self._open_sqlite(config)
+        return backend, saver, conn
+
+    async def _entry(self) -> Tuple[str, BaseCheckpointSaver, Any]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._savers.get(loop)
+            if task is None or (task.done() and task.exception() is not None):
+                # Una única tarea de apertura por loop: las corrutinas concurrentes la comparten.
+                task = loop.create_task(self._open())
+                self._savers[loop] = task
+        return await task
+
+    async def saver(self) -> BaseCheckpointSaver:
+        """Saver real del event loop en curso."""
+        return (await self._entry())[1]
+
+    async def backend(self) -> str:
+        return (await self._entry())[0]
+
+    # --- Interfaz asíncrona de BaseCheckpointSaver ---
+
+    async def aget_tuple(self, config) -> Optional[CheckpointTuple]:
+        return await (await self.saver()).aget_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[CheckpointTuple]:
+        saver = await self.saver()
+        async for item in saver.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions):
+        return await (await self.saver()).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        return await (await self.saver()).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await (await self.saver()).adelete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Los tres backends comparten el mismo formato de versión ("<contador>.<aleatorio>").
+        return InMemorySaver.get_next_version(self, current, channel)
+
+    # --- Mantenimiento ---
+
+    async def alist_thread_ids(self) -> List[str]:
+        """Hilos (tareas) con checkpoints guardados."""
+        backend, saver, conn = await self._entry()
+        if backend == "memory":
+            return sorted(saver.storage.keys())
+        async with saver.lock:
+            cursor = await conn.execute("SELECT DISTINCT thread_id FROM checkpoints")
+            rows = await cursor.fetchall()
+        return sorted(row["thread_id"] if isinstance(row, dict) else row[0] for row in rows)
+
+    async def adelete_threads(self, thread_ids: Iterable[str]) -> int:
+        """Elimina todos los checkpoints (incluidos los de sub-grafos) de los hilos indicados."""
+        deleted = 0
+        for thread_id in thread_ids:
+            await self.adelete_thread(str(thread_id))
+            deleted += 1
+        return deleted
+
+    async def aclose(self) -> None:
+        """Cierra la conexión del event loop en curso (fin de un comando o apagado del worker)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._savers.pop(loop, None)
+        if task is None or not task.done() or task.exception() is not None:
+            return
+        _, _, conn = task.result()
+        if conn is not None:
+            await conn.close()
+
+
+agent_checkpointer = AgentCheckpointer()
+
+
+def get_agent_checkpointer() -> Optional[AgentCheckpointer]:
+    """Checkpointer para compilar los grafos, o None si están desactivados en settings."""
+    return agent_checkpointer if get_checkpoint_settings()["ENABLED"] else None
+
+
+# --- HILOS Y REANUDACIÓN ---
+
+def thread_config(thread_id: Any = None) -> Dict[str, Any]:
+    """Configuración de LangGraph para un hilo; sin id (órdenes sin `AgentTask`) se crea uno efímero."""
+    return {"configurable": {"thread_id": str(thread_id or uuid.uuid4())}}
+
+
+async def get_thread_status(graph, config: Dict[str, Any]) -> str:
+    """
+    Estado del hilo en el checkpointer del grafo:
+      - "new": no hay checkpoints (o el grafo no usa checkpointer).
+      - "interrupted": la ejecución se cortó antes de terminar; se puede reanudar.
+      - "finished": la ejecución ya terminó; su estado final está disponible.
+    """
+    if getattr(graph, "checkpointer", None) is None:
+        return "new"
+    snapshot = await graph.aget_state(config)
+    if not snapshot.values and not snapshot.next:
+        return "new"
+    return "interrupted" if snapshot.next else "finished"
+
+
+def select_prunable_threads(thread_ids: Iterable[str], retention_days: int) -> List[str]:
+    """
+    Hilos cuyos checkpoints ya no sirven para reanudar nada:
+      - tareas terminadas (COMPLETED/FAILED) sin cambios en los últimos `retention_days` días;
+      - hilos huérfanos, sin `AgentTask` (tarea borrada u órdenes sin tarea, como `test_agent`).
+    Las tareas pendientes o en ejecución se conservan siempre. Usa el ORM (contexto síncrono).
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from api.models import AgentTask
+
+    task_ids = {}
+    for thread_id in thread_ids:
+        try:
+            task_ids[thread_id] = uuid.UUID(str(thread_id))
+        except ValueError:
+            task_ids[thread_id] = None
+
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    tasks = {
+        row["id"]: row
+        for row in AgentTask.objects.filter(id__in=[t for t in task_ids.values() if t]).values("id", "status", "updated_at")
+    }
+    finished = {AgentTask.Status.COMPLETED, AgentTask.Status.FAILED}
+    prunable = []
+    for thread_id, task_id in task_ids.items():
+        task = tasks.get(task_id)
+        if task is None or (task["status"] in finished and task["updated_at"] < cutoff):
+            prunable.append(thread_id)
+    return prunable
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+# --- DESPLIEGUE POR OLEADAS: EJECUCIÓN CONCURRENTE DE MISIONES INDEPENDIENTES ---
+#
+# Los planes del Coronel, de los Capitanes orquestadores y del Teniente de
+# Prestadores se ejecutaban misión por misión, de modo que la latencia total era
+# la suma de todos los viajes al LLM. Cada misión del plan declara ahora de qué
+# misiones anteriores depende (`depends_on`); las misiones sin dependencias
+# pendientes forman una "oleada" que se despliega en paralelo, con un tope de
+# concurrencia, y los reportes se consolidan siempre en el orden del plan.
+
+DEFAULT_MAX_CONCURRENT_MISSIONS = 4
+
+
+def get_max_concurrent_missions() -> int:
+    """Tope de misiones simultáneas por unidad (`settings.AGENT_MAX_CONCURRENT_MISSIONS`)."""
+    try:
+        from django.conf import settings
+        value = getattr(settings, "AGENT_MAX_CONCURRENT_MISSIONS", DEFAULT_MAX_CONCURRENT_MISSIONS)
+    except Exception:
+        value = DEFAULT_MAX_CONCURRENT_MISSIONS
+    return max(int(value), 1)
+
+
+def emit_progress(event: Dict[str, Any]) -> None:
+    """
+    Publica un evento de progreso en el canal `custom` de LangGraph.
+
+    Solo llega a alguien cuando el grafo se ejecuta con `astream(..., stream_mode="custom")`
+    (la vista de streaming del Coronel); fuera de un grafo o con `ainvoke` no hace nada.
+    """
+    try:
+        from langgraph.config import get_stream_writer
+        writer = get_stream_writer()
+    except Exception:
+        return
+    writer(event)
+
+
+def resolve_dependencies(tasks: Sequence[Any]) -> List[List[int]]:
+    """
+    Devuelve, para cada misión, los índices de las misiones de las que depende.
+
+    - `depends_on = None` (el LLM no lo indicó): depende de la misión anterior,
+      lo que conserva la ejecución secuencial de los planes antiguos.
+    - `depends_on = []`: misión independiente.
+    - Solo se aceptan referencias a misiones *anteriores* del plan; las demás se
+      descartan, lo que garantiza que el grafo de dependencias no tenga ciclos.
+    """
+    resolved = []
+    for index, task in enumerate(tasks):
+        depends_on = getattr(task, "depends_on", None)
+        if depends_on is None:
+            resolved.append([index - 1] if index > 0 else [])
+        else:
+            resolved.append(sorted({d for d in depends_on if isinstance(d, int) and 0 <= d < index}))
+    return resolved
+
+
+def plan_waves(tasks: Sequence[Any]) -> List[List[int]]:
+    """Agrupa los índices del plan en oleadas: cada oleada solo depende de las anteriores."""
+    levels: List[int] = []
+    for deps in resolve_dependencies(tasks):
+        levels.append(1 + max((levels[d] for d in deps), default=-1))
+    waves: List[List[int]] = [[] for _ in range(max(levels, default=-1) + 1)]
+    for index, level in enumerate(levels):
+        waves[level].append(index)
+    return waves
+
+
+async def execute_plan_in_waves(
+    tasks: Sequence[Any],
+    run_mission: Callable[[int, Any], Awaitable[Dict[str, Any]]],
+    max_concurrency: Optional[int] = None,
+    unit_name: str = "",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Ejecuta el plan oleada por oleada, con las misiones de cada oleada en paralelo.
+
+    `run_mission(index, task)` devuelve el registro de la misión completada. Si una
+    misión falla, se termina la oleada en curso y no se despliegan las siguientes
+    (igual que la ejecución secuencial se detenía ante el primer error).
+
+    Returns:
+        (misiones completadas en el orden del plan, primer error en el orden del plan o None)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or get_max_concurrent_missions())
+    results: Dict[int, Dict[str, Any]] = {}
+    errors: Dict[int, str] = {}
+
+    async def run_guarded(index: int, wave_number: int):
+        progress = {
+            "unit": unit_name,
+            "index": index,
+            "wave": wave_number,
+            "mission": getattr(tasks[index], "task_description", ""),
+        }
+        async with semaphore:
+            emit_progress({"event": "mission_started", **progress})
+            try:
+                results[index] = await run_mission(index, tasks[index])
+            except Exception as e:
+                errors[index] = str(e)
+                emit_progress({"event": "mission_failed", **progress, "error": errors[index]})
+            else:
+                emit_progress({"event": "mission_completed", **progress, "result": results[index]})
+
+    for wave_number, wave in enumerate(plan_waves(tasks), start=1):
+        if len(wave) > 1:
+            print(f"--- ⚡ {unit_name}: Desplegando oleada {wave_number} con {len(wave)} misiones en paralelo. ---")
+        await asyncio.gather(*(run_guarded(index, wave_number) for index in wave))
+        if errors:
+            break
+
+    completed = [results[index] for index in sorted(results)]
+    first_error = errors[min(errors)] if errors else None
+    return completed, first_error
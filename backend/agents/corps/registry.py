@@ -0,0 +1,268 @@
+import asyncio
+import importlib
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterable, List, Optional
+
+# --- ARSENAL DE GRAFOS: COMPILACIÓN BAJO DEMANDA DE LA JERARQUÍA DE AGENTES ---
+#
+# Antes, cada módulo de Capitán y Teniente compilaba a sus subordinados al ser
+# importado, de modo que importar al Coronel construía decenas de StateGraph y
+# ToolNode en cada worker. El arsenal registra *cómo* construir cada unidad
+# (ruta "modulo:funcion" + argumentos) y solo la compila la primera vez que se
+# necesita; a partir de ahí queda en caché para el resto del proceso.
+
+
+class GraphSpec:
+    """Ficha de una unidad del ejército: cómo se construye y a quién comanda."""
+
+    def __init__(self, key: str, builder_path: str, subordinados: Iterable[str] = (), **builder_kwargs):
+        self.key = key
+        self.builder_path = builder_path
+        self.subordinados = tuple(subordinados)
+        self.builder_kwargs = builder_kwargs
+
+    def resolve_builder(self):
+        """Importa el módulo de la unidad solo en el momento de compilarla."""
+        module_path, _, attr = self.builder_path.partition(":")
+        module = importlib.import_module(module_path)
+        return getattr(module, attr)
+
+
+class GraphRegistry:
+    """
+    Registro de grafos compilados por proceso.
+
+    Es seguro entre hilos (un candado por unidad evita compilaciones dobles) y
+    entre corrutinas: `aget` delega la compilación a un hilo para no bloquear
+    el event loop mientras se construye el grafo.
+    """
+
+    def __init__(self, track_memory: bool = False):
+        self.track_memory = track_memory
+        self._specs: Dict[str, GraphSpec] = {}
+        self._graphs: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    # --- Alistamiento ---
+
+    def register(self, key: str, builder_path: str, subordinados: Iterable[str] = (), **builder_kwargs) -> None:
+        """Registra una unidad sin compilarla."""
+        with self._registry_lock:
+            self._specs[key] = GraphSpec(key, builder_path, subordinados, **builder_kwargs)
+            self._locks.setdefault(key, threading.Lock())
+
+    def keys(self) -> List[str]:
+        return list(self._specs.keys())
+
+    def is_compiled(self, key: str) -> bool:
+        return key in self._graphs
+
+    # --- Obtención de grafos ---
+
+    def get(self, key: str):
+        """Devuelve el grafo compilado de la unidad, compilándolo si aún no existe."""
+        graph = self._graphs.get(key)
+        if graph is not None:
+            return graph
+
+        spec = self._specs.get(key)
+        if spec is None:
+            raise KeyError(f"Unidad '{key}' no registrada en el arsenal de grafos.")
+
+        with self._locks[key]:
+            # Otro hilo pudo compilarlo mientras esperábamos el candado.
+            graph = self._graphs.get(key)
+            if graph is None:
+                graph = self._compile(spec)
+                self._graphs[key] = graph
+        return graph
+
+    async def aget(self, key: str):
+        """Versión asíncrona de `get`: la compilación no bloquea el event loop."""
+        graph = self._graphs.get(key)
+        if graph is not None:
+            return graph
+        return await asyncio.to_thread(self.get, key)
+
+    def _compile(self, spec: GraphSpec):
+        builder = spec.resolve_builder()
+
+        measure_memory = self.track_memory or tracemalloc.is_tracing()
+        started_tracing = False
+        if measure_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        memory_before = tracemalloc.get_traced_memory()[0] if measure_memory else 0
+
+        start = time.perf_counter()
+        try:
+            graph = builder(**spec.builder_kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            memory_after = tracemalloc.get_traced_memory()[0] if measure_memory else 0
+            if started_tracing:
+                tracemalloc.stop()
+
+        self._stats[spec.key] = {
+            "compile_seconds": elapsed,
+            "memory_bytes": max(memory_after - memory_before, 0) if measure_memory else None,
+        }
+        print(f"--- 🏗️ ARSENAL: Unidad '{spec.key}' compilada en {elapsed * 1000:.1f} ms. ---")
+        return graph
+
+    # --- Alistamiento previo (warm-up) ---
+
+    def branch(self, key: str) -> List[str]:
+        """Devuelve la unidad y todos sus subordinados (sin repetir), en orden de mando."""
+        ordered: List[str] = []
+        pending = [key]
+        while pending:
+            current = pending.pop(0)
+            if current in ordered:
+                continue
+            if current not in self._specs:
+                raise KeyError(f"Unidad '{current}' no registrada en el arsenal de grafos.")
+            ordered.append(current)
+            pending.extend(self._specs[current].subordinados)
+        return ordered
+
+    def warm_up(self, keys: Optional[Iterable[str]] = None) -> List[str]:
+        """Compila por adelantado las ramas indicadas (o todo el arsenal si no se indica ninguna)."""
+        roots = list(keys) if keys else self.keys()
+        compiled: List[str] = []
+        for root in roots:
+            for key in self.branch(root):
+                if key not in compiled:
+                    self.get(key)
+                    compiled.append(key)
+        return compiled
+
+    # --- Informes ---
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Informe por unidad: si está compilada, cuánto tardó y cuánta memoria reservó."""
+        report = []
+        for key in self._specs:
+            unit_stats = self._stats.get(key, {})
+            report.append({
+                "key": key,
+                "compiled": key in self._graphs,
+                "compile_seconds": unit_stats.get("compile_seconds"),
+                "memory_bytes": unit_stats.get("memory_bytes"),
+            })
+        return report
+
+    def clear(self) -> None:
+        """Descarta los grafos compilados (útil en pruebas o tras recargar doctrina)."""
+        with self._registry_lock:
+            self._graphs.clear()
+            self._stats.clear()
+
+
+# --- ORDEN DE BATALLA: REGISTRO DE TODAS LAS UNIDADES ---
+
+UNITS = "agents.corps.units"
+PLATOONS = f"{UNITS}.platoons"
+SQUADS = f"{PLATOONS}.squads"
+GENERIC_LIEUTENANT = f"{PLATOONS}.teniente_generico:get_generic_lieutenant_graph"
+
+graph_registry = GraphRegistry()
+
+# Sargentos
+for _name, _module in [
+    ("admin", "gestion_admin_sargento"),
+    ("agencias", "gestion_agencias_sargento"),
+    ("artesanos", "gestion_artesanos_sargento"),
+    ("atractivos", "gestion_atractivos_sargento"),
+    ("funcionario", "gestion_funcionario_sargento"),
+    ("guias", "gestion_guias_sargento"),
+    ("hoteles", "gestion_hoteles_sargento"),
+    ("oferta", "gestion_oferta_sargento"),
+    ("prestador", "gestion_prestador_sargento"),
+    ("publicaciones", "gestion_publicaciones_sargento"),
+    ("restaurantes", "gestion_restaurantes_sargento"),
+    ("transporte", "gestion_transporte_sargento"),
+    ("turista", "gestion_turista_sargento"),
+    ("videos", "gestion_videos_sargento"),
+]:
+    graph_registry.register(f"sargento.{_name}", f"{SQUADS}.{_module}:get_{_module}_graph")
+
+# Tenientes con archivo propio
+graph_registry.register(
+    "teniente.prestadores", f"{PLATOONS}.prestadores_teniente:get_prestadores_teniente_graph",
+    subordinados=["sargento.hoteles", "sargento.restaurantes", "sargento.guias",
+                  "sargento.agencias", "sargento.transporte", "sargento.prestador"],
+)
+for _name in ["artesanos", "turista", "hoteles", "restaurantes", "guias", "agencias", "transporte"]:
+    graph_registry.register(
+        f"teniente.{_name}", f"{PLATOONS}.{_name}_teniente:get_{_name}_teniente_graph",
+        subordinados=[f"sargento.{_name}"],
+    )
+
+# Tenientes genéricos (fábrica)
+for _name, _display in [
+    ("publicaciones", "Publicaciones"),
+    ("atractivos", "Atractivos Turísticos"),
+    ("admin", "Admin"),
+    ("funcionario", "Funcionario"),
+    ("oferta", "Oferta Turística"),
+    ("videos", "Videos"),
+]:
+    graph_registry.register(
+        f"teniente.{_name}", GENERIC_LIEUTENANT,
+        subordinados=[f"sargento.{_name}"],
+        sargento_key=f"sargento.{_name}", teniente_name=_display,
+    )
+
+# Capitanes
+graph_registry.register(
+    "capitan.admin", f"{UNITS}.admin_captain:get_admin_captain_graph",
+    subordinados=["teniente.prestadores", "teniente.artesanos", "teniente.publicaciones",
+                  "teniente.atractivos", "teniente.admin"],
+)
+graph_registry.register(
+    "capitan.funcionario", f"{UNITS}.funcionario_captain:get_funcionario_captain_graph",
+    subordinados=["teniente.prestadores", "teniente.publicaciones", "teniente.atractivos",
+                  "teniente.funcionario"],
+)
+for _name in ["prestadores", "artesanos", "turista", "publicaciones", "atractivos", "oferta", "videos"]:
+    graph_registry.register(
+        f"capitan.{_name}", f"{UNITS}.{_name}_captain:get_{_name}_captain_graph",
+        subordinados=[f"teniente.{_name}"],
+    )
+
+# Coronel
+graph_registry.register(
+    "coronel", "agents.corps.turismo_coronel:get_turismo_coronel_graph",
+    subordinados=[f"capitan.{_name}" for _name in [
+        "admin", "funcionario", "prestadores", "artesanos", "turista",
+        "publicaciones", "atractivos", "oferta", "videos",
+    ]],
+)
+
+
+def warm_up_from_settings() -> List[str]:
+    """
+    Compila las ramas listadas en `settings.AGENT_GRAPH_WARMUP`.
+
+    Se invoca desde wsgi.py / asgi.py para que cada worker aliste sus grafos al
+    arrancar. Un fallo aquí no debe tumbar el servidor: la unidad se compilará
+    bajo demanda en su primera orden.
+    """
+    from django.conf import settings
+
+    graph_registry.track_memory = getattr(settings, "AGENT_GRAPH_TRACK_MEMORY", False)
+    keys = getattr(settings, "AGENT_GRAPH_WARMUP", [])
+    if not keys:
+        return []
+    try:
+        compiled = graph_registry.warm_up(keys)
+    except Exception as e:
+        print(f"--- ⚠️ ARSENAL: Falló el alistamiento previo de {keys}. Se compilará bajo demanda. Razón: {e} ---")
+        return []
+    print(f"--- ✅ ARSENAL: {len(compiled)} unidades alistadas al arrancar el worker. ---")
+    return compiled
@@ -0,0 +1,491 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+
+# --- COLA DE TAREAS DEL CORONEL ---
+#
+# Una orden al Coronel encadena varias llamadas al LLM y puede tardar minutos:
+# ejecutarla dentro de la petición bloqueaba un worker WSGI todo ese tiempo.
+# `AgentCommandView` ahora solo registra la `AgentTask` como PENDING y responde
+# con su id; un worker la reclama, ejecuta el grafo del Coronel fuera del hilo de
+# la petición y guarda el estado y el informe final, que el frontend consulta en
+# `AgentTaskStatusView`.
+#
+# La cola es la propia tabla `AgentTask`:
+#   - Reclamar una tarea es un UPDATE condicionado a `status=PENDING`, atómico en
+#     cualquier base de datos; en Postgres, además, `SELECT ... FOR UPDATE OF
+#     api_agenttask SKIP LOCKED` evita que dos workers compitan por las mismas filas
+#     (solo se bloquea la tabla de tareas: el usuario llega por un LEFT JOIN).
+#   - Cada usuario tiene un tope de órdenes en ejecución y de órdenes en espera. Los
+#     visitantes anónimos no comparten un único cupo: cada uno se identifica por su
+#     sesión o, sin ella, por su IP (`guest_key_for`), y consulta sus órdenes por el
+#     `task_id` (un UUID4 imposible de adivinar) que recibe al enviarlas.
+#   - Cada orden tiene un tiempo máximo. Mientras se ejecuta, su worker renueva
+#     `updated_at` cada `HEARTBEAT_SECONDS`; cada worker devuelve a la cola, con la
+#     misma frecuencia, las tareas RUNNING sin latido desde hace `STALE_AFTER_SECONDS`
+#     (su worker se cayó), que se reanudan desde su último checkpoint. Cada reclamo
+#     cuenta un intento (`attempts`): una orden que tumba a su worker cada vez (falta
+#     de memoria, fallo de una librería nativa) no vuelve a la cola indefinidamente
+#     gastando cuota del LLM; pasados `MAX_ATTEMPTS` intentos queda FAILED.
+#
+# Los workers pueden ser procesos dedicados (`python manage.py run_agent_worker`)
+# o un hilo embebido en cada proceso web (`EMBEDDED_WORKER`), útil en desarrollo.
+#
+# `AgentCommandStreamView` ejecuta la orden en la propia petición para reenviar su
+# progreso, pero pasa por los mismos topes (`start_streamed_task`) y, con
+# `StreamedTaskRun`, por el mismo latido y tiempo máximo que un worker.
+
+DEFAULT_TASK_QUEUE_SETTINGS = {
+    "WORKERS": 4,
+    "MAX_RUNNING_PER_USER": 1,
+    "MAX_PENDING_PER_USER": 5,
+    "TIMEOUT_SECONDS": 300,
+    "POLL_INTERVAL_SECONDS": 2.0,
+    "HEARTBEAT_SECONDS": 30.0,
+    "STALE_AFTER_SECONDS": 120.0,  # Sin latido por más de este tiempo: el worker se cayó.
+    "MAX_ATTEMPTS": 3,  # Ejecuciones abandonadas tras las que la orden se da por fallida.
+    "EMBEDDED_WORKER": True,
+}
+
+TIMEOUT_REPORT = "Misión abortada: la orden superó el tiempo máximo de ejecución ({seconds} s)."
+CANCELLED_REPORT = "Misión cancelada: el cliente cerró la conexión antes de recibir el informe."
+NO_REPORT = "El Coronel no generó un informe final."
+ABANDONED_REPORT = (
+    "Misión abortada: la orden interrumpió a su worker en {attempts} intentos seguidos y no se volverá a ejecutar."
+)
+
+
+class TaskQueueFull(Exception):
+    """El usuario ya tiene el máximo de órdenes en espera o en ejecución."""
+
+
+def get_task_queue_settings() -> Dict[str, Any]:
+    config = dict(DEFAULT_TASK_QUEUE_SETTINGS)
+    try:
+        from django.conf import settings
+        config.update(getattr(settings, "AGENT_TASK_QUEUE", {}) or {})
+    except Exception:
+        pass
+    return config
+
+
+# --- OPERACIONES SOBRE LA TABLA (síncronas, se invocan con sync_to_async desde el worker) ---
+
+def guest_key_for(request) -> str:
+    """
+    Identifica a un visitante anónimo para su cupo en la cola: la clave de su sesión si
+    la tiene y, si no, su IP. Se guarda como hash para no almacenar la IP en claro.
+    """
+    import hashlib
+
+    session = getattr(request, "session", None)
+    session_key = getattr(session, "session_key", None)
+    source = f"session:{session_key}" if session_key else f"ip:{request.META.get('REMOTE_ADDR', '')}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:40]
+
+
+def enqueue_agent_task(command: str, user=None, guest_key: str = ""):
+    """
+    Registra una orden como PENDING y despierta al worker embebido al confirmar la transacción.
+    Las órdenes de visitantes anónimos cuentan contra el cupo de su `guest_key`.
+
+    Raises:
+        TaskQueueFull: si el usuario ya tiene `MAX_PENDING_PER_USER` órdenes activas.
+    """
+    from django.db import transaction
+    from api.models import AgentTask
+
+    config = get_task_queue_settings()
+    owner, guest_key = _task_owner(user, guest_key)
+    _check_user_limits(owner, guest_key, config)
+    task = AgentTask.objects.create(user=owner, guest_key=guest_key, command=command, status=AgentTask.Status.PENDING)
+    if config["EMBEDDED_WORKER"]:
+        transaction.on_commit(ensure_embedded_worker)
+    return task
+
+
+def start_streamed_task(command: str, user=None, guest_key: str = ""):
+    """
+    Registra una orden que se ejecutará en la misma petición (streaming) con los topes de
+    la cola: cuenta como orden activa y ocupa uno de los cupos en ejecución del usuario,
+    así que `claim_tasks` no le asignará otra orden mientras tanto. Se crea como RUNNING.
+
+    Raises:
+        TaskQueueFull: si el usuario ya tiene `MAX_PENDING_PER_USER` órdenes activas o
+            `MAX_RUNNING_PER_USER` órdenes en ejecución.
+    """
+    from api.models import AgentTask
+
+    owner, guest_key = _task_owner(user, guest_key)
+    _check_user_limits(owner, guest_key, get_task_queue_settings(), starting=True)
+    return AgentTask.objects.create(
+        user=owner, guest_key=guest_key, command=command, status=AgentTask.Status.RUNNING, attempts=1
+    )
+
+
+def _task_owner(user, guest_key: str = ""):
+    """Dueño de una orden: el usuario autenticado, o `user=None` con la clave del visitante."""
+    if user is not None and user.is_authenticated:
+        return user, ""
+    return None, guest_key
+
+
+def _check_user_limits(owner, guest_key: str, config: Dict[str, Any], starting: bool = False) -> None:
+    from django.db.models import Count
+    from api.models import AgentTask
+
+    counts = dict(
+        AgentTask.objects.filter(user=owner, guest_key=guest_key, status__in=[AgentTask.Status.PENDING, AgentTask.Status.RUNNING])
+        .values_list("status").annotate(total=Count("id")).order_by()
+    )
+    active, running = sum(counts.values()), counts.get(AgentTask.Status.RUNNING, 0)
+    if active >= config["MAX_PENDING_PER_USER"]:
+        raise TaskQueueFull(
+            f"Ya tienes {active} órdenes en curso. Espera a que terminen antes de enviar otra."
+        )
+    if starting and running >= config["MAX_RUNNING_PER_USER"]:
+        raise TaskQueueFull(
+            f"Ya tienes {running} órdenes en ejecución. Espera a que terminen antes de enviar otra."
+        )
+
+
+def claimable_tasks(limit: int):
+    """
+    Tareas PENDING más antiguas, bloqueadas sin esperar a las que ya reclamó otro worker.
+    `of=("self",)`: Postgres no admite FOR UPDATE sobre el lado anulable del LEFT JOIN
+    con el usuario, así que solo se bloquean las filas de la tabla de tareas.
+    """
+    from api.models import AgentTask
+
+    return (
+        AgentTask.objects.select_for_update(skip_locked=True, of=("self",))
+        .filter(status=AgentTask.Status.PENDING)
+        .select_related("user")
+        .order_by("created_at")[:limit]
+    )
+
+
+def claim_tasks(limit: int) -> List[Any]:
+    """
+    Reclama hasta `limit` tareas PENDING (las más antiguas primero) respetando el tope de
+    órdenes en ejecución por usuario (o por visitante anónimo), y las marca como RUNNING.
+    """
+    from django.db import close_old_connections, transaction
+    from django.db.models import Count, F
+    from django.utils import timezone
+    from api.models import AgentTask
+
+    if limit <= 0:
+        return []
+    close_old_connections()
+    config = get_task_queue_settings()
+    max_running = config["MAX_RUNNING_PER_USER"]
+
+    with transaction.atomic():
+        running = {
+            (user_id, guest_key): total
+            for user_id, guest_key, total in AgentTask.objects.filter(status=AgentTask.Status.RUNNING)
+            .values("user_id", "guest_key").annotate(total=Count("id")).order_by()
+            .values_list("user_id", "guest_key", "total")
+        }
+        # Ventana mayor que `limit`: las tareas de usuarios en su tope se saltan sin bloquear la cola.
+        candidates = list(claimable_tasks(limit * 5))
+        claimed = []
+        for task in candidates:
+            if len(claimed) >= limit:
+                break
+            owner = (task.user_id, task.guest_key)
+            if running.get(owner, 0) >= max_running:
+                continue
+            now = timezone.now()
+            updated = AgentTask.objects.filter(pk=task.pk, status=AgentTask.Status.PENDING).update(
+                status=AgentTask.Status.RUNNING, updated_at=now, attempts=F("attempts") + 1
+            )
+            if updated:  # Otro worker pudo reclamarla primero (SQLite no bloquea filas).
+                task.status, task.updated_at, task.attempts = AgentTask.Status.RUNNING, now, task.attempts + 1
+                running[owner] = running.get(owner, 0) + 1
+                claimed.append(task)
+    return claimed
+
+
+def finish_task(task_id, report: str, failed: bool) -> None:
+    from django.utils import timezone
+    from api.models import AgentTask
+
+    AgentTask.objects.filter(pk=task_id).update(
+        report=report,
+        status=AgentTask.Status.FAILED if failed else AgentTask.Status.COMPLETED,
+        updated_at=timezone.now(),
+    )
+
+
+def heartbeat_tasks(task_ids) -> int:
+    """Renueva `updated_at` de las tareas RUNNING que este worker sigue ejecutando."""
+    from django.utils import timezone
+    from api.models import AgentTask
+
+    if not task_ids:
+        return 0
+    return AgentTask.objects.filter(pk__in=list(task_ids), status=AgentTask.Status.RUNNING).update(updated_at=timezone.now())
+
+
+def requeue_stale_tasks(max_age_seconds: Optional[float] = None) -> int:
+    """
+    Devuelve a PENDING las tareas RUNNING sin latido desde hace más de
+    `STALE_AFTER_SECONDS`: su worker se cayó. Al volver a ejecutarse se reanudan desde
+    su último checkpoint en lugar de repetir todas las llamadas al LLM. Las que ya
+    agotaron `MAX_ATTEMPTS` se marcan FAILED con su informe. Devuelve cuántas volvieron
+    a la cola.
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from api.models import AgentTask
+
+    config = get_task_queue_settings()
+    if max_age_seconds is None:
+        max_age_seconds = config["STALE_AFTER_SECONDS"]
+    now = timezone.now()
+    stale = AgentTask.objects.filter(status=AgentTask.Status.RUNNING, updated_at__lt=now - timedelta(seconds=max_age_seconds))
+    exhausted = stale.filter(attempts__gte=config["MAX_ATTEMPTS"])
+    for attempts in exhausted.values_list("attempts", flat=True).distinct():
+        failed = exhausted.filter(attempts=attempts).update(
+            status=AgentTask.Status.FAILED, report=ABANDONED_REPORT.format(attempts=attempts), updated_at=now
+        )
+        if failed:
+            print(f"--- ❌ COLA DE MANDO: {failed} tareas agotaron sus {attempts} intentos y se dan por fallidas. ---")
+    return stale.filter(attempts__lt=config["MAX_ATTEMPTS"]).update(status=AgentTask.Status.PENDING, updated_at=now)
+
+
+# --- WORKER ---
+
+class AgentTaskWorker:
+    """Pool asíncrono que reclama tareas de la cola y ejecuta el Coronel para cada una."""
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = max(int(concurrency or get_task_queue_settings()["WORKERS"]), 1)
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def wake(self) -> None:
+        """Avisa al worker de que hay tareas nuevas (seguro desde cualquier hilo)."""
+        if self._loop is not None and self._wake is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def execute(self, task) -> None:
+        """Ejecuta (o reanuda) una orden con tiempo máximo y guarda su resultado."""
+        from django.contrib.auth.models import AnonymousUser
+        from agents.corps.turismo_coronel import run_general_order
+
+        timeout = get_task_queue_settings()["TIMEOUT_SECONDS"]
+        print(f"--- 📨 COLA DE MANDO: Ejecutando tarea {task.id}. ---")
+        try:
+            result = await asyncio.wait_for(
+                run_general_order(task.command, {"user": task.user or AnonymousUser()}, task_id=task.id),
+                timeout=timeout,
+            )
+            report, failed = result.get("report", NO_REPORT), bool(result.get("error"))
+        except asyncio.TimeoutError:
+            report, failed = TIMEOUT_REPORT.format(seconds=timeout), True
+        except Exception as e:
+            report, failed = f"Error crítico al ejecutar la orden: {e}", True
+        await sync_to_async(finish_task)(task.id, report, failed)
+        print(f"--- {'❌' if failed else '✅'} COLA DE MANDO: Tarea {task.id} finalizada. ---")
+
+    async def dispatch(self) -> int:
+        """Reclama tantas tareas como huecos libres haya y las lanza. Devuelve cuántas lanzó."""
+        free = self.concurrency - len(self._running)
+        tasks = await sync_to_async(claim_tasks)(free)
+        for task in tasks:
+            job = asyncio.create_task(self.execute(task))
+            self._running[str(task.id)] = job
+            job.add_done_callback(lambda _, key=str(task.id): self._finished(key))
+        return len(tasks)
+
+    def _finished(self, key: str) -> None:
+        self._running.pop(key, None)
+        if self._wake is not None:
+            self._wake.set()  # Un hueco libre: puede haber tareas esperando por el tope de usuario.
+
+    async def drain(self) -> None:
+        """Procesa la cola hasta vaciarla (comando con `--once` y pruebas)."""
+        self._loop, self._wake = asyncio.get_running_loop(), asyncio.Event()
+        while await self.dispatch() or self._running:
+            if self._running:
+                await asyncio.wait(list(self._running.values()), return_when=asyncio.FIRST_COMPLETED)
+
+    async def maintain(self) -> int:
+        """Latido de las tareas propias y recuperación de las abandonadas por otros workers."""
+        await sync_to_async(heartbeat_tasks)(list(self._running))
+        requeued = await sync_to_async(requeue_stale_tasks)()
+        if requeued:
+            print(f"--- ♻️ COLA DE MANDO: {requeued} tareas abandonadas vuelven a la cola. ---")
+        return requeued
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """
+        Bucle principal: reclama tareas al recibir un aviso o cada `POLL_INTERVAL_SECONDS`
+        y hace el mantenimiento (`maintain`) cada `HEARTBEAT_SECONDS`.
+        """
+        self._loop, self._wake = asyncio.get_running_loop(), asyncio.Event()
+        stop = stop or asyncio.Event()
+        print(f"--- 🎖️ COLA DE MANDO: Worker listo ({self.concurrency} órdenes simultáneas). ---")
+
+        next_maintenance = self._loop.time()
+        while not stop.is_set():
+            self._wake.clear()
+            if self._loop.time() >= next_maintenance:
+                try:
+                    await self.maintain()
+                except Exception as e:
+                    print(f"--- ⚠️ COLA DE MANDO: Error en el mantenimiento de la cola: {e} ---")
+                next_maintenance = self._loop.time() + get_task_queue_settings()["HEARTBEAT_SECONDS"]
+            try:
+                await self.dispatch()
+            except Exception as e:
+                print(f"--- ⚠️ COLA DE MANDO: Error al reclamar tareas: {e} ---")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=get_task_queue_settings()["POLL_INTERVAL_SECONDS"])
+            except asyncio.TimeoutError:
+                pass
+
+        if self._running:
+            await asyncio.wait(list(self._running.values()))
+
+
+# --- EJECUCIÓN EN STREAMING DENTRO DE LA PETICIÓN ---
+
+class StreamedTaskRun:
+    """
+    Ejecuta una orden registrada con `start_streamed_task` y entrega sus eventos como un
+    iterador síncrono para `StreamingHttpResponse`. El proyecto se sirve por WSGI, donde
+    Django consumiría un iterador asíncrono completo antes de enviar nada; aquí
+    `stream_general_order` corre en un hilo con su propio event loop y cada evento pasa
+    por una cola hacia la petición en cuanto se produce.
+
+    Como un worker, renueva el latido de la tarea cada `HEARTBEAT_SECONDS` (entregando
+    `None` si no hubo eventos, para que la vista mande un keep-alive) y aplica
+    `TIMEOUT_SECONDS`. La tarea siempre termina: si el cliente cierra la conexión, el
+    servidor llama a `close()`, la ejecución se cancela y la tarea queda FAILED.
+    """
+
+    def __init__(self, task, app_context: Any, render=None):
+        self.task, self.app_context = task, app_context
+        self.render = render or (lambda event: event)
+        self._stop = threading.Event()
+        self._control: Dict[str, Any] = {}
+        self._finished = False
+        self._events = self._generate()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.render(next(self._events))
+
+    def close(self) -> None:
+        self._events.close()
+        self._cancel()
+        if not self._finished:
+            self._finish(CANCELLED_REPORT, True)
+            print(f"--- 🚫 COLA DE MANDO: Tarea {self.task.id} cancelada (el cliente se desconectó). ---")
+
+    def _finish(self, report: str, failed: bool) -> None:
+        self._finished = True
+        finish_task(self.task.id, report, failed)
+
+    def _cancel(self) -> None:
+        self._stop.set()
+        loop, job = self._control.get("loop"), self._control.get("job")
+        if loop is not None and job is not None:
+            try:
+                loop.call_soon_threadsafe(job.cancel)
+            except RuntimeError:
+                pass  # El event loop del hilo ya terminó.
+
+    def _pump(self, items: "queue.Queue") -> None:
+        from agents.corps.turismo_coronel import stream_general_order
+
+        async def pump():
+            self._control["loop"], self._control["job"] = asyncio.get_running_loop(), asyncio.current_task()
+            try:
+                async for event in stream_general_order(self.task.command, self.app_context, task_id=self.task.id):
+                    if self._stop.is_set():
+                        break
+                    items.put(("event", event))
+            except Exception as e:
+                items.put(("error", e))
+            finally:
+                items.put(("end", None))
+
+        try:
+            asyncio.run(pump())
+        except asyncio.CancelledError:
+            pass
+
+    def _generate(self):
+        from api.models import AgentTask
+
+        config = get_task_queue_settings()
+        yield {"event": "task", "task_id": str(self.task.id)}
+
+        items: "queue.Queue" = queue.Queue()
+        threading.Thread(
+            target=self._pump, args=(items,), name=f"agent-stream-{self.task.id}", daemon=True,
+        ).start()
+        deadline = time.monotonic() + config["TIMEOUT_SECONDS"]
+        next_beat = time.monotonic() + config["HEARTBEAT_SECONDS"]
+        report, failed = NO_REPORT, False
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                self._cancel()
+                report, failed = TIMEOUT_REPORT.format(seconds=config["TIMEOUT_SECONDS"]), True
+                yield {"event": "error", "error": report}
+                break
+            if now >= next_beat:
+                heartbeat_tasks([self.task.id])
+                next_beat = now + config["HEARTBEAT_SECONDS"]
+            try:
+                kind, value = items.get(timeout=max(0.0, min(next_beat, deadline) - now))
+            except queue.Empty:
+                yield None
+                continue
+            if kind == "end":
+                break
+            if kind == "error":
+                report, failed = f"Error crítico al ejecutar la orden: {value}", True
+                yield {"event": "error", "error": report}
+                continue
+            if value.get("event") == "report":
+                report, failed = value.get("report", NO_REPORT), bool(value.get("error"))
+            yield value
+
+        self._finish(report, failed)
+        final_status = AgentTask.Status.FAILED if failed else AgentTask.Status.COMPLETED
+        yield {"event": "done", "task_id": str(self.task.id), "status": final_status}
+
+
+# --- WORKER EMBEBIDO EN EL PROCESO WEB ---
+
+_embedded_worker: Optional[AgentTaskWorker] = None
+_embedded_lock = threading.Lock()
+
+
+def ensure_embedded_worker() -> AgentTaskWorker:
+    """Arranca (una vez por proceso) el worker en un hilo demonio con su propio event loop, o lo despierta."""
+    global _embedded_worker
+    with _embedded_lock:
+        if _embedded_worker is None:
+            _embedded_worker = AgentTaskWorker()
+            threading.Thread(
+                target=asyncio.run, args=(_embedded_worker.run(),),
+                name="agent-task-worker", daemon=True,
+            ).start()
+        worker = _embedded_worker
+    worker.wake()
+    return worker
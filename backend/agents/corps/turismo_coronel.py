@@ -1,19 +1,13 @@
 import json
-from typing import TypedDict, List, Any, Dict
+from typing import TypedDict, List, Any, AsyncIterator, Dict, Optional
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langgraph.graph import StateGraph, END
-from ai_models.llm_router import route_llm_request
-
-# --- Importamos a los comandantes de campo: los Capitanes ---
-from .units.admin_captain import get_admin_captain_graph
-from .units.funcionario_captain import get_funcionario_captain_graph
-from .units.prestadores_captain import get_prestadores_captain_graph
-from .units.artesanos_captain import get_artesanos_captain_graph
-from .units.turista_captain import get_turista_captain_graph
-from .units.publicaciones_captain import get_publicaciones_captain_graph
-from .units.atractivos_captain import get_atractivos_captain_graph
-from .units.oferta_captain import get_oferta_captain_graph
-from .units.videos_captain import get_videos_captain_graph
+from ai_models.llm_router import count_history_tokens, count_message_tokens, route_llm_request
+from .checkpoints import get_agent_checkpointer, get_thread_status, thread_config
+from .dispatch import emit_progress, execute_plan_in_waves
+
+# --- Los Capitanes se obtienen del arsenal de grafos, que los compila bajo demanda ---
+from .registry import graph_registry
 
 # --- DEFINICIÓN DEL ESTADO Y EL PLAN TÁCTICO DEL CORONEL ---
 
@@ -21,34 +15,43 @@ class CaptainTask(BaseModel):
     """Define una misión táctica clara para ser asignada a un Capitán."""
     task_description: str = Field(description="La descripción específica y detallada de la misión para el Capitán.")
     responsible_captain: str = Field(description="El Capitán especialista. Debe ser uno de: 'Admin', 'Funcionario', 'Prestadores', 'Artesanos', 'Turista', 'Publicaciones', 'Atractivos', 'Oferta', 'Videos'.")
+    depends_on: Optional[List[int]] = Field(
+        default=None,
+        description="Índices (desde 0) de las misiones anteriores del plan que deben completarse antes de esta. Usa [] si la misión es independiente."
+    )
 
 class TacticalPlan(BaseModel):
     """El plan táctico completo generado por el Coronel."""
-    plan: List[CaptainTask] = Field(description="La lista de misiones tácticas secuenciales para cumplir la orden.")
+    plan: List[CaptainTask] = Field(description="La lista de misiones tácticas para cumplir la orden, con sus dependencias.")
+
+def parse_tactical_plan(response: str) -> TacticalPlan:
+    """Parsea la respuesta JSON del LLM y la valida con Pydantic (lanza si no es un plan válido)."""
+    return TacticalPlan.parse_obj(json.loads(response))
 
 class TurismoColonelState(TypedDict):
     """La pizarra táctica del Coronel de Turismo."""
     general_order: str
     app_context: Any
     conversation_history: List[Dict[str, str]]
+    history_tokens: int | None  # Total acumulado de tokens del historial (se actualiza por turno)
     tactical_plan: TacticalPlan | None
     task_queue: List[CaptainTask]
     completed_missions: list
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO: INSTANCIACIÓN DE CAPITANES ---
-# Se instancian una sola vez para eficiencia
+# --- PUESTO DE MANDO: CADENA DE MANDO DE CAPITANES ---
+# Cada Capitán se compila la primera vez que recibe una misión (ver `agents/corps/registry.py`).
 capitanes = {
-    "Admin": get_admin_captain_graph(),
-    "Funcionario": get_funcionario_captain_graph(),
-    "Prestadores": get_prestadores_captain_graph(),
-    "Artesanos": get_artesanos_captain_graph(),
-    "Turista": get_turista_captain_graph(),
-    "Publicaciones": get_publicaciones_captain_graph(),
-    "Atractivos": get_atractivos_captain_graph(),
-    "Oferta": get_oferta_captain_graph(),
-    "Videos": get_videos_captain_graph(),
+    "Admin": "capitan.admin",
+    "Funcionario": "capitan.funcionario",
+    "Prestadores": "capitan.prestadores",
+    "Artesanos": "capitan.artesanos",
+    "Turista": "capitan.turista",
+    "Publicaciones": "capitan.publicaciones",
+    "Atractivos": "capitan.atractivos",
+    "Oferta": "capitan.oferta",
+    "Videos": "capitan.videos",
 }
 
 # --- NODOS DEL GRAFO DE MANDO DEL CORONEL ---
@@ -61,12 +64,15 @@ async def create_tactical_plan(state: TurismoColonelState) -> TurismoColonelStat
     user_context = state.get("app_context", {})
     user = user_context.get("user")  # Se espera que el objeto de usuario esté aquí
     conversation_history = state.get("conversation_history", [])
+    if state.get("history_tokens") is None:
+        state["history_tokens"] = count_history_tokens(conversation_history)
 
     # El prompt ahora es una guía clara para el LLM sobre sus capacidades
     base_prompt = f"""
 Eres el Coronel de la División de Turismo. Tu General (el usuario) te ha dado una orden estratégica.
 Tu deber es analizar esta orden y descomponerla en un plan táctico, asignando cada misión al Capitán especialista más adecuado.
 Debes devolver SIEMPRE una respuesta en formato JSON válido, siguiendo la estructura de la clase `TacticalPlan`.
+Para cada misión indica en `depends_on` los índices (desde 0) de las misiones anteriores que deben terminar antes; usa [] si es independiente. Las misiones independientes se ejecutan en paralelo.
 
 **Capitanes bajo tu mando y sus especialidades:**
 - **'Admin'**: Capitán de administración general. Asigna misiones de configuración del sitio, gestión de usuarios y moderación de alto nivel.
@@ -101,14 +107,22 @@ Analiza la siguiente orden y genera el plan táctico en formato JSON. Sé concis
 **Orden: "{state['general_order']}"**
 """
     try:
-        # --- INVOCACIÓN DEL ROUTER HÍBRIDO ---
-        llm_response_str = await route_llm_request(prompt, conversation_history, user)
-
-        # Parsear la respuesta JSON del LLM
-        llm_response_json = json.loads(llm_response_str)
-
-        # Validar y estructurar con Pydantic
-        plan = TacticalPlan.parse_obj(llm_response_json)
+        # --- INVOCACIÓN DEL ROUTER HÍBRIDO (EN STREAMING) ---
+        # Los fragmentos se reenvían como eventos de progreso para que la vista de
+        # streaming muestre actividad desde el primer token. El prompt no lleva datos del
+        # catálogo: el plan no depende de ningún modelo y no se invalida al cambiar contenido.
+        # Solo se guarda en la caché un plan que pasa la validación de `TacticalPlan`.
+        chunks = await route_llm_request(
+            prompt, conversation_history, user, stream=True, semantic_text=state['general_order'],
+            history_tokens=state["history_tokens"], depends_on=[], validate=parse_tactical_plan
+        )
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            emit_progress({"event": "token", "unit": "CORONEL", "text": chunk})
+        llm_response_str = "".join(parts)
+
+        plan = parse_tactical_plan(llm_response_str)
 
         state.update({
             "tactical_plan": plan,
@@ -122,39 +136,43 @@ Analiza la siguiente orden y genera el plan táctico en formato JSON. Sé concis
         state["error"] = f"Error crítico al planificar: {e}"
     return state
 
-def route_to_captain(state: TurismoColonelState):
-    """(NODO 2: ENRUTADOR DE MANDO) Selecciona el Capitán según la próxima misión."""
-    if state.get("error") or not state.get("task_queue"):
-        return "compile_report"
-
-    next_mission = state["task_queue"][0]
-    captain_unit = next_mission.responsible_captain
-
-    if captain_unit in capitanes:
-        return captain_unit
-    else:
-        state["error"] = f"Error de planificación: Capitán '{captain_unit}' desconocido."
-        state["task_queue"].pop(0)
-        return "route_to_captain"
+async def delegate_mission(mission: CaptainTask, app_context: Any) -> Dict[str, str]:
+    """Invoca el sub-grafo del Capitán responsable de una misión y devuelve su registro."""
+    captain_name = mission.responsible_captain
+    if captain_name not in capitanes:
+        raise ValueError(f"Error de planificación: Capitán '{captain_name}' desconocido.")
 
-async def delegate_mission(state: TurismoColonelState, captain_name: str) -> TurismoColonelState:
-    """(NODO DE DELEGACIÓN) Invoca dinámicamente el sub-grafo del Capitán adecuado."""
-    mission = state["task_queue"].pop(0)
     print(f"--- 🔽 CORONEL: Delegando a CAP. {captain_name.upper()} -> '{mission.task_description}' ---")
     try:
-        captain_agent = capitanes[captain_name]
+        captain_agent = await graph_registry.aget(capitanes[captain_name])
         # CORRECCIÓN VITAL: Pasar el app_context al capitán.
         result = await captain_agent.ainvoke({
             "coronel_order": mission.task_description,
-            "app_context": state.get("app_context")
-        })
-        state["completed_missions"].append({
-            "captain": captain_name,
-            "mission": mission.task_description,
-            "report": result.get("final_report", "Sin reporte.")
+            "app_context": app_context
         })
     except Exception as e:
-        state["error"] = f"Error al ejecutar Capitán {captain_name}: {e}"
+        raise RuntimeError(f"Error al ejecutar Capitán {captain_name}: {e}") from e
+    return {
+        "captain": captain_name,
+        "mission": mission.task_description,
+        "report": result.get("final_report", "Sin reporte.")
+    }
+
+async def execute_tactical_plan(state: TurismoColonelState) -> TurismoColonelState:
+    """(NODO 2: DESPLIEGUE) Ejecuta el plan por oleadas: las misiones independientes van en paralelo."""
+    if state.get("error") or not state.get("task_queue"):
+        return state
+
+    app_context = state.get("app_context")
+    completed, error = await execute_plan_in_waves(
+        state["task_queue"],
+        lambda index, mission: delegate_mission(mission, app_context),
+        unit_name="CORONEL",
+    )
+    state["completed_missions"] = completed
+    state["task_queue"] = []
+    if error:
+        state["error"] = error
     return state
 
 async def compile_final_report(state: TurismoColonelState) -> TurismoColonelState:
@@ -171,9 +189,17 @@ async def compile_final_report(state: TurismoColonelState) -> TurismoColonelStat
 
     # Actualizar el historial de conversación para la próxima ronda
     history = state.get("conversation_history", [])
-    history.append({"role": "user", "content": state["general_order"]})
-    history.append({"role": "assistant", "content": state["final_report"]})
+    history_tokens = state.get("history_tokens")
+    if history_tokens is None:
+        history_tokens = count_history_tokens(history)
+    new_messages = [
+        {"role": "user", "content": state["general_order"]},
+        {"role": "assistant", "content": state["final_report"]},
+    ]
+    history.extend(new_messages)
     state["conversation_history"] = history
+    # Total incremental: solo se tokenizan los mensajes nuevos de este turno.
+    state["history_tokens"] = history_tokens + sum(count_message_tokens(m["content"]) for m in new_messages)
 
     return state
 
@@ -184,22 +210,87 @@ def get_turismo_coronel_graph():
     workflow = StateGraph(TurismoColonelState)
 
     workflow.add_node("planner", create_tactical_plan)
-    workflow.add_node("router", lambda s: s) # Nodo 'passthrough' para el enrutador
-
-    for name in capitanes.keys():
-        workflow.add_node(name, lambda state, c_name=name: delegate_mission(state, c_name))
-        workflow.add_edge(name, "router")
-
+    workflow.add_node("executor", execute_tactical_plan)
     workflow.add_node("compiler", compile_final_report)
 
     workflow.set_entry_point("planner")
-    workflow.add_edge("planner", "router")
-
-    conditional_map = {name: name for name in capitanes.keys()}
-    conditional_map["compile_report"] = "compiler"
-    workflow.add_conditional_edges("router", route_to_captain, conditional_map)
-
+    workflow.add_edge("planner", "executor")
+    workflow.add_edge("executor", "compiler")
     workflow.add_edge("compiler", END)
 
     print("⚜️ CORONEL DE TURISMO: Puesto de mando establecido. Ejército de agentes listo para recibir órdenes.")
-    return workflow.compile()
\ No newline at end of file
+    # Los sub-grafos de los Capitanes heredan este checkpointer al ser invocados desde los nodos.
+    return workflow.compile(checkpointer=get_agent_checkpointer())
+
+# --- EJECUCIÓN EN STREAMING PARA LA API ---
+
+def build_report_event(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Evento final de una orden a partir del estado del Coronel."""
+    return {
+        "event": "report",
+        "report": state.get("final_report", "El Coronel no generó un informe final."),
+        "error": state.get("error"),
+        "history_tokens": state.get("history_tokens"),
+    }
+
+async def stream_general_order(
+    general_order: str,
+    app_context: Any,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    history_tokens: Optional[int] = None,
+    task_id: Any = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Ejecuta una orden del General y produce eventos a medida que el Coronel avanza:
+    `token` (fragmentos del plan), `plan`, `mission_started`, `mission_completed`,
+    `mission_failed` y, por último, `report` con el informe final.
+
+    `task_id` (el id de la `AgentTask`) identifica el hilo de checkpoints. Si ese hilo
+    quedó interrumpido (p. ej. se cayó el worker), la orden se reanuda desde el último
+    punto de control, emitiendo antes un evento `resumed`; si ya había terminado, se
+    devuelve su informe sin volver a ejecutar nada.
+    """
+    coronel_agent = await graph_registry.aget("coronel")
+    config = thread_config(task_id)
+    status = await get_thread_status(coronel_agent, config) if task_id else "new"
+
+    if status == "finished":
+        snapshot = await coronel_agent.aget_state(config)
+        yield build_report_event(snapshot.values)
+        return
+
+    if status == "interrupted":
+        print(f"--- ♻️ CORONEL: Reanudando la orden {config['configurable']['thread_id']} desde su último punto de control. ---")
+        yield {"event": "resumed", "task_id": config["configurable"]["thread_id"]}
+        payload = None
+    else:
+        payload = {
+            "general_order": general_order,
+            "app_context": app_context,
+            "conversation_history": conversation_history or [],
+            "history_tokens": history_tokens,
+        }
+
+    final_state: Dict[str, Any] = {}
+    async for mode, chunk in coronel_agent.astream(payload, config, stream_mode=["custom", "updates"]):
+        if mode == "custom":
+            yield chunk
+            continue
+        for node_name, update in (chunk or {}).items():
+            if node_name == "planner" and update.get("tactical_plan"):
+                yield {
+                    "event": "plan",
+                    "missions": [task.dict() for task in update["tactical_plan"].plan],
+                }
+            elif node_name == "compiler":
+                final_state = update
+
+    yield build_report_event(final_state)
+
+async def run_general_order(general_order: str, app_context: Any, task_id: Any = None, **kwargs) -> Dict[str, Any]:
+    """Variante sin streaming: ejecuta (o reanuda) la orden y devuelve el evento `report`."""
+    report: Dict[str, Any] = {}
+    async for event in stream_general_order(general_order, app_context, task_id=task_id, **kwargs):
+        if event.get("event") == "report":
+            report = event
+    return report
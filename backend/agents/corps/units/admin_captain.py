@@ -1,17 +1,11 @@
-from typing import TypedDict, Any, List
+from typing import TypedDict, Any, Dict, List, Optional
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 
-# --- Importamos los Pelotones (Tenientes) que este Capitán comanda ---
-from .platoons.prestadores_teniente import get_prestadores_teniente_graph
-from .platoons.artesanos_teniente import get_artesanos_teniente_graph
-from .platoons.teniente_generico import get_generic_lieutenant_graph
-
-# --- Importamos los constructores de Sargentos para los Tenientes Genéricos ---
-from .platoons.squads.gestion_publicaciones_sargento import get_gestion_publicaciones_sargento_graph
-from .platoons.squads.gestion_atractivos_sargento import get_gestion_atractivos_sargento_graph
-from .platoons.squads.gestion_admin_sargento import get_gestion_admin_sargento_graph
+# --- Los Pelotones (Tenientes) que este Capitán comanda se obtienen del arsenal de grafos ---
+from ..registry import graph_registry
+from ..dispatch import execute_plan_in_waves
 
 # --- DEFINICIÓN DEL ESTADO Y EL PLAN TÁCTICO DEL CAPITÁN ---
 
@@ -21,6 +15,10 @@ class LieutenantTask(BaseModel):
     responsible_lieutenant: str = Field(
         description="El Teniente especialista. Debe ser uno de: 'Prestadores', 'Artesanos', 'Publicaciones', 'Atractivos', 'Admin'."
     )
+    depends_on: Optional[List[int]] = Field(
+        default=None,
+        description="Índices (desde 0) de las misiones anteriores del plan que deben completarse antes de esta. Usa [] si la misión es independiente."
+    )
 
 class LieutenantPlan(BaseModel):
     """El plan de pelotón completo generado por el Capitán de Administración."""
@@ -36,14 +34,14 @@ class AdminCaptainState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO: INSTANCIACIÓN DE TENIENTES ---
-# Se instancian una sola vez para eficiencia
+# --- PUESTO DE MANDO: CADENA DE MANDO DE TENIENTES ---
+# Cada Teniente se compila la primera vez que recibe una misión.
 tenientes = {
-    "Prestadores": get_prestadores_teniente_graph(),
-    "Artesanos": get_artesanos_teniente_graph(),
-    "Publicaciones": get_generic_lieutenant_graph(get_gestion_publicaciones_sargento_graph, "Publicaciones"),
-    "Atractivos": get_generic_lieutenant_graph(get_gestion_atractivos_sargento_graph, "Atractivos"),
-    "Admin": get_generic_lieutenant_graph(get_gestion_admin_sargento_graph, "Admin"),
+    "Prestadores": "teniente.prestadores",
+    "Artesanos": "teniente.artesanos",
+    "Publicaciones": "teniente.publicaciones",
+    "Atractivos": "teniente.atractivos",
+    "Admin": "teniente.admin",
 }
 
 # --- NODOS DEL GRAFO DE MANDO DEL CAPITÁN ---
@@ -64,6 +62,8 @@ Tenientes bajo tu mando y sus especialidades:
 - 'Atractivos': Un teniente supervisor para crear, actualizar y publicar atractivos turísticos.
 - 'Admin': Un teniente supervisor para tareas de administración del sitio: gestionar usuarios, cambiar la configuración general, moderar reseñas, etc.
 
+Para cada misión indica en `depends_on` los índices (desde 0) de las misiones anteriores que deben terminar antes; usa [] si es independiente. Las misiones independientes se ejecutan en paralelo.
+
 Analiza la orden de tu Coronel y genera el plan de pelotón en formato JSON:
 "{state['coronel_order']}"
 """
@@ -79,39 +79,41 @@ Analiza la orden de tu Coronel y genera el plan de pelotón en formato JSON:
     except Exception as e:
         state["error"] = f"No se pudo crear un plan de pelotón: {e}"; return state
 
-def route_to_lieutenant(state: AdminCaptainState):
-    """(NODO 2: ENRUTADOR) Lee la siguiente misión y dirige el flujo al Teniente correcto."""
-    if state.get("error") or not state.get("task_queue"):
-        return "compile_report"
-
-    next_mission = state["task_queue"][0]
-    lieutenant_unit = next_mission.responsible_lieutenant
-
-    if lieutenant_unit in tenientes:
-        return lieutenant_unit
-    else:
-        state["error"] = f"Error de planificación: Teniente '{lieutenant_unit}' desconocido."
-        state["task_queue"].pop(0)
-        return "route_to_lieutenant"
-
 # --- NODOS DE DELEGACIÓN DE MANDO (SUB-GRAFOS) ---
 
-async def delegate_mission(state: AdminCaptainState, teniente_name: str) -> AdminCaptainState:
-    """Función genérica para invocar a cualquier teniente."""
-    mission = state["task_queue"].pop(0)
-    print(f"--- 🫡 CAP. ADMIN: Delegando a TTE. {teniente_name} -> '{mission.task_description}' ---")
+async def delegate_mission(mission: LieutenantTask, app_context: Any) -> Dict[str, str]:
+    """Función genérica para invocar a cualquier teniente y devolver el registro de su misión."""
+    teniente_name = mission.responsible_lieutenant
+    if teniente_name not in tenientes:
+        raise ValueError(f"Error de planificación: Teniente '{teniente_name}' desconocido.")
 
-    teniente_agent = tenientes[teniente_name]
-    result = await teniente_agent.ainvoke({
+    print(f"--- 🫡 CAP. ADMIN: Delegando a TTE. {teniente_name} -> '{mission.task_description}' ---")
+    lieutenant_agent = await graph_registry.aget(tenientes[teniente_name])
+    result = await lieutenant_agent.ainvoke({
         "captain_order": mission.task_description,
-        "app_context": state.get('app_context')
+        "app_context": app_context
     })
-
-    state["completed_missions"].append({
+    return {
         "lieutenant": teniente_name,
         "mission": mission.task_description,
         "report": result.get("final_report", "Sin reporte detallado.")
-    })
+    }
+
+async def execute_plan(state: AdminCaptainState) -> AdminCaptainState:
+    """(NODO 2: DESPLIEGUE) Ejecuta el plan por oleadas: las misiones independientes van en paralelo."""
+    if state.get("error") or not state.get("task_queue"):
+        return state
+
+    app_context = state.get('app_context')
+    completed, error = await execute_plan_in_waves(
+        state["task_queue"],
+        lambda index, mission: delegate_mission(mission, app_context),
+        unit_name="CAP. ADMIN",
+    )
+    state["completed_missions"] = completed
+    state["task_queue"] = []
+    if error:
+        state["error"] = error
     return state
 
 async def compile_final_report(state: AdminCaptainState) -> AdminCaptainState:
@@ -131,22 +133,12 @@ def get_admin_captain_graph():
     workflow = StateGraph(AdminCaptainState)
 
     workflow.add_node("planner", create_lieutenant_plan)
-
-    for name in tenientes.keys():
-        workflow.add_node(name, lambda state, t_name=name: delegate_mission(state, t_name))
-        workflow.add_edge(name, "router")
-
+    workflow.add_node("executor", execute_plan)
     workflow.add_node("compiler", compile_final_report)
-    workflow.add_node("router", lambda state: state)
 
     workflow.set_entry_point("planner")
-    workflow.add_edge("planner", "router")
-
-    workflow.add_conditional_edges("router", route_to_lieutenant, {
-        **{name: name for name in tenientes.keys()},
-        "compile_report": "compiler"
-    })
-
+    workflow.add_edge("planner", "executor")
+    workflow.add_edge("executor", "compiler")
     workflow.add_edge("compiler", END)
 
     print("✅ Doctrina aplicada: Capitán Orquestador de Administración compilado y listo.")
@@ -1,9 +1,8 @@
 from typing import TypedDict, Any
 from langgraph.graph import StateGraph, END
 
-# --- Importamos la fábrica de Tenientes Genéricos y el constructor del Sargento a comandar ---
-from .platoons.teniente_generico import get_generic_lieutenant_graph
-from .platoons.squads.gestion_atractivos_sargento import get_gestion_atractivos_sargento_graph
+# --- Arsenal de grafos: el Teniente se compila solo cuando recibe su primera orden ---
+from ..registry import graph_registry
 
 class AtractivosCaptainState(TypedDict):
     """La pizarra táctica del Capitán de Atractivos Turísticos."""
@@ -12,12 +11,8 @@ class AtractivosCaptainState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO: INSTANCIACIÓN DEL TENIENTE ---
-# Usamos la fábrica para crear un Teniente Supervisor que comanda al Sargento de Atractivos.
-atractivos_teniente_agent = get_generic_lieutenant_graph(
-    sargento_builder=get_gestion_atractivos_sargento_graph,
-    teniente_name="Atractivos Turísticos"
-)
+# --- PUESTO DE MANDO: CLAVE DEL TENIENTE EN EL ARSENAL ---
+TENIENTE_KEY = "teniente.atractivos"
 
 # --- NODOS DEL GRAFO SUPERVISOR DEL CAPITÁN ---
 
@@ -28,6 +23,7 @@ async def delegate_to_lieutenant(state: AtractivosCaptainState) -> AtractivosCap
     order = state['coronel_order']
     print(f"--- 🫡 CAP. ATRACTIVOS: Recibida orden. Delegando a TTE. ATRACTIVOS -> '{order}' ---")
     try:
+        atractivos_teniente_agent = await graph_registry.aget(TENIENTE_KEY)
         result = await atractivos_teniente_agent.ainvoke({
             "captain_order": order,
             "app_context": state.get('app_context')
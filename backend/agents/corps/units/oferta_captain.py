@@ -1,9 +1,8 @@
 from typing import TypedDict, Any
 from langgraph.graph import StateGraph, END
 
-# --- Importamos la fábrica de Tenientes Genéricos y el constructor del Sargento a comandar ---
-from .platoons.teniente_generico import get_generic_lieutenant_graph
-from .platoons.squads.gestion_oferta_sargento import get_gestion_oferta_sargento_graph
+# --- Arsenal de grafos: el Teniente se compila solo cuando recibe su primera orden ---
+from ..registry import graph_registry
 
 class OfertaCaptainState(TypedDict):
     """La pizarra táctica del Capitán de Oferta Turística."""
@@ -12,12 +11,8 @@ class OfertaCaptainState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO: INSTANCIACIÓN DEL TENIENTE ---
-# Usamos la fábrica para crear un Teniente Supervisor que comanda al Sargento de Oferta.
-oferta_teniente_agent = get_generic_lieutenant_graph(
-    sargento_builder=get_gestion_oferta_sargento_graph,
-    teniente_name="Oferta Turística"
-)
+# --- PUESTO DE MANDO: CLAVE DEL TENIENTE EN EL ARSENAL ---
+TENIENTE_KEY = "teniente.oferta"
 
 # --- NODOS DEL GRAFO SUPERVISOR DEL CAPITÁN ---
 
@@ -28,6 +23,7 @@ async def delegate_to_lieutenant(state: OfertaCaptainState) -> OfertaCaptainStat
     order = state['coronel_order']
     print(f"--- 🫡 CAP. OFERTA: Recibida orden. Delegando a TTE. OFERTA -> '{order}' ---")
     try:
+        oferta_teniente_agent = await graph_registry.aget(TENIENTE_KEY)
         result = await oferta_teniente_agent.ainvoke({
             "captain_order": order,
             "app_context": state.get('app_context')
@@ -1,8 +1,8 @@
 from typing import TypedDict, Any
 from langgraph.graph import StateGraph, END
 
-# --- Importamos al comandante de escuadra: el Sargento especialista ---
-from .squads.gestion_agencias_sargento import get_gestion_agencias_sargento_graph
+# --- Arsenal de grafos: el Sargento se compila solo cuando recibe su primera orden ---
+from ...registry import graph_registry
 
 class AgenciasLieutenantState(TypedDict):
     """La pizarra táctica del Teniente de Agencias de Viajes."""
@@ -11,8 +11,8 @@ class AgenciasLieutenantState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO DEL TENIENTE: INSTANCIA DE SU SARGENTO ---
-agencias_sargento_agent = get_gestion_agencias_sargento_graph()
+# --- PUESTO DE MANDO DEL TENIENTE: CLAVE DE SU SARGENTO EN EL ARSENAL ---
+SARGENTO_KEY = "sargento.agencias"
 
 # --- NODOS DEL GRAFO SUPERVISOR DEL TENIENTE ---
 
@@ -23,6 +23,7 @@ async def delegate_to_sargento(state: AgenciasLieutenantState) -> AgenciasLieute
     order = state['captain_order']
     print(f"--- 🫡 TENIENTE DE AGENCIAS: Recibida orden. Delegando misión al Sargento -> '{order}' ---")
     try:
+        agencias_sargento_agent = await graph_registry.aget(SARGENTO_KEY)
         result = await agencias_sargento_agent.ainvoke({
             "teniente_order": order,
             "app_context": state.get('app_context')
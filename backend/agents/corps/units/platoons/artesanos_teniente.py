@@ -1,8 +1,8 @@
 from typing import TypedDict, Any
 from langgraph.graph import StateGraph, END
 
-# --- Importamos al comandante de escuadra: el Sargento especialista ---
-from .squads.gestion_artesanos_sargento import get_gestion_artesanos_sargento_graph
+# --- Arsenal de grafos: el Sargento se compila solo cuando recibe su primera orden ---
+from ...registry import graph_registry
 
 class ArtesanosLieutenantState(TypedDict):
     """La pizarra táctica del Teniente de Artesanos."""
@@ -11,9 +11,8 @@ class ArtesanosLieutenantState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO DEL TENIENTE: INSTANCIA DE SU SARGENTO ---
-# El Teniente conoce y confía en su suboficial principal.
-artesanos_sargento_agent = get_gestion_artesanos_sargento_graph()
+# --- PUESTO DE MANDO DEL TENIENTE: CLAVE DE SU SARGENTO EN EL ARSENAL ---
+SARGENTO_KEY = "sargento.artesanos"
 
 # --- NODOS DEL GRAFO SUPERVISOR DEL TENIENTE ---
 
@@ -26,6 +25,7 @@ async def delegate_to_sargento(state: ArtesanosLieutenantState) -> ArtesanosLieu
     print(f"--- 🫡 TENIENTE DE ARTESANOS: Recibida orden. Delegando misión al Sargento -> '{order}' ---")
     try:
         # El Teniente invoca el grafo completo del Sargento, pasándole la orden y el contexto.
+        artesanos_sargento_agent = await graph_registry.aget(SARGENTO_KEY)
         result = await artesanos_sargento_agent.ainvoke({
             "teniente_order": order,
             "app_context": state.get('app_context')
@@ -1,8 +1,8 @@
 from typing import TypedDict, Any
 from langgraph.graph import StateGraph, END
 
-# --- Importamos al comandante de escuadra: el Sargento especialista ---
-from .squads.gestion_oferta_sargento import get_gestion_oferta_sargento_graph
+# --- Arsenal de grafos: el Sargento se compila solo cuando recibe su primera orden ---
+from ...registry import graph_registry
 
 class OfertaLieutenantState(TypedDict):
     """La pizarra táctica del Teniente de Oferta Turística."""
@@ -11,8 +11,8 @@ class OfertaLieutenantState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO DEL TENIENTE: INSTANCIA DE SU SARGENTO ---
-oferta_sargento_agent = get_gestion_oferta_sargento_graph()
+# --- PUESTO DE MANDO DEL TENIENTE: CLAVE DE SU SARGENTO EN EL ARSENAL ---
+SARGENTO_KEY = "sargento.oferta"
 
 # --- NODOS DEL GRAFO SUPERVISOR DEL TENIENTE ---
 
@@ -23,6 +23,7 @@ async def delegate_to_sargento(state: OfertaLieutenantState) -> OfertaLieutenant
     order = state['captain_order']
     print(f"--- 🫡 TENIENTE DE OFERTA: Recibida orden. Delegando misión al Sargento -> '{order}' ---")
     try:
+        oferta_sargento_agent = await graph_registry.aget(SARGENTO_KEY)
         result = await oferta_sargento_agent.ainvoke({
             "teniente_order": order,
             "app_context": state.get('app_context')
@@ -1,15 +1,11 @@
-from typing import TypedDict, Any, List
+from typing import TypedDict, Any, Dict, List, Optional
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 
-# --- Importamos a los comandantes de escuadra: los Sargentos Especialistas ---
-from .squads.gestion_hoteles_sargento import get_gestion_hoteles_sargento_graph
-from .squads.gestion_restaurantes_sargento import get_gestion_restaurantes_sargento_graph
-from .squads.gestion_guias_sargento import get_gestion_guias_sargento_graph
-from .squads.gestion_agencias_sargento import get_gestion_agencias_sargento_graph
-from .squads.gestion_transporte_sargento import get_gestion_transporte_sargento_graph
-from .squads.gestion_prestador_sargento import get_gestion_prestador_sargento_graph
+# --- Los Sargentos Especialistas se obtienen del arsenal de grafos ---
+from ...registry import graph_registry
+from ...dispatch import execute_plan_in_waves
 
 # --- DEFINICIÓN DEL ESTADO Y EL PLAN TÁCTICO DEL TENIENTE ---
 
@@ -19,6 +15,10 @@ class SargentoTask(BaseModel):
     responsible_sargento: str = Field(
         description="El Sargento especialista. Debe ser uno de: 'Hoteles', 'Restaurantes', 'Guias', 'Agencias', 'Transporte', 'Generico'."
     )
+    depends_on: Optional[List[int]] = Field(
+        default=None,
+        description="Índices (desde 0) de las misiones anteriores del plan que deben completarse antes de esta. Usa [] si la misión es independiente."
+    )
 
 class SargentoPlan(BaseModel):
     """El plan de escuadra generado por el Teniente para cumplir la orden del Capitán."""
@@ -34,15 +34,15 @@ class PrestadoresLieutenantState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO: INSTANCIACIÓN DE SARGENTOS ---
-# Se instancian una sola vez para eficiencia
+# --- PUESTO DE MANDO: CADENA DE MANDO DE SARGENTOS ---
+# Cada Sargento se compila la primera vez que recibe una misión.
 sargentos = {
-    "Hoteles": get_gestion_hoteles_sargento_graph(),
-    "Restaurantes": get_gestion_restaurantes_sargento_graph(),
-    "Guias": get_gestion_guias_sargento_graph(),
-    "Agencias": get_gestion_agencias_sargento_graph(),
-    "Transporte": get_gestion_transporte_sargento_graph(),
-    "Generico": get_gestion_prestador_sargento_graph(),
+    "Hoteles": "sargento.hoteles",
+    "Restaurantes": "sargento.restaurantes",
+    "Guias": "sargento.guias",
+    "Agencias": "sargento.agencias",
+    "Transporte": "sargento.transporte",
+    "Generico": "sargento.prestador",
 }
 
 # --- NODOS DEL GRAFO ORQUESTADOR DEL TENIENTE ---
@@ -65,6 +65,8 @@ Sargentos bajo tu mando y sus especialidades:
 - 'Transporte': Gestiona empresas de transporte turístico.
 - 'Generico': Usa este sargento para tareas generales sobre prestadores que no encajan en una especialidad, como listar todas las categorías o realizar búsquedas amplias.
 
+Para cada misión indica en `depends_on` los índices (desde 0) de las misiones anteriores que deben terminar antes; usa [] si es independiente. Las misiones independientes se ejecutan en paralelo.
+
 Analiza la orden de tu Capitán y genera el plan de escuadra en formato JSON:
 "{state['captain_order']}"
 """
@@ -80,40 +82,41 @@ Analiza la orden de tu Capitán y genera el plan de escuadra en formato JSON:
     except Exception as e:
         state["error"] = f"No se pudo crear un plan de escuadra: {e}"; return state
 
-def route_to_sargento(state: PrestadoresLieutenantState):
-    """(NODO 2: ENRUTADOR) Lee la siguiente misión y dirige el flujo al Sargento correcto."""
-    if state.get("error") or not state.get("task_queue"):
-        return "compile_report"
-
-    next_mission = state["task_queue"][0]
-    sargento_unit = next_mission.responsible_sargento
-
-    if sargento_unit in sargentos:
-        return sargento_unit
-    else:
-        # Si el LLM alucina un sargento, se maneja el error y se continúa.
-        state["error"] = f"Error de planificación: Sargento '{sargento_unit}' desconocido."
-        state["task_queue"].pop(0)
-        return "route_to_sargento"
-
 # --- NODOS DE DELEGACIÓN DE MANDO (SUB-GRAFOS) ---
 
-async def delegate_mission(state: PrestadoresLieutenantState, sargento_name: str) -> PrestadoresLieutenantState:
-    """Función genérica para invocar a cualquier sargento."""
-    mission = state["task_queue"].pop(0)
-    print(f"--- 🫡 TTE. PRESTADORES: Delegando a SGTO. {sargento_name} -> '{mission.task_description}' ---")
+async def delegate_mission(mission: SargentoTask, app_context: Any) -> Dict[str, str]:
+    """Función genérica para invocar a cualquier sargento y devolver el registro de su misión."""
+    sargento_name = mission.responsible_sargento
+    if sargento_name not in sargentos:
+        raise ValueError(f"Error de planificación: Sargento '{sargento_name}' desconocido.")
 
-    sargento_agent = sargentos[sargento_name]
+    print(f"--- 🫡 TTE. PRESTADORES: Delegando a SGTO. {sargento_name} -> '{mission.task_description}' ---")
+    sargento_agent = await graph_registry.aget(sargentos[sargento_name])
     result = await sargento_agent.ainvoke({
         "teniente_order": mission.task_description,
-        "app_context": state.get('app_context')
+        "app_context": app_context
     })
-
-    state["completed_missions"].append({
+    return {
         "sargento": sargento_name,
         "mission": mission.task_description,
         "report": result.get("final_report", "Sin reporte detallado.")
-    })
+    }
+
+async def execute_plan(state: PrestadoresLieutenantState) -> PrestadoresLieutenantState:
+    """(NODO 2: DESPLIEGUE) Ejecuta el plan por oleadas: las misiones independientes van en paralelo."""
+    if state.get("error") or not state.get("task_queue"):
+        return state
+
+    app_context = state.get('app_context')
+    completed, error = await execute_plan_in_waves(
+        state["task_queue"],
+        lambda index, mission: delegate_mission(mission, app_context),
+        unit_name="TTE. PRESTADORES",
+    )
+    state["completed_missions"] = completed
+    state["task_queue"] = []
+    if error:
+        state["error"] = error
     return state
 
 async def compile_final_report(state: PrestadoresLieutenantState) -> PrestadoresLieutenantState:
@@ -133,23 +136,12 @@ def get_prestadores_teniente_graph():
     workflow = StateGraph(PrestadoresLieutenantState)
 
     workflow.add_node("planner", create_sargento_plan)
-
-    # Nodos de delegación para cada sargento
-    for name in sargentos.keys():
-        workflow.add_node(name, lambda state, s_name=name: delegate_mission(state, s_name))
-        workflow.add_edge(name, "router")
-
+    workflow.add_node("executor", execute_plan)
     workflow.add_node("compiler", compile_final_report)
-    workflow.add_node("router", lambda state: state) # Nodo 'passthrough' para el enrutador
 
     workflow.set_entry_point("planner")
-    workflow.add_edge("planner", "router")
-
-    workflow.add_conditional_edges("router", route_to_sargento, {
-        **{name: name for name in sargentos.keys()}, # Rutas a cada sargento
-        "compile_report": "compiler"
-    })
-
+    workflow.add_edge("planner", "executor")
+    workflow.add_edge("executor", "compiler")
     workflow.add_edge("compiler", END)
 
     print("✅ Doctrina aplicada: Teniente Orquestador de Prestadores compilado y listo.")
@@ -7,7 +7,7 @@ def get_gestion_turista_sargento_graph():
 
     Este sargento comanda a la escuadra de soldados que interactúan con los turistas.
     Sus misiones incluyen buscar información, gestionar la lista 'Mi Viaje',
-    recibir reseñas y procesar sugerencias.
+    planificar itinerarios, recibir reseñas y procesar sugerencias.
     """
     squad = get_turista_soldiers()
     builder = SargentoGraphBuilder(squad, squad_name="Asistencia al Turista")
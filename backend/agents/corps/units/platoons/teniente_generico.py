@@ -1,6 +1,8 @@
 from typing import TypedDict, Any, Callable
 from langgraph.graph import StateGraph, END
 
+from ...registry import graph_registry
+
 # --- ESTADO GENÉRICO DEL TENIENTE ---
 
 class GenericLieutenantState(TypedDict):
@@ -13,7 +15,7 @@ class GenericLieutenantState(TypedDict):
 # --- CONSTRUCTOR DEL TENIENTE GENÉRICO (PATRÓN FACTORY) ---
 
 def get_generic_lieutenant_graph(
-    sargento_builder: Callable[[], Any],
+    sargento_key: str,
     teniente_name: str
 ) -> Callable:
     """
@@ -23,16 +25,14 @@ def get_generic_lieutenant_graph(
     para cada sargento que solo necesita delegación directa, usamos esta función.
 
     Args:
-        sargento_builder: La función que construye al sargento (ej. get_gestion_videos_sargento_graph).
+        sargento_key: La clave del sargento en el arsenal de grafos (ej. "sargento.videos").
+            El sargento se compila la primera vez que el teniente le delega una misión.
         teniente_name: El nombre de la unidad del teniente para los logs (ej. "Videos").
 
     Returns:
         Un agente LangGraph compilado y listo para usar.
     """
 
-    # --- PUESTO DE MANDO: INSTANCIA DEL SARGENTO PASADO COMO PARÁMETRO ---
-    sargento_agent = sargento_builder()
-
     # --- NODOS DEL GRAFO SUPERVISOR ---
 
     async def delegate_to_sargento(state: GenericLieutenantState) -> GenericLieutenantState:
@@ -42,6 +42,7 @@ def get_generic_lieutenant_graph(
         order = state['captain_order']
         print(f"--- 🫡 TENIENTE GENÉRICO ({teniente_name}): Delegando misión al Sargento -> '{order}' ---")
         try:
+            sargento_agent = await graph_registry.aget(sargento_key)
             result = await sargento_agent.ainvoke({
                 "teniente_order": order,
                 "app_context": state.get('app_context')
@@ -1,8 +1,8 @@
 from typing import TypedDict, Any
 from langgraph.graph import StateGraph, END
 
-# --- Importamos al comandante de escuadra: el Sargento especialista ---
-from .squads.gestion_transporte_sargento import get_gestion_transporte_sargento_graph
+# --- Arsenal de grafos: el Sargento se compila solo cuando recibe su primera orden ---
+from ...registry import graph_registry
 
 class TransporteLieutenantState(TypedDict):
     """La pizarra táctica del Teniente de Transporte Turístico."""
@@ -11,8 +11,8 @@ class TransporteLieutenantState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO DEL TENIENTE: INSTANCIA DE SU SARGENTO ---
-transporte_sargento_agent = get_gestion_transporte_sargento_graph()
+# --- PUESTO DE MANDO DEL TENIENTE: CLAVE DE SU SARGENTO EN EL ARSENAL ---
+SARGENTO_KEY = "sargento.transporte"
 
 # --- NODOS DEL GRAFO SUPERVISOR DEL TENIENTE ---
 
@@ -23,6 +23,7 @@ async def delegate_to_sargento(state: TransporteLieutenantState) -> TransporteLi
     order = state['captain_order']
     print(f"--- 🫡 TENIENTE DE TRANSPORTE: Recibida orden. Delegando misión al Sargento -> '{order}' ---")
     try:
+        transporte_sargento_agent = await graph_registry.aget(SARGENTO_KEY)
         result = await transporte_sargento_agent.ainvoke({
             "teniente_order": order,
             "app_context": state.get('app_context')
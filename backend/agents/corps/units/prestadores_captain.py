@@ -1,8 +1,8 @@
 from typing import TypedDict, Any
 from langgraph.graph import StateGraph, END
 
-# --- Importamos el Pelotón que este Capitán comanda ---
-from .platoons.prestadores_teniente import get_prestadores_teniente_graph
+# --- Arsenal de grafos: el Teniente se compila solo cuando recibe su primera orden ---
+from ..registry import graph_registry
 
 class PrestadorCaptainState(TypedDict):
     """La pizarra táctica del Capitán de Prestadores."""
@@ -11,8 +11,8 @@ class PrestadorCaptainState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO: INSTANCIACIÓN DEL TENIENTE ---
-prestadores_teniente_agent = get_prestadores_teniente_graph()
+# --- PUESTO DE MANDO: CLAVE DEL TENIENTE EN EL ARSENAL ---
+TENIENTE_KEY = "teniente.prestadores"
 
 # --- NODOS DEL GRAFO SUPERVISOR DEL CAPITÁN ---
 
@@ -24,6 +24,7 @@ async def delegate_to_lieutenant(state: PrestadorCaptainState) -> PrestadorCapta
     order = state['coronel_order']
     print(f"--- 🫡 CAP. PRESTADORES: Recibida orden. Delegando a TTE. PRESTADORES -> '{order}' ---")
     try:
+        prestadores_teniente_agent = await graph_registry.aget(TENIENTE_KEY)
         result = await prestadores_teniente_agent.ainvoke({
             "captain_order": order,
             "app_context": state.get('app_context')
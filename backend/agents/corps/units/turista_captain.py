@@ -1,8 +1,8 @@
 from typing import TypedDict, Any
 from langgraph.graph import StateGraph, END
 
-# --- Importamos el Pelotón que este Capitán comanda ---
-from .platoons.turista_teniente import get_turista_teniente_graph
+# --- Arsenal de grafos: el Teniente se compila solo cuando recibe su primera orden ---
+from ..registry import graph_registry
 
 class TuristaCaptainState(TypedDict):
     """La pizarra táctica del Capitán de Turistas."""
@@ -11,8 +11,8 @@ class TuristaCaptainState(TypedDict):
     final_report: str
     error: str | None
 
-# --- PUESTO DE MANDO: INSTANCIACIÓN DEL TENIENTE ---
-turista_teniente_agent = get_turista_teniente_graph()
+# --- PUESTO DE MANDO: CLAVE DEL TENIENTE EN EL ARSENAL ---
+TENIENTE_KEY = "teniente.turista"
 
 # --- NODOS DEL GRAFO SUPERVISOR DEL CAPITÁN ---
 
@@ -23,6 +23,7 @@ async def delegate_to_lieutenant(state: TuristaCaptainState) -> TuristaCaptainSt
     order = state['coronel_order']
     print(f"--- 🫡 CAP. TURISTA: Recibida orden. Delegando a TTE. TURISTA -> '{order}' ---")
     try:
+        turista_teniente_agent = await graph_registry.aget(TENIENTE_KEY)
         result = await turista_teniente_agent.ainvoke({
             "captain_order": order,
             "app_context": state.get('app_context')
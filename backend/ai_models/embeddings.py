@@ -0,0 +1,68 @@
+import math
+import os
+from typing import List, Optional, Sequence
+
+import httpx
+
+from .http_clients import llm_clients
+
+# --- Configuración de Embeddings (Ollama) ---
+OLLAMA_EMBEDDINGS_URL = os.environ.get("OLLAMA_EMBEDDINGS_URL", "http://localhost:11434/api/embeddings")
+# Endpoint por lotes (`/api/embed`): varios textos en una sola petición.
+OLLAMA_EMBED_BATCH_URL = os.environ.get("OLLAMA_EMBED_BATCH_URL", "http://localhost:11434/api/embed")
+DEFAULT_EMBEDDING_MODEL = os.environ.get("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+
+
+async def embed_text(text: str, model_name: str = None) -> Optional[List[float]]:
+    """
+    Obtiene el embedding de un texto con el modelo local de Ollama.
+
+    Returns:
+        La lista de floats, o None si el servicio no está disponible (el llamador
+        debe degradar con elegancia, p. ej. usando solo coincidencia exacta).
+    """
+    payload = {"model": model_name or DEFAULT_EMBEDDING_MODEL, "prompt": text}
+    try:
+        response = await llm_clients.post("ollama", OLLAMA_EMBEDDINGS_URL, json=payload)
+        response.raise_for_status()
+        embedding = response.json().get("embedding")
+        return embedding or None
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"[Embeddings] No se pudo obtener el embedding: {e}")
+        return None
+
+
+async def embed_texts(texts: Sequence[str], model_name: str = None) -> Optional[List[List[float]]]:
+    """
+    Obtiene los embeddings de varios textos en una sola petición a Ollama.
+
+    Returns:
+        Una lista de vectores en el mismo orden que `texts`, o None si el servicio
+        no está disponible o la respuesta no trae un vector por texto.
+    """
+    if not texts:
+        return []
+    payload = {"model": model_name or DEFAULT_EMBEDDING_MODEL, "input": list(texts)}
+    try:
+        response = await llm_clients.post("ollama", OLLAMA_EMBED_BATCH_URL, json=payload)
+        response.raise_for_status()
+        embeddings = response.json().get("embeddings") or []
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"[Embeddings] No se pudo obtener el lote de embeddings: {e}")
+        return None
+    if len(embeddings) != len(texts):
+        print(f"[Embeddings] Ollama devolvió {len(embeddings)} embeddings para {len(texts)} textos.")
+        return None
+    return embeddings
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Similitud coseno entre dos vectores (0.0 si alguno es nulo o de distinta dimensión)."""
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
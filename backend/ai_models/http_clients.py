@@ -0,0 +1,218 @@
+import asyncio
+import importlib.util
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+import httpx
+
+# --- POOL DE CLIENTES HTTP PARA LOS PROVEEDORES DE LLM ---
+#
+# Una sola orden del Coronel dispara muchas llamadas al LLM a lo largo de la
+# cadena Capitán -> Teniente -> Sargento. Abrir un `httpx.AsyncClient` nuevo por
+# llamada costaba un handshake TCP (+TLS en Groq) en cada salto. Aquí se
+# mantiene un cliente de larga vida por proveedor, con keep-alive y HTTP/2
+# cuando está disponible, y se cuentan las conexiones nuevas para medir cuánto
+# se reutiliza el pool.
+#
+# Los clientes de httpx quedan atados al event loop que los creó, por eso el
+# pool se indexa por (event loop, proveedor): bajo ASGI hay un único loop y un
+# único cliente por proveedor; los loops efímeros (asyncio.run en comandos de
+# gestión, async_to_sync) reciben el suyo.
+#
+# Al terminar un loop hay que cerrar sus clientes con `aclose()`, dentro del propio
+# loop: soltarlos sin más dejaba sus sockets (y conexiones HTTP/2) abiertos hasta
+# el recolector de basura, con el aviso de httpx por cliente sin cerrar. Con el
+# primer cliente de cada loop se lanza una tarea centinela que solo espera; al
+# terminar, `asyncio.run` (que también usa async_to_sync) cancela las tareas
+# pendientes antes de cerrar el loop, y el centinela cierra entonces sus clientes.
+# Bajo ASGI el cierre lo hace antes el `lifespan` (`LLMClientLifespanMiddleware`).
+
+DEFAULT_HTTP_CLIENT_SETTINGS = {
+    "MAX_CONNECTIONS": 20,
+    "MAX_KEEPALIVE_CONNECTIONS": 10,
+    "KEEPALIVE_EXPIRY": 60.0,
+    "TIMEOUT": 90.0,
+    "CONNECT_TIMEOUT": 10.0,
+    "HTTP2": True,
+}
+
+NEW_CONNECTION_EVENTS = ("connection.connect_tcp.complete", "connection.connect_unix_socket.complete")
+
+
+def get_http_client_settings() -> Dict[str, Any]:
+    """Combina los valores por defecto con `settings.LLM_HTTP_CLIENT`."""
+    config = dict(DEFAULT_HTTP_CLIENT_SETTINGS)
+    try:
+        from django.conf import settings
+        config.update(getattr(settings, "LLM_HTTP_CLIENT", {}) or {})
+    except Exception:
+        pass
+    return config
+
+
+def http2_available() -> bool:
+    """HTTP/2 requiere el paquete `h2`; sin él se usa HTTP/1.1 con keep-alive."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class LLMClientManager:
+    """Administra un `httpx.AsyncClient` reutilizable por proveedor y por event loop."""
+
+    def __init__(self):
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+        self._sentinels: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = weakref.WeakKeyDictionary()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    # --- Construcción de clientes ---
+
+    def _build_client(self, provider: str) -> httpx.AsyncClient:
+        config = get_http_client_settings()
+        limits = httpx.Limits(
+            max_connections=config["MAX_CONNECTIONS"],
+            max_keepalive_connections=config["MAX_KEEPALIVE_CONNECTIONS"],
+            keepalive_expiry=config["KEEPALIVE_EXPIRY"],
+        )
+        timeout = httpx.Timeout(config["TIMEOUT"], connect=config["CONNECT_TIMEOUT"])
+        use_http2 = bool(config["HTTP2"]) and http2_available()
+        print(f"[LLM HTTP] Abriendo pool de conexiones para '{provider}' (HTTP/2: {'sí' if use_http2 else 'no'}).")
+        return httpx.AsyncClient(limits=limits, timeout=timeout, http2=use_http2)
+
+    def get_client(self, provider: str) -> httpx.AsyncClient:
+        """Devuelve el cliente del proveedor para el event loop en curso, creándolo si hace falta."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get(provider)
+            if client is None or client.is_closed:
+                client = self._build_client(provider)
+                clients[provider] = client
+            if loop not in self._sentinels:
+                self._sentinels[loop] = loop.create_task(self._close_with_loop())
+            return client
+
+    async def _close_with_loop(self) -> None:
+        """Centinela del loop: espera hasta que lo cancelan al terminar el loop y cierra sus clientes."""
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            try:
+                await self.aclose()
+            except Exception as e:
+                print(f"[LLM HTTP] Error al cerrar los pools de conexiones del loop: {e}")
+
+    # --- Métricas ---
+
+    def _counter(self, provider: str) -> Dict[str, float]:
+        with self._lock:
+            return self._metrics.setdefault(provider, {
+                "requests": 0, "new_connections": 0, "errors": 0, "total_seconds": 0.0,
+            })
+
+    def _trace_for(self, provider: str):
+        counter = self._counter(provider)
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name in NEW_CONNECTION_EVENTS:
+                counter["new_connections"] += 1
+
+        return trace
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Peticiones, conexiones nuevas y porcentaje de reutilización del pool por proveedor."""
+        report = {}
+        for provider, counter in self._metrics.items():
+            requests = counter["requests"]
+            reused = max(requests - counter["new_connections"], 0)
+            report[provider] = {
+                **counter,
+                "reused_connections": reused,
+                "reuse_ratio": (reused / requests) if requests else None,
+                "avg_seconds": (counter["total_seconds"] / requests) if requests else None,
+            }
+        return report
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+    # --- Peticiones ---
+
+    async def post(self, provider: str, url: str, **kwargs) -> httpx.Response:
+        """`POST` a través del pool del proveedor, registrando latencia y reutilización de conexiones."""
+        client = self.get_client(provider)
+        counter = self._counter(provider)
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions["trace"] = self._trace_for(provider)
+
+        counter["requests"] += 1
+        start = time.perf_counter()
+        try:
+            return await client.post(url, extensions=extensions, **kwargs)
+        except Exception:
+            counter["errors"] += 1
+            raise
+        finally:
+            counter["total_seconds"] += time.perf_counter() - start
+
+    @asynccontextmanager
+    async def stream(self, provider: str, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Petición en streaming a través del pool; la latencia medida incluye la lectura completa."""
+        client = self.get_client(provider)
+        counter = self._counter(provider)
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions["trace"] = self._trace_for(provider)
+
+        counter["requests"] += 1
+        start = time.perf_counter()
+        try:
+            async with client.stream(method, url, extensions=extensions, **kwargs) as response:
+                yield response
+        except Exception:
+            counter["errors"] += 1
+            raise
+        finally:
+            counter["total_seconds"] += time.perf_counter() - start
+
+    # --- Cierre ordenado ---
+
+    async def aclose(self) -> None:
+        """Cierra los clientes abiertos en el event loop en curso (apagado del worker ASGI)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.pop(loop, {})
+        for provider, client in clients.items():
+            await client.aclose()
+            print(f"[LLM HTTP] Pool de conexiones de '{provider}' cerrado.")
+
+
+llm_clients = LLMClientManager()
+
+
+class LLMClientLifespanMiddleware:
+    """
+    Envoltorio ASGI que atiende el protocolo `lifespan` (Django no lo implementa)
+    para cerrar los pools de conexiones de los LLM cuando el worker se apaga.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    await llm_clients.aclose()
+                except Exception as e:
+                    print(f"[LLM HTTP] Error al cerrar los pools de conexiones: {e}")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
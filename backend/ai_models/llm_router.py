@@ -1,13 +1,17 @@
 import os
+import json
 import httpx
 import tiktoken
+from functools import lru_cache
 from dotenv import load_dotenv
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator, Callable, Tuple, Union
 from asgiref.sync import sync_to_async
 
 # --- Importaciones de Django y del proyecto ---
 from api.models import SiteConfiguration, CustomUser, UserLLMConfig
-from .local_llm_service import invoke_local_llm
+from .local_llm_service import DEFAULT_LOCAL_MODEL, StreamError, invoke_local_llm, stream_local_llm
+from .response_cache import llm_response_cache
+from .http_clients import llm_clients
 
 # Cargar variables de entorno
 load_dotenv()
@@ -15,16 +19,43 @@ load_dotenv()
 # --- Configuración de Modelos y Palabras Clave ---
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 GROQ_MODEL_NAME = "llama3-8b-8192"
+LLM_TEMPERATURE = 0.7
 DEEP_REASONING_KEYWORDS = ["analiza", "resume", "explica", "corrige", "evalúa", "genera un reporte", "crea un plan", "redacta"]
 
+@lru_cache(maxsize=1)
+def get_token_encoder():
+    """
+    Devuelve el codificador `cl100k_base`, cargado una sola vez por proceso.
+
+    La primera carga puede requerir descargar el BPE; si falla (p. ej. sin red) se
+    recuerda el fallo y se usa el conteo por palabras, en lugar de reintentar la
+    descarga en cada solicitud.
+    """
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"[LLM Router] tiktoken no disponible ({e}). Se contarán palabras en su lugar.")
+        return None
+
 def count_tokens(text: str) -> int:
     """Calcula el número de tokens en un texto usando tiktoken."""
+    encoder = get_token_encoder()
+    if encoder is None:
+        return len(text.split())
     try:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(text))
+        return len(encoder.encode(text))
     except Exception:
         return len(text.split())
 
+@lru_cache(maxsize=4096)
+def count_message_tokens(content: str) -> int:
+    """Tokens de un mensaje del historial, memorizados: cada mensaje se tokeniza una sola vez."""
+    return count_tokens(content)
+
+def count_history_tokens(conversation_history: List[Dict[str, str]]) -> int:
+    """Total de tokens del historial a partir de los conteos memorizados de cada mensaje."""
+    return sum(count_message_tokens(msg.get("content", "")) for msg in conversation_history)
+
 def requires_deep_reasoning(prompt: str) -> bool:
     """Verifica si el prompt contiene palabras clave que sugieren una tarea compleja."""
     prompt_lower = prompt.lower()
@@ -37,18 +68,53 @@ async def invoke_groq_api(prompt: str, api_key: str, conversation_history: List[
 
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     messages = conversation_history + [{"role": "user", "content": prompt}]
-    data = {"model": GROQ_MODEL_NAME, "messages": messages, "temperature": 0.7}
+    data = {"model": GROQ_MODEL_NAME, "messages": messages, "temperature": LLM_TEMPERATURE}
 
     try:
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            response = await client.post(GROQ_API_URL, headers=headers, json=data)
-            response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+        # Cliente compartido del pool: reutiliza la conexión TLS entre llamadas.
+        response = await llm_clients.post("groq", GROQ_API_URL, headers=headers, json=data)
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
     except httpx.RequestError as e:
         return f"Error de conexión a la API de Groq: {e}"
     except (KeyError, IndexError, TypeError) as e:
         return f"Respuesta inesperada de la API de Groq. Error: {e}"
 
+async def stream_groq_api(prompt: str, api_key: str, conversation_history: List[Dict[str, str]]) -> AsyncIterator[str]:
+    """
+    Versión en streaming de `invoke_groq_api`: lee los eventos SSE (`data: {...}`) de la API
+    compatible con OpenAI y produce el texto de cada `delta` en cuanto llega. Los errores,
+    incluido un stream que se corta antes de `[DONE]`, llegan como un `StreamError` final.
+    """
+    if not api_key:
+        yield StreamError("Error: No se ha proporcionado una clave API para Groq.")
+        return
+
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    messages = conversation_history + [{"role": "user", "content": prompt}]
+    data = {"model": GROQ_MODEL_NAME, "messages": messages, "temperature": LLM_TEMPERATURE, "stream": True}
+
+    try:
+        async with llm_clients.stream("groq", "POST", GROQ_API_URL, headers=headers, json=data) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                yield StreamError(f"Error de la API de Groq (HTTP {response.status_code}): {response.text}")
+                return
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event_data = line[len("data:"):].strip()
+                if event_data == "[DONE]":
+                    return
+                delta = json.loads(event_data)['choices'][0].get('delta', {})
+                if delta.get('content'):
+                    yield delta['content']
+            yield StreamError("Error de conexión a la API de Groq: el stream se cerró antes de terminar.")
+    except httpx.RequestError as e:
+        yield StreamError(f"Error de conexión a la API de Groq: {e}")
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        yield StreamError(f"Respuesta inesperada de la API de Groq. Error: {e}")
+
 @sync_to_async
 def get_user_llm_config(user: Optional[CustomUser]) -> Optional[UserLLMConfig]:
     """Obtiene la configuración LLM de un usuario de forma asíncrona."""
@@ -61,17 +127,25 @@ def get_system_llm_config() -> Dict[str, Any]:
     """Obtiene la configuración LLM del sistema (claves y umbrales) de forma asíncrona."""
     config = SiteConfiguration.load()
     return {
-        "groq_api_key": config.groq_api_key,
+        # SiteConfiguration aún no tiene campo para la clave de Groq: se admite la variable de entorno.
+        "groq_api_key": getattr(config, "groq_api_key", None) or os.environ.get("GROQ_API_KEY"),
         "token_threshold": config.llm_routing_token_threshold
     }
 
-async def route_llm_request(
+async def select_llm_backend(
     prompt: str,
     conversation_history: List[Dict[str, str]],
-    user: Optional[CustomUser]
-) -> str:
+    user: Optional[CustomUser],
+    history_tokens: Optional[int] = None
+) -> Tuple[str, Dict[str, Any]]:
     """
-    Enruta una solicitud al LLM apropiado de forma asíncrona, priorizando la configuración del usuario.
+    Decide qué LLM atiende la solicitud, priorizando la configuración del usuario.
+
+    `history_tokens` es el total acumulado de tokens del historial que lleva el llamador
+    (ver `TurismoColonelState`); si no se indica, se calcula con los conteos memorizados.
+
+    Returns:
+        ("groq", {"api_key": ...}) o ("local", {"model_name": ...}).
     """
     # 1. Verificar la configuración personalizada del usuario
     user_config = await get_user_llm_config(user)
@@ -81,14 +155,14 @@ async def route_llm_request(
         print(f"[LLM Router] Usando configuración personalizada del usuario: {provider}")
 
         if provider == 'GROQ' and user_config.api_key:
-            return await invoke_groq_api(prompt, user_config.api_key, conversation_history)
+            return "groq", {"api_key": user_config.api_key}
 
         if provider == 'PHI3_LOCAL':
-            return await invoke_local_llm(prompt, model_name="phi3:mini", conversation_history=conversation_history)
+            return "local", {"model_name": "phi3:mini"}
 
         if provider == 'PHI4_LOCAL':
             # Asumiendo que el modelo 'phi-4' está disponible en Ollama
-            return await invoke_local_llm(prompt, model_name="phi-4", conversation_history=conversation_history)
+            return "local", {"model_name": "phi-4"}
 
     # 2. Si no hay configuración de usuario, usar el router híbrido del sistema
     print("[LLM Router] Usando router híbrido del sistema.")
@@ -97,8 +171,9 @@ async def route_llm_request(
     token_threshold = system_config.get("token_threshold", 1500)
 
     # 3. Lógica de enrutamiento híbrido
-    history_text = " ".join([msg["content"] for msg in conversation_history])
-    total_tokens = count_tokens(history_text + prompt)
+    if history_tokens is None:
+        history_tokens = count_history_tokens(conversation_history)
+    total_tokens = history_tokens + count_tokens(prompt)
     is_complex_task = requires_deep_reasoning(prompt)
 
     use_cloud_model = total_tokens > token_threshold or is_complex_task
@@ -106,13 +181,105 @@ async def route_llm_request(
     if use_cloud_model:
         if system_groq_key:
             print(f"[LLM Router] Tarea compleja o historial largo ({total_tokens} tokens). Usando Groq del sistema.")
-            return await invoke_groq_api(prompt, system_groq_key, conversation_history)
+            return "groq", {"api_key": system_groq_key}
         else:
             print(f"[LLM Router] Advertencia: Se necesita modelo avanzado pero no hay clave Groq del sistema. Usando modelo local.")
-            return await invoke_local_llm(prompt, conversation_history=conversation_history)
+            return "local", {"model_name": None}
     else:
         print(f"[LLM Router] Tarea simple ({total_tokens} tokens). Usando modelo local por defecto (Phi-3).")
-        return await invoke_local_llm(prompt, conversation_history=conversation_history)
+        return "local", {"model_name": None}
+
+async def replay_cached_response(response: str) -> AsyncIterator[str]:
+    """Entrega una respuesta de la caché con la misma interfaz que el modo streaming."""
+    yield response
+
+def is_cacheable(response: str, validate: Optional[Callable[[str], bool]] = None) -> bool:
+    """Una respuesta se guarda si no hay validador o si el validador la acepta sin errores."""
+    if validate is None:
+        return True
+    try:
+        return bool(validate(response))
+    except Exception:
+        return False
+
+async def stream_and_cache(
+    chunks: AsyncIterator[str],
+    cache_args: Dict[str, Any],
+    validate: Optional[Callable[[str], bool]] = None,
+) -> AsyncIterator[str]:
+    """
+    Reenvía los fragmentos del modelo y guarda la respuesta solo si el stream terminó
+    limpio (sin un `StreamError` y sin que el consumidor lo abandonara a medias) y, con
+    `validate`, solo si el validador acepta el texto completo.
+    """
+    parts, failed = [], False
+    async for chunk in chunks:
+        failed = failed or isinstance(chunk, StreamError)
+        parts.append(chunk)
+        yield chunk
+    response = "".join(parts)
+    if not failed and is_cacheable(response, validate):
+        await llm_response_cache.aset(response=response, **cache_args)
+
+async def route_llm_request(
+    prompt: str,
+    conversation_history: List[Dict[str, str]],
+    user: Optional[CustomUser],
+    stream: bool = False,
+    use_cache: bool = True,
+    semantic_text: Optional[str] = None,
+    history_tokens: Optional[int] = None,
+    depends_on: Optional[List[str]] = None,
+    validate: Optional[Callable[[str], bool]] = None
+) -> Union[str, AsyncIterator[str]]:
+    """
+    Enruta una solicitud al LLM apropiado de forma asíncrona, priorizando la configuración del usuario.
+
+    Con `stream=True` devuelve un generador asíncrono que produce los fragmentos de texto
+    a medida que el modelo los genera (NDJSON de Ollama o SSE de Groq):
+
+        chunks = await route_llm_request(prompt, history, user, stream=True)
+        async for chunk in chunks: ...
+
+    Las respuestas pasan por la caché de `response_cache` salvo con `use_cache=False`.
+    `semantic_text` indica la parte variable del prompt (ej. la orden del usuario) para
+    la búsqueda por similitud, si está activada. `history_tokens` evita recontar el historial.
+    `depends_on` indica los modelos (`app.modelo`) cuyos datos van en el prompt: la respuesta
+    guardada solo se invalida cuando cambia uno de ellos (None = cualquiera; [] = ninguno).
+    `validate` recibe la respuesta completa: si devuelve False o lanza una excepción, la
+    respuesta no se guarda (ej. un plan que no es JSON válido no debe repetirse desde la caché).
+    """
+    backend, options = await select_llm_backend(prompt, conversation_history, user, history_tokens)
+    model_name = GROQ_MODEL_NAME if backend == "groq" else (options.get("model_name") or DEFAULT_LOCAL_MODEL)
+
+    cache_args = {
+        "provider": backend,
+        "model_name": model_name,
+        "messages": conversation_history + [{"role": "user", "content": prompt}],
+        "temperature": LLM_TEMPERATURE,
+        "semantic_text": semantic_text,
+    }
+    store_args = {**cache_args, "depends_on": depends_on}
+    if use_cache:
+        cached = await llm_response_cache.aget(**cache_args)
+        if cached is not None:
+            print(f"[LLM Router] Respuesta servida desde la caché ({backend}/{model_name}).")
+            return replay_cached_response(cached) if stream else cached
+
+    if stream:
+        if backend == "groq":
+            chunks = stream_groq_api(prompt, options["api_key"], conversation_history)
+        else:
+            chunks = stream_local_llm(prompt, model_name=options.get("model_name"), conversation_history=conversation_history)
+        return stream_and_cache(chunks, store_args, validate) if use_cache else chunks
+
+    if backend == "groq":
+        response = await invoke_groq_api(prompt, options["api_key"], conversation_history)
+    else:
+        response = await invoke_local_llm(prompt, model_name=options.get("model_name"), conversation_history=conversation_history)
+    if use_cache and is_cacheable(response, validate):
+        await llm_response_cache.aset(response=response, **store_args)
+    return response
 
 # --- Bloque de prueba (requiere un entorno Django asíncrono para ejecutarse) ---
 # Para probar, puedes crear un comando de gestión en Django que llame a esta función.
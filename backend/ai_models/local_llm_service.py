@@ -1,6 +1,9 @@
 import httpx
+import json
 import os
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
+
+from .http_clients import llm_clients
 
 # --- Configuración del Cliente Ollama ---
 # Se asume que Ollama se ejecuta localmente.
@@ -8,6 +11,27 @@ from typing import Dict, Any
 OLLAMA_API_BASE_URL = os.environ.get("OLLAMA_API_BASE_URL", "http://localhost:11434/api/chat")
 DEFAULT_LOCAL_MODEL = "phi3:mini"
 
+
+class StreamError(str):
+    """
+    Último fragmento de un stream que no terminó bien: lleva el mismo mensaje de error
+    que devolvería el modo sin streaming, pero su tipo permite distinguirlo de un
+    fragmento de respuesta sin mirar el texto (ver `llm_router.stream_and_cache`).
+    """
+
+def build_ollama_payload(prompt: str, model_name: str, conversation_history: list = None, stream: bool = False) -> Dict[str, Any]:
+    """Construye el cuerpo de la petición a `/api/chat` de Ollama."""
+    messages = (conversation_history or []) + [{"role": "user", "content": prompt}]
+    return {
+        "model": model_name,
+        "messages": messages,
+        "stream": stream,
+        "options": {
+            "temperature": 0.7,
+            "num_ctx": 4096, # Ajustar el contexto si es necesario
+        }
+    }
+
 async def invoke_local_llm(
     prompt: str,
     model_name: str = None,
@@ -31,30 +55,20 @@ async def invoke_local_llm(
     print(f"[Local LLM Service] Invocando modelo local: {model_name}")
 
     headers = {"Content-Type": "application/json"}
-
-    messages = (conversation_history or []) + [{"role": "user", "content": prompt}]
-
-    payload: Dict[str, Any] = {
-        "model": model_name,
-        "messages": messages,
-        "stream": False,  # No usar streaming para obtener una respuesta completa
-        "options": {
-            "temperature": 0.7,
-            "num_ctx": 4096, # Ajustar el contexto si es necesario
-        }
-    }
+    # Sin streaming: se espera la respuesta completa (ver `stream_local_llm`).
+    payload = build_ollama_payload(prompt, model_name, conversation_history, stream=False)
 
     try:
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            response = await client.post(OLLAMA_API_BASE_URL, json=payload, headers=headers)
-            response.raise_for_status()
+        # Cliente compartido del pool: mantiene viva la conexión con Ollama entre llamadas.
+        response = await llm_clients.post("ollama", OLLAMA_API_BASE_URL, json=payload, headers=headers)
+        response.raise_for_status()
 
-            response_data = response.json()
+        response_data = response.json()
 
-            if "message" in response_data and "content" in response_data["message"]:
-                return response_data["message"]["content"]
-            else:
-                return f"Error: Respuesta inesperada del servicio local. Formato no reconocido: {response_data}"
+        if "message" in response_data and "content" in response_data["message"]:
+            return response_data["message"]["content"]
+        else:
+            return f"Error: Respuesta inesperada del servicio local. Formato no reconocido: {response_data}"
 
     except httpx.ConnectError:
         error_msg = (
@@ -72,6 +86,56 @@ async def invoke_local_llm(
         print(error_msg)
         return error_msg
 
+async def stream_local_llm(
+    prompt: str,
+    model_name: str = None,
+    conversation_history: list = None
+) -> AsyncIterator[str]:
+    """
+    Versión en streaming de `invoke_local_llm`: produce los fragmentos de texto a medida
+    que Ollama los genera (respuesta NDJSON, un objeto JSON por línea).
+
+    Los errores se entregan como un último fragmento `StreamError` con el mismo mensaje
+    que devolvería `invoke_local_llm`, para que el consumidor no tenga que distinguir
+    modos. Un stream que se corta antes del objeto con `done` también es un error.
+    """
+    if not model_name:
+        model_name = DEFAULT_LOCAL_MODEL
+
+    print(f"[Local LLM Service] Invocando modelo local en streaming: {model_name}")
+    payload = build_ollama_payload(prompt, model_name, conversation_history, stream=True)
+
+    try:
+        async with llm_clients.stream("ollama", "POST", OLLAMA_API_BASE_URL, json=payload) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                yield StreamError(f"Error: El servicio local devolvió un estado HTTP {response.status_code}. Respuesta: {response.text}")
+                return
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    yield StreamError(f"Error: El servicio local reportó un fallo: {chunk['error']}")
+                    return
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    return
+            yield StreamError(f"Error: El servicio local cerró el stream del modelo '{model_name}' antes de terminar.")
+    except httpx.ConnectError:
+        error_msg = (
+            f"Error: No se pudo conectar al servicio local de LLM en {OLLAMA_API_BASE_URL}. "
+            "Asegúrate de que Ollama esté en ejecución y sea accesible."
+        )
+        print(error_msg)
+        yield StreamError(error_msg)
+    except Exception as e:
+        error_msg = f"Error inesperado al invocar el modelo local '{model_name}': {e}"
+        print(error_msg)
+        yield StreamError(error_msg)
+
 # --- Bloque de prueba para ejecución directa ---
 if __name__ == '__main__':
     import asyncio
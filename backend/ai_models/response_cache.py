@@ -0,0 +1,325 @@
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+
+from .embeddings import cosine_similarity, embed_text
+
+# --- CACHÉ DE RESPUESTAS DEL ROUTER DE LLM ---
+#
+# El prompt de planificación del Coronel es casi siempre el mismo (un `base_prompt`
+# fijo más la orden del usuario), así que órdenes repetidas volvían a pagar un
+# viaje completo a Groq u Ollama. Esta caché tiene dos niveles:
+#
+#   1. Memoria: LRU acotada por proceso, con su propio TTL corto.
+#   2. Persistente: tabla `LLMResponseCache`, compartida por todos los workers.
+#
+# La clave es un hash de (proveedor, modelo, mensajes, temperatura) con el texto
+# normalizado (Unicode NFC, sin mayúsculas, espacios colapsados). Opcionalmente,
+# si el llamador indica qué parte del prompt es "semántica" (la orden), se buscan
+# respuestas a órdenes parecidas por similitud de embeddings dentro del mismo
+# contexto (mismo prompt con la orden retirada).
+#
+# Cada entrada declara de qué modelos depende su respuesta (`depends_on`, etiquetas
+# `app.modelo`); al cambiar un modelo fuente solo se retiran las entradas que dependen
+# de él. Sin declaración, la entrada depende de todos (`*`) y cae con cualquier cambio.
+
+DEFAULT_CACHE_SETTINGS = {
+    "ENABLED": True,
+    "TTL_SECONDS": 3600,
+    "MEMORY_MAX_ENTRIES": 512,
+    "MEMORY_TTL_SECONDS": 300,
+    "SIMILARITY_THRESHOLD": None,  # None = solo coincidencia exacta
+    "SIMILARITY_CANDIDATES": 200,
+    "EMBEDDING_MODEL": None,
+}
+
+ERROR_PREFIXES = ("Error", "Respuesta inesperada")
+ALL_SOURCES = "*"
+
+
+def get_cache_settings() -> Dict[str, Any]:
+    config = dict(DEFAULT_CACHE_SETTINGS)
+    try:
+        from django.conf import settings
+        config.update(getattr(settings, "LLM_RESPONSE_CACHE", {}) or {})
+    except Exception:
+        pass
+    return config
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza un texto para que variaciones triviales compartan entrada de caché."""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.casefold().split())
+
+
+def _hash(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def build_cache_key(provider: str, model_name: str, messages: List[Dict[str, str]], temperature: float) -> str:
+    normalized = [{"role": m.get("role", ""), "content": normalize_text(m.get("content", ""))} for m in messages]
+    return _hash({"provider": provider, "model": model_name, "messages": normalized, "temperature": temperature})
+
+
+def build_context_hash(provider: str, model_name: str, messages: List[Dict[str, str]], temperature: float, semantic_text: str) -> str:
+    """Hash del prompt con el texto semántico retirado: solo se comparan órdenes del mismo contexto."""
+    semantic = normalize_text(semantic_text)
+    normalized = [
+        {"role": m.get("role", ""), "content": normalize_text(m.get("content", "")).replace(semantic, "")}
+        for m in messages
+    ]
+    return _hash({"provider": provider, "model": model_name, "messages": normalized, "temperature": temperature})
+
+
+def dependency_tag(depends_on: Optional[Iterable[str]] = None) -> str:
+    """Serializa las dependencias de una entrada: `|api.publicacion|api.video|`; None = todas."""
+    labels = [ALL_SOURCES] if depends_on is None else sorted({label.lower() for label in depends_on})
+    return f"|{'|'.join(labels)}|" if labels else ""
+
+
+def is_cacheable(response: Optional[str]) -> bool:
+    """Los mensajes de error del router no se guardan nunca."""
+    return bool(response) and not response.startswith(ERROR_PREFIXES)
+
+
+class ResponseCache:
+    """Caché de dos niveles (LRU en memoria + tabla persistente) con contadores de aciertos."""
+
+    def __init__(self):
+        self._memory: "OrderedDict[str, Tuple[str, float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0, "persistent_hits": 0, "similar_hits": 0,
+            "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0,
+        }
+
+    # --- Nivel de memoria ---
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            response, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return response
+
+    def _memory_set(self, key: str, response: str, ttl_seconds: float, tag: str) -> None:
+        config = get_cache_settings()
+        ttl = min(ttl_seconds, config["MEMORY_TTL_SECONDS"])
+        with self._lock:
+            self._memory[key] = (response, time.monotonic() + ttl, tag)
+            self._memory.move_to_end(key)
+            while len(self._memory) > config["MEMORY_MAX_ENTRIES"]:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    # --- Nivel persistente (síncrono, se invoca con sync_to_async) ---
+
+    @staticmethod
+    def _db_get(key: str) -> Optional[Tuple[str, float]]:
+        from django.db.models import F
+        from django.utils import timezone
+        from api.models import LLMResponseCache
+
+        now = timezone.now()
+        entry = (
+            LLMResponseCache.objects.filter(cache_key=key, expires_at__gt=now)
+            .only("response", "expires_at", "depends_on").first()
+        )
+        if entry is None:
+            return None
+        LLMResponseCache.objects.filter(pk=entry.pk).update(hit_count=F("hit_count") + 1)
+        return entry.response, (entry.expires_at - now).total_seconds(), entry.depends_on
+
+    @staticmethod
+    def _db_similar(context_hash: str, embedding: List[float], threshold: float, candidates: int) -> Optional[Tuple[str, float, str]]:
+        from django.db.models import F
+        from django.utils import timezone
+        from api.models import LLMResponseCache
+
+        now = timezone.now()
+        rows = (
+            LLMResponseCache.objects
+            .filter(context_hash=context_hash, expires_at__gt=now, embedding__isnull=False)
+            .only("response", "embedding", "expires_at", "depends_on")[:candidates]
+        )
+        best, best_score = None, threshold
+        for row in rows:
+            score = cosine_similarity(row.embedding, embedding)
+            if score >= best_score:
+                best, best_score = row, score
+        if best is None:
+            return None
+        LLMResponseCache.objects.filter(pk=best.pk).update(hit_count=F("hit_count") + 1)
+        return best.response, (best.expires_at - now).total_seconds(), best.depends_on
+
+    @staticmethod
+    def _db_set(fields: Dict[str, Any], ttl_seconds: float) -> None:
+        from django.utils import timezone
+        from api.models import LLMResponseCache
+
+        fields = dict(fields)
+        fields["expires_at"] = timezone.now() + timedelta(seconds=ttl_seconds)
+        key = fields.pop("cache_key")
+        LLMResponseCache.objects.update_or_create(cache_key=key, defaults=fields)
+
+    # --- API pública ---
+
+    async def aget(
+        self,
+        provider: str,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        semantic_text: Optional[str] = None,
+    ) -> Optional[str]:
+        """Busca una respuesta: memoria -> tabla (exacta) -> tabla (similitud, si está activa)."""
+        config = get_cache_settings()
+        if not config["ENABLED"]:
+            return None
+
+        key = build_cache_key(provider, model_name, messages, temperature)
+        response = self._memory_get(key)
+        if response is not None:
+            self._count("memory_hits")
+            return response
+
+        found = await sync_to_async(self._db_get)(key)
+        if found is not None:
+            response, remaining, tag = found
+            self._memory_set(key, response, remaining, tag)
+            self._count("persistent_hits")
+            print(f"[LLM Cache] Acierto persistente ({provider}/{model_name}).")
+            return response
+
+        threshold = config["SIMILARITY_THRESHOLD"]
+        if semantic_text and threshold is not None:
+            embedding = await embed_text(semantic_text, config["EMBEDDING_MODEL"])
+            if embedding:
+                context_hash = build_context_hash(provider, model_name, messages, temperature, semantic_text)
+                found = await sync_to_async(self._db_similar)(context_hash, embedding, threshold, config["SIMILARITY_CANDIDATES"])
+                if found is not None:
+                    response, remaining, tag = found
+                    self._memory_set(key, response, remaining, tag)
+                    self._count("similar_hits")
+                    print(f"[LLM Cache] Acierto por similitud ({provider}/{model_name}).")
+                    return response
+
+        self._count("misses")
+        return None
+
+    async def aset(
+        self,
+        provider: str,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        response: str,
+        semantic_text: Optional[str] = None,
+        depends_on: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """
+        Guarda una respuesta en ambos niveles. `depends_on` son los modelos (`app.modelo`)
+        cuyos datos usa la respuesta; None = todos. Devuelve False si no era cacheable.
+        """
+        config = get_cache_settings()
+        if not config["ENABLED"] or not is_cacheable(response):
+            return False
+
+        ttl = config["TTL_SECONDS"]
+        key = build_cache_key(provider, model_name, messages, temperature)
+        tag = dependency_tag(depends_on)
+        fields = {
+            "cache_key": key,
+            "context_hash": key,
+            "provider": provider,
+            "model_name": model_name,
+            "response": response,
+            "semantic_text": "",
+            "embedding": None,
+            "depends_on": tag,
+        }
+        if semantic_text:
+            fields["semantic_text"] = semantic_text
+            fields["context_hash"] = build_context_hash(provider, model_name, messages, temperature, semantic_text)
+            if config["SIMILARITY_THRESHOLD"] is not None:
+                fields["embedding"] = await embed_text(semantic_text, config["EMBEDDING_MODEL"])
+
+        self._memory_set(key, response, ttl, tag)
+        await sync_to_async(self._db_set)(fields, ttl)
+        self._count("stores")
+        return True
+
+    def invalidate(self, labels: Optional[Iterable[str]] = None) -> int:
+        """
+        Retira las entradas que dependen de alguno de los modelos `labels` (`app.modelo`),
+        incluidas las que dependen de todos; sin `labels`, vacía la caché. Se invoca cuando
+        cambian los datos sobre los que responden los agentes; la memoria de otros workers
+        caduca sola por `MEMORY_TTL_SECONDS`. Devuelve cuántas filas se borraron de la tabla.
+        """
+        from django.db.models import Q
+        from api.models import LLMResponseCache
+
+        queryset = LLMResponseCache.objects.all()
+        needles = None
+        if labels is not None:
+            needles = {f"|{label.lower()}|" for label in labels} | {f"|{ALL_SOURCES}|"}
+            matches = Q()
+            for needle in needles:
+                matches |= Q(depends_on__contains=needle)
+            queryset = queryset.filter(matches)
+
+        with self._lock:
+            if needles is None:
+                self._memory.clear()
+            else:
+                stale = [key for key, (_, _, tag) in self._memory.items() if any(needle in tag for needle in needles)]
+                for key in stale:
+                    del self._memory[key]
+            self._counters["invalidations"] += 1
+        deleted, _ = queryset.delete()
+        return deleted
+
+    def prune_expired(self) -> int:
+        """Elimina de la tabla las entradas caducadas. Devuelve cuántas se borraron."""
+        from django.utils import timezone
+        from api.models import LLMResponseCache
+
+        deleted, _ = LLMResponseCache.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_entries"] = len(self._memory)
+        hits = counters["memory_hits"] + counters["persistent_hits"] + counters["similar_hits"]
+        lookups = hits + counters["misses"]
+        counters["hit_ratio"] = (hits / lookups) if lookups else None
+        return counters
+
+    def reset(self) -> None:
+        """Vacía la memoria y los contadores (útil en pruebas)."""
+        with self._lock:
+            self._memory.clear()
+            for counter in self._counters:
+                self._counters[counter] = 0
+
+
+llm_response_cache = ResponseCache()
@@ -10,11 +10,55 @@ from .models import (
     Resena, Sugerencia, AuditLog, RutaTuristica, ImagenRutaTuristica, Notificacion
 )
 from django.utils.html import format_html
+from django.db import transaction
+from django.contrib.admin.views.main import ChangeList
+from .audit import record_audit
+from .generic_relations import prefetch_generic_objects
+from .geo import refresh_locations
+from .scoring import mark_review_targets, score_batch
+
+
+class GenericObjectChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # La columna `content_object` se resuelve en lote para toda la página.
+        self.result_list = prefetch_generic_objects(self.result_list)
+
+
+class GenericObjectAdminMixin:
+    def get_changelist(self, request, **kwargs):
+        return GenericObjectChangeList
+
+
+class AuditedAdminMixin:
+    """Registra en la bitácora las altas, cambios y bajas hechos desde el admin (ver `api/audit.py`)."""
+    audit_actions = {}  # 'create' | 'update' | 'destroy' -> AuditLog.Action
+
+    def audit(self, request, operation, obj, **details):
+        action = self.audit_actions.get(operation)
+        if action:
+            record_audit(action, user=request.user, target=obj, details={"objeto": str(obj), **details})
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.audit(request, 'update' if change else 'create', obj, campos=sorted(form.changed_data))
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            self.audit(request, 'destroy', obj)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for obj in queryset:
+                self.audit(request, 'destroy', obj)
+            super().delete_queryset(request, queryset)
 
 # -- CONFIGURACIÓN GENERAL DEL SITIO --
 
 @admin.register(SiteConfiguration)
-class SiteConfigurationAdmin(admin.ModelAdmin):
+class SiteConfigurationAdmin(AuditedAdminMixin, admin.ModelAdmin):
+    audit_actions = {'update': AuditLog.Action.SITE_CONFIG_UPDATE}
     list_display = ('__str__', 'correo_institucional', 'telefono_conmutador')
     fieldsets = (
         ('Información de Contacto', {
@@ -68,14 +112,24 @@ class RutaTuristicaAdmin(admin.ModelAdmin):
         return False
 
 @admin.register(MenuItem)
-class MenuItemAdmin(admin.ModelAdmin):
+class MenuItemAdmin(AuditedAdminMixin, admin.ModelAdmin):
+    audit_actions = {
+        'create': AuditLog.Action.MENU_CREATE,
+        'update': AuditLog.Action.MENU_UPDATE,
+        'destroy': AuditLog.Action.MENU_DELETE,
+    }
     list_display = ('nombre', 'url', 'parent', 'orden')
     list_filter = ('parent',)
     search_fields = ('nombre', 'url')
     ordering = ('orden',)
 
 @admin.register(HomePageComponent)
-class HomePageComponentAdmin(admin.ModelAdmin):
+class HomePageComponentAdmin(AuditedAdminMixin, admin.ModelAdmin):
+    audit_actions = {
+        'create': AuditLog.Action.COMPONENT_CREATE,
+        'update': AuditLog.Action.COMPONENT_UPDATE,
+        'destroy': AuditLog.Action.COMPONENT_DELETE,
+    }
     list_display = ('title', 'component_type', 'order', 'is_active')
     list_filter = ('component_type', 'is_active')
     search_fields = ('title', 'subtitle')
@@ -119,6 +173,7 @@ class PrestadorServicioAdmin(admin.ModelAdmin):
 
     def aprobar_prestadores(self, request, queryset):
         queryset.update(aprobado=True)
+        refresh_locations(queryset)  # `update()` no emite señales.
     aprobar_prestadores.short_description = "Aprobar perfiles de prestadores seleccionados"
 
 @admin.register(CategoriaPrestador)
@@ -141,6 +196,7 @@ class ArtesanoAdmin(admin.ModelAdmin):
 
     def aprobar_artesanos(self, request, queryset):
         queryset.update(aprobado=True)
+        refresh_locations(queryset)
     aprobar_artesanos.short_description = "Aprobar perfiles de artesanos seleccionados"
 
 @admin.register(RubroArtesano)
@@ -190,6 +246,7 @@ class AtractivoTuristicoAdmin(admin.ModelAdmin):
 
     def publicar_atractivos(self, request, queryset):
         queryset.update(es_publicado=True)
+        refresh_locations(queryset)
     publicar_atractivos.short_description = "Publicar atractivos seleccionados"
 
 class ImagenPaginaInstitucionalInline(admin.TabularInline):
@@ -314,19 +371,25 @@ class VerificacionAdmin(admin.ModelAdmin):
 # -- FEEDBACK Y AUDITORÍA --
 
 @admin.register(Resena)
-class ResenaAdmin(admin.ModelAdmin):
+class ResenaAdmin(GenericObjectAdminMixin, admin.ModelAdmin):
     list_display = ('usuario', 'content_object', 'calificacion', 'aprobada', 'fecha_creacion')
+    list_select_related = ('usuario',)
     list_filter = ('aprobada', 'calificacion', 'content_type')
     search_fields = ('usuario__username', 'comentario')
     actions = ['aprobar_resenas']
 
     def aprobar_resenas(self, request, queryset):
-        queryset.update(aprobada=True)
+        # Un solo UPDATE para las reseñas y un recálculo por conjunto de los destinos afectados.
+        with transaction.atomic(), score_batch():
+            targets = list(queryset.values_list('content_type_id', 'object_id').distinct())
+            queryset.update(aprobada=True)
+            mark_review_targets(targets)
     aprobar_resenas.short_description = "Aprobar reseñas seleccionadas"
 
 @admin.register(Sugerencia)
 class SugerenciaAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'tipo_mensaje', 'estado', 'fecha_envio')
+    list_select_related = ('usuario',)
     list_filter = ('tipo_mensaje', 'estado', 'es_publico')
     search_fields = ('nombre_remitente', 'email_remitente', 'usuario__username', 'mensaje')
 
@@ -337,15 +400,17 @@ class AsistenciaCapacitacionAdmin(admin.ModelAdmin):
     search_fields = ('usuario__username', 'capacitacion__titulo')
 
 @admin.register(AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
+class AuditLogAdmin(GenericObjectAdminMixin, admin.ModelAdmin):
     list_display = ('timestamp', 'user', 'get_action_display', 'content_object')
+    list_select_related = ('user',)
     list_filter = ('action', 'user')
     readonly_fields = ('timestamp', 'user', 'action', 'details', 'content_type', 'object_id', 'content_object')
     date_hierarchy = 'timestamp'
 
 @admin.register(Notificacion)
-class NotificacionAdmin(admin.ModelAdmin):
+class NotificacionAdmin(GenericObjectAdminMixin, admin.ModelAdmin):
     list_display = ('usuario', 'mensaje', 'leido', 'fecha_creacion', 'content_object')
+    list_select_related = ('usuario',)
     list_filter = ('leido', 'fecha_creacion')
     search_fields = ('usuario__username', 'mensaje')
     readonly_fields = ('usuario', 'mensaje', 'leido', 'fecha_creacion', 'url', 'content_type', 'object_id', 'content_object')
@@ -0,0 +1,278 @@
+import io
+import json
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+# --- BITÁCORA DE AUDITORÍA ---
+#
+# Cada acción administrativa (usuarios, componentes de inicio, contenido del municipio,
+# configuración del sitio) deja un `AuditLog` con detalles en JSON. La escritura no va
+# en línea con la acción:
+#
+#   - `record_audit()` arma la entrada y la suelta solo si la transacción de la acción
+#     se confirma (una acción revertida no deja rastro).
+#   - Dentro de `audit_batch()` (cada petición, vía `AuditBatchMiddleware`) las entradas
+#     confirmadas se acumulan y se escriben juntas con un `bulk_create` al final.
+#
+# La tabla viva solo guarda los meses recientes. `manage.py audit_retention` mueve los
+# meses vencidos a tablas de archivo mensuales (`api_auditlog_archive_AAAA_MM`): en
+# PostgreSQL son particiones por rango de `timestamp` de `api_auditlog_archive`; en
+# los demás motores, tablas independientes. Cada mes archivado puede exportarse a
+# JSON Lines comprimido con zstandard y, pasado el plazo, eliminarse.
+
+DEFAULT_AUDIT_LOG_SETTINGS = {
+    "BATCH_SIZE": 500,  # Filas por INSERT al escribir la bitácora acumulada.
+    "RETENTION_MONTHS": 6,  # Meses que quedan en la tabla viva (incluido el actual).
+    "ARCHIVE_RETENTION_MONTHS": 24,  # Meses que se conservan las tablas de archivo.
+    "EXPORT_DIR": None,
+}
+
+ARCHIVE_SUFFIX = "_archive"
+
+
+def get_audit_log_settings() -> Dict:
+    return {**DEFAULT_AUDIT_LOG_SETTINGS, **getattr(settings, "AUDIT_LOG", {})}
+
+
+_current_batch: ContextVar[Optional[List]] = ContextVar("audit_batch", default=None)
+
+
+# --- ESCRITURA ---
+
+def _write(entries: List) -> None:
+    from .models import AuditLog
+
+    if not entries:
+        return
+    try:
+        AuditLog.objects.bulk_create(entries, batch_size=get_audit_log_settings()["BATCH_SIZE"])
+    except DatabaseError as e:
+        # La acción ya se confirmó: perder la bitácora no debe convertirla en un error.
+        print(f"--- ⚠️ AUDITORÍA: No se pudieron guardar {len(entries)} registros: {e} ---")
+
+
+def record_audit(action: str, user=None, target=None, details: Optional[Dict] = None) -> None:
+    """
+    Registra `action` sobre `target` (una instancia de modelo, opcional). La entrada se
+    escribe cuando se confirma la transacción en curso, o al cerrar el `audit_batch()`.
+    """
+    from .models import AuditLog
+
+    entry = AuditLog(
+        user=user if getattr(user, "is_authenticated", False) else None,
+        action=action,
+        details=details or {},
+    )
+    if target is not None:
+        entry.content_type = ContentType.objects.get_for_model(target)
+        entry.object_id = target.pk
+
+    batch = _current_batch.get()
+    if batch is None:
+        transaction.on_commit(lambda: _write([entry]))
+    else:
+        # Solo lo confirmado llega al lote.
+        transaction.on_commit(lambda: batch.append(entry))
+
+
+@contextmanager
+def audit_batch() -> Iterator[List]:
+    """Acumula las entradas confirmadas dentro del bloque y las escribe juntas al salir."""
+    entries: List = []
+    token = _current_batch.set(entries)
+    try:
+        yield entries
+    finally:
+        _current_batch.reset(token)
+        # Fuera de una transacción se escribe ya; dentro, tras las entradas que aún
+        # esperan el commit (los callbacks corren en orden de registro).
+        transaction.on_commit(lambda: _write(entries))
+
+
+class AuditTrailMixin:
+    """
+    Para vistas DRF de escritura: registra en la bitácora las operaciones con acción en
+    `audit_actions` (`create`, `update`, `destroy` -> `AuditLog.Action`), con el objeto
+    afectado y los campos enviados (sin sus valores, que pueden ser contraseñas).
+    """
+    audit_actions: Dict[str, str] = {}
+
+    def audit(self, operation: str, instance, **details) -> None:
+        action = self.audit_actions.get(operation)
+        if action:
+            record_audit(action, user=self.request.user, target=instance, details={"objeto": str(instance), **details})
+
+    def perform_create(self, serializer):
+        fields = sorted(serializer.validated_data)  # Antes de guardar: algunos `create()` los consumen.
+        super().perform_create(serializer)
+        self.audit("create", serializer.instance, campos=fields)
+
+    def perform_update(self, serializer):
+        fields = sorted(serializer.validated_data)
+        super().perform_update(serializer)
+        self.audit("update", serializer.instance, campos=fields)
+
+    def perform_destroy(self, instance):
+        # Se registra antes de borrar (después ya no hay pk); si el borrado falla, se revierte.
+        with transaction.atomic():
+            self.audit("destroy", instance)
+            super().perform_destroy(instance)
+
+
+# --- ARCHIVO MENSUAL ---
+
+def month_start(value) -> date:
+    if isinstance(value, datetime):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bounds(month: date):
+    start = timezone.make_aware(datetime(month.year, month.month, 1))
+    end = timezone.make_aware(datetime.combine(add_months(month, 1), datetime.min.time()))
+    return start, end
+
+
+def _hot_table() -> str:
+    from .models import AuditLog
+    return AuditLog._meta.db_table
+
+
+def archive_table(month: date) -> str:
+    return f"{_hot_table()}{ARCHIVE_SUFFIX}_{month:%Y_%m}"
+
+
+def archived_months() -> List[date]:
+    pattern = re.compile(rf"^{re.escape(_hot_table() + ARCHIVE_SUFFIX)}_(\d{{4}})_(\d{{2}})$")
+    months = []
+    for name in connection.introspection.table_names():
+        match = pattern.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def _columns() -> List[str]:
+    from .models import AuditLog
+    return [field.column for field in AuditLog._meta.concrete_fields]
+
+
+def ensure_archive_table(month: date) -> str:
+    """Crea (si falta) la tabla de archivo del mes: una partición en PostgreSQL."""
+    quote = connection.ops.quote_name
+    hot, table = _hot_table(), archive_table(month)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            parent = hot + ARCHIVE_SUFFIX
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote(parent)} (LIKE {quote(hot)} INCLUDING DEFAULTS) "
+                f"PARTITION BY RANGE ({quote('timestamp')})"
+            )
+            start, end = _bounds(month)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote(table)} PARTITION OF {quote(parent)} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        else:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {quote(table)} AS SELECT * FROM {quote(hot)} WHERE 1 = 0")
+    return table
+
+
+def archive_month(month: date) -> int:
+    """Mueve las filas del mes de la tabla viva a su tabla de archivo. Devuelve cuántas."""
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(column) for column in _columns())
+    start, end = (connection.ops.adapt_datetimefield_value(value) for value in _bounds(month))
+    hot = quote(_hot_table())
+    where = f"{quote('timestamp')} >= %s AND {quote('timestamp')} < %s"
+    with transaction.atomic():
+        table = quote(ensure_archive_table(month))
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {hot} WHERE {where}", [start, end])
+            cursor.execute(f"DELETE FROM {hot} WHERE {where}", [start, end])
+            return cursor.rowcount
+
+
+def months_to_archive(keep_months: int, today: Optional[date] = None) -> List[date]:
+    """Meses con filas en la tabla viva anteriores a los `keep_months` más recientes."""
+    from .models import AuditLog
+
+    cutoff = add_months(month_start(today or timezone.localdate()), -(keep_months - 1))
+    return list(AuditLog.objects.filter(timestamp__lt=_bounds(cutoff)[0]).dates("timestamp", "month"))
+
+
+def drop_archive(month: date) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(archive_table(month))}")
+
+
+def analyze_hot_table() -> None:
+    """Refresca las estadísticas (y la estimación de filas de la paginación) tras mover meses."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {connection.ops.quote_name(_hot_table())}")
+
+
+# --- EXPORTACIÓN COMPRIMIDA ---
+
+def export_path(directory, month: date) -> Path:
+    return Path(directory) / f"auditlog-{month:%Y-%m}.jsonl.zst"
+
+
+def _json_row(columns: List[str], row) -> Dict:
+    record = {}
+    for column, value in zip(columns, row):
+        if column == "details" and isinstance(value, str):
+            value = json.loads(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        record[column] = value
+    return record
+
+
+def export_month(month: date, directory) -> Path:
+    """Escribe el archivo del mes como JSON Lines comprimido con zstandard (una fila por línea)."""
+    import zstandard
+
+    quote = connection.ops.quote_name
+    columns = _columns()
+    path = export_path(directory, month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".partial")
+    with open(partial, "wb") as raw, zstandard.ZstdCompressor(level=10).stream_writer(raw) as writer:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(quote(column) for column in columns)} FROM {quote(archive_table(month))} "
+                f"ORDER BY {quote('timestamp')}, {quote('id')}"
+            )
+            while True:
+                rows = cursor.fetchmany(2000)
+                if not rows:
+                    break
+                for row in rows:
+                    writer.write(json.dumps(_json_row(columns, row), ensure_ascii=False).encode() + b"\n")
+    partial.replace(path)  # Un archivo a medio escribir nunca pasa por completo.
+    return path
+
+
+def read_export(path) -> Iterator[Dict]:
+    """Recorre un archivo exportado por `export_month`."""
+    import zstandard
+
+    with open(path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+        for line in io.TextIOWrapper(reader, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,66 @@
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable
+
+from django.db import transaction
+
+# --- LOTES POR TRANSACCIÓN ---
+#
+# El índice vectorial, la pirámide del mapa y las derivadas de imágenes procesan los
+# objetos cambiados al confirmarse la transacción. Una cola global de marcas no sirve:
+# el `on_commit` de cualquier hilo la vaciaría y se llevaría las marcas de otra
+# transacción aún sin confirmar, que se procesarían con los datos viejos y ya no
+# estarían al confirmarse. `defer_until_commit` guarda las marcas en un lote de la
+# transacción en curso (uno por conexión y por nombre) y registra un solo `on_commit`
+# que entrega ese lote, y solo ese, al confirmarse.
+#
+# Si la transacción (o el savepoint donde se abrió el lote) se revierte, Django
+# descarta el callback; la siguiente marca en esa conexión abre un lote nuevo.
+
+_batches: "weakref.WeakKeyDictionary[Any, Dict[str, _CommitBatch]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class _CommitBatch:
+    def __init__(self, connection, name: str, callback: Callable[[Dict], Any]):
+        self.connection, self.name, self.callback = connection, name, callback
+        self.items: Dict[Hashable, Any] = {}
+
+    def flush(self) -> None:
+        with _lock:
+            open_batches = _batches.get(self.connection, {})
+            if open_batches.get(self.name) is self:
+                del open_batches[self.name]
+        self.callback(self.items)
+
+    def is_registered(self) -> bool:
+        return on_commit_pending(self.connection, self.flush)
+
+
+def on_commit_pending(connection, func) -> bool:
+    """
+    Si `func` sigue registrado con `on_commit` en `connection`: deja de estarlo al
+    ejecutarse (commit) o al revertirse la transacción o el savepoint donde se registró.
+    """
+    return any(entry[1] == func for entry in connection.run_on_commit)
+
+
+def defer_until_commit(name: str, items: Dict[Hashable, Any], callback: Callable[[Dict], Any]) -> None:
+    """
+    Añade `items` al lote `name` de la transacción en curso; al confirmarse se llama a
+    `callback(lote)` una vez con todas sus marcas (a igual clave, gana la última).
+    Fuera de una transacción, `callback` se llama en el acto.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        callback(dict(items))
+        return
+    with _lock:
+        open_batches = _batches.setdefault(connection, {})
+        batch = open_batches.get(name)
+        created = batch is None or not batch.is_registered()
+        if created:
+            batch = open_batches[name] = _CommitBatch(connection, name, callback)
+        batch.items.update(items)
+    if created:
+        transaction.on_commit(batch.flush)
@@ -1,4 +1,5 @@
 import django_filters
+from rest_framework.filters import BaseFilterBackend
 from .models import AuditLog, CustomUser
 
 class AuditLogFilter(django_filters.FilterSet):
@@ -24,4 +25,21 @@ class AuditLogFilter(django_filters.FilterSet):
 
     class Meta:
         model = AuditLog
-        fields = ['user', 'action']
\ No newline at end of file
+        fields = ['user', 'action']
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Filtro `?q=` de los listados públicos: usa el índice de texto completo
+    (`api/search.py`) y devuelve los resultados ordenados por relevancia.
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        from .search import filter_queryset
+
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return filter_queryset(queryset, query)
+
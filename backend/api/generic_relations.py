@@ -0,0 +1,80 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import serializers
+
+# --- RESOLUCIÓN EN LOTE DE RELACIONES GENÉRICAS ---
+#
+# `ElementoGuardado`, `Resena`, `Sugerencia`, `AuditLog` y `Notificacion` apuntan a su
+# objeto con un `GenericForeignKey`. Leer `content_object` fila por fila cuesta una
+# consulta por fila (dos, contando el `ContentType`). Aquí se agrupan las filas por
+# tipo de contenido y se trae cada modelo destino con un único `in_bulk`, con los
+# `select_related` que su `__str__` necesita; luego se deja cada objeto en la caché
+# del campo genérico, de modo que el código existente no cambia.
+
+# Relaciones que recorre el `__str__` de los modelos que suelen ser destino genérico.
+TARGET_SELECT_RELATED: Dict[str, Tuple[str, ...]] = {
+    "api.userllmconfig": ("user",),
+    "api.detalleshotel": ("prestador",),
+    "api.imagengaleria": ("prestador",),
+    "api.imagenartesano": ("artesano",),
+    "api.documentolegalizacion": ("prestador",),
+    "api.imagenatractivo": ("atractivo",),
+    "api.verificacion": ("prestador",),
+    "api.asistenciacapacitacion": ("usuario", "capacitacion"),
+    "api.resena": ("usuario",),
+}
+
+
+def prefetch_generic_objects(instances: Iterable, field_name: str = "content_object") -> List:
+    """
+    Resuelve `field_name` (un GenericForeignKey) para todas las instancias con una
+    consulta por modelo destino. Los destinos borrados quedan en caché como None.
+    Devuelve las instancias como lista.
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+    opts = type(instances[0])._meta
+    field = opts.get_field(field_name)
+    ct_field = opts.get_field(field.ct_field)
+
+    wanted = defaultdict(set)
+    for instance in instances:
+        if field.is_cached(instance):
+            continue
+        ct_id, object_id = getattr(instance, ct_field.attname), getattr(instance, field.fk_field)
+        if ct_id is not None and object_id is not None:
+            wanted[ct_id].add(object_id)
+
+    resolved = {}
+    for ct_id, object_ids in wanted.items():
+        model = ContentType.objects.get_for_id(ct_id).model_class()
+        if model is None:  # Tipo de contenido huérfano (modelo eliminado).
+            continue
+        related = TARGET_SELECT_RELATED.get(model._meta.label_lower, ())
+        queryset = model._base_manager.select_related(*related) if related else model._base_manager.all()
+        for pk, obj in queryset.in_bulk(object_ids).items():
+            resolved[(ct_id, pk)] = obj
+
+    for instance in instances:
+        ct_id = getattr(instance, ct_field.attname)
+        if ct_id is not None and not ct_field.is_cached(instance):
+            # Los ContentType salen de la caché del manager: sin JOIN ni consulta extra.
+            ct_field.set_cached_value(instance, ContentType.objects.get_for_id(ct_id))
+        if not field.is_cached(instance):
+            field.set_cached_value(instance, resolved.get((ct_id, getattr(instance, field.fk_field))))
+    return instances
+
+
+class GenericObjectListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer que resuelve en lote el `content_object` de la página antes de
+    serializarla. Se activa con `list_serializer_class` en el Meta del serializador.
+    """
+    generic_field_name = "content_object"
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, "all") else data
+        return super().to_representation(prefetch_generic_objects(iterable, self.generic_field_name))
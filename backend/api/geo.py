@@ -0,0 +1,389 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+# --- ÍNDICE GEOESPACIAL ---
+#
+# Prestadores, artesanos y atractivos guardan `latitud`/`longitud` como flotantes sin
+# índice: "¿qué hay cerca de mí?" obligaba a leer todas las filas y medir distancias en
+# Python. Cada objeto con coordenadas se copia al guardarse a `GeoPoint` (una tabla para
+# los tres tipos, como `SearchDocument`) junto con su geohash, indexado. Una búsqueda
+# por radio:
+#
+#   1. Elige la precisión de geohash cuyas celdas miden al menos el radio y toma las
+#      celdas (a lo sumo 3x3) que cubren la caja envolvente del círculo: cada una es
+#      un rango sobre el índice (`geohash >= celda AND geohash < siguiente celda`, ver
+#      `geohash_prefix_q`).
+#   2. Recorta con la caja envolvente en grados.
+#   3. Refina los candidatos con la distancia haversine y devuelve los k más cercanos.
+#
+# Con `GEO_INDEX["BACKEND"] = "postgis"` (PostgreSQL con la extensión PostGIS) la
+# búsqueda usa `ST_DWithin` sobre un índice GiST de expresión; el resto no cambia.
+#
+# Los cambios del índice alimentan además la pirámide de agrupación del mapa
+# (`api/map_clusters.py`).
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+STORED_PRECISION = 9  # ~5 m: los prefijos sirven para cualquier precisión menor.
+MAX_QUERY_PRECISION = 8
+
+DEFAULT_GEO_INDEX_SETTINGS = {
+    "BACKEND": "geohash",  # "geohash" (cualquier base) o "postgis".
+    "DEFAULT_RADIUS_KM": 5.0,
+    "MAX_RADIUS_KM": 200.0,
+    "DEFAULT_LIMIT": 20,  # k por defecto en las búsquedas por cercanía.
+    "MAX_LIMIT": 200,
+    # Pirámide de agrupación del mapa (api/map_clusters.py).
+    "CLUSTER_MAX_PRECISION": 7,  # ~150 m; con más zoom se devuelven los puntos sueltos.
+    "CLUSTER_CELLS_PER_TILE": 4,  # Celdas a lo ancho de un tile de 256 px.
+    "MAX_TILE_ZOOM": 22,
+}
+
+
+def get_geo_index_settings() -> Dict:
+    return {**DEFAULT_GEO_INDEX_SETTINGS, **getattr(settings, "GEO_INDEX", {})}
+
+
+# --- GEOMETRÍA ---
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lng_min, lng_max) que contiene el círculo; longitud sin envolver en ±180."""
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(89.9, abs(lat) + dlat)))
+    dlng = min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), lng - dlng, lng + dlng
+
+
+def geohash_encode(lat: float, lng: float, precision: int = STORED_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bit, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bit, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(alto, ancho) en grados de una celda de geohash de la precisión dada."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def geohash_successor(cell: str) -> Optional[str]:
+    """
+    Primera cadena de geohash, sin el prefijo `cell`, que ordena después de todas las que
+    lo tienen: se incrementa el último carácter dentro de `GEOHASH_ALPHABET` (con acarreo).
+    Dígitos y minúsculas ordenan igual en la collation "C" y en las de locale (en_US.UTF-8,
+    es_CO.UTF-8...), a diferencia de la puntuación. None si no hay ninguna (`"zz…"`).
+    """
+    chars = list(cell)
+    while chars:
+        position = GEOHASH_ALPHABET.index(chars[-1])
+        if position + 1 < len(GEOHASH_ALPHABET):
+            chars[-1] = GEOHASH_ALPHABET[position + 1]
+            return "".join(chars)
+        chars.pop()
+    return None
+
+
+def geohash_prefix_q(field: str, cell: str) -> Q:
+    """Filtro `field` empieza por `cell` como un rango sobre el índice de `field`."""
+    upper = geohash_successor(cell)
+    if upper is None:
+        return Q(**{f"{field}__gte": cell})
+    return Q(**{f"{field}__gte": cell, f"{field}__lt": upper})
+
+
+def covering_cells(lat: float, lng: float, radius_km: float) -> List[str]:
+    """
+    Celdas de geohash que cubren la caja envolvente del círculo. Con celdas al menos tan
+    grandes como el radio, toda celda que toque la caja contiene uno de los 3x3 puntos
+    de muestra (centro, bordes y esquinas). Lista vacía si el radio es demasiado grande.
+    """
+    lat_min, lat_max, lng_min, lng_max = bounding_box(lat, lng, radius_km)
+    dlat, dlng = (lat_max - lat_min) / 2, (lng_max - lng_min) / 2
+    for precision in range(MAX_QUERY_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        if height >= dlat and width >= dlng:
+            break
+    else:
+        return []
+    cells = set()
+    for sample_lat in (lat_min, lat, lat_max):
+        for sample_lng in (lng - dlng, lng, lng + dlng):
+            wrapped = (sample_lng + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(max(-90.0, min(90.0, sample_lat)), wrapped, precision))
+    return sorted(cells)
+
+
+# --- REGISTRO DE MODELOS ---
+
+@dataclass
+class GeoSpec:
+    """Cómo copiar un modelo al índice: nombre, tipo de marcador, URL pública y visibilidad."""
+    entity_type: str
+    model: Any
+    name: Callable[[Any], str]
+    marker: Callable[[Any], str]
+    url: Callable[[Any], str]
+    is_public: Callable[[Any], bool]
+    select_related: Tuple[str, ...] = ()
+
+
+def _build_registry() -> Dict[str, GeoSpec]:
+    from .models import Artesano, AtractivoTuristico, PrestadorServicio
+
+    specs = [
+        GeoSpec("prestador", PrestadorServicio, lambda obj: obj.nombre_negocio,
+                lambda obj: obj.categoria.slug if obj.categoria_id else "prestador",
+                lambda obj: f"/directorio/prestadores/{obj.pk}", lambda obj: obj.aprobado, ("categoria",)),
+        GeoSpec("artesano", Artesano, lambda obj: obj.nombre_taller,
+                lambda obj: "artesano",
+                lambda obj: f"/directorio/artesanos/{obj.pk}", lambda obj: obj.aprobado),
+        GeoSpec("atractivo", AtractivoTuristico, lambda obj: obj.nombre,
+                lambda obj: f"atractivo_{obj.categoria_color.lower()}",
+                lambda obj: f"/descubre/atractivos/{obj.slug}", lambda obj: obj.es_publicado),
+    ]
+    return {spec.entity_type: spec for spec in specs}
+
+
+_registry: Optional[Dict[str, GeoSpec]] = None
+
+
+def get_registry() -> Dict[str, GeoSpec]:
+    global _registry
+    if _registry is None:
+        _registry = _build_registry()
+    return _registry
+
+
+def spec_for_model(model) -> Optional[GeoSpec]:
+    for spec in get_registry().values():
+        if spec.model is model:
+            return spec
+    return None
+
+
+# --- INDEXACIÓN ---
+
+def _point_for(spec: GeoSpec, instance):
+    from .models import GeoPoint
+
+    if instance.latitud is None or instance.longitud is None:
+        return None
+    return GeoPoint(
+        entity_type=spec.entity_type, object_id=instance.pk,
+        nombre=spec.name(instance)[:255], tipo=spec.marker(instance), url_detalle=spec.url(instance),
+        latitud=instance.latitud, longitud=instance.longitud,
+        geohash=geohash_encode(instance.latitud, instance.longitud), is_public=bool(spec.is_public(instance)),
+    )
+
+
+def _indexed_geohashes(entity_type: str, object_ids) -> List[str]:
+    from .models import GeoPoint
+    return list(GeoPoint.objects.filter(entity_type=entity_type, object_id__in=object_ids).values_list("geohash", flat=True))
+
+
+def index_location(instance) -> None:
+    """Crea, actualiza o retira (si ya no tiene coordenadas) el punto de un objeto."""
+    from .map_clusters import schedule_refresh
+    from .models import GeoPoint
+
+    spec = spec_for_model(type(instance))
+    if spec is None:
+        return
+    previous = _indexed_geohashes(spec.entity_type, [instance.pk])
+    point = _point_for(spec, instance)
+    if point is None:
+        GeoPoint.objects.filter(entity_type=spec.entity_type, object_id=instance.pk).delete()
+        schedule_refresh(*previous)
+        return
+    fields = ("nombre", "tipo", "url_detalle", "latitud", "longitud", "geohash", "is_public")
+    GeoPoint.objects.update_or_create(
+        entity_type=spec.entity_type, object_id=instance.pk,
+        defaults={name: getattr(point, name) for name in fields},
+    )
+    schedule_refresh(*previous, point.geohash)
+
+
+def remove_location(instance) -> None:
+    from .map_clusters import schedule_refresh
+    from .models import GeoPoint
+
+    spec = spec_for_model(type(instance))
+    if spec is not None:
+        previous = _indexed_geohashes(spec.entity_type, [instance.pk])
+        GeoPoint.objects.filter(entity_type=spec.entity_type, object_id=instance.pk).delete()
+        schedule_refresh(*previous)
+
+
+def refresh_locations(queryset, clusters: bool = True) -> int:
+    """
+    Reindexa en bloque los objetos de `queryset` (los `update()` masivos no emiten
+    señales). Devuelve cuántos puntos quedaron en el índice. Con `clusters=False` no
+    se recalcula la pirámide del mapa (quien llama la reconstruye entera).
+    """
+    from .map_clusters import schedule_refresh
+    from .models import GeoPoint
+
+    spec = spec_for_model(queryset.model)
+    if spec is None:
+        return 0
+    instances = list(queryset.select_related(*spec.select_related))
+    object_ids = [obj.pk for obj in instances]
+    previous = _indexed_geohashes(spec.entity_type, object_ids) if clusters else []
+    points = [point for point in (_point_for(spec, instance) for instance in instances) if point is not None]
+    GeoPoint.objects.filter(entity_type=spec.entity_type, object_id__in=object_ids).delete()
+    GeoPoint.objects.bulk_create(points, batch_size=1000)
+    if clusters:
+        schedule_refresh(*previous, *(point.geohash for point in points))
+    return len(points)
+
+
+def rebuild_index(types: Optional[Sequence[str]] = None) -> Dict[str, int]:
+    """
+    Reconstruye el índice de los tipos dados (todos por defecto) y la pirámide de
+    agrupación del mapa. Devuelve puntos por tipo.
+    """
+    from .map_clusters import rebuild_clusters
+    from .models import GeoPoint
+
+    totals = {}
+    for entity_type, spec in get_registry().items():
+        if types and entity_type not in types:
+            continue
+        GeoPoint.objects.filter(entity_type=entity_type).delete()
+        totals[entity_type] = refresh_locations(spec.model.objects.all(), clusters=False)
+    rebuild_clusters()
+    return totals
+
+
+# --- CONSULTAS ---
+
+POINT_FIELDS = ("entity_type", "object_id", "nombre", "tipo", "url_detalle", "latitud", "longitud")
+
+
+def _as_location(row: Dict, distance: Optional[float] = None) -> Dict:
+    location = {
+        "id": f"{row['entity_type']}-{row['object_id']}",
+        "nombre": row["nombre"],
+        "lat": row["latitud"],
+        "lng": row["longitud"],
+        "tipo": row["tipo"],
+        "url_detalle": row["url_detalle"],
+    }
+    if distance is not None:
+        location["distancia_km"] = round(distance, 3)
+    return location
+
+
+def public_points(types: Optional[Sequence[str]] = None):
+    from .models import GeoPoint
+
+    queryset = GeoPoint.objects.filter(is_public=True)
+    if types:
+        queryset = queryset.filter(entity_type__in=types)
+    return queryset
+
+
+def all_locations(types: Optional[Sequence[str]] = None) -> List[Dict]:
+    """Todos los puntos públicos (el mapa completo), en una sola consulta."""
+    return [_as_location(row) for row in public_points(types).order_by("entity_type", "object_id").values(*POINT_FIELDS)]
+
+
+def candidates(lat: float, lng: float, radius_km: float, types: Optional[Sequence[str]] = None):
+    """Puntos públicos dentro de la caja envolvente, preseleccionados por geohash."""
+    lat_min, lat_max, lng_min, lng_max = bounding_box(lat, lng, radius_km)
+    queryset = public_points(types).filter(latitud__range=(lat_min, lat_max))
+    if -180.0 <= lng_min and lng_max <= 180.0:  # Si la caja cruza el antimeridiano solo se filtra por latitud.
+        queryset = queryset.filter(longitud__range=(lng_min, lng_max))
+    cells = covering_cells(lat, lng, radius_km)
+    if cells:
+        prefix = Q()
+        for cell in cells:
+            prefix |= geohash_prefix_q("geohash", cell)
+        queryset = queryset.filter(prefix)
+    return queryset
+
+
+def _nearby_postgis(lat: float, lng: float, radius_km: float, types, k: int) -> List[Dict]:
+    from .models import GeoPoint
+
+    quote = connection.ops.quote_name
+    geography = "ST_SetSRID(ST_MakePoint(longitud, latitud), 4326)::geography"
+    origin = "ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography"
+    where, params = ["is_public", f"ST_DWithin({geography}, {origin}, %s)"], [lng, lat, radius_km * 1000]
+    if types:
+        where.append("entity_type IN (" + ", ".join(["%s"] * len(types)) + ")")
+        params.extend(types)
+    sql = (
+        f"SELECT {', '.join(quote(name) for name in POINT_FIELDS)}, ST_Distance({geography}, {origin}) / 1000.0 "
+        f"FROM {quote(GeoPoint._meta.db_table)} WHERE {' AND '.join(where)} ORDER BY 8 LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [lng, lat, *params, k])
+        return [_as_location(dict(zip(POINT_FIELDS, row)), row[-1]) for row in cursor.fetchall()]
+
+
+def nearby(lat: float, lng: float, radius_km: float, types: Optional[Sequence[str]] = None, k: int = 20) -> List[Dict]:
+    """Los `k` puntos públicos más cercanos dentro de `radius_km`, del más cercano al más lejano."""
+    if get_geo_index_settings()["BACKEND"] == "postgis" and connection.vendor == "postgresql":
+        return _nearby_postgis(lat, lng, radius_km, types, k)
+    found = []
+    for row in candidates(lat, lng, radius_km, types).values(*POINT_FIELDS):
+        distance = haversine_km(lat, lng, row["latitud"], row["longitud"])
+        if distance <= radius_km:
+            found.append((distance, row["entity_type"], row["object_id"], row))
+    found.sort(key=lambda item: item[:3])
+    return [_as_location(row, distance) for distance, _, _, row in found[:k]]
+
+
+def ensure_postgis_index() -> bool:
+    """Crea el índice GiST de expresión que usa el backend PostGIS. False si no hay PostGIS."""
+    from .models import GeoPoint
+
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+        if cursor.fetchone() is None:
+            return False
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS geopoint_geography_idx ON {connection.ops.quote_name(GeoPoint._meta.db_table)} "
+            "USING GIST ((ST_SetSRID(ST_MakePoint(longitud, latitud), 4326)::geography))"
+        )
+    return True
+
+
+def parse_types(value: Optional[str]) -> List[str]:
+    """`?types=prestador,atractivo` -> lista de tipos; vacía = todos. ValueError si alguno no existe."""
+    types = [part.strip() for part in (value or "").split(",") if part.strip()]
+    unknown = sorted(set(types) - set(get_registry()))
+    if unknown:
+        raise ValueError(f"Tipos desconocidos: {', '.join(unknown)}. Válidos: {', '.join(get_registry())}.")
+    return types
+
@@ -0,0 +1,214 @@
+import hashlib
+import json
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.translation import get_language
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+# --- RESPUESTAS CONDICIONALES Y CACHÉ HTTP ---
+#
+# Los endpoints públicos de contenido (menú, páginas institucionales, videos...) solo
+# cambian cuando un funcionario edita algo, pero se reconstruían en cada visita. Cada
+# modelo lleva un contador de versión (`ContentVersion`) que las señales incrementan al
+# guardar o borrar. De esos contadores salen el ETag y el Last-Modified de la respuesta:
+#
+#   1. Si el cliente ya tiene esa versión (If-None-Match / If-Modified-Since), 304 sin
+#      tocar las tablas de contenido ni serializar.
+#   2. Si no, se busca el JSON ya renderizado en la caché (clave = ETag, que incluye
+#      ruta, idioma y versiones) y solo si falta se ejecuta la vista.
+#
+# Los cambios con `QuerySet.update()` no emiten señales: quien los use debe llamar a
+# `bump_versions()` a mano.
+#
+# Algunos valores dependen de cachés que no mueven esas versiones (p. ej. el mapa de
+# derivadas de imágenes, que se carga en segundo plano). Mientras falten, el campo llama a
+# `mark_provisional(request)` y esa respuesta sale sin guardarse ni llevar ETag: si no, se
+# serviría provisional (o con 304) hasta el siguiente cambio de versión.
+
+DEFAULT_HTTP_CACHE_SETTINGS = {
+    "ENABLED": True,
+    "CACHE_ALIAS": "default",
+    "TIMEOUT_SECONDS": 24 * 3600,
+    "CACHE_CONTROL": "public, no-cache",
+}
+
+STATS_KEYS = ("hits", "misses", "not_modified")
+
+
+def get_http_cache_settings() -> Dict:
+    return {**DEFAULT_HTTP_CACHE_SETTINGS, **getattr(settings, "HTTP_CACHE", {})}
+
+
+def _cache(config=None):
+    return caches[(config or get_http_cache_settings())["CACHE_ALIAS"]]
+
+
+def _label(model) -> str:
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+# --- CONTADORES DE VERSIÓN ---
+
+def bump_versions(*models) -> None:
+    """Incrementa la versión de los modelos dados; se confirma junto con el cambio que la provocó."""
+    from .models import ContentVersion
+
+    now = timezone.now()
+    for label in {_label(model).lower() for model in models}:
+        if ContentVersion.objects.filter(label=label).update(version=F("version") + 1, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                ContentVersion.objects.create(label=label, version=1, updated_at=now)
+        except IntegrityError:  # Otro proceso la creó entre ambas consultas.
+            ContentVersion.objects.filter(label=label).update(version=F("version") + 1, updated_at=now)
+
+
+def get_versions(models: Iterable) -> Tuple[str, Optional[object]]:
+    """Firma de versiones (`label:versión,...`) y fecha del último cambio de los modelos dados."""
+    from .models import ContentVersion
+
+    labels = sorted({_label(model).lower() for model in models})
+    rows = {
+        label: (version, updated_at)
+        for label, version, updated_at in ContentVersion.objects.filter(label__in=labels)
+        .values_list("label", "version", "updated_at")
+    }
+    signature = ",".join(f"{label}:{rows.get(label, (0, None))[0]}" for label in labels)
+    changes = [updated_at for _, updated_at in rows.values() if updated_at]
+    return signature, max(changes) if changes else None
+
+
+# --- RESPUESTAS PROVISIONALES ---
+
+def mark_provisional(request) -> None:
+    """Marca la respuesta en curso como provisional: `conditional_response` no la guarda."""
+    if request is not None:
+        getattr(request, "_request", request).http_cache_provisional = True
+
+
+def is_provisional(request) -> bool:
+    return getattr(getattr(request, "_request", request), "http_cache_provisional", False)
+
+
+# --- ESTADÍSTICAS (en la caché: si es compartida, suman todos los procesos) ---
+
+def _count(name: str, config) -> None:
+    cache, key = _cache(config), f"http-cache:stats:{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def stats() -> Dict:
+    values = _cache().get_many([f"http-cache:stats:{name}" for name in STATS_KEYS])
+    counts = {name: values.get(f"http-cache:stats:{name}", 0) for name in STATS_KEYS}
+    served = sum(counts.values())
+    counts["hit_ratio"] = round((counts["hits"] + counts["not_modified"]) / served, 4) if served else None
+    return counts
+
+
+def reset_stats() -> None:
+    _cache().delete_many([f"http-cache:stats:{name}" for name in STATS_KEYS])
+
+
+# --- CAPA CONDICIONAL PARA VISTAS DRF ---
+
+class RenderedResponse(Response):
+    """Respuesta DRF cuyo cuerpo ya está renderizado: no vuelve a pasar por el serializador."""
+
+    def __init__(self, body: bytes, **kwargs):
+        self.body = body
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        # Solo para quien inspeccione la respuesta (pruebas, middleware): se decodifica a demanda.
+        return json.loads(self.body) if self.body else None
+
+    @data.setter
+    def data(self, value):
+        pass
+
+    @property
+    def rendered_content(self):
+        self["Content-Type"] = self.accepted_renderer.media_type
+        return self.body
+
+
+class ConditionalCacheMixin:
+    """
+    Para vistas de lectura pública cuyo contenido depende solo de `cache_models`.
+    Las acciones `list` y `retrieve` responden con ETag/Last-Modified, devuelven 304
+    cuando el cliente ya tiene la versión vigente y sirven el JSON ya renderizado.
+    Las vistas con un `list` propio lo envuelven con `self.conditional_response(...)`, y
+    las que pueden firmar su contenido con más detalle redefinen `cache_signature`.
+    """
+    cache_models: Tuple = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+    def conditional_response(self, request, build, *args, **kwargs):
+        config = get_http_cache_settings()
+        cacheable = (
+            config["ENABLED"] and request.method in ("GET", "HEAD")
+            and isinstance(getattr(request, "accepted_renderer", None), JSONRenderer)
+        )
+        if not cacheable:
+            return build(request, *args, **kwargs)
+
+        signature, last_modified = self.cache_signature(request, *args, **kwargs)
+        language = get_language() or settings.LANGUAGE_CODE
+        digest = hashlib.sha1(f"{request.get_full_path()}|{language}|{signature}".encode()).hexdigest()
+        etag = f'"{digest}"'
+
+        if self._client_is_current(request, etag, last_modified):
+            _count("not_modified", config)
+            response = Response(status=304)
+        else:
+            cache, key = _cache(config), f"http-cache:body:{digest}"
+            body = cache.get(key)
+            if body is not None:
+                _count("hits", config)
+                response = RenderedResponse(body)
+            else:
+                _count("misses", config)
+                response = build(request, *args, **kwargs)
+                if response.status_code != 200 or is_provisional(request):
+                    return response
+                body = request.accepted_renderer.render(
+                    response.data, request.accepted_media_type, self.get_renderer_context()
+                )
+                cache.set(key, body, timeout=config["TIMEOUT_SECONDS"])
+                response = RenderedResponse(body)
+
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        response["Cache-Control"] = config["CACHE_CONTROL"]
+        return response
+
+    def cache_signature(self, request, *args, **kwargs) -> Tuple[str, Optional[object]]:
+        """Firma del contenido y fecha de su último cambio: por defecto, las versiones de `cache_models`."""
+        return get_versions(self.cache_models)
+
+    @staticmethod
+    def _client_is_current(request, etag: str, last_modified) -> bool:
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        since = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+        return bool(since and last_modified and int(last_modified.timestamp()) <= since)
@@ -0,0 +1,376 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, models
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+from rest_framework import serializers
+
+from .commit_batches import defer_until_commit
+from .http_cache import mark_provisional
+
+# --- DERIVADAS DE IMÁGENES ---
+#
+# Las imágenes se servían con la resolución subida: los listados públicos enviaban
+# megabytes por página a teléfonos. Cada imagen de los modelos de `IMAGE_VARIANT_MODELS`
+# se convierte, fuera de la petición, en varios anchos (`WIDTHS`) y formatos (`FORMATS`:
+# AVIF y WebP si el Pillow instalado los soporta, y JPEG como respaldo). Las derivadas se
+# guardan junto al original, en `<carpeta>/<DIRECTORY>/`, con el hash del contenido en el
+# nombre: nunca cambian y pueden cachearse como inmutables.
+#
+# Flujo:
+#   - post_save marca las imágenes del objeto; al confirmar la transacción un grupo de
+#     hilos (`WORKERS`) las procesa. Si el hash no cambió no se hace nada.
+#   - `ImageVariant` guarda el mapa `{formato: {ancho: ruta}}` de cada original y se copia
+#     a la caché. Los serializadores leen solo la caché (sin consultas en la petición);
+#     si falta una entrada se carga en segundo plano y mientras tanto se sirve el original.
+#   - `manage.py generate_image_variants` procesa las imágenes existentes.
+
+IMAGE_VARIANT_MODELS = [
+    'api.PrestadorServicio', 'api.Artesano', 'api.ImagenGaleria', 'api.ImagenArtesano', 'api.Publicacion',
+    'api.AtractivoTuristico', 'api.ImagenAtractivo', 'api.RutaTuristica', 'api.ImagenRutaTuristica',
+    'api.PaginaInstitucional', 'api.ImagenPaginaInstitucional', 'api.HomePageComponent', 'api.HechoHistorico',
+]
+
+DEFAULT_IMAGE_VARIANTS_SETTINGS = {
+    "ENABLED": True,
+    "WIDTHS": (320, 640, 1024, 1600),
+    "FORMATS": ("avif", "webp", "jpeg"),  # Los que el Pillow instalado no soporte se omiten.
+    "QUALITY": {"avif": 55, "webp": 78, "jpeg": 82},
+    "DIRECTORY": "variantes",
+    "WORKERS": 2,
+    "BACKGROUND": True,  # False: se generan en el hilo que confirma la transacción.
+    "CACHE_ALIAS": "default",
+    "CACHE_TIMEOUT_SECONDS": 60 * 60 * 24,
+    "MISSING_TIMEOUT_SECONDS": 60 * 10,  # Cuánto se recuerda que una imagen aún no tiene derivadas.
+}
+
+FORMAT_EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+PIL_FORMATS = {"avif": "AVIF", "webp": "WEBP", "jpeg": "JPEG"}
+CACHE_PREFIX = "image-variants:"
+
+
+def get_image_variants_settings() -> Dict:
+    return {**DEFAULT_IMAGE_VARIANTS_SETTINGS, **getattr(settings, "IMAGE_VARIANTS", {})}
+
+
+def supported_formats(config: Optional[Dict] = None) -> List[str]:
+    """Formatos configurados que el Pillow instalado puede escribir."""
+    config = config or get_image_variants_settings()
+    return [fmt for fmt in config["FORMATS"] if fmt == "jpeg" or (fmt in PIL_FORMATS and features.check(fmt))]
+
+
+def image_fields(model) -> List[str]:
+    return [field.name for field in model._meta.get_fields() if isinstance(field, models.ImageField)]
+
+
+def _cache(config: Dict):
+    return caches[config["CACHE_ALIAS"]]
+
+
+def _cache_key(name: str) -> str:
+    return CACHE_PREFIX + hashlib.sha1(name.encode()).hexdigest()
+
+
+# --- GENERACIÓN ---
+
+def _signature(config: Dict) -> str:
+    formats = supported_formats(config)
+    return f"{sorted(config['WIDTHS'])}|{formats}|{[config['QUALITY'].get(fmt) for fmt in formats]}"
+
+
+def _prepare(image: Image.Image, fmt: str) -> Image.Image:
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if fmt == "jpeg":
+        if not has_alpha:
+            return image.convert("RGB")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image.convert("RGBA"), mask=image.convert("RGBA").getchannel("A"))
+        return background
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def _encode(image: Image.Image, fmt: str, quality: Optional[int]) -> bytes:
+    buffer = io.BytesIO()
+    options = {"quality": quality} if quality else {}
+    if fmt == "jpeg":
+        options.update(optimize=True, progressive=True)
+    image.save(buffer, PIL_FORMATS[fmt], **options)
+    return buffer.getvalue()
+
+
+def variant_name(original: str, digest: str, width: int, fmt: str, config: Optional[Dict] = None) -> str:
+    config = config or get_image_variants_settings()
+    folder, filename = os.path.split(original)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(folder, config["DIRECTORY"], f"{stem}-{digest[:12]}-{width}w.{FORMAT_EXTENSIONS[fmt]}")
+
+
+def generate_variants(name: str, force: bool = False) -> bool:
+    """
+    Genera (o reutiliza) las derivadas del original `name`. Devuelve True si se
+    escribieron derivadas nuevas, False si ya estaban al día o el original no se pudo leer.
+    `force` ignora el hash guardado y vuelve a revisar los archivos.
+    """
+    from .models import ImageVariant
+
+    config = get_image_variants_settings()
+    try:
+        with default_storage.open(name, "rb") as handle:
+            data = handle.read()
+    except (FileNotFoundError, OSError) as e:
+        print(f"--- ⚠️ DERIVADAS: No se pudo leer '{name}': {e} ---")
+        return False
+    digest = hashlib.sha256(data + _signature(config).encode()).hexdigest()
+    existing = ImageVariant.objects.filter(original=name).first()
+    if existing is not None and existing.content_hash == digest and not force:
+        _store_in_cache({name: _as_entry(existing)}, config)
+        return False
+
+    try:
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+        image.load()
+    except (UnidentifiedImageError, OSError) as e:
+        print(f"--- ⚠️ DERIVADAS: '{name}' no es una imagen válida: {e} ---")
+        return False
+
+    width, height = image.size
+    widths = sorted({min(width, target) for target in config["WIDTHS"]})
+    variants: Dict[str, Dict[str, str]] = {}
+    for fmt in supported_formats(config):
+        variants[fmt] = {}
+        for target in widths:
+            path = variant_name(name, digest, target, fmt, config)
+            if not default_storage.exists(path):  # Mismo nombre, mismo contenido: no se reescribe.
+                resized = image if target == width else image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+                default_storage.save(path, ContentFile(_encode(_prepare(resized, fmt), fmt, config["QUALITY"].get(fmt))))
+            variants[fmt][str(target)] = path
+
+    if existing is not None:
+        current = {path for sizes in variants.values() for path in sizes.values()}
+        for path in {path for sizes in existing.variants.values() for path in sizes.values()} - current:
+            default_storage.delete(path)
+    variant, _ = ImageVariant.objects.update_or_create(
+        original=name, defaults={"content_hash": digest, "width": width, "height": height, "variants": variants},
+    )
+    _store_in_cache({name: _as_entry(variant)}, config)
+    return True
+
+
+def _touch_versions(instance) -> None:
+    """
+    Mueve la versión del objeto y la del dueño de su galería (p. ej. la página de una
+    `ImagenPaginaInstitucional`): las representaciones y los ETag cacheados se rehacen
+    con las URLs de las derivadas.
+    """
+    from .http_cache import bump_versions
+    from .translated_cache import version_field
+
+    targets = [(type(instance), instance.pk)]
+    for field in instance._meta.concrete_fields:
+        if field.many_to_one and field.related_model._meta.label in IMAGE_VARIANT_MODELS:
+            targets.append((field.related_model, getattr(instance, field.attname)))
+    for model, pk in targets:
+        name = version_field(model)
+        if name and pk is not None:
+            model._base_manager.filter(pk=pk).update(**{name: timezone.now()})
+    bump_versions(*{model for model, _ in targets})
+
+
+def generate_for_instance(instance, force: bool = False) -> int:
+    """Genera las derivadas de todas las imágenes del objeto. Devuelve cuántos originales cambiaron."""
+    generated = 0
+    for field_name in image_fields(type(instance)):
+        file = getattr(instance, field_name)
+        if file and file.name:
+            generated += generate_variants(file.name, force=force)
+    if generated:
+        _touch_versions(instance)
+    return generated
+
+
+# --- COLA Y GRUPO DE HILOS ---
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(config: Dict) -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, config["WORKERS"]), thread_name_prefix="image-variants")
+        return _executor
+
+
+def schedule_variants(instance) -> None:
+    """Marca las imágenes del objeto; se procesan al confirmar la transacción en curso."""
+    config = get_image_variants_settings()
+    if not config["ENABLED"] or not any(getattr(instance, name) for name in image_fields(type(instance))):
+        return
+    defer_until_commit("image_variants", {(instance._meta.label, instance.pk): True}, submit_batch)
+
+
+def _process(batch: Iterable[Tuple[str, int]]) -> int:
+    by_model: Dict[str, List[int]] = {}
+    for label, pk in batch:
+        by_model.setdefault(label, []).append(pk)
+    generated = 0
+    for label, pks in by_model.items():
+        for instance in apps.get_model(label)._base_manager.filter(pk__in=pks):
+            generated += generate_for_instance(instance)
+    return generated
+
+
+def _run_in_worker(function, *args):
+    try:
+        return function(*args)
+    except Exception as e:
+        print(f"--- ⚠️ DERIVADAS: Error en segundo plano: {e} ---")
+        return 0
+    finally:
+        connections.close_all()  # Las conexiones del hilo del grupo no se reutilizan entre tareas.
+
+
+def submit_batch(batch: Iterable[Tuple[str, int]]) -> int:
+    """Envía las imágenes de una transacción confirmada al grupo de hilos (o las procesa aquí sin BACKGROUND)."""
+    batch = set(batch)
+    if not batch:
+        return 0
+    config = get_image_variants_settings()
+    if not config["BACKGROUND"]:
+        return _process(batch)
+    _get_executor(config).submit(_run_in_worker, _process, batch)
+    return 0
+
+
+def generate_all(labels: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, int]:
+    """Genera las derivadas de las imágenes existentes con el grupo de hilos. Devuelve originales nuevos por modelo."""
+    config = get_image_variants_settings()
+    workers = _get_executor(config) if config["BACKGROUND"] else None
+    totals = {}
+    for label in labels or IMAGE_VARIANT_MODELS:
+        instances = list(apps.get_model(label)._base_manager.all())
+        if workers is None:
+            totals[label] = sum(generate_for_instance(instance, force) for instance in instances)
+        else:
+            results = workers.map(lambda instance: _run_in_worker(generate_for_instance, instance, force), instances)
+            totals[label] = sum(results)
+    return totals
+
+
+# --- LECTURA (SERIALIZADORES) ---
+
+def _as_entry(variant) -> Dict:
+    return {"width": variant.width, "height": variant.height, "variants": variant.variants}
+
+
+def _store_in_cache(entries: Dict[str, Optional[Dict]], config: Dict) -> None:
+    cache = _cache(config)
+    present = {_cache_key(name): entry for name, entry in entries.items() if entry}
+    missing = {_cache_key(name): {} for name, entry in entries.items() if not entry}
+    if present:
+        cache.set_many(present, timeout=config["CACHE_TIMEOUT_SECONDS"])
+    if missing:
+        cache.set_many(missing, timeout=config["MISSING_TIMEOUT_SECONDS"])
+
+
+def load_into_cache(names: Iterable[str]) -> Dict[str, Optional[Dict]]:
+    """Copia a la caché los mapas guardados de `names` (y recuerda los que no existen)."""
+    from .models import ImageVariant
+
+    names = set(names)
+    found = {variant.original: _as_entry(variant) for variant in ImageVariant.objects.filter(original__in=names)}
+    entries = {name: found.get(name) for name in names}
+    _store_in_cache(entries, get_image_variants_settings())
+    return entries
+
+
+def cached_variants(names: Iterable[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Mapas de derivadas de `names` desde la caché, sin consultar la base. Lo que no está
+    en caché se carga en segundo plano; mientras tanto se devuelve None (usar el original).
+    Sin `BACKGROUND` se carga aquí mismo, con una consulta.
+    """
+    return lookup_variants(names)[0]
+
+
+def lookup_variants(names: Iterable[str]) -> Tuple[Dict[str, Optional[Dict]], List[str]]:
+    """Como `cached_variants`, pero además devuelve los nombres que siguen cargándose en segundo plano."""
+    config = get_image_variants_settings()
+    names = [name for name in names if name]
+    if not config["ENABLED"] or not names:
+        return {}, []
+    keys = {name: _cache_key(name) for name in names}
+    stored = _cache(config).get_many(list(keys.values()))
+    result, missing = {}, []
+    for name, key in keys.items():
+        if key not in stored:
+            missing.append(name)
+        result[name] = stored.get(key) or None
+    if missing and not config["BACKGROUND"]:
+        result.update(load_into_cache(missing))
+        return result, []
+    if missing:
+        _get_executor(config).submit(_run_in_worker, load_into_cache, missing)
+    return result, missing
+
+
+def variants_representation(entry: Optional[Dict], request=None) -> Optional[Dict]:
+    """`{ancho, alto, formatos: {formato: {ancho: url}}, srcset: {formato: "url 320w, ..."}}`."""
+    if not entry:
+        return None
+
+    def url(path):
+        value = default_storage.url(path)
+        return request.build_absolute_uri(value) if request is not None else value
+
+    formatos = {
+        fmt: {width: url(path) for width, path in sorted(sizes.items(), key=lambda item: int(item[0]))}
+        for fmt, sizes in entry["variants"].items()
+    }
+    return {
+        "ancho": entry["width"],
+        "alto": entry["height"],
+        "formatos": formatos,
+        "srcset": {fmt: ", ".join(f"{link} {width}w" for width, link in sizes.items()) for fmt, sizes in formatos.items()},
+    }
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Derivadas del ImageField de `source` para `srcset`/`<picture>` (ver
+    `variants_representation`); None mientras no existan: se usa el original.
+    Si el mapa aún se está cargando en segundo plano se avisa al serializador con
+    caché más cercano (`mark_incomplete`, también a través de serializadores
+    anidados) y a la caché HTTP (`mark_provisional`) para que no guarden esa
+    representación provisional.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        name = getattr(value, "name", None)
+        if not name:
+            return None
+        found, loading = lookup_variants([name])
+        if loading:
+            mark_provisional(self.context.get("request"))
+            # El serializador que cachea puede estar más arriba (galerías anidadas).
+            parent = self.parent
+            while parent is not None and not hasattr(parent, "mark_incomplete"):
+                parent = parent.parent
+            if parent is not None:
+                parent.mark_incomplete()
+        return variants_representation(found.get(name), self.context.get("request"))
@@ -0,0 +1,455 @@
+import hashlib
+import json
+import re
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db.models import Q
+from django.utils import timezone
+
+from .geo import get_registry, haversine_km
+
+# --- PLANIFICADOR DE ITINERARIOS ---
+#
+# Una `RutaTuristica` (o la lista "Mi Viaje" de un turista) es un conjunto de atractivos
+# y prestadores sin orden ni tiempos. Aquí se ordena la visita:
+#
+#   1. Las paradas salen del índice geoespacial (`GeoPoint`): solo objetos públicos con
+#      coordenadas. Los atractivos aportan su `horario_funcionamiento`, interpretado
+#      cuando el texto lo permite ("Lunes a Viernes de 9am a 5pm...").
+#   2. Vecino más cercano sobre la matriz de distancias haversine (memorizada por
+#      conjunto de coordenadas), mejorado con 2-opt y Or-opt (mover tramos de 1 a 3
+#      paradas) hasta un óptimo local. Con punto de partida (`origen`) el recorrido sale
+#      de él; si no, empieza en la parada que dé el camino más corto. No vuelve al inicio.
+#   3. Si alguna parada tiene horario, una segunda pasada de 2-opt/Or-opt minimiza la
+#      duración del día penalizando las llegadas fuera de horario.
+#
+# El resultado se guarda en caché con una clave que resume todas las entradas (paradas,
+# coordenadas, horarios, fecha, hora de inicio y origen): cualquier cambio en la ruta o
+# en sus paradas produce una clave nueva.
+
+DEFAULT_ITINERARY_SETTINGS = {
+    "SPEED_KMH": 35.0,  # Velocidad media de traslado.
+    "ROAD_FACTOR": 1.3,  # Distancia por carretera / distancia en línea recta.
+    "VISIT_MINUTES": {"atractivo": 90, "prestador": 60, "artesano": 45},
+    "DAY_START": "08:00",
+    "MAX_STOPS": 40,
+    "LATE_PENALTY_PER_MINUTE": 10.0,  # Costo de cada minuto de visita fuera del horario.
+    "MAX_TIME_PASSES": 20,
+    "CACHE_ALIAS": "default",
+    "TIMEOUT_SECONDS": 24 * 3600,
+}
+
+DAY_NAMES = ("lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo")
+ALL_DAYS = frozenset(range(7))
+
+
+def get_itinerary_settings() -> Dict:
+    return {**DEFAULT_ITINERARY_SETTINGS, **getattr(settings, "ITINERARY", {})}
+
+
+# --- HORARIOS EN TEXTO LIBRE ---
+
+_DAY = r"(lunes|martes|miercoles|jueves|viernes|sabado|domingo)s?"
+_DAY_RANGE_RE = re.compile(rf"{_DAY}\s*(?:a|al|-|hasta)\s*{_DAY}")
+_DAY_RE = re.compile(_DAY)
+_TIME = r"(\d{1,2})(?:[:h.](\d{2}))?\s*(am|pm|m\b)?"
+_TIME_RANGE_RE = re.compile(rf"{_TIME}\s*(?:a|-|hasta)\s*{_TIME}")
+_SEGMENT_SPLIT_RE = re.compile(r"\.(?=\s|$)|[;\n|]")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = text.replace("–", "-").replace("—", "-")
+    return re.sub(r"\b([ap])\.?\s*m\b\.?", r"\1m", text)  # "p. m." / "p.m." -> "pm"
+
+
+def _to_minutes(hour: str, minute: Optional[str], meridiem: Optional[str]) -> Optional[int]:
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    if hour > 24 or minute >= 60:
+        return None
+    return hour * 60 + minute
+
+
+def _parse_time_range(match) -> Optional[Tuple[int, int]]:
+    start_h, start_m, start_mer, end_h, end_m, end_mer = match.groups()
+    if start_mer is None and end_mer in ("am", "pm") and int(start_h) <= int(end_h) % 12:
+        start_mer = end_mer  # "de 2 a 6pm": el inicio comparte el meridiano del cierre.
+    start, end = _to_minutes(start_h, start_m, start_mer), _to_minutes(end_h, end_m, end_mer)
+    if start is None or end is None:
+        return None
+    if end == 0:
+        end = 24 * 60  # "hasta las 12am": medianoche.
+    if end <= start and end_mer is None and end < 12 * 60:
+        end += 12 * 60  # "de 8 a 5" sin meridiano: cierre por la tarde.
+    return (start, end) if end > start else None
+
+
+def _segment_days(segment: str) -> Optional[frozenset]:
+    days = set()
+    for first, last in _DAY_RANGE_RE.findall(segment):
+        start, end = DAY_NAMES.index(first), DAY_NAMES.index(last)
+        days.update((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    for name in _DAY_RE.findall(_DAY_RANGE_RE.sub(" ", segment)):
+        days.add(DAY_NAMES.index(name))
+    if "fin de semana" in segment or "fines de semana" in segment:
+        days.update((5, 6))
+    if re.search(r"todos los dias|diario|diariamente|toda la semana", segment):
+        days.update(ALL_DAYS)
+    return frozenset(days) or None
+
+
+def parse_opening_hours(text: Optional[str]) -> Optional[Dict[int, List[Tuple[int, int]]]]:
+    """
+    Ventanas de apertura por día (0 = lunes) en minutos desde la medianoche, o None si
+    el texto no dice nada interpretable (la parada se trata como siempre abierta). Un
+    día sin ventanas está cerrado.
+    """
+    if not text or not text.strip():
+        return None
+    text = _normalize(text)
+    if re.search(r"24\s*(?:horas|h\b)", text):
+        return {day: [(0, 24 * 60)] for day in ALL_DAYS}
+
+    hours: Dict[int, List[Tuple[int, int]]] = {}
+    for segment in _SEGMENT_SPLIT_RE.split(text):
+        days = _segment_days(segment)
+        if "cerrado" in segment:
+            for day in days or ():
+                hours[day] = []
+            continue
+        windows = [window for window in map(_parse_time_range, _TIME_RANGE_RE.finditer(segment)) if window]
+        for day in days or ALL_DAYS:
+            hours.setdefault(day, []).extend(windows)
+    if not any(hours.values()):
+        return None
+    # Los días no mencionados (cuando se mencionan otros) se consideran cerrados.
+    return {day: sorted(hours.get(day, [])) for day in ALL_DAYS}
+
+
+# --- PARADAS ---
+
+@dataclass
+class Stop:
+    id: str
+    nombre: str
+    tipo: str
+    url_detalle: str
+    lat: float
+    lng: float
+    horario: str = ""
+    visit_minutes: int = 60
+    windows: Optional[List[Tuple[int, int]]] = field(default=None, repr=False)
+
+
+def load_stops(items: Sequence[Tuple[str, int]]) -> Tuple[List[Stop], int]:
+    """
+    Paradas de los pares (tipo, id) dados, desde el índice geoespacial (una consulta, más
+    otra para los horarios de los atractivos). Devuelve también cuántas se omitieron por
+    no ser públicas o no tener coordenadas.
+    """
+    from .models import AtractivoTuristico, GeoPoint
+
+    visit_minutes = get_itinerary_settings()["VISIT_MINUTES"]
+    wanted = {(entity_type, int(object_id)) for entity_type, object_id in items}
+    if not wanted:
+        return [], 0
+    condition = Q()
+    for entity_type in {entity_type for entity_type, _ in wanted}:
+        ids = [object_id for kind, object_id in wanted if kind == entity_type]
+        condition |= Q(entity_type=entity_type, object_id__in=ids)
+    points = list(GeoPoint.objects.filter(condition, is_public=True).order_by("entity_type", "object_id"))
+
+    horarios = {}
+    atractivo_ids = [point.object_id for point in points if point.entity_type == "atractivo"]
+    if atractivo_ids:
+        horarios = dict(AtractivoTuristico.objects.filter(pk__in=atractivo_ids).values_list("pk", "horario_funcionamiento"))
+
+    stops = [
+        Stop(
+            id=f"{point.entity_type}-{point.object_id}", nombre=point.nombre, tipo=point.entity_type,
+            url_detalle=point.url_detalle, lat=point.latitud, lng=point.longitud,
+            horario=horarios.get(point.object_id, "") if point.entity_type == "atractivo" else "",
+            visit_minutes=int(visit_minutes.get(point.entity_type, 60)),
+        )
+        for point in points
+    ]
+    return stops, len(wanted) - len(stops)
+
+
+def route_items(ruta) -> List[Tuple[str, int]]:
+    items = [("atractivo", pk) for pk in ruta.atractivos.values_list("pk", flat=True)]
+    items += [("prestador", pk) for pk in ruta.prestadores.values_list("pk", flat=True)]
+    return items
+
+
+def saved_items(usuario) -> List[Tuple[str, int]]:
+    """Elementos de "Mi Viaje" que pueden ser paradas (prestadores, artesanos y atractivos)."""
+    from .models import ElementoGuardado
+
+    types = {ContentType.objects.get_for_model(spec.model).pk: name for name, spec in get_registry().items()}
+    rows = ElementoGuardado.objects.filter(usuario=usuario, content_type_id__in=types).values_list("content_type_id", "object_id")
+    return [(types[content_type_id], object_id) for content_type_id, object_id in rows]
+
+
+# --- DISTANCIAS ---
+
+@lru_cache(maxsize=256)
+def distance_matrix(coordinates: Tuple[Tuple[float, float], ...]) -> Tuple[Tuple[float, ...], ...]:
+    """Matriz haversine (km) de las coordenadas dadas; memorizada por conjunto de coordenadas."""
+    return tuple(
+        tuple(haversine_km(lat1, lng1, lat2, lng2) for lat2, lng2 in coordinates)
+        for lat1, lng1 in coordinates
+    )
+
+
+def travel_minutes(distance_km: float, config: Dict) -> float:
+    return distance_km * config["ROAD_FACTOR"] / config["SPEED_KMH"] * 60
+
+
+# --- OPTIMIZACIÓN ---
+#
+# Los recorridos son listas de índices de la matriz. El nodo 0 es el origen: el punto de
+# partida, o un nodo ficticio a distancia 0 de todas las paradas (recorrido de inicio libre).
+
+def _path_length(matrix, order: Sequence[int]) -> float:
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def nearest_neighbour(matrix, start: int = 0) -> List[int]:
+    remaining = set(range(len(matrix))) - {start}
+    order = [start]
+    while remaining:
+        current = order[-1]
+        nearest = min(remaining, key=lambda node: (matrix[current][node], node))
+        order.append(nearest)
+        remaining.remove(nearest)
+    return order
+
+
+def two_opt(matrix, order: List[int]) -> bool:
+    """Invierte tramos mientras acorten el recorrido abierto (el nodo 0 queda fijo)."""
+    improved, n = False, len(order)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b, c = order[i - 1], order[i], order[j]
+                delta = matrix[a][c] - matrix[a][b]
+                if j + 1 < n:
+                    d = order[j + 1]
+                    delta += matrix[b][d] - matrix[c][d]
+                if delta < -1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    changed = improved = True
+    return improved
+
+
+def or_opt(matrix, order: List[int]) -> bool:
+    """Mueve tramos de 1 a 3 paradas a la posición que más acorte el recorrido."""
+    improved, n = False, len(order)
+    changed = True
+    while changed:
+        changed = False
+        for length in (1, 2, 3):
+            for i in range(1, n - length + 1):
+                end = i + length - 1
+                prev, first, last = order[i - 1], order[i], order[end]
+                gain = matrix[prev][first]
+                if end + 1 < n:
+                    following = order[end + 1]
+                    gain += matrix[last][following] - matrix[prev][following]
+                rest = order[:i] + order[end + 1:]
+                best, best_at = -1e-9, None
+                for k in range(len(rest)):
+                    if k == i - 1:  # Su lugar actual.
+                        continue
+                    left = rest[k]
+                    insertion = matrix[left][first]
+                    if k + 1 < len(rest):
+                        right = rest[k + 1]
+                        insertion += matrix[last][right] - matrix[left][right]
+                    if insertion - gain < best:
+                        best, best_at = insertion - gain, k
+                if best_at is not None:
+                    segment = order[i:end + 1]
+                    order[:] = rest[:best_at + 1] + segment + rest[best_at + 1:]
+                    changed = improved = True
+                    break
+            if changed:
+                break
+    return improved
+
+
+def improve_distance(matrix, order: List[int]) -> List[int]:
+    while two_opt(matrix, order) | or_opt(matrix, order):
+        pass
+    return order
+
+
+def _schedule(stops: List[Stop], matrix, order: Sequence[int], start_minute: int, config: Dict):
+    """Simula el día: llegada, espera y salida de cada parada, y minutos fuera de horario."""
+    clock, late, rows = float(start_minute), 0.0, []
+    for previous, node in zip(order, order[1:]):
+        stop = stops[node - 1]
+        leg_km = matrix[previous][node]
+        arrival = clock + travel_minutes(leg_km, config)
+        begin, outside = arrival, False
+        if stop.windows is not None:
+            fitting = [(open_, close) for open_, close in stop.windows if max(arrival, open_) + stop.visit_minutes <= close]
+            if fitting:
+                begin = max(arrival, fitting[0][0])
+            else:
+                outside = True
+                # Fuera de horario: cuenta el exceso sobre la ventana más favorable (o la visita entera).
+                overrun = [max(arrival, open_) + stop.visit_minutes - close for open_, close in stop.windows if close > arrival]
+                late += min(overrun) if overrun else stop.visit_minutes
+        clock = begin + stop.visit_minutes
+        rows.append((stop, leg_km, arrival, begin, clock, outside))
+    return clock, late, rows
+
+
+def _time_cost(stops, matrix, order, start_minute, config) -> float:
+    end, late, _ = _schedule(stops, matrix, order, start_minute, config)
+    return end + late * config["LATE_PENALTY_PER_MINUTE"]
+
+
+def _neighbours(order: List[int]):
+    """Recorridos a un movimiento 2-opt u Or-opt de distancia (el nodo 0 queda fijo)."""
+    n = len(order)
+    for i in range(1, n - 1):
+        for j in range(i + 1, n):
+            yield order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+    for length in (1, 2, 3):
+        for i in range(1, n - length + 1):
+            rest = order[:i] + order[i + length:]
+            for k in range(len(rest)):
+                if k != i - 1:
+                    yield rest[:k + 1] + order[i:i + length] + rest[k + 1:]
+
+
+def improve_schedule(stops, matrix, order: List[int], start_minute: int, config: Dict) -> List[int]:
+    """2-opt y Or-opt sobre la duración del día con penalización por llegar fuera de horario."""
+    best = _time_cost(stops, matrix, order, start_minute, config)
+    for _ in range(config["MAX_TIME_PASSES"]):
+        changed = False
+        for candidate in _neighbours(order):
+            cost = _time_cost(stops, matrix, candidate, start_minute, config)
+            if cost < best - 1e-9:
+                best, order, changed = cost, candidate, True
+                break
+        if not changed:
+            break
+    return order
+
+
+def optimize(stops: List[Stop], origin: Optional[Tuple[float, float]], start_minute: int, config: Dict):
+    """Orden de visita (índices desde el nodo 0, ver arriba) y la matriz usada."""
+    coordinates = tuple((stop.lat, stop.lng) for stop in stops)
+    base = distance_matrix(coordinates)
+    if origin is not None:
+        first_row = [haversine_km(origin[0], origin[1], lat, lng) for lat, lng in coordinates]
+    else:
+        first_row = [0.0] * len(stops)
+    matrix = [[0.0, *first_row]] + [[first_row[i], *base[i]] for i in range(len(stops))]
+    if not stops:
+        return [0], matrix
+
+    if origin is None:
+        # Inicio libre: el vecino más cercano desde cada parada, y se queda el más corto.
+        order = min(
+            ([0] + [node + 1 for node in nearest_neighbour(base, start=i)] for i in range(len(stops))),
+            key=lambda candidate: _path_length(matrix, candidate),
+        )
+    else:
+        order = nearest_neighbour(matrix, start=0)
+    order = improve_distance(matrix, order)
+    if any(stop.windows is not None for stop in stops):
+        order = improve_schedule(stops, matrix, order, start_minute, config)
+    return order, matrix
+
+
+# --- ITINERARIO ---
+
+def _clock(minutes: float) -> str:
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_clock(value: str) -> int:
+    """"HH:MM" -> minutos desde la medianoche. ValueError si no es una hora válida."""
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", (value or "").strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError(f"Hora inválida: '{value}'. Use HH:MM.")
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def plan_itinerary(
+    items: Sequence[Tuple[str, int]],
+    day: Optional[date] = None,
+    start: Optional[str] = None,
+    origin: Optional[Tuple[float, float]] = None,
+) -> Dict:
+    """
+    Itinerario de un día para los pares (tipo, id) dados: orden de visita, horas de
+    llegada y salida, y totales. `start` es la hora de salida ("HH:MM"); `origin`, el
+    punto de partida (lat, lng), p. ej. el hotel. ValueError si hay demasiadas paradas.
+    """
+    config = get_itinerary_settings()
+    day = day or timezone.localdate()
+    start_minute = parse_clock(start or config["DAY_START"])
+    stops, skipped = load_stops(items)
+    if len(stops) > config["MAX_STOPS"]:
+        raise ValueError(f"Demasiadas paradas ({len(stops)}); el máximo es {config['MAX_STOPS']}.")
+
+    signature = json.dumps(
+        [[asdict(stop) for stop in stops], skipped, day.isoformat(), start_minute, origin,
+         {key: config[key] for key in ("SPEED_KMH", "ROAD_FACTOR", "LATE_PENALTY_PER_MINUTE")}],
+        sort_keys=True, default=str,
+    )
+    cache = caches[config["CACHE_ALIAS"]]
+    key = f"itinerary:{hashlib.sha1(signature.encode()).hexdigest()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    for stop in stops:
+        hours = parse_opening_hours(stop.horario)
+        stop.windows = hours[day.weekday()] if hours is not None else None
+
+    order, matrix = optimize(stops, origin, start_minute, config)
+    end, _, rows = _schedule(stops, matrix, order, start_minute, config)
+    distance = sum(leg_km for _, leg_km, *_ in rows)
+    result = {
+        "fecha": day.isoformat(),
+        "inicio": _clock(start_minute),
+        "fin": _clock(end),
+        "distancia_total_km": round(distance, 2),
+        "tiempo_traslado_min": round(travel_minutes(distance, config)),
+        "duracion_total_min": round(end - start_minute),
+        "horarios_respetados": not any(outside for *_, outside in rows),
+        "omitidas": skipped,
+        "paradas": [
+            {
+                "orden": position, "id": stop.id, "nombre": stop.nombre, "tipo": stop.tipo,
+                "url_detalle": stop.url_detalle, "lat": stop.lat, "lng": stop.lng,
+                "tramo_km": round(leg_km, 2), "llegada": _clock(arrival), "inicio_visita": _clock(begin),
+                "salida": _clock(leave), "horario": stop.horario, "fuera_de_horario": outside,
+            }
+            for position, (stop, leg_km, arrival, begin, leave, outside) in enumerate(rows, start=1)
+        ],
+    }
+    cache.set(key, result, timeout=config["TIMEOUT_SECONDS"])
+    return result
@@ -0,0 +1,60 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+
+from agents.corps.checkpoints import agent_checkpointer, get_checkpoint_settings, select_prunable_threads
+from api.models import AgentTask
+
+
+class Command(BaseCommand):
+    help = 'Administra los checkpoints de las órdenes del Coronel (resumen, reanudación de tareas interrumpidas y purga).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resume', action='store_true', help='Reanuda las tareas que quedaron en ejecución (p. ej. tras una caída del worker).')
+        parser.add_argument('--prune', action='store_true', help='Elimina los checkpoints de tareas terminadas y de hilos huérfanos.')
+        parser.add_argument('--days', type=int, default=None, help='Antigüedad mínima (en días) de las tareas terminadas a purgar. Por defecto, RETENTION_DAYS.')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        try:
+            self.stdout.write(f"Backend de checkpoints: {await agent_checkpointer.backend()}")
+            if options['resume']:
+                await self.resume_tasks()
+            if options['prune']:
+                days = options['days'] if options['days'] is not None else get_checkpoint_settings()['RETENTION_DAYS']
+                await self.prune(days)
+            thread_ids = await agent_checkpointer.alist_thread_ids()
+            self.stdout.write(f"Hilos con checkpoints: {len(thread_ids)}")
+        finally:
+            await agent_checkpointer.aclose()
+
+    async def resume_tasks(self):
+        from agents.corps.turismo_coronel import run_general_order
+
+        tasks = await sync_to_async(list)(AgentTask.objects.filter(status=AgentTask.Status.RUNNING).select_related('user'))
+        if not tasks:
+            self.stdout.write("No hay tareas interrumpidas.")
+            return
+        for task in tasks:
+            self.stdout.write(self.style.HTTP_INFO(f"Reanudando tarea {task.id}: {task.command[:60]}"))
+            try:
+                # El contexto solo se usa si la tarea no llegó a guardar ningún checkpoint.
+                result = await run_general_order(task.command, {"user": task.user or AnonymousUser()}, task_id=task.id)
+                report, failed = result.get("report", ""), bool(result.get("error"))
+            except Exception as e:
+                report, failed = f"Error crítico al reanudar la orden: {e}", True
+            task.report = report
+            task.status = AgentTask.Status.FAILED if failed else AgentTask.Status.COMPLETED
+            await task.asave(update_fields=['report', 'status', 'updated_at'])
+            style = self.style.ERROR if failed else self.style.SUCCESS
+            self.stdout.write(style(f"Tarea {task.id}: {task.get_status_display()}"))
+
+    async def prune(self, days):
+        thread_ids = await agent_checkpointer.alist_thread_ids()
+        prunable = await sync_to_async(select_prunable_threads)(thread_ids, days)
+        deleted = await agent_checkpointer.adelete_threads(prunable)
+        self.stdout.write(self.style.SUCCESS(f"{deleted} hilos de checkpoints eliminados."))
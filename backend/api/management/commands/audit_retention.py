@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.audit import (
+    add_months,
+    analyze_hot_table,
+    archive_month,
+    archived_months,
+    drop_archive,
+    export_month,
+    export_path,
+    get_audit_log_settings,
+    month_start,
+    months_to_archive,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mantiene la bitácora de auditoría: mueve los meses vencidos de la tabla viva a tablas de archivo '
+        'mensuales (particiones en PostgreSQL), los exporta a JSON Lines comprimido con zstandard y elimina '
+        'los archivos que superan el plazo de conservación.'
+    )
+
+    def add_arguments(self, parser):
+        config = get_audit_log_settings()
+        parser.add_argument('--keep-months', type=int, default=config['RETENTION_MONTHS'],
+                            help='Meses que quedan en la tabla viva, incluido el actual.')
+        parser.add_argument('--archive-months', type=int, default=config['ARCHIVE_RETENTION_MONTHS'],
+                            help='Meses que se conservan las tablas de archivo antes de eliminarlas.')
+        parser.add_argument('--export-dir', default=config['EXPORT_DIR'],
+                            help='Carpeta de los .jsonl.zst exportados. Sin ella no se exporta ni se elimina nada.')
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra lo que haría.')
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 1:
+            raise CommandError('--keep-months debe ser al menos 1 (el mes en curso).')
+        export_dir = options['export_dir']
+        dry_run = options['dry_run']
+
+        moved = 0
+        for month in months_to_archive(options['keep_months']):
+            if dry_run:
+                self.stdout.write(f"📦 Se archivaría {month:%Y-%m}.")
+                continue
+            count = archive_month(month)
+            moved += count
+            self.stdout.write(f"📦 {month:%Y-%m}: {count} registros movidos al archivo.")
+        if moved:
+            analyze_hot_table()
+
+        expiry = add_months(month_start(timezone.localdate()), -options['archive_months'])
+        for month in archived_months():
+            path = export_path(export_dir, month) if export_dir else None
+            if path is not None and not path.exists():
+                if dry_run:
+                    self.stdout.write(f"🗜️ Se exportaría {month:%Y-%m} a {path}.")
+                else:
+                    export_month(month, export_dir)
+                    self.stdout.write(f"🗜️ {month:%Y-%m} exportado a {path}.")
+            if month < expiry:
+                # Un mes vencido solo se elimina si su exportación existe.
+                if path is None or (not path.exists() and not dry_run):
+                    self.stdout.write(self.style.WARNING(f"⚠️ {month:%Y-%m} vencido pero sin exportar: se conserva."))
+                elif dry_run:
+                    self.stdout.write(f"🗑️ Se eliminaría el archivo de {month:%Y-%m}.")
+                else:
+                    drop_archive(month)
+                    self.stdout.write(f"🗑️ Archivo de {month:%Y-%m} eliminado.")
+
+        self.stdout.write(self.style.SUCCESS(f"Bitácora al día: {moved} registros archivados."))
@@ -0,0 +1,71 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.geo import POINT_FIELDS, geohash_encode, haversine_km, nearby
+from api.models import GeoPoint
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda por cercanía recorriendo todos los puntos (haversine en Python) con la búsqueda '
+        'sobre el índice geoespacial (geohash + caja envolvente). Los puntos de prueba se crean dentro de una '
+        'transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=50_000, help='Puntos a generar.')
+        parser.add_argument('--spread-km', type=float, default=150.0, help='Radio de dispersión alrededor del centro.')
+        parser.add_argument('--radii', default='1,5,20,50', help='Radios a medir (km), separados por comas.')
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por medición (se toma la mejor).')
+        parser.add_argument('--lat', type=float, default=4.3155, help='Centro de la búsqueda (Puerto Gaitán por defecto).')
+        parser.add_argument('--lng', type=float, default=-72.0819)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.populate(options)
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def populate(self, options):
+        rng = random.Random(42)
+        spread = options['spread_km'] / 111.32
+        self.stdout.write(f"Generando {options['points']} puntos...")
+        points = []
+        for index in range(options['points']):
+            lat = options['lat'] + rng.uniform(-spread, spread)
+            lng = options['lng'] + rng.uniform(-spread, spread)
+            points.append(GeoPoint(
+                entity_type='prestador', object_id=10_000_000 + index, nombre=f"benchmark {index}", tipo='hotel',
+                url_detalle='', latitud=lat, longitud=lng, geohash=geohash_encode(lat, lng), is_public=True,
+            ))
+        GeoPoint.objects.bulk_create(points, batch_size=5000)
+
+    def best_of(self, repeat, func):
+        timings, result = [], None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings), result
+
+    def brute_force(self, lat, lng, radius, k):
+        found = []
+        for row in GeoPoint.objects.filter(is_public=True).values(*POINT_FIELDS):
+            distance = haversine_km(lat, lng, row['latitud'], row['longitud'])
+            if distance <= radius:
+                found.append((distance, row['entity_type'], row['object_id']))
+        found.sort()
+        return [f"{entity_type}-{object_id}" for _, entity_type, object_id in found[:k]]
+
+    def run(self, options):
+        lat, lng, k, repeat = options['lat'], options['lng'], options['k'], options['repeat']
+        self.stdout.write(f"{'RADIO (km)':>10}{'COMPLETO (ms)':>16}{'ÍNDICE (ms)':>14}{'IGUALES':>10}")
+        for radius in [float(value) for value in options['radii'].split(',')]:
+            full_ms, expected = self.best_of(repeat, lambda: self.brute_force(lat, lng, radius, k))
+            index_ms, result = self.best_of(repeat, lambda: nearby(lat, lng, radius, k=k))
+            same = [location['id'] for location in result] == expected
+            self.stdout.write(f"{radius:>10g}{full_ms:>16.1f}{index_ms:>14.1f}{'sí' if same else 'NO':>10}")
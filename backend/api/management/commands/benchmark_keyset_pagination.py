@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.models import AuditLog
+from api.pagination import KeysetPagination
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara, sobre una tabla AuditLog grande, el coste de pedir páginas cada vez más profundas con la '
+        'paginación por número de página (COUNT + OFFSET) frente a la paginación por cursor (timestamp, id). '
+        'Las filas de prueba se crean dentro de una transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Registros de auditoría a generar.')
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--pages', default='1,100,1000,10000,50000', help='Páginas a medir, separadas por comas.')
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por medición (se toma la mejor).')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.populate(options['rows'], options['batch_size'])
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def populate(self, rows, batch_size):
+        existing = AuditLog.objects.count()
+        missing = max(rows - existing, 0)
+        self.stdout.write(f"Generando {missing} registros de auditoría ({existing} ya existentes)...")
+        for start in range(0, missing, batch_size):
+            AuditLog.objects.bulk_create([
+                AuditLog(action=AuditLog.Action.CONTENIDO_UPDATE, details=f"benchmark {start + i}")
+                for i in range(min(batch_size, missing - start))
+            ])
+
+    def best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    def run(self, options):
+        factory = APIRequestFactory()
+        queryset = AuditLog.objects.all().order_by('-timestamp', '-id')
+        page_size = options['page_size']
+        total = queryset.count()
+
+        self.stdout.write(f"{'PÁGINA':>8}{'OFFSET (ms)':>14}{'CURSOR (ms)':>14}")
+        for page in [int(value) for value in options['pages'].split(',')]:
+            offset = (page - 1) * page_size
+            if offset >= total:
+                break
+
+            paginator = PageNumberPagination()
+            paginator.page_size = page_size
+            offset_request = Request(factory.get('/', {'page': page}))
+            offset_ms = self.best_of(options['repeat'], lambda: list(paginator.paginate_queryset(queryset, offset_request)))
+
+            # El cursor de esa profundidad se arma fuera de la medición, con la fila anterior a la página.
+            keyset = KeysetPagination(('-timestamp', '-id'))
+            keyset.model = AuditLog
+            params = {'page_size': page_size}
+            if offset:
+                params['cursor'] = keyset.encode_cursor(queryset[offset - 1], reverse=False)
+            cursor_request = Request(factory.get('/', params))
+            cursor_ms = self.best_of(options['repeat'], lambda: keyset.paginate_queryset(queryset, cursor_request))
+
+            self.stdout.write(f"{page:>8}{offset_ms:>14.2f}{cursor_ms:>14.2f}")
+
+        self.stdout.write(self.style.SUCCESS(f"Medición terminada sobre {total} registros; los datos de prueba se revierten."))
@@ -0,0 +1,56 @@
+import time
+
+import tiktoken
+from django.core.management.base import BaseCommand
+
+from ai_models.llm_router import count_message_tokens, count_tokens, get_token_encoder
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el coste de contar tokens para el enrutamiento a medida que crece una conversación: '
+        'recuento completo por turno (método anterior) frente al total incremental.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, default=200, help='Número de turnos a simular.')
+        parser.add_argument('--every', type=int, default=25, help='Cada cuántos turnos se imprime una fila.')
+
+    @staticmethod
+    def legacy_count(text):
+        """Réplica del conteo original: obtiene el codificador en cada llamada."""
+        try:
+            return len(tiktoken.get_encoding("cl100k_base").encode(text))
+        except Exception:
+            return len(text.split())
+
+    def handle(self, *args, **options):
+        get_token_encoder()  # La carga inicial no forma parte de la medición por turno
+        prompt = "Analiza la siguiente orden y genera el plan táctico. Orden: '¿qué hoteles hay cerca del río?'"
+        report = "Misión completada. " + "El Capitán de Turista encontró opciones de alojamiento junto al río Manacacías. " * 8
+
+        history = []
+        running_total = 0
+        self.stdout.write(f"{'TURNO':>6}{'MENSAJES':>10}{'TOKENS':>9}{'COMPLETO (ms)':>16}{'INCREMENTAL (ms)':>19}")
+        for turn in range(1, options['turns'] + 1):
+            start = time.perf_counter()
+            history_text = " ".join(msg["content"] for msg in history)
+            self.legacy_count(history_text + prompt)
+            legacy_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            routing_tokens = running_total + count_tokens(prompt)
+            incremental_ms = (time.perf_counter() - start) * 1000
+
+            # Fin del turno: el Coronel añade la orden y su informe al historial.
+            new_messages = [
+                {"role": "user", "content": f"Orden número {turn}: ¿qué hoteles hay cerca del río?"},
+                {"role": "assistant", "content": f"{report} (turno {turn})"},
+            ]
+            history.extend(new_messages)
+            running_total += sum(count_message_tokens(m["content"]) for m in new_messages)
+
+            if turn == 1 or turn % options['every'] == 0:
+                self.stdout.write(f"{turn:>6}{len(history):>10}{routing_tokens:>9}{legacy_ms:>16.3f}{incremental_ms:>19.3f}")
+
+        self.stdout.write(self.style.SUCCESS(f"Total acumulado del historial: {running_total} tokens."))
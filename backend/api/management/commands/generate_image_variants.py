@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.image_variants import IMAGE_VARIANT_MODELS, generate_all, supported_formats
+
+
+class Command(BaseCommand):
+    help = 'Genera las derivadas (anchos y formatos modernos) de las imágenes ya subidas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help=f"Modelos a procesar ({', '.join(IMAGE_VARIANT_MODELS)}). Por defecto, todos.")
+        parser.add_argument('--force', action='store_true', help="Revisa también las imágenes cuyo hash no cambió.")
+
+    def handle(self, *args, **options):
+        unknown = set(options['models']) - set(IMAGE_VARIANT_MODELS)
+        if unknown:
+            raise CommandError(f"Modelos desconocidos: {', '.join(sorted(unknown))}")
+        self.stdout.write(f"Formatos disponibles: {', '.join(supported_formats())}")
+        for label, total in generate_all(options['models'] or None, force=options['force']).items():
+            self.stdout.write(self.style.SUCCESS(f"{label}: {total} imágenes con derivadas nuevas."))
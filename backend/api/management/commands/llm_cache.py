@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from ai_models.response_cache import llm_response_cache
+from api.models import LLMResponseCache
+
+
+class Command(BaseCommand):
+    help = 'Administra la caché de respuestas del router de LLM (resumen, purga de caducadas o vaciado).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help='Elimina las entradas caducadas.')
+        parser.add_argument('--clear', action='store_true', help='Vacía la caché por completo.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            llm_response_cache.invalidate()
+            self.stdout.write(self.style.SUCCESS('Caché de respuestas de LLM vaciada.'))
+            return
+
+        if options['prune']:
+            deleted = llm_response_cache.prune_expired()
+            self.stdout.write(self.style.SUCCESS(f'{deleted} entradas caducadas eliminadas.'))
+
+        resumen = (
+            LLMResponseCache.objects.values('provider', 'model_name')
+            .annotate(entradas=Count('id'), aciertos=Sum('hit_count'))
+            .order_by('provider', 'model_name')
+        )
+        self.stdout.write(f"{'PROVEEDOR':<12}{'MODELO':<24}{'ENTRADAS':>10}{'ACIERTOS':>10}")
+        for fila in resumen:
+            self.stdout.write(
+                f"{fila['provider']:<12}{fila['model_name']:<24}{fila['entradas']:>10}{fila['aciertos'] or 0:>10}"
+            )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.geo import ensure_postgis_index, get_geo_index_settings, get_registry, rebuild_index
+from api.models import MarkerCluster
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice geoespacial (GeoPoint) y la pirámide de agrupación del mapa a partir de las coordenadas de los modelos fuente.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('types', nargs='*', help=f"Tipos a reindexar ({', '.join(get_registry())}). Por defecto, todos.")
+
+    def handle(self, *args, **options):
+        unknown = set(options['types']) - set(get_registry())
+        if unknown:
+            raise CommandError(f"Tipos desconocidos: {', '.join(sorted(unknown))}")
+        for entity_type, total in rebuild_index(options['types'] or None).items():
+            self.stdout.write(self.style.SUCCESS(f"{entity_type}: {total} puntos indexados."))
+        self.stdout.write(self.style.SUCCESS(f"Pirámide del mapa: {MarkerCluster.objects.count()} celdas."))
+        if get_geo_index_settings()["BACKEND"] == "postgis":
+            if ensure_postgis_index():
+                self.stdout.write(self.style.SUCCESS("Índice GiST de PostGIS listo."))
+            else:
+                self.stdout.write(self.style.WARNING("BACKEND='postgis' sin PostgreSQL con PostGIS: se usará el geohash."))
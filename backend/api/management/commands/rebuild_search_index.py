@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.search import get_registry, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo (SearchDocument) a partir de los modelos fuente.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('types', nargs='*', help=f"Tipos a reindexar ({', '.join(get_registry())}). Por defecto, todos.")
+
+    def handle(self, *args, **options):
+        unknown = set(options['types']) - set(get_registry())
+        if unknown:
+            raise CommandError(f"Tipos desconocidos: {', '.join(sorted(unknown))}")
+        for type_name, total in rebuild_index(options['types'] or None).items():
+            self.stdout.write(self.style.SUCCESS(f"{type_name}: {total} objetos indexados."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import CustomUser
+from api.trip_plan import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la copia (nombre, imagen, coordenadas y zona) de los elementos guardados en "Mi Viaje".'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, help="ID del turista. Por defecto, todos.")
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario'] is not None:
+            usuario = CustomUser.objects.filter(pk=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f"No existe el usuario {options['usuario']}.")
+        total = rebuild_snapshots(usuario)
+        self.stdout.write(self.style.SUCCESS(f"{total} elementos guardados actualizados."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.vector_search import get_vector_registry, get_vector_store, rebuild_vector_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice vectorial (embeddings de Ollama en sqlite-vec) a partir de los modelos fuente.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('types', nargs='*', help=f"Tipos a reindexar ({', '.join(get_vector_registry())}). Por defecto, todos.")
+
+    def handle(self, *args, **options):
+        unknown = set(options['types']) - set(get_vector_registry())
+        if unknown:
+            raise CommandError(f"Tipos desconocidos: {', '.join(sorted(unknown))}")
+        for type_name, total in rebuild_vector_index(options['types'] or None).items():
+            self.stdout.write(self.style.SUCCESS(f"{type_name}: {total} objetos indexados."))
+        store = get_vector_store()
+        engine = "sqlite-vec" if store.vec_enabled else "búsqueda exhaustiva (sqlite-vec no disponible)"
+        self.stdout.write(f"Pasajes en el índice: {store.count()} · Motor k-NN: {engine}")
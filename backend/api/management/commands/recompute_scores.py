@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.scoring import recompute_scores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula por conjuntos la puntuación de todos los prestadores y artesanos (reseñas, verificaciones y capacitaciones).'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            counts = recompute_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f"Puntuaciones recalculadas: {counts['prestadores']} prestadores, {counts['artesanos']} artesanos "
+            f"y {counts['verificaciones']} verificaciones."
+        ))
@@ -0,0 +1,30 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from agents.corps.checkpoints import agent_checkpointer
+from agents.corps.task_queue import AgentTaskWorker
+
+
+class Command(BaseCommand):
+    help = 'Lanza un worker que ejecuta en segundo plano las órdenes encoladas para el Coronel (AgentTask).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None, help='Órdenes simultáneas. Por defecto, AGENT_TASK_QUEUE["WORKERS"].')
+        parser.add_argument('--once', action='store_true', help='Procesa las tareas pendientes y termina.')
+
+    def handle(self, *args, **options):
+        worker = AgentTaskWorker(concurrency=options['concurrency'])
+        try:
+            asyncio.run(self.run(worker, options['once']))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Worker detenido. Las tareas en curso se reanudarán desde su último checkpoint.'))
+
+    async def run(self, worker, once):
+        try:
+            if once:
+                await worker.drain()
+            else:
+                await worker.run()
+        finally:
+            await agent_checkpointer.aclose()
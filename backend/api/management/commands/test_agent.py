@@ -1,6 +1,7 @@
 import asyncio
 from django.core.management.base import BaseCommand
-from agents.corps.turismo_coronel import get_turismo_coronel_graph
+from agents.corps.checkpoints import agent_checkpointer, thread_config
+from agents.corps.registry import graph_registry
 
 class Command(BaseCommand):
     help = 'Ejecuta una prueba de extremo a extremo del sistema de agentes de IA.'
@@ -14,8 +15,9 @@ class Command(BaseCommand):
         orden_de_prueba = "Crear un nuevo perfil de prestador de servicios para el restaurante 'La Brasa Llanera', con email 'brasa@example.com', slug de categoría 'restaurantes' y teléfono '3123456789'."
         self.stdout.write(self.style.HTTP_INFO(f"\n[ORDEN DE PRUEBA]: {orden_de_prueba}\n"))
 
-        coronel_agent = get_turismo_coronel_graph()
-        config = {"configurable": {"thread_id": "test-thread-management-command"}}
+        coronel_agent = await graph_registry.aget("coronel")
+        # Hilo de checkpoints propio para cada ejecución de la prueba.
+        config = thread_config()
 
         try:
             result = await coronel_agent.ainvoke({
@@ -32,6 +34,8 @@ class Command(BaseCommand):
             self.stderr.write(self.style.ERROR(f"\n--- ❌ ERROR CRÍTICO DURANTE LA PRUEBA DEL AGENTE ---"))
             self.stderr.write(f"Error: {e}")
             self.stderr.write(self.style.ERROR("-----------------------------------------------------\n"))
+        finally:
+            await agent_checkpointer.aclose()
 
     def handle(self, *args, **options):
         """
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from agents.corps.registry import graph_registry
+
+
+class Command(BaseCommand):
+    help = 'Compila por adelantado los grafos de agentes y reporta tiempo y memoria por unidad.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'keys', nargs='*',
+            help='Ramas a compilar (ej. "coronel", "capitan.turista"). Sin argumentos se compila todo el arsenal.'
+        )
+        parser.add_argument('--list', action='store_true', help='Solo lista las unidades registradas.')
+        parser.add_argument('--no-memory', action='store_true', help='No medir memoria (compilación más rápida).')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for key in graph_registry.keys():
+                self.stdout.write(key)
+            return
+
+        graph_registry.track_memory = not options['no_memory']
+        keys = options['keys'] or None
+        self.stdout.write(self.style.SUCCESS('--- INICIANDO ALISTAMIENTO DE GRAFOS DE AGENTES ---'))
+        try:
+            compiled = graph_registry.warm_up(keys)
+        except KeyError as e:
+            raise CommandError(str(e))
+
+        stats = {row['key']: row for row in graph_registry.stats()}
+        total_seconds = 0.0
+        total_bytes = 0
+        self.stdout.write(f"{'UNIDAD':<28}{'TIEMPO (ms)':>14}{'MEMORIA (KiB)':>16}")
+        for key in compiled:
+            row = stats[key]
+            seconds = row['compile_seconds'] or 0.0
+            memory = row['memory_bytes']
+            total_seconds += seconds
+            total_bytes += memory or 0
+            memory_str = f"{memory / 1024:.1f}" if memory is not None else '-'
+            self.stdout.write(f"{key:<28}{seconds * 1000:>14.1f}{memory_str:>16}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"--- {len(compiled)} unidades listas en {total_seconds * 1000:.1f} ms "
+            f"({total_bytes / 1024:.1f} KiB) ---"
+        ))
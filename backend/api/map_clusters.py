@@ -0,0 +1,240 @@
+import hashlib
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Substr
+from rest_framework.renderers import JSONRenderer
+
+from .commit_batches import defer_until_commit
+from .geo import geohash_cell_size, geohash_prefix_q, get_geo_index_settings
+
+# --- PIRÁMIDE DE AGRUPACIÓN DEL MAPA ---
+#
+# Con zoom lejano el mapa público descargaba y dibujaba todos los marcadores. Los
+# puntos de `GeoPoint` se resumen en una pirámide de celdas de geohash (`MarkerCluster`):
+# una fila por prefijo no vacío de precisión 1 a `CLUSTER_MAX_PRECISION`, con cantidad,
+# centroide y desglose por tipo. Un tile `z/x/y` (esquema XYZ de los mapas web) lee la
+# precisión cuyas celdas caben unas `CLUSTER_CELLS_PER_TILE` veces a lo ancho del tile
+# y devuelve las celdas cuyo centroide cae dentro. Más allá de la última precisión se
+# devuelven los puntos sueltos.
+#
+# Mantenimiento incremental: cada cambio en `GeoPoint` marca su geohash (el anterior y
+# el nuevo); al confirmar esa transacción se recalculan solo los prefijos afectados, de
+# abajo hacia arriba: el nivel más fino agrega sus puntos y cada nivel superior suma
+# sus (a lo sumo 32) celdas hijas. Las celdas recalculadas llevan un `updated_at`
+# nuevo; el ETag de cada tile sale de las celdas que cubre (`tile_signature`), así que
+# un cambio solo invalida los tiles donde se ve.
+
+TILE_FIELDS = ("lat", "lng", "count", "tipos", "punto")
+UPSERT_FIELDS = ("precision", "count", "latitud", "longitud", "tipos", "punto", "updated_at")
+
+
+def _max_precision() -> int:
+    return get_geo_index_settings()["CLUSTER_MAX_PRECISION"]
+
+
+# --- RECÁLCULO ---
+
+def _aggregate(precision: int, cells: Optional[Iterable[str]] = None) -> List:
+    """Filas `MarkerCluster` de las celdas dadas (todas las no vacías si `cells` es None)."""
+    from .geo import public_points
+    from .models import MarkerCluster
+
+    queryset = public_points()
+    if cells is not None:
+        ranges = Q()
+        for cell in cells:
+            ranges |= geohash_prefix_q("geohash", cell)
+        queryset = queryset.filter(ranges)
+    rows = (
+        queryset.annotate(cell=Substr("geohash", 1, precision))
+        .values("cell", "tipo")
+        .annotate(
+            n=Count("id"), sum_lat=Sum("latitud"), sum_lng=Sum("longitud"),
+            # Con un solo punto en el grupo, los mínimos son los valores de ese punto.
+            entity_type=Min("entity_type"), object_id=Min("object_id"),
+            nombre=Min("nombre"), url_detalle=Min("url_detalle"),
+        )
+    )
+    groups: Dict[str, List[Dict]] = {}
+    for row in rows:
+        groups.setdefault(row["cell"], []).append(row)
+
+    clusters = []
+    for cell, parts in groups.items():
+        count = sum(part["n"] for part in parts)
+        punto = None
+        if count == 1:
+            only = parts[0]
+            punto = {
+                "id": f"{only['entity_type']}-{only['object_id']}", "nombre": only["nombre"],
+                "tipo": only["tipo"], "url_detalle": only["url_detalle"],
+            }
+        clusters.append(MarkerCluster(
+            cell=cell, precision=precision, count=count,
+            latitud=sum(part["sum_lat"] for part in parts) / count,
+            longitud=sum(part["sum_lng"] for part in parts) / count,
+            tipos={part["tipo"]: part["n"] for part in sorted(parts, key=lambda part: part["tipo"])},
+            punto=punto,
+        ))
+    return clusters
+
+
+def _merge(precision: int, children: Iterable) -> List:
+    """Celdas de `precision` a partir de sus hijas (precisión + 1): solo el nivel más fino lee `GeoPoint`."""
+    from .models import MarkerCluster
+
+    groups: Dict[str, List] = {}
+    for child in children:
+        groups.setdefault(child.cell[:precision], []).append(child)
+    clusters = []
+    for cell, parts in groups.items():
+        count = sum(part.count for part in parts)
+        tipos: Dict[str, int] = {}
+        for part in parts:
+            for tipo, n in part.tipos.items():
+                tipos[tipo] = tipos.get(tipo, 0) + n
+        clusters.append(MarkerCluster(
+            cell=cell, precision=precision, count=count,
+            latitud=sum(part.latitud * part.count for part in parts) / count,
+            longitud=sum(part.longitud * part.count for part in parts) / count,
+            tipos=dict(sorted(tipos.items())),
+            punto=parts[0].punto if count == 1 else None,
+        ))
+    return clusters
+
+
+def refresh_cells(geohashes: Iterable[str]) -> int:
+    """Recalcula, de la precisión mayor a la menor, las celdas que contienen los geohashes dados."""
+    from .models import MarkerCluster
+
+    geohashes = {value for value in geohashes if value}
+    if not geohashes:
+        return 0
+    touched = 0
+    top = _max_precision()
+    with transaction.atomic():
+        for precision in range(top, 0, -1):
+            cells = {value[:precision] for value in geohashes}
+            if precision == top:
+                clusters = _aggregate(precision, cells)
+            else:
+                children = Q()
+                for cell in cells:
+                    children |= geohash_prefix_q("cell", cell)
+                clusters = _merge(precision, MarkerCluster.objects.filter(children, precision=precision + 1))
+            # Upsert en vez de borrar y reinsertar: dos transacciones que recalculan la
+            # misma celda (las de baja precisión las comparten casi todos los puntos)
+            # chocarían con la unicidad de `cell`. Solo se borran las celdas que quedaron vacías.
+            MarkerCluster.objects.bulk_create(
+                clusters, batch_size=1000, update_conflicts=True, unique_fields=["cell"], update_fields=UPSERT_FIELDS,
+            )
+            MarkerCluster.objects.filter(cell__in=cells - {cluster.cell for cluster in clusters}).delete()
+            touched += len(cells)
+    return touched
+
+
+def rebuild_clusters() -> int:
+    """Reconstruye la pirámide completa. Devuelve cuántas celdas quedaron."""
+    from .models import MarkerCluster
+
+    level = _aggregate(_max_precision())
+    pyramid = list(level)
+    for precision in range(_max_precision() - 1, 0, -1):
+        level = _merge(precision, level)
+        pyramid.extend(level)
+    with transaction.atomic():
+        MarkerCluster.objects.all().delete()
+        MarkerCluster.objects.bulk_create(pyramid, batch_size=1000)
+    return len(pyramid)
+
+
+def schedule_refresh(*geohashes: Optional[str]) -> None:
+    """Marca geohashes cambiados; sus celdas se recalculan al confirmar la transacción en curso."""
+    values = {value: True for value in geohashes if value}
+    if values:
+        defer_until_commit("marker_clusters", values, refresh_cells)
+
+
+# --- TILES ---
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lng_min, lng_max) del tile XYZ (proyección Web Mercator)."""
+    n = 2 ** z
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return latitude(y + 1), latitude(y), x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+
+
+def precision_for_zoom(z: int) -> Optional[int]:
+    """Precisión de geohash para el zoom; None si el zoom ya pide puntos sueltos."""
+    target = 360.0 / 2 ** z / get_geo_index_settings()["CLUSTER_CELLS_PER_TILE"]
+    for precision in range(1, _max_precision() + 1):
+        if geohash_cell_size(precision)[1] <= target:
+            return precision
+    return None
+
+
+def _tile_filter(z: int, x: int, y: int) -> Dict:
+    lat_min, lat_max, lng_min, lng_max = tile_bounds(z, x, y)
+    return {"latitud__gte": lat_min, "latitud__lt": lat_max, "longitud__gte": lng_min, "longitud__lt": lng_max}
+
+
+def tile_signature(z: int, x: int, y: int) -> Tuple[str, Optional[object]]:
+    """
+    Firma del contenido del tile y fecha de su último cambio, sin construirlo. Con
+    agrupaciones: cantidad de celdas y último `updated_at` (toda celda que cambia, entra
+    o sale del tile se recrea, así que alguno de los dos se mueve). Con puntos sueltos
+    (zoom profundo, pocos puntos): hash de las filas del tile.
+    """
+    from .geo import public_points
+    from .models import MarkerCluster
+
+    inside = _tile_filter(z, x, y)
+    precision = precision_for_zoom(z)
+    if precision is not None:
+        summary = MarkerCluster.objects.filter(precision=precision, **inside).aggregate(
+            cells=Count("id"), last=Max("updated_at"),
+        )
+        last = summary["last"]
+        return f"{precision}:{summary['cells']}:{last.isoformat() if last else '-'}", last
+    rows = public_points().filter(**inside).order_by("geohash", "entity_type", "object_id").values_list(
+        "entity_type", "object_id", "nombre", "tipo", "url_detalle", "latitud", "longitud",
+    )
+    return hashlib.sha1(repr(list(rows)).encode()).hexdigest(), None
+
+
+def tile(z: int, x: int, y: int) -> Dict:
+    """Contenido del tile: una fila por agrupación, en el orden de `TILE_FIELDS`."""
+    from .geo import public_points
+    from .models import MarkerCluster
+
+    inside = _tile_filter(z, x, y)
+    precision = precision_for_zoom(z)
+    if precision is not None:
+        rows = [
+            [round(c.latitud, 6), round(c.longitud, 6), c.count, c.tipos, c.punto]
+            for c in MarkerCluster.objects.filter(precision=precision, **inside).order_by("cell")
+        ]
+    else:
+        rows = [
+            [round(p.latitud, 6), round(p.longitud, 6), 1, {p.tipo: 1},
+             {"id": f"{p.entity_type}-{p.object_id}", "nombre": p.nombre, "tipo": p.tipo, "url_detalle": p.url_detalle}]
+            for p in public_points().filter(**inside).order_by("geohash")
+        ]
+    return {"z": z, "x": x, "y": y, "precision": precision, "fields": list(TILE_FIELDS), "clusters": rows}
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON compacto con orjson: los tiles se renderizan una vez y se sirven desde la caché."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import orjson
+
+        if data is None:
+            return b""
+        return orjson.dumps(data)
@@ -0,0 +1,27 @@
+from .audit import audit_batch
+from .scoring import score_batch
+
+
+class ScoreBatchMiddleware:
+    """
+    Agrupa los recálculos de puntuación de una petición: si una vista guarda varias
+    reseñas, verificaciones o asistencias del mismo prestador, se recalcula una sola vez.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with score_batch():
+            return self.get_response(request)
+
+
+class AuditBatchMiddleware:
+    """Escribe con un solo `bulk_create` los registros de auditoría confirmados durante la petición."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit_batch():
+            return self.get_response(request)
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_remove_customuser_ai_provider_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMResponseCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(help_text='Hash SHA-256 de (proveedor, modelo, mensajes, temperatura) normalizados.', max_length=64, unique=True)),
+                ('context_hash', models.CharField(db_index=True, help_text='Hash del prompt sin el texto semántico; agrupa candidatos para la búsqueda por similitud.', max_length=64)),
+                ('provider', models.CharField(max_length=20)),
+                ('model_name', models.CharField(max_length=100)),
+                ('semantic_text', models.TextField(blank=True, default='', help_text='Texto variable del prompt (ej. la orden del usuario) usado para la búsqueda por similitud.')),
+                ('embedding', models.JSONField(blank=True, help_text='Embedding del texto semántico, si la búsqueda por similitud está activa.', null=True)),
+                ('response', models.TextField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Respuesta de LLM en Caché',
+                'verbose_name_plural': 'Respuestas de LLM en Caché',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
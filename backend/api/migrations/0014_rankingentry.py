@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('prestador', 'Prestador de Servicio'), ('artesano', 'Artesano')], max_length=20)),
+                ('group_id', models.PositiveIntegerField(default=0, help_text='0 = ranking global; si no, id de la categoría (prestadores) o del rubro (artesanos).')),
+                ('object_id', models.PositiveIntegerField()),
+                ('nombre', models.CharField(max_length=200)),
+                ('puntuacion', models.PositiveIntegerField(default=0)),
+                ('rank', models.PositiveIntegerField(help_text='Posición con empates (1, 2, 2, 4...).')),
+                ('percentile', models.FloatField(help_text='Porcentaje del grupo con puntuación menor o igual (100 = el mejor).')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Posición en Ranking',
+                'verbose_name_plural': 'Posiciones en Rankings',
+                'indexes': [models.Index(fields=['entity_type', 'group_id', 'rank', 'object_id'], name='ranking_position_idx')],
+                'constraints': [models.UniqueConstraint(fields=('entity_type', 'group_id', 'object_id'), name='unique_ranking_entry')],
+            },
+        ),
+    ]
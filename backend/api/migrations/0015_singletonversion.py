@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_rankingentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SingletonVersion',
+            fields=[
+                ('label', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=32)),
+            ],
+        ),
+    ]
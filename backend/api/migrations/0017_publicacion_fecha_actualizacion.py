@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_contentversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicacion',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_publicacion_fecha_actualizacion'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp', 'id'], name='auditlog_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='notificacion_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resena',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='resena_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sugerencia',
+            index=models.Index(fields=['fecha_envio', 'id'], name='sugerencia_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+import json
+
+from django.db import migrations, models
+
+
+def text_to_json(apps, schema_editor):
+    """Los detalles que ya eran JSON se conservan; el texto libre queda como {"mensaje": ...}."""
+    AuditLog = apps.get_model("api", "AuditLog")
+    batch = []
+    for log in AuditLog.objects.exclude(details__isnull=True).exclude(details="").only("id", "details").iterator(chunk_size=2000):
+        try:
+            value = json.loads(log.details)
+        except ValueError:
+            value = None
+        log.details_json = value if isinstance(value, dict) else {"mensaje": log.details}
+        batch.append(log)
+        if len(batch) >= 2000:
+            AuditLog.objects.bulk_update(batch, ["details_json"])
+            batch = []
+    if batch:
+        AuditLog.objects.bulk_update(batch, ["details_json"])
+
+
+def json_to_text(apps, schema_editor):
+    AuditLog = apps.get_model("api", "AuditLog")
+    batch = []
+    for log in AuditLog.objects.only("id", "details_json").iterator(chunk_size=2000):
+        log.details = json.dumps(log.details_json, ensure_ascii=False) if log.details_json else None
+        batch.append(log)
+        if len(batch) >= 2000:
+            AuditLog.objects.bulk_update(batch, ["details"])
+            batch = []
+    if batch:
+        AuditLog.objects.bulk_update(batch, ["details"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='details_json',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(text_to_json, json_to_text),
+        migrations.RemoveField(
+            model_name='auditlog',
+            name='details',
+        ),
+        migrations.RenameField(
+            model_name='auditlog',
+            old_name='details_json',
+            new_name='details',
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='details',
+            field=models.JSONField(blank=True, default=dict, help_text='Datos estructurados de la acción: objeto afectado, campos cambiados, etc.', verbose_name='Detalles'),
+        ),
+    ]
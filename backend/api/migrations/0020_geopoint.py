@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_auditlog_structured_details'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('prestador', 'Prestador de Servicio'), ('artesano', 'Artesano'), ('atractivo', 'Atractivo Turístico')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('nombre', models.CharField(max_length=255)),
+                ('tipo', models.CharField(help_text="Tipo de marcador en el mapa (categoría, 'artesano', 'atractivo_<color>').", max_length=60)),
+                ('url_detalle', models.CharField(blank=True, max_length=255)),
+                ('latitud', models.FloatField()),
+                ('longitud', models.FloatField()),
+                ('geohash', models.CharField(help_text='Geohash de precisión 9; sus prefijos son las celdas de menor precisión.', max_length=12)),
+                ('is_public', models.BooleanField(default=False, help_text='Si el objeto es visible en el sitio público (aprobado o publicado).')),
+            ],
+            options={
+                'verbose_name': 'Punto Geográfico',
+                'verbose_name_plural': 'Puntos Geográficos',
+                'indexes': [models.Index(fields=['is_public', 'geohash'], name='geopoint_public_geohash_idx')],
+                'constraints': [models.UniqueConstraint(fields=('entity_type', 'object_id'), name='unique_geo_point')],
+            },
+        ),
+    ]
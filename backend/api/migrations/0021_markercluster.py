@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_geopoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarkerCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(max_length=12, unique=True)),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField()),
+                ('latitud', models.FloatField(help_text='Latitud del centroide de los puntos de la celda.')),
+                ('longitud', models.FloatField(help_text='Longitud del centroide de los puntos de la celda.')),
+                ('tipos', models.JSONField(default=dict, help_text='Cantidad de puntos por tipo de marcador.')),
+                ('punto', models.JSONField(blank=True, help_text='El punto mismo cuando la celda tiene uno solo.', null=True)),
+            ],
+            options={
+                'verbose_name': 'Agrupación de Marcadores',
+                'verbose_name_plural': 'Agrupaciones de Marcadores',
+                'indexes': [models.Index(fields=['precision', 'latitud', 'longitud'], name='markercluster_tile_idx')],
+            },
+        ),
+    ]
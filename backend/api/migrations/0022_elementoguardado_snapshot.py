@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_markercluster'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='dia',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Día del viaje elegido por el turista. Vacío: se asigna al armar el plan.', null=True),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='imagen',
+            field=models.CharField(blank=True, help_text='Ruta en el almacenamiento de la imagen principal del elemento.', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='latitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='longitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='nombre',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='slug',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='tipo',
+            field=models.CharField(blank=True, help_text='Tipo del elemento: atractivo, publicacion, prestador o artesano. Vacío si aún no tiene copia.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='url_detalle',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='zona',
+            field=models.CharField(blank=True, help_text='Celda de geohash que agrupa los elementos cercanos.', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='elementoguardado',
+            index=models.Index(fields=['content_type', 'object_id'], name='elementoguardado_target_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_elementoguardado_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.CharField(help_text='Ruta del original en el almacenamiento.', max_length=255, unique=True)),
+                ('content_hash', models.CharField(help_text='SHA-256 del original y de la configuración con que se generó.', max_length=64)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('variants', models.JSONField(default=dict)),
+                ('fecha_generacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Variante de Imagen',
+                'verbose_name_plural': 'Variantes de Imagen',
+            },
+        ),
+    ]
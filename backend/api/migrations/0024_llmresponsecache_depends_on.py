@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_imagevariant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmresponsecache',
+            name='depends_on',
+            field=models.TextField(blank=True, default='|*|', help_text="Modelos de los que depende la respuesta, como '|api.video|api.publicacion|' ('|*|' = todos). Al cambiar uno, se invalida."),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_llmresponsecache_depends_on'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agenttask',
+            name='guest_key',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Identifica al visitante anónimo (hash de su sesión o IP) para su cupo en la cola.', max_length=64, verbose_name='Clave del Visitante'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_agenttask_guest_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='markercluster',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Último recálculo de la celda; de aquí salen los ETag de los tiles.'),
+        ),
+    ]
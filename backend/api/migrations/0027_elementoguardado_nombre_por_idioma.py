@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:16
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_default_language_name(apps, schema_editor):
+    """Las copias existentes se hicieron en español; `rebuild_trip_snapshots` completa los demás idiomas."""
+    ElementoGuardado = apps.get_model("api", "ElementoGuardado")
+    ElementoGuardado.objects.update(nombre_es=F("nombre"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_markercluster_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='nombre_en',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='elementoguardado',
+            name='nombre_es',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(copy_default_language_name, migrations.RunPython.noop),
+    ]
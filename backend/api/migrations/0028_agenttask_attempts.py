@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_elementoguardado_nombre_por_idioma'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agenttask',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Veces que un worker reclamó la tarea; al agotar MAX_ATTEMPTS sin terminar, se da por fallida.', verbose_name='Intentos'),
+        ),
+    ]
@@ -2,10 +2,13 @@ import os
 import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
 from .fields import EncryptedTextField
+from .singletons import invalidate_singleton, load_singleton
 
 
 def prestador_directory_path(instance, filename):
@@ -369,6 +372,7 @@ class Publicacion(models.Model):
     fecha_evento_fin = models.DateTimeField(blank=True, null=True)
     puntos_asistencia = models.PositiveIntegerField(default=0, help_text="Puntos otorgados por asistir a esta capacitación (solo si tipo=CAPACITACION).")
     fecha_publicacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
 
     estado = models.CharField(
         _("Estado de Publicación"),
@@ -495,11 +499,27 @@ class ElementoGuardado(models.Model):
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
     fecha_guardado = models.DateTimeField(auto_now_add=True)
+
+    # Copia del elemento guardado (ver `api/trip_plan.py`): "Mi Viaje" se lee sin resolver
+    # cada `content_object`. Las señales la actualizan al guardar el elemento o su destino.
+    tipo = models.CharField(max_length=20, blank=True, help_text="Tipo del elemento: atractivo, publicacion, prestador o artesano. Vacío si aún no tiene copia.")
+    nombre = models.CharField(max_length=255, blank=True)
+    slug = models.CharField(max_length=255, blank=True)
+    url_detalle = models.CharField(max_length=255, blank=True)
+    imagen = models.CharField(max_length=255, blank=True, help_text="Ruta en el almacenamiento de la imagen principal del elemento.")
+    latitud = models.FloatField(null=True, blank=True)
+    longitud = models.FloatField(null=True, blank=True)
+    zona = models.CharField(max_length=12, blank=True, help_text="Celda de geohash que agrupa los elementos cercanos.")
+    dia = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Día del viaje elegido por el turista. Vacío: se asigna al armar el plan.")
+
     def __str__(self):
-        return f'{self.usuario.username} guardó {self.content_object}'
+        return f'{self.usuario.username} guardó {self.nombre or self.content_object}'
     class Meta:
         unique_together = ('usuario', 'content_type', 'object_id')
         ordering = ['-fecha_guardado']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='elementoguardado_target_idx'),
+        ]
 
 
 def pagina_institucional_banner_path(instance, filename):
@@ -582,9 +602,11 @@ class AgentTask(models.Model):
         FAILED = "FAILED", _("Fallida")
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='agent_tasks')
+    guest_key = models.CharField(_("Clave del Visitante"), max_length=64, blank=True, default="", db_index=True, help_text="Identifica al visitante anónimo (hash de su sesión o IP) para su cupo en la cola.")
     command = models.TextField(_("Comando del Usuario"), help_text="El comando en lenguaje natural que inició la tarea.")
     status = models.CharField(_("Estado de la Tarea"), max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True)
     report = models.TextField(_("Informe Final"), blank=True, null=True, help_text="El informe final generado por el agente al completar la tarea.")
+    attempts = models.PositiveSmallIntegerField(_("Intentos"), default=0, help_text="Veces que un worker reclamó la tarea; al agotar MAX_ATTEMPTS sin terminar, se da por fallida.")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     def __str__(self):
@@ -612,7 +634,7 @@ class AuditLog(models.Model):
         CONTENIDO_DELETE = "CONTENIDO_DELETE", _("Contenido de Municipio Eliminado")
     user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='audit_logs', verbose_name=_("Usuario"))
     action = models.CharField(_("Acción"), max_length=50, choices=Action.choices, db_index=True)
-    details = models.TextField(_("Detalles"), blank=True, null=True, help_text="Descripción detallada de la acción o los datos cambiados (ej. en formato JSON).")
+    details = models.JSONField(_("Detalles"), default=dict, blank=True, help_text="Datos estructurados de la acción: objeto afectado, campos cambiados, etc.")
     content_type = models.ForeignKey(ContentType, on_delete=models.SET_NULL, null=True, blank=True)
     object_id = models.PositiveIntegerField(null=True, blank=True)
     content_object = GenericForeignKey('content_type', 'object_id')
@@ -623,6 +645,10 @@ class AuditLog(models.Model):
         verbose_name = "Registro de Auditoría"
         verbose_name_plural = "Registros de Auditoría"
         ordering = ['-timestamp']
+        indexes = [
+            # Clave de la paginación por cursor (api/pagination.py).
+            models.Index(fields=['timestamp', 'id'], name='auditlog_keyset_idx'),
+        ]
 
 
 class HomePageComponent(models.Model):
@@ -683,10 +709,15 @@ class SiteConfiguration(models.Model):
     def save(self, *args, **kwargs):
         self.pk = 1
         super(SiteConfiguration, self).save(*args, **kwargs)
+        invalidate_singleton(type(self))
+    def delete(self, *args, **kwargs):
+        result = super(SiteConfiguration, self).delete(*args, **kwargs)
+        invalidate_singleton(type(self))
+        return result
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        # Copia en memoria por proceso (api/singletons.py); se recarga cuando alguien guarda.
+        return load_singleton(cls)
     class Meta:
         verbose_name = "Configuración del Sitio"
         verbose_name_plural = "Configuración del Sitio"
@@ -744,6 +775,9 @@ class Resena(models.Model):
         verbose_name_plural = "Reseñas y Calificaciones"
         ordering = ['-fecha_creacion']
         unique_together = ('usuario', 'content_type', 'object_id')
+        indexes = [
+            models.Index(fields=['fecha_creacion', 'id'], name='resena_keyset_idx'),
+        ]
 
 
 class Sugerencia(models.Model):
@@ -773,6 +807,9 @@ class Sugerencia(models.Model):
         verbose_name = "Sugerencia o Felicitación"
         verbose_name_plural = "Sugerencias y Felicitaciones"
         ordering = ['-fecha_envio']
+        indexes = [
+            models.Index(fields=['fecha_envio', 'id'], name='sugerencia_keyset_idx'),
+        ]
 # --------------------- Modelos de Formularios Dinámicos ---------------------
 
 class Formulario(models.Model):
@@ -1040,11 +1077,16 @@ class ScoringRule(models.Model):
     def save(self, *args, **kwargs):
         self.pk = 1
         super(ScoringRule, self).save(*args, **kwargs)
+        invalidate_singleton(type(self))
+
+    def delete(self, *args, **kwargs):
+        result = super(ScoringRule, self).delete(*args, **kwargs)
+        invalidate_singleton(type(self))
+        return result
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        return load_singleton(cls)
 
     class Meta:
         verbose_name = "Reglas de Puntuación"
@@ -1076,4 +1118,207 @@ class Notificacion(models.Model):
     class Meta:
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
-        ordering = ['-fecha_creacion']
\ No newline at end of file
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['fecha_creacion', 'id'], name='notificacion_keyset_idx'),
+        ]
+
+# --------------------- Módulo de IA: Caché de Respuestas de LLM ---------------------
+
+class LLMResponseCache(models.Model):
+    """
+    Nivel persistente de la caché de respuestas del router de LLM.
+    Cada fila guarda la respuesta a un prompt normalizado para un proveedor y modelo concretos.
+    """
+    cache_key = models.CharField(max_length=64, unique=True, help_text="Hash SHA-256 de (proveedor, modelo, mensajes, temperatura) normalizados.")
+    context_hash = models.CharField(max_length=64, db_index=True, help_text="Hash del prompt sin el texto semántico; agrupa candidatos para la búsqueda por similitud.")
+    provider = models.CharField(max_length=20)
+    model_name = models.CharField(max_length=100)
+    semantic_text = models.TextField(blank=True, default="", help_text="Texto variable del prompt (ej. la orden del usuario) usado para la búsqueda por similitud.")
+    embedding = models.JSONField(null=True, blank=True, help_text="Embedding del texto semántico, si la búsqueda por similitud está activa.")
+    response = models.TextField()
+    depends_on = models.TextField(blank=True, default="|*|", help_text="Modelos de los que depende la respuesta, como '|api.video|api.publicacion|' ('|*|' = todos). Al cambiar uno, se invalida.")
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.provider}/{self.model_name} [{self.cache_key[:12]}]"
+
+    class Meta:
+        verbose_name = "Respuesta de LLM en Caché"
+        verbose_name_plural = "Respuestas de LLM en Caché"
+        ordering = ['-created_at']
+
+
+class SearchDocument(models.Model):
+    """
+    Entrada del índice de búsqueda de texto completo: una por objeto indexable e idioma.
+    Se mantiene al guardar los modelos fuente (ver `api/search.py`). En Postgres se
+    consulta por `search_vector` (índice GIN); en SQLite, por la tabla FTS5 espejo.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    language = models.CharField(max_length=10)
+    title = models.TextField(blank=True, default="")
+    body = models.TextField(blank=True, default="")
+    is_public = models.BooleanField(default=False, help_text="Si el objeto es visible en el sitio público (aprobado o publicado).")
+    search_vector = SearchVectorField(null=True, editable=False, help_text="Solo en Postgres: título (peso A) y cuerpo (peso B).")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.content_type.model}:{self.object_id} [{self.language}] {self.title[:40]}"
+
+    class Meta:
+        verbose_name = "Documento de Búsqueda"
+        verbose_name_plural = "Documentos de Búsqueda"
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id', 'language'], name='unique_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['language', 'is_public', 'content_type'], name='search_doc_lang_public_idx'),
+        ]
+
+
+
+class RankingEntry(models.Model):
+    """
+    Posición precalculada de un prestador o artesano aprobado en un ranking: el global de su
+    tipo (`group_id = 0`) y el de su categoría o rubro. Se refresca al cambiar las puntuaciones
+    (ver `api/rankings.py`), así el endpoint de "mejores prestadores" no ordena tablas completas.
+    """
+    class EntityType(models.TextChoices):
+        PRESTADOR = 'prestador', _('Prestador de Servicio')
+        ARTESANO = 'artesano', _('Artesano')
+
+    GLOBAL_GROUP = 0
+
+    entity_type = models.CharField(max_length=20, choices=EntityType.choices)
+    group_id = models.PositiveIntegerField(default=GLOBAL_GROUP, help_text="0 = ranking global; si no, id de la categoría (prestadores) o del rubro (artesanos).")
+    object_id = models.PositiveIntegerField()
+    nombre = models.CharField(max_length=200)
+    puntuacion = models.PositiveIntegerField(default=0)
+    rank = models.PositiveIntegerField(help_text="Posición con empates (1, 2, 2, 4...).")
+    percentile = models.FloatField(help_text="Porcentaje del grupo con puntuación menor o igual (100 = el mejor).")
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"#{self.rank} {self.nombre} ({self.entity_type}/{self.group_id})"
+
+    class Meta:
+        verbose_name = "Posición en Ranking"
+        verbose_name_plural = "Posiciones en Rankings"
+        constraints = [
+            models.UniqueConstraint(fields=['entity_type', 'group_id', 'object_id'], name='unique_ranking_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['entity_type', 'group_id', 'rank', 'object_id'], name='ranking_position_idx'),
+        ]
+
+
+class SingletonVersion(models.Model):
+    """
+    Sello de versión de cada singleton (SiteConfiguration, ScoringRule). Se renueva en
+    cada `save()`; los procesos comparan su copia en memoria contra él (api/singletons.py).
+    """
+    label = models.CharField(max_length=100, primary_key=True)
+    token = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.label} @ {self.token[:8]}"
+
+
+class ContentVersion(models.Model):
+    """
+    Contador de versión por modelo para las respuestas condicionales (api/http_cache.py):
+    las señales lo incrementan al guardar o borrar y de él salen el ETag y el Last-Modified.
+    """
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+class GeoPoint(models.Model):
+    """
+    Punto del índice geoespacial: una fila por prestador, artesano o atractivo con
+    coordenadas, con su geohash indexado. Se mantiene al guardar los modelos fuente
+    (ver `api/geo.py`) y sirve las búsquedas por cercanía del endpoint `/locations/`.
+    """
+    class EntityType(models.TextChoices):
+        PRESTADOR = 'prestador', _('Prestador de Servicio')
+        ARTESANO = 'artesano', _('Artesano')
+        ATRACTIVO = 'atractivo', _('Atractivo Turístico')
+
+    entity_type = models.CharField(max_length=20, choices=EntityType.choices)
+    object_id = models.PositiveIntegerField()
+    nombre = models.CharField(max_length=255)
+    tipo = models.CharField(max_length=60, help_text="Tipo de marcador en el mapa (categoría, 'artesano', 'atractivo_<color>').")
+    url_detalle = models.CharField(max_length=255, blank=True)
+    latitud = models.FloatField()
+    longitud = models.FloatField()
+    geohash = models.CharField(max_length=12, help_text="Geohash de precisión 9; sus prefijos son las celdas de menor precisión.")
+    is_public = models.BooleanField(default=False, help_text="Si el objeto es visible en el sitio público (aprobado o publicado).")
+
+    def __str__(self):
+        return f"{self.entity_type}:{self.object_id} {self.nombre} ({self.latitud:.5f}, {self.longitud:.5f})"
+
+    class Meta:
+        verbose_name = "Punto Geográfico"
+        verbose_name_plural = "Puntos Geográficos"
+        constraints = [
+            models.UniqueConstraint(fields=['entity_type', 'object_id'], name='unique_geo_point'),
+        ]
+        indexes = [
+            models.Index(fields=['is_public', 'geohash'], name='geopoint_public_geohash_idx'),
+        ]
+
+
+class MarkerCluster(models.Model):
+    """
+    Celda de la pirámide de agrupación del mapa (api/map_clusters.py): los puntos públicos
+    de `GeoPoint` cuyo geohash empieza por `cell`, resumidos en cantidad, centroide y
+    desglose por tipo de marcador. Cada nivel de zoom lee la precisión que le corresponde.
+    """
+    cell = models.CharField(max_length=12, unique=True)
+    precision = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField()
+    latitud = models.FloatField(help_text="Latitud del centroide de los puntos de la celda.")
+    longitud = models.FloatField(help_text="Longitud del centroide de los puntos de la celda.")
+    tipos = models.JSONField(default=dict, help_text="Cantidad de puntos por tipo de marcador.")
+    punto = models.JSONField(null=True, blank=True, help_text="El punto mismo cuando la celda tiene uno solo.")
+    updated_at = models.DateTimeField(auto_now=True, help_text="Último recálculo de la celda; de aquí salen los ETag de los tiles.")
+
+    def __str__(self):
+        return f"{self.cell} ({self.count})"
+
+    class Meta:
+        verbose_name = "Agrupación de Marcadores"
+        verbose_name_plural = "Agrupaciones de Marcadores"
+        indexes = [
+            models.Index(fields=['precision', 'latitud', 'longitud'], name='markercluster_tile_idx'),
+        ]
+
+
+class ImageVariant(models.Model):
+    """
+    Derivadas de una imagen subida (api/image_variants.py): varios anchos en formatos
+    modernos, guardadas junto al original con nombres que llevan el hash del contenido.
+    Una fila por archivo original; `variants` es `{formato: {ancho: ruta}}`.
+    """
+    original = models.CharField(max_length=255, unique=True, help_text="Ruta del original en el almacenamiento.")
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 del original y de la configuración con que se generó.")
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    variants = models.JSONField(default=dict)
+    fecha_generacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.original} ({self.width}x{self.height})"
+
+    class Meta:
+        verbose_name = "Variante de Imagen"
+        verbose_name_plural = "Variantes de Imagen"
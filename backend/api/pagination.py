@@ -0,0 +1,174 @@
+import base64
+import binascii
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# --- PAGINACIÓN POR CURSOR (KEYSET) ---
+#
+# La paginación global (`PageNumberPagination`) hace un `COUNT(*)` y un `OFFSET` por
+# página: en tablas que solo crecen (auditoría, notificaciones, reseñas, sugerencias)
+# las páginas profundas se vuelven linealmente más lentas. Con `?pagination=cursor`
+# las vistas con `KeysetPaginationMixin` paginan por la clave de su orden (p. ej.
+# `timestamp, id`): cada página es un `WHERE (timestamp, id) < (...)` sobre el índice,
+# sin OFFSET y sin contar. El conteo es opcional: `?count=exact` o `?count=approx`
+# (en PostgreSQL, la estimación de `pg_class.reltuples` cuando no hay filtros).
+#
+# Las columnas de la clave no pueden ser nulas y la última debe ser única (el id).
+
+DEFAULT_KEYSET_PAGINATION_SETTINGS = {
+    "MAX_PAGE_SIZE": 100,
+    # Por debajo de esta estimación se cuenta exacto: la diferencia de coste es mínima.
+    "EXACT_COUNT_BELOW": 10000,
+}
+
+
+def get_keyset_pagination_settings() -> Dict:
+    return {**DEFAULT_KEYSET_PAGINATION_SETTINGS, **getattr(settings, "KEYSET_PAGINATION", {})}
+
+
+def approximate_count(queryset) -> Tuple[int, bool]:
+    """
+    Número de filas de `queryset` y si es una estimación. Solo se estima en PostgreSQL y
+    sin filtros (la estadística es de la tabla entera); en los demás casos, `count()`.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql" and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples vale -1 mientras la tabla no se haya analizado nunca.
+        if row and row[0] >= get_keyset_pagination_settings()["EXACT_COUNT_BELOW"]:
+            return int(row[0]), True
+    return queryset.count(), False
+
+
+class KeysetPagination(BasePagination):
+    mode_query_param = "pagination"
+    mode_value = "cursor"
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+
+    def __init__(self, ordering: Sequence[str]):
+        # ('-timestamp', '-id') -> [('timestamp', True), ('id', True)]
+        self.ordering = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+
+    @classmethod
+    def requested(cls, request) -> bool:
+        params = request.query_params
+        return params.get(cls.mode_query_param) == cls.mode_value or cls.cursor_query_param in params
+
+    # --- CURSOR ---
+
+    def encode_cursor(self, instance, reverse: bool) -> str:
+        values = [self._field(name).value_to_string(instance) for name, _ in self.ordering]
+        payload = json.dumps({"v": values, "r": reverse}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request) -> Optional[Tuple[List, bool]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = [self._field(name).to_python(value) for (name, _), value in zip(self.ordering, payload["v"], strict=True)]
+            return values, bool(payload.get("r"))
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            raise NotFound("Cursor inválido.")
+
+    def _field(self, name):
+        return self.model._meta.pk if name == "pk" else self.model._meta.get_field(name)
+
+    def _after(self, values, reverse: bool) -> Q:
+        """Filas posteriores a `values` según el orden (o anteriores, con `reverse`)."""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.ordering):
+            lookup = "lt" if descending != reverse else "gt"
+            equal = {prev: value for (prev, _), value in zip(self.ordering[:index], values)}
+            condition |= Q(**equal, **{f"{name}__{lookup}": values[index]})
+        # Cota redundante sobre la primera columna: sin ella el OR no acota el rango del índice.
+        name, descending = self.ordering[0]
+        return Q(**{f"{name}__{'lte' if descending != reverse else 'gte'}": values[0]}) & condition
+
+    # --- PAGINACIÓN ---
+
+    def get_page_size(self, request) -> int:
+        page_size = api_settings.PAGE_SIZE or 10
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+            if requested > 0:
+                page_size = requested
+        except (KeyError, ValueError):
+            pass
+        return min(page_size, get_keyset_pagination_settings()["MAX_PAGE_SIZE"])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[1])
+
+        self.count = None
+        mode = request.query_params.get(self.count_query_param)
+        if mode == "exact":
+            self.count, self.count_is_approximate = queryset.count(), False
+        elif mode == "approx":
+            self.count, self.count_is_approximate = approximate_count(queryset)
+
+        if cursor:
+            queryset = queryset.filter(self._after(cursor[0], reverse))
+        order = [("-" if descending != reverse else "") + name for name, descending in self.ordering]
+        rows = list(queryset.order_by(*order)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+            if (has_more and reverse) or (cursor and not reverse):
+                self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def _link(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        body = {"next": self._link(self.next_cursor), "previous": self._link(self.previous_cursor), "results": data}
+        if self.count is not None:
+            body = {"count": self.count, "count_is_approximate": self.count_is_approximate, **body}
+        return Response(body)
+
+
+class KeysetPaginationMixin:
+    """
+    Para vistas de listado sobre tablas grandes. Por defecto conservan la paginación
+    global; con `?pagination=cursor` (o un `?cursor=`) paginan por `keyset_ordering`,
+    que reemplaza al orden del queryset y al de `?ordering=`.
+    """
+    keyset_ordering: Tuple[str, ...] = ("-id",)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and KeysetPagination.requested(self.request):
+            self._paginator = KeysetPagination(self.keyset_ordering)
+        return super().paginator
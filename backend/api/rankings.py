@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.db.models import F, Max, Count, Window
+from django.db.models.functions import CumeDist, Rank
+from django.utils import timezone
+
+# --- RANKINGS MATERIALIZADOS ---
+#
+# Calcular posiciones y percentiles al vuelo para una página de "mejores
+# prestadores" obliga a ordenar toda la tabla en cada visita. `RankingEntry`
+# guarda la posición de cada entidad aprobada en su ranking global y en el de su
+# categoría (prestadores) o rubro (artesanos).
+#
+# El refresco es incremental: cuando cambian las puntuaciones de unas entidades,
+# el motor de puntuación (`api/scoring.py`) pide refrescar solo las particiones
+# que las contienen. Cada partición se recalcula con funciones de ventana
+# (`RANK`, `CUME_DIST`) en la base de datos y solo se escriben las filas cuya
+# posición, puntuación o nombre cambió.
+
+
+@dataclass(frozen=True)
+class RankedSpec:
+    entity_type: str
+    model_name: str
+    group_field: str
+    name_field: str
+
+    @property
+    def model(self):
+        from django.apps import apps
+        return apps.get_model("api", self.model_name)
+
+
+RANKED_SPECS = {
+    "prestador": RankedSpec("prestador", "PrestadorServicio", "categoria_id", "nombre_negocio"),
+    "artesano": RankedSpec("artesano", "Artesano", "rubro_id", "nombre_taller"),
+}
+
+UPDATE_FIELDS = ["nombre", "puntuacion", "rank", "percentile", "updated_at"]
+
+
+def _refresh_partition(spec: RankedSpec, group_id: int) -> int:
+    """Recalcula una partición (global o de un grupo). Devuelve cuántas filas escribió o borró."""
+    from .models import RankingEntry
+
+    source = spec.model.objects.filter(aprobado=True)
+    if group_id != RankingEntry.GLOBAL_GROUP:
+        source = source.filter(**{spec.group_field: group_id})
+    rows = source.annotate(
+        position=Window(Rank(), order_by=[F("puntuacion_total").desc()]),
+        cume=Window(CumeDist(), order_by=[F("puntuacion_total").asc()]),
+    ).values_list("pk", spec.name_field, "puntuacion_total", "position", "cume")
+
+    existing = {
+        entry.object_id: entry
+        for entry in RankingEntry.objects.filter(entity_type=spec.entity_type, group_id=group_id)
+    }
+    now = timezone.now()
+    to_create, to_update = [], []
+    for object_id, nombre, puntuacion, position, cume in rows:
+        values = {"nombre": nombre, "puntuacion": puntuacion, "rank": position, "percentile": round(cume * 100, 2)}
+        entry = existing.pop(object_id, None)
+        if entry is None:
+            to_create.append(RankingEntry(
+                entity_type=spec.entity_type, group_id=group_id, object_id=object_id, updated_at=now, **values
+            ))
+        elif any(getattr(entry, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(entry, name, value)
+            entry.updated_at = now
+            to_update.append(entry)
+
+    if existing:
+        RankingEntry.objects.filter(pk__in=[entry.pk for entry in existing.values()]).delete()
+    # Otro proceso (cada worker tiene su ScoreQueue) puede estar refrescando la misma
+    # partición: las altas se insertan como upsert para no chocar con `unique_ranking_entry`.
+    RankingEntry.objects.bulk_create(
+        to_create, batch_size=500,
+        update_conflicts=True, unique_fields=["entity_type", "group_id", "object_id"], update_fields=UPDATE_FIELDS,
+    )
+    RankingEntry.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=500)
+    return len(to_create) + len(to_update) + len(existing)
+
+
+def _partitions_for(spec: RankedSpec, object_ids: Set[int]) -> Set[int]:
+    """Particiones afectadas: la global, el grupo actual de cada entidad y el que tenía en el ranking."""
+    from .models import RankingEntry
+
+    groups = {RankingEntry.GLOBAL_GROUP}
+    groups.update(
+        spec.model.objects.filter(pk__in=object_ids, **{f"{spec.group_field}__isnull": False})
+        .values_list(spec.group_field, flat=True)
+    )
+    groups.update(
+        RankingEntry.objects.filter(entity_type=spec.entity_type, object_id__in=object_ids)
+        .values_list("group_id", flat=True)
+    )
+    return groups
+
+
+def refresh_rankings(changed: Optional[Dict[str, Iterable[int]]] = None) -> Dict[str, int]:
+    """
+    Refresca las particiones que contienen a las entidades cambiadas
+    (`{"prestador": ids, "artesano": ids}`), o todas si `changed` es None.
+    Devuelve cuántas filas se escribieron por tipo.
+    """
+    from .models import RankingEntry
+
+    written = {}
+    for entity_type, spec in RANKED_SPECS.items():
+        if changed is None:
+            groups = {RankingEntry.GLOBAL_GROUP}
+            groups.update(
+                spec.model.objects.filter(**{f"{spec.group_field}__isnull": False})
+                .values_list(spec.group_field, flat=True).distinct()
+            )
+            # Grupos que ya no existen o quedaron vacíos: se purgan.
+            RankingEntry.objects.filter(entity_type=entity_type).exclude(group_id__in=groups).delete()
+        else:
+            object_ids = set(changed.get(entity_type) or ())
+            if not object_ids:
+                continue
+            groups = _partitions_for(spec, object_ids)
+        written[entity_type] = sum(_refresh_partition(spec, group_id) for group_id in sorted(groups))
+    return written
+
+
+def ranking_version(entity_type: str, group_id: int) -> Tuple[int, Optional[str]]:
+    """Número de filas y última modificación de una partición: base del ETag del endpoint."""
+    from .models import RankingEntry
+
+    summary = RankingEntry.objects.filter(entity_type=entity_type, group_id=group_id).aggregate(
+        total=Count("id"), last=Max("updated_at")
+    )
+    return summary["total"], summary["last"].isoformat() if summary["last"] else None
@@ -0,0 +1,397 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+# --- MOTOR DE PUNTUACIÓN POR CONJUNTOS ---
+#
+# Las señales recalculaban la puntuación de un prestador recorriendo en Python
+# todas sus reseñas, verificaciones y asistencias (con una consulta extra por
+# capacitación) en cada guardado. Una aprobación masiva de N reseñas costaba
+# así O(n²) consultas. Aquí:
+#
+#   - Las señales solo *marcan* la entidad afectada.
+#   - Cada componente se calcula con un único agregado (`Sum`/`Case` en una
+#     subconsulta correlacionada) y se escribe con un `UPDATE` por conjunto, sea
+#     un prestador o todos: dos sentencias por tipo de entidad.
+#   - Dentro de `score_batch()` (una petición, una acción masiva del admin) las
+#     marcas se acumulan y cada entidad se recalcula una sola vez al final.
+#   - Por defecto el recálculo es diferido: al confirmarse la transacción las
+#     entidades marcadas pasan a `score_queue`, un conjunto sin duplicados que un
+#     hilo en segundo plano vacía por lotes. Así una ráfaga de verificaciones en
+#     campo no alarga cada petición ni repite escrituras sobre el mismo prestador.
+#     Con `SCORING_QUEUE["DEFERRED"] = False` se recalcula al momento, en la misma
+#     transacción que el cambio (útil en pruebas y scripts).
+
+DEFAULT_SCORING_QUEUE_SETTINGS = {
+    "DEFERRED": True,
+    "BACKGROUND": True,  # False: la cola se vacía en el mismo hilo, al confirmar la transacción.
+    "BATCH_SIZE": 500,  # Entidades por lote (y por transacción) al vaciar la cola.
+    "FLUSH_DELAY_SECONDS": 0.5,  # Espera antes de vaciar, para agrupar ráfagas de cambios.
+}
+
+
+def get_scoring_queue_settings() -> Dict[str, Any]:
+    config = dict(DEFAULT_SCORING_QUEUE_SETTINGS)
+    try:
+        from django.conf import settings
+        config.update(getattr(settings, "SCORING_QUEUE", {}) or {})
+    except Exception:
+        pass
+    return config
+
+
+@dataclass
+class PendingScores:
+    """Entidades marcadas para recalcular su puntuación."""
+    prestador_ids: Set[int] = field(default_factory=set)
+    artesano_ids: Set[int] = field(default_factory=set)
+    usuario_ids: Set[int] = field(default_factory=set)  # Asistencias: se resuelven a prestador o artesano.
+    verificacion_ids: Set[int] = field(default_factory=set)  # Su puntaje_obtenido también se recalcula.
+    # Cambios de perfil (aprobación, nombre, categoría): solo se refresca su posición en los rankings.
+    ranking_prestador_ids: Set[int] = field(default_factory=set)
+    ranking_artesano_ids: Set[int] = field(default_factory=set)
+    everything: bool = False
+
+    ID_FIELDS = ("prestador_ids", "artesano_ids", "usuario_ids", "verificacion_ids",
+                 "ranking_prestador_ids", "ranking_artesano_ids")
+
+    def __bool__(self) -> bool:
+        return self.everything or any(getattr(self, name) for name in self.ID_FIELDS)
+
+    def __len__(self) -> int:
+        return sum(len(getattr(self, name)) for name in self.ID_FIELDS)
+
+    def merge(self, other: "PendingScores") -> None:
+        self.everything = self.everything or other.everything
+        for name in self.ID_FIELDS:
+            getattr(self, name).update(getattr(other, name))
+
+    def chunks(self, size: int) -> List["PendingScores"]:
+        """Divide las marcas en lotes de a lo sumo `size` ids (un recálculo total no se divide)."""
+        if self.everything:
+            return [PendingScores(everything=True)]
+        items = [(name, pk) for name in self.ID_FIELDS for pk in getattr(self, name)]
+        chunks = []
+        for start in range(0, len(items), size):
+            chunk = PendingScores()
+            for name, pk in items[start:start + size]:
+                getattr(chunk, name).add(pk)
+            chunks.append(chunk)
+        return chunks
+
+
+_current_batch: ContextVar[Optional[PendingScores]] = ContextVar("score_batch", default=None)
+
+
+def _scoring_values():
+    """Reglas vigentes; sin fila guardada se usan los valores por defecto del modelo (sin crearla)."""
+    from .models import ScoringRule
+    from .singletons import load_singleton
+    rules = load_singleton(ScoringRule, create=False)
+    return rules.puntos_por_estrella_reseña, rules.puntos_asistencia_capacitacion
+
+
+# --- AGREGADOS (una subconsulta correlacionada por componente) ---
+
+def _sum_subquery(queryset, group_field: str, expression) -> Coalesce:
+    total = queryset.order_by().values(group_field).annotate(total=Sum(expression)).values("total")
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def _review_points(model, puntos_por_estrella: int):
+    from .models import Resena
+    reviews = Resena.objects.filter(
+        content_type=ContentType.objects.get_for_model(model), object_id=OuterRef("pk"), aprobada=True
+    )
+    return _sum_subquery(reviews, "object_id", "calificacion") * Value(puntos_por_estrella)
+
+
+def _training_points(puntos_base: int):
+    from .models import AsistenciaCapacitacion
+    # Los puntos propios de la capacitación mandan; si no tiene, se usan los de las reglas.
+    points = Case(
+        When(capacitacion__puntos_asistencia__gt=0, then=F("capacitacion__puntos_asistencia")),
+        default=Value(puntos_base),
+        output_field=IntegerField(),
+    )
+    return _sum_subquery(AsistenciaCapacitacion.objects.filter(usuario_id=OuterRef("usuario_id")), "usuario_id", points)
+
+
+def _verification_points():
+    from .models import Verificacion
+    return _sum_subquery(Verificacion.objects.filter(prestador_id=OuterRef("pk")), "prestador_id", "puntaje_obtenido")
+
+
+def _checklist_points():
+    from .models import RespuestaItemVerificacion
+    answers = RespuestaItemVerificacion.objects.filter(verificacion_id=OuterRef("pk"), cumple=True)
+    return _sum_subquery(answers, "verificacion_id", "item_original__puntaje")
+
+
+# --- RECÁLCULO ---
+
+def apply_scores(pending: PendingScores) -> Dict[str, int]:
+    """
+    Recalcula en bloque las entidades marcadas. Devuelve cuántas filas se actualizaron por tipo.
+    Equivale a llamar `recalcular_puntuacion_total()` una vez por entidad, pero con un
+    número de consultas que no depende de cuántas sean.
+    """
+    from .models import Artesano, PrestadorServicio, Verificacion
+    from .rankings import refresh_rankings
+
+    if not pending:
+        return {"verificaciones": 0, "prestadores": 0, "artesanos": 0}
+    puntos_por_estrella, puntos_base = _scoring_values()
+
+    verificaciones = Verificacion.objects.all()
+    if not pending.everything:
+        verificaciones = verificaciones.filter(pk__in=pending.verificacion_ids)
+    updated_checks = verificaciones.update(puntaje_obtenido=_checklist_points()) if (
+        pending.everything or pending.verificacion_ids) else 0
+
+    prestadores, artesanos = PrestadorServicio.objects.all(), Artesano.objects.all()
+    if not pending.everything:
+        prestador_ids, artesano_ids = set(pending.prestador_ids), set(pending.artesano_ids)
+        if pending.verificacion_ids:
+            prestador_ids.update(
+                Verificacion.objects.filter(pk__in=pending.verificacion_ids).values_list("prestador_id", flat=True)
+            )
+        if pending.usuario_ids:
+            prestador_ids.update(prestadores.filter(usuario_id__in=pending.usuario_ids).values_list("pk", flat=True))
+            artesano_ids.update(artesanos.filter(usuario_id__in=pending.usuario_ids).values_list("pk", flat=True))
+        prestadores, artesanos = prestadores.filter(pk__in=prestador_ids), artesanos.filter(pk__in=artesano_ids)
+
+    updated_prestadores = prestadores.update(
+        puntuacion_reseñas=_review_points(PrestadorServicio, puntos_por_estrella),
+        puntuacion_capacitacion=_training_points(puntos_base),
+        puntuacion_verificacion=_verification_points(),
+    )
+    prestadores.update(puntuacion_total=(
+        F("puntuacion_verificacion") + F("puntuacion_capacitacion") + F("puntuacion_reseñas") + F("puntuacion_formularios")
+    ))
+    updated_artesanos = artesanos.update(
+        puntuacion_reseñas=_review_points(Artesano, puntos_por_estrella),
+        puntuacion_capacitacion=_training_points(puntos_base),
+    )
+    artesanos.update(puntuacion_total=F("puntuacion_capacitacion") + F("puntuacion_reseñas") + F("puntuacion_formularios"))
+
+    # Los rankings materializados siguen a las puntuaciones (y a los cambios de perfil marcados).
+    refresh_rankings(None if pending.everything else {
+        "prestador": prestador_ids | pending.ranking_prestador_ids,
+        "artesano": artesano_ids | pending.ranking_artesano_ids,
+    })
+    # Los UPDATE en bloque no emiten señales: las respuestas del LLM que citan puntuaciones
+    # o rankings se retiran aquí, como haría `invalidar_cache_llm` al guardar.
+    changed = [label for label, updated in (
+        ("api.prestadorservicio", updated_prestadores), ("api.artesano", updated_artesanos),
+    ) if updated]
+    if changed:
+        from ai_models.response_cache import llm_response_cache
+        llm_response_cache.invalidate(changed)
+    return {"verificaciones": updated_checks, "prestadores": updated_prestadores, "artesanos": updated_artesanos}
+
+
+def recompute_scores() -> Dict[str, int]:
+    """Reconstruye la puntuación de todos los prestadores y artesanos."""
+    return apply_scores(PendingScores(everything=True))
+
+
+# --- COLA DIFERIDA ---
+
+class ScoreQueue:
+    """
+    Conjunto de entidades pendientes de recalcular (sin duplicados) que un hilo demonio
+    vacía por lotes. Mide el retraso entre la primera marca pendiente y su recálculo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = PendingScores()
+        self._oldest: Optional[float] = None
+        self._worker: Optional[threading.Thread] = None
+        self._stats = {"flushes": 0, "flushed_entities": 0, "last_lag_seconds": None, "max_lag_seconds": 0.0}
+
+    def enqueue(self, pending: PendingScores) -> None:
+        if not pending:
+            return
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.merge(pending)
+        if get_scoring_queue_settings()["BACKGROUND"]:
+            self._ensure_worker()
+        else:
+            self.flush()
+
+    def flush(self) -> int:
+        """Recalcula todo lo pendiente en este hilo. Devuelve cuántas entidades trató."""
+        with self._lock:
+            pending, oldest = self._pending, self._oldest
+            self._pending, self._oldest = PendingScores(), None
+        if not pending:
+            return 0
+        done = PendingScores()
+        try:
+            for chunk in pending.chunks(get_scoring_queue_settings()["BATCH_SIZE"]):
+                with transaction.atomic():
+                    apply_scores(chunk)
+                done.merge(chunk)
+        except Exception:
+            # Lo que no se pudo recalcular vuelve a la cola para el próximo intento.
+            for name in PendingScores.ID_FIELDS:
+                getattr(pending, name).difference_update(getattr(done, name))
+            self._requeue(pending, oldest)
+            raise
+
+        lag = time.monotonic() - oldest if oldest is not None else 0.0
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["flushed_entities"] += len(pending) or 1
+            self._stats["last_lag_seconds"] = round(lag, 3)
+            self._stats["max_lag_seconds"] = round(max(self._stats["max_lag_seconds"], lag), 3)
+        print(f"--- 🧮 PUNTUACIÓN: {len(pending) or 'Todas las'} entidades recalculadas (retraso {lag:.2f} s). ---")
+        return len(pending)
+
+    def _requeue(self, pending: PendingScores, oldest: Optional[float]) -> None:
+        with self._lock:
+            self._pending.merge(pending)
+            if oldest is not None and (self._oldest is None or oldest < self._oldest):
+                self._oldest = oldest
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name="score-queue-worker", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        try:
+            time.sleep(get_scoring_queue_settings()["FLUSH_DELAY_SECONDS"])
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._worker = None
+                        return
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"--- ⚠️ PUNTUACIÓN: Error al recalcular puntajes, se reintentará con la próxima marca: {e} ---")
+                    with self._lock:
+                        self._worker = None
+                    return
+        finally:
+            connections.close_all()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Espera a que el hilo termine de vaciar la cola (pruebas y apagado ordenado)."""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            oldest = self._oldest
+            return {
+                **self._stats,
+                "pending_entities": len(self._pending) or int(self._pending.everything),
+                "oldest_pending_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            }
+
+
+score_queue = ScoreQueue()
+
+
+def _dispatch(pending: PendingScores) -> None:
+    """Recalcula ahora (modo síncrono) o encola las marcas para cuando se confirme la transacción."""
+    if not pending:
+        return
+    if not get_scoring_queue_settings()["DEFERRED"]:
+        apply_scores(pending)
+        return
+    transaction.on_commit(lambda: score_queue.enqueue(pending))
+
+
+# --- MARCAS (las llaman las señales) ---
+
+def _mark(**changes: Iterable[int]) -> None:
+    batch = _current_batch.get()
+    pending = batch if batch is not None else PendingScores()
+    for name, ids in changes.items():
+        if name == "everything":
+            pending.everything = True
+        else:
+            getattr(pending, name).update(pk for pk in ids if pk is not None)
+    if batch is None:
+        _dispatch(pending)
+
+
+def mark_prestadores(ids: Iterable[int]) -> None:
+    _mark(prestador_ids=ids)
+
+
+def mark_artesanos(ids: Iterable[int]) -> None:
+    _mark(artesano_ids=ids)
+
+
+def mark_usuarios(ids: Iterable[int]) -> None:
+    _mark(usuario_ids=ids)
+
+
+def mark_verificaciones(ids: Iterable[int]) -> None:
+    _mark(verificacion_ids=ids)
+
+
+def mark_ranking(entity_type: str, ids: Iterable[int]) -> None:
+    """Refresca la posición en los rankings de prestadores o artesanos sin recalcular su puntuación."""
+    _mark(**{f"ranking_{entity_type}_ids": ids})
+
+
+def mark_everything() -> None:
+    _mark(everything=[True])
+
+
+def mark_review_targets(pairs: Iterable) -> None:
+    """Marca los destinos de reseñas dados como pares (content_type_id, object_id)."""
+    from .models import Artesano, PrestadorServicio
+
+    prestador_ct = ContentType.objects.get_for_model(PrestadorServicio).pk
+    artesano_ct = ContentType.objects.get_for_model(Artesano).pk
+    pairs = list(pairs)
+    _mark(
+        prestador_ids=[object_id for ct, object_id in pairs if ct == prestador_ct],
+        artesano_ids=[object_id for ct, object_id in pairs if ct == artesano_ct],
+    )
+
+
+@contextmanager
+def score_batch() -> Iterator[PendingScores]:
+    """
+    Acumula las marcas de puntuación y las despacha juntas al salir del bloque: cada
+    entidad se recalcula una sola vez. En modo síncrono, un lote abierto dentro de un
+    `transaction.atomic()` recalcula en esa misma transacción.
+    """
+    pending = PendingScores()
+    token = _current_batch.set(pending)
+    failed = False
+    try:
+        yield pending
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _current_batch.reset(token)
+        try:
+            _dispatch(pending)
+        except DatabaseError:
+            # Con la transacción ya rota no se puede recalcular; el error original es el relevante.
+            if not failed:
+                raise
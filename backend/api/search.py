@@ -0,0 +1,289 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.utils import translation
+
+# --- MOTOR DE BÚSQUEDA DE TEXTO COMPLETO ---
+#
+# `buscar_informacion_general` y los listados públicos buscaban con `icontains`
+# sobre varias columnas: recorridos secuenciales completos, sin ranking y sin
+# ignorar tildes ("cafe" no encontraba "café"). Aquí cada objeto indexable se
+# copia a `SearchDocument` (una fila por idioma, con los campos traducidos de
+# modeltranslation) al guardarse, y las consultas usan el motor de cada base:
+#
+#   - Postgres: columna `tsvector` con la configuración "spanish_unaccent"
+#     (stemming en español + unaccent), índice GIN y `ts_rank`.
+#   - SQLite (desarrollo): tabla virtual FTS5 con `remove_diacritics` y `bm25`.
+#   - Otros motores: `icontains` sobre el índice, sin ranking.
+
+SEARCH_CONFIG = "spanish_unaccent"
+TITLE_WEIGHT, BODY_WEIGHT = 10.0, 1.0  # Pesos de bm25 en SQLite (equivalentes a A/B en Postgres)
+SNIPPET_LENGTH = 200
+MAX_FILTER_RESULTS = 500  # Tope de ids al filtrar un listado con ?q=
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchableSpec:
+    """Cómo indexar un modelo: campos de título y cuerpo, y cuándo es público."""
+    type_name: str
+    title_fields: Tuple[str, ...]
+    body_fields: Tuple[str, ...]
+    is_public: Callable[[Any], bool]
+    model: Any = field(default=None)
+
+
+def _build_registry() -> Dict[str, SearchableSpec]:
+    from .models import Artesano, AtractivoTuristico, PrestadorServicio, Publicacion
+
+    specs = [
+        SearchableSpec("prestador", ("nombre_negocio",), ("descripcion", "promociones_ofertas", "direccion"),
+                       lambda obj: obj.aprobado, PrestadorServicio),
+        SearchableSpec("artesano", ("nombre_taller", "nombre_artesano"), ("descripcion", "direccion"),
+                       lambda obj: obj.aprobado, Artesano),
+        SearchableSpec("atractivo", ("nombre",), ("descripcion", "como_llegar", "recomendaciones", "direccion"),
+                       lambda obj: obj.es_publicado, AtractivoTuristico),
+        SearchableSpec("publicacion", ("titulo",), ("contenido",),
+                       lambda obj: obj.estado == Publicacion.Status.PUBLICADO, Publicacion),
+    ]
+    return {spec.type_name: spec for spec in specs}
+
+
+_registry: Optional[Dict[str, SearchableSpec]] = None
+
+
+def get_registry() -> Dict[str, SearchableSpec]:
+    global _registry
+    if _registry is None:
+        _registry = _build_registry()
+    return _registry
+
+
+def spec_for_model(model) -> Optional[SearchableSpec]:
+    for spec in get_registry().values():
+        if spec.model is model:
+            return spec
+    return None
+
+
+def search_languages() -> List[str]:
+    return [code for code, _ in settings.LANGUAGES]
+
+
+def current_language() -> str:
+    """Idioma activo reducido a uno de `LANGUAGES` (ej. "es-co" -> "es")."""
+    language = (translation.get_language() or settings.MODELTRANSLATION_DEFAULT_LANGUAGE).split("-")[0]
+    return language if language in search_languages() else settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+
+
+# --- INDEXACIÓN ---
+
+def _field_text(instance, field_name: str, language: str) -> str:
+    """Valor del campo en un idioma; los campos traducidos caen al idioma por defecto si están vacíos."""
+    default = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+    for attr in (f"{field_name}_{language}", f"{field_name}_{default}", field_name):
+        value = getattr(instance, attr, None)
+        if value:
+            return str(value)
+    return ""
+
+
+def _join(instance, field_names: Iterable[str], language: str) -> str:
+    return " ".join(text for text in (_field_text(instance, name, language) for name in field_names) if text)
+
+
+def _refresh_vectors(document_ids: List[int]) -> None:
+    """En Postgres, recalcula el `tsvector` de las filas indicadas (título con peso A, cuerpo con peso B)."""
+    if connection.vendor != "postgresql" or not document_ids:
+        return
+    from django.contrib.postgres.search import SearchVector
+    from .models import SearchDocument
+
+    SearchDocument.objects.filter(pk__in=document_ids).update(
+        search_vector=SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("body", weight="B", config=SEARCH_CONFIG)
+    )
+
+
+def index_instance(instance) -> None:
+    """Crea o actualiza las filas del índice (una por idioma) de un objeto indexable."""
+    from .models import SearchDocument
+
+    spec = spec_for_model(type(instance))
+    if spec is None:
+        return
+    content_type = ContentType.objects.get_for_model(instance)
+    is_public = bool(spec.is_public(instance))
+    document_ids = []
+    for language in search_languages():
+        document, _ = SearchDocument.objects.update_or_create(
+            content_type=content_type, object_id=instance.pk, language=language,
+            defaults={
+                "title": _join(instance, spec.title_fields, language),
+                "body": _join(instance, spec.body_fields, language),
+                "is_public": is_public,
+            },
+        )
+        document_ids.append(document.pk)
+    _refresh_vectors(document_ids)
+
+
+def remove_instance(instance) -> None:
+    from .models import SearchDocument
+
+    if spec_for_model(type(instance)) is None:
+        return
+    SearchDocument.objects.filter(
+        content_type=ContentType.objects.get_for_model(instance), object_id=instance.pk
+    ).delete()
+
+
+def rebuild_index(type_names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Reconstruye el índice de los tipos indicados (todos por defecto). Devuelve objetos indexados por tipo."""
+    from .models import SearchDocument
+
+    counts = {}
+    for type_name in (type_names or get_registry().keys()):
+        spec = get_registry()[type_name]
+        SearchDocument.objects.filter(content_type=ContentType.objects.get_for_model(spec.model)).delete()
+        total = 0
+        for instance in spec.model.objects.all().iterator(chunk_size=500):
+            index_instance(instance)
+            total += 1
+        counts[type_name] = total
+    return counts
+
+
+# --- CONSULTA ---
+
+def _terms(query: str) -> List[str]:
+    return TERM_RE.findall(query or "")
+
+
+def _type_ids(type_names: Optional[Iterable[str]]) -> Optional[List[int]]:
+    if not type_names:
+        return None
+    registry = get_registry()
+    return [ContentType.objects.get_for_model(registry[name].model).pk for name in type_names if name in registry]
+
+
+def _ranked_documents(query: str, language: str, content_type_ids: Optional[List[int]], public_only: bool):
+    """
+    Devuelve una función `(limit, offset) -> filas` y el total de coincidencias.
+    Cada fila es (content_type_id, object_id, title, body, rank), ordenadas por relevancia.
+    """
+    from .models import SearchDocument
+
+    terms = _terms(query)
+    if not terms:
+        return (lambda limit, offset: []), 0
+
+    if connection.vendor == "sqlite":
+        # Cada término como prefijo ("hot" encuentra "hoteles"); FTS5 combina los términos con AND.
+        match = " ".join(f'"{term}"*' for term in terms)
+        where = ["api_searchdocument_fts MATCH %s", "d.language = %s"]
+        params: List[Any] = [match, language]
+        if public_only:
+            where.append("d.is_public = 1")
+        if content_type_ids is not None:
+            if not content_type_ids:
+                return (lambda limit, offset: []), 0
+            where.append(f"d.content_type_id IN ({', '.join(['%s'] * len(content_type_ids))})")
+            params.extend(content_type_ids)
+        base = (
+            "FROM api_searchdocument_fts JOIN api_searchdocument d ON d.id = api_searchdocument_fts.rowid "
+            f"WHERE {' AND '.join(where)}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) {base}", params)
+            total = cursor.fetchone()[0]
+
+        def fetch(limit, offset):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT d.content_type_id, d.object_id, d.title, d.body, "
+                    f"-bm25(api_searchdocument_fts, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS rank {base} "
+                    "ORDER BY rank DESC, d.id LIMIT %s OFFSET %s",
+                    params + [limit, offset],
+                )
+                return cursor.fetchall()
+        return fetch, total
+
+    documents = SearchDocument.objects.filter(language=language)
+    if public_only:
+        documents = documents.filter(is_public=True)
+    if content_type_ids is not None:
+        documents = documents.filter(content_type_id__in=content_type_ids)
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        from django.db.models import F
+
+        search_query = SearchQuery(" ".join(terms), search_type="websearch", config=SEARCH_CONFIG)
+        documents = (
+            documents.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "id")
+        )
+    else:
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(body__icontains=term)
+        documents = documents.filter(condition).annotate(rank=Value(0.0, output_field=FloatField())).order_by("id")
+
+    rows = documents.values_list("content_type_id", "object_id", "title", "body", "rank")
+    return (lambda limit, offset: list(rows[offset:offset + limit])), documents.count()
+
+
+def search(
+    query: str,
+    types: Optional[Iterable[str]] = None,
+    language: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    public_only: bool = True,
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Búsqueda ordenada por relevancia sobre todos los tipos indexados (o los indicados).
+
+    Returns:
+        (total de coincidencias, página de resultados `{type, id, title, snippet, rank}`)
+    """
+    fetch, total = _ranked_documents(query, language or current_language(), _type_ids(types), public_only)
+    if not total:
+        return 0, []
+    names_by_type_id = {
+        ContentType.objects.get_for_model(spec.model).pk: spec.type_name for spec in get_registry().values()
+    }
+    results = [
+        {
+            "type": names_by_type_id.get(content_type_id),
+            "id": object_id,
+            "title": title,
+            "snippet": body[:SNIPPET_LENGTH],
+            "rank": float(rank or 0),
+        }
+        for content_type_id, object_id, title, body, rank in fetch(limit, offset)
+    ]
+    return total, results
+
+
+def filter_queryset(queryset, query: str, language: Optional[str] = None):
+    """
+    Restringe un queryset de un modelo indexado a las coincidencias de `query`, ordenadas
+    por relevancia. La visibilidad la decide el propio queryset, no el índice.
+    """
+    spec = spec_for_model(queryset.model)
+    if spec is None or not _terms(query):
+        return queryset
+    fetch, total = _ranked_documents(query, language or current_language(), _type_ids([spec.type_name]), public_only=False)
+    ids = [row[1] for row in fetch(MAX_FILTER_RESULTS, 0)] if total else []
+    if not ids:
+        return queryset.none()
+    ranking = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+    return queryset.filter(pk__in=ids).order_by(ranking)
@@ -15,9 +15,13 @@ from .models import (
     PerfilAdministrador,
     PerfilFuncionarioDirectivo,
     PerfilFuncionarioProfesional,
-    UserLLMConfig
+    UserLLMConfig,
+    RankingEntry
 )
 from django.db import transaction
+from .generic_relations import GenericObjectListSerializer
+from .image_variants import ImageVariantsField
+from .translated_cache import CachedRepresentationListSerializer, CachedRepresentationMixin
 
 # --- Serializadores para Formularios Dinámicos ---
 
@@ -102,9 +106,10 @@ class RespuestaUsuarioCreateSerializer(serializers.Serializer):
 
 class HechoHistoricoSerializer(serializers.ModelSerializer):
     imagen_url = serializers.ImageField(source='imagen', read_only=True)
+    imagen_variantes = ImageVariantsField(source='imagen')
     class Meta:
         model = HechoHistorico
-        fields = ['id', 'ano', 'titulo', 'descripcion', 'imagen', 'imagen_url', 'es_publicado']
+        fields = ['id', 'ano', 'titulo', 'descripcion', 'imagen', 'imagen_url', 'imagen_variantes', 'es_publicado']
         extra_kwargs = {'imagen': {'write_only': True, 'required': False}}
 
 
@@ -119,26 +124,29 @@ class GaleriaItemSerializer(serializers.Serializer):
 
 class ImagenPaginaInstitucionalSerializer(serializers.ModelSerializer):
     imagen_url = serializers.ImageField(source='imagen', read_only=True)
+    imagen_variantes = ImageVariantsField(source='imagen')
     class Meta:
         model = ImagenPaginaInstitucional
-        fields = ['id', 'imagen_url', 'alt_text', 'orden']
+        fields = ['id', 'imagen_url', 'imagen_variantes', 'alt_text', 'orden']
 
 
-class PaginaInstitucionalSerializer(serializers.ModelSerializer):
+class PaginaInstitucionalSerializer(CachedRepresentationMixin, serializers.ModelSerializer):
     banner_url = serializers.ImageField(source='banner', read_only=True)
+    banner_variantes = ImageVariantsField(source='banner')
     actualizado_por_username = serializers.CharField(source='actualizado_por.username', read_only=True)
-    galeria_imagenes = ImagenPaginaInstitucionalSerializer(many=True, read_only=True, source='galeria_imagenes')
+    galeria_imagenes = ImagenPaginaInstitucionalSerializer(many=True, read_only=True)
 
     class Meta:
         model = PaginaInstitucional
         fields = [
             'id', 'nombre', 'slug', 'titulo_banner', 'subtitulo_banner',
-            'banner', 'banner_url', 'contenido_principal', 'programas_proyectos',
+            'banner', 'banner_url', 'banner_variantes', 'contenido_principal', 'programas_proyectos',
             'estrategias_apoyo', 'politicas_locales', 'convenios_asociaciones',
             'informes_resultados', 'actualizado_por_username', 'fecha_actualizacion',
             'galeria_imagenes'
         ]
         extra_kwargs = {'banner': {'write_only': True, 'required': False}}
+        list_serializer_class = CachedRepresentationListSerializer
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -225,32 +233,37 @@ class LocationSerializer(serializers.Serializer):
     lng = serializers.FloatField()
     tipo = serializers.CharField()
     url_detalle = serializers.CharField()
+    distancia_km = serializers.FloatField(required=False)
 
 
 class ImagenAtractivoSerializer(serializers.ModelSerializer):
+    imagen_variantes = ImageVariantsField(source='imagen')
     class Meta:
         model = ImagenAtractivo
-        fields = ['id', 'imagen', 'alt_text']
+        fields = ['id', 'imagen', 'imagen_variantes', 'alt_text']
 
 
-class AtractivoTuristicoListSerializer(serializers.ModelSerializer):
+class AtractivoTuristicoListSerializer(CachedRepresentationMixin, serializers.ModelSerializer):
     imagen_principal_url = serializers.ImageField(source='imagen_principal', read_only=True)
+    imagen_principal_variantes = ImageVariantsField(source='imagen_principal')
     class Meta:
         model = AtractivoTuristico
-        fields = ['id', 'nombre', 'slug', 'descripcion', 'categoria_color', 'imagen_principal_url']
+        fields = ['id', 'nombre', 'slug', 'descripcion', 'categoria_color', 'imagen_principal_url', 'imagen_principal_variantes']
+        list_serializer_class = CachedRepresentationListSerializer
 
 
 class AtractivoTuristicoDetailSerializer(serializers.ModelSerializer):
     imagenes = ImagenAtractivoSerializer(many=True, read_only=True)
     categoria_color_display = serializers.CharField(source='get_categoria_color_display', read_only=True)
     imagen_principal_url = serializers.ImageField(source='imagen_principal', read_only=True)
+    imagen_principal_variantes = ImageVariantsField(source='imagen_principal')
     autor_username = serializers.CharField(source='autor.username', read_only=True, default=None)
     class Meta:
         model = AtractivoTuristico
         fields = [
             'id', 'nombre', 'slug', 'descripcion', 'como_llegar',
             'latitud', 'longitud', 'categoria_color', 'categoria_color_display',
-            'imagen_principal_url', 'imagenes', 'horario_funcionamiento', 'tarifas',
+            'imagen_principal_url', 'imagen_principal_variantes', 'imagenes', 'horario_funcionamiento', 'tarifas',
             'recomendaciones', 'accesibilidad', 'informacion_contacto', 'autor_username'
         ]
 
@@ -272,19 +285,22 @@ class AtractivoTuristicoWriteSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class PublicacionListSerializer(serializers.ModelSerializer):
+class PublicacionListSerializer(CachedRepresentationMixin, serializers.ModelSerializer):
+    imagen_principal_variantes = ImageVariantsField(source='imagen_principal')
     class Meta:
         model = Publicacion
-        fields = ['id', 'tipo', 'subcategoria_evento', 'titulo', 'slug', 'imagen_principal', 'fecha_evento_inicio', 'fecha_evento_fin', 'fecha_publicacion']
+        fields = ['id', 'tipo', 'subcategoria_evento', 'titulo', 'slug', 'imagen_principal', 'imagen_principal_variantes', 'fecha_evento_inicio', 'fecha_evento_fin', 'fecha_publicacion']
+        list_serializer_class = CachedRepresentationListSerializer
 
 
-class PublicacionDetailSerializer(serializers.ModelSerializer):
+class PublicacionDetailSerializer(CachedRepresentationMixin, serializers.ModelSerializer):
     autor_nombre = serializers.CharField(source='autor.get_full_name', read_only=True)
     subcategoria_evento_display = serializers.CharField(source='get_subcategoria_evento_display', read_only=True)
+    imagen_principal_variantes = ImageVariantsField(source='imagen_principal')
     class Meta:
         model = Publicacion
         fields = [
-            'id', 'tipo', 'titulo', 'slug', 'contenido', 'imagen_principal',
+            'id', 'tipo', 'titulo', 'slug', 'contenido', 'imagen_principal', 'imagen_principal_variantes',
             'autor_nombre', 'fecha_evento_inicio', 'fecha_evento_fin', 'fecha_publicacion',
             'subcategoria_evento', 'subcategoria_evento_display'
         ]
@@ -305,16 +321,18 @@ class AdminPublicacionSerializer(serializers.ModelSerializer):
 
 
 class ImagenGaleriaSerializer(serializers.ModelSerializer):
+    imagen_variantes = ImageVariantsField(source='imagen')
     class Meta:
         model = ImagenGaleria
-        fields = ['id', 'imagen', 'alt_text', 'prestador']
+        fields = ['id', 'imagen', 'imagen_variantes', 'alt_text', 'prestador']
         read_only_fields = ['prestador']
 
 
 class ImagenArtesanoSerializer(serializers.ModelSerializer):
+    imagen_variantes = ImageVariantsField(source='imagen')
     class Meta:
         model = ImagenArtesano
-        fields = ['id', 'imagen', 'alt_text', 'artesano']
+        fields = ['id', 'imagen', 'imagen_variantes', 'alt_text', 'artesano']
         read_only_fields = ['artesano']
 
 
@@ -334,6 +352,7 @@ class CategoriaPrestadorSerializer(serializers.ModelSerializer):
 class PrestadorServicioPublicListSerializer(serializers.ModelSerializer):
     categoria_nombre = serializers.SerializerMethodField()
     imagen_principal = serializers.ImageField(source='foto_principal', read_only=True)
+    imagen_principal_variantes = ImageVariantsField(source='foto_principal')
 
     class Meta:
         model = PrestadorServicio
@@ -342,6 +361,7 @@ class PrestadorServicioPublicListSerializer(serializers.ModelSerializer):
             'nombre_negocio',
             'categoria_nombre',
             'imagen_principal',
+            'imagen_principal_variantes',
             'descripcion',
             'telefono',
             'email_contacto',
@@ -366,6 +386,7 @@ class RubroArtesanoSerializer(serializers.ModelSerializer):
 class ArtesanoPublicListSerializer(serializers.ModelSerializer):
     rubro_nombre = serializers.SerializerMethodField()
     foto_url = serializers.ImageField(source='foto_principal', read_only=True)
+    foto_variantes = ImageVariantsField(source='foto_principal')
     class Meta:
         model = Artesano
         fields = [
@@ -374,6 +395,7 @@ class ArtesanoPublicListSerializer(serializers.ModelSerializer):
             'nombre_artesano',
             'rubro_nombre',
             'foto_url',
+            'foto_variantes',
             'descripcion',
             'telefono',
             'email_contacto',
@@ -392,28 +414,31 @@ class ArtesanoPublicListSerializer(serializers.ModelSerializer):
 class ArtesanoPublicDetailSerializer(serializers.ModelSerializer):
     rubro = RubroArtesanoSerializer(read_only=True)
     foto_url = serializers.ImageField(source='foto_principal', read_only=True)
+    foto_variantes = ImageVariantsField(source='foto_principal')
     galeria_imagenes = ImagenArtesanoSerializer(many=True, read_only=True)
     class Meta:
         model = Artesano
         fields = [
             'id', 'nombre_taller', 'nombre_artesano', 'descripcion', 'telefono', 'email_contacto',
             'red_social_facebook', 'red_social_instagram', 'red_social_tiktok', 'red_social_whatsapp',
-            'latitud', 'longitud', 'rubro', 'foto_url', 'galeria_imagenes'
+            'latitud', 'longitud', 'rubro', 'foto_url', 'foto_variantes', 'galeria_imagenes'
         ]
 
 
 class ImagenRutaTuristicaSerializer(serializers.ModelSerializer):
+    imagen_variantes = ImageVariantsField(source='imagen')
     class Meta:
         model = ImagenRutaTuristica
-        fields = ['id', 'imagen', 'alt_text']
+        fields = ['id', 'imagen', 'imagen_variantes', 'alt_text']
 
 
 class RutaTuristicaListSerializer(serializers.ModelSerializer):
     imagen_principal_url = serializers.ImageField(source='imagen_principal', read_only=True)
+    imagen_principal_variantes = ImageVariantsField(source='imagen_principal')
 
     class Meta:
         model = RutaTuristica
-        fields = ['id', 'nombre', 'slug', 'descripcion', 'imagen_principal_url']
+        fields = ['id', 'nombre', 'slug', 'descripcion', 'imagen_principal_url', 'imagen_principal_variantes']
 
 
 class RutaTuristicaDetailSerializer(RutaTuristicaListSerializer):
@@ -615,17 +640,39 @@ class AgenciaEventosRegisterSerializer(RegisterSerializer):
 
 
 class ElementoGuardadoSerializer(serializers.ModelSerializer):
+    """
+    Se sirve desde la copia guardada en el propio elemento (ver `api/trip_plan.py`): la
+    lista sale de una sola consulta. `content_object` conserva la forma anterior
+    (id, nombre o titulo, slug e imagen_principal) para los clientes existentes.
+    """
+    content_type_name = serializers.SerializerMethodField()
+    imagen = serializers.SerializerMethodField()
     content_object = serializers.SerializerMethodField()
-    content_type_name = serializers.CharField(source='content_type.model', read_only=True)
     class Meta:
         model = ElementoGuardado
-        fields = ['id', 'fecha_guardado', 'object_id', 'content_type_name', 'content_object']
+        fields = [
+            'id', 'fecha_guardado', 'object_id', 'content_type_name', 'tipo', 'nombre', 'slug',
+            'url_detalle', 'imagen', 'latitud', 'longitud', 'zona', 'dia', 'content_object',
+        ]
+        read_only_fields = [field for field in fields if field != 'dia']
+    def get_content_type_name(self, obj):
+        # Desde la caché de ContentType: sin JOIN.
+        return ContentType.objects.get_for_id(obj.content_type_id).model
+    def get_imagen(self, obj):
+        from .trip_plan import image_url
+        return image_url(obj.imagen, self.context.get('request'))
     def get_content_object(self, obj):
-        if isinstance(obj.content_object, AtractivoTuristico):
-            return AtractivoTuristicoListSerializer(obj.content_object, context=self.context).data
-        if isinstance(obj.content_object, Publicacion):
-            return PublicacionListSerializer(obj.content_object, context=self.context).data
-        return None
+        if not obj.tipo:
+            return None
+        name_key = 'titulo' if obj.tipo == 'publicacion' else 'nombre'
+        return {
+            'id': obj.object_id, name_key: obj.nombre, 'slug': obj.slug,
+            'imagen_principal': self.get_imagen(obj),
+        }
+    def validate_dia(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Los días del viaje empiezan en 1.")
+        return value
 
 
 class ElementoGuardadoCreateSerializer(serializers.ModelSerializer):
@@ -638,6 +685,8 @@ class ElementoGuardadoCreateSerializer(serializers.ModelSerializer):
         model_map = {
             'atractivoturistico': AtractivoTuristico,
             'publicacion': Publicacion,
+            'prestadorservicio': PrestadorServicio,
+            'artesano': Artesano,
         }
         model = model_map.get(content_type_str)
         if not model:
@@ -716,6 +765,14 @@ class AgentTaskSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class RankingEntrySerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='object_id', read_only=True)
+    class Meta:
+        model = RankingEntry
+        fields = ['id', 'nombre', 'puntuacion', 'rank', 'percentile']
+        read_only_fields = fields
+
+
 class AgentCommandSerializer(serializers.Serializer):
     orden = serializers.CharField(
         max_length=2000,
@@ -733,9 +790,11 @@ class AuditLogSerializer(serializers.ModelSerializer):
             'id', 'timestamp', 'user_username', 'action',
             'action_display', 'details', 'content_object_str'
         ]
+        list_serializer_class = GenericObjectListSerializer
 
 
 class HomePageComponentSerializer(serializers.ModelSerializer):
+    image_variantes = ImageVariantsField(source='image')
     class Meta:
         model = HomePageComponent
         fields = '__all__'
@@ -921,25 +980,19 @@ class GuardarVerificacionSerializer(serializers.ModelSerializer):
         instance.fecha_visita = validated_data.get('fecha_visita', instance.fecha_visita)
         instance.observaciones_generales = validated_data.get('observaciones_generales', instance.observaciones_generales)
         instance.recomendaciones = validated_data.get('recomendaciones', instance.recomendaciones)
-        puntaje_actual = 0
         instance.respuestas_items.all().delete()
-        for respuesta_data in respuestas_data:
-            item = respuesta_data['item_original']
-            cumple = respuesta_data['cumple']
-            RespuestaItemVerificacion.objects.create(
+        RespuestaItemVerificacion.objects.bulk_create([
+            RespuestaItemVerificacion(
                 verificacion=instance,
-                item_original=item,
-                cumple=cumple,
+                item_original=respuesta_data['item_original'],
+                cumple=respuesta_data['cumple'],
                 justificacion=respuesta_data.get('justificacion', '')
             )
-            if cumple:
-                puntaje_actual += item.puntaje
-        instance.puntaje_obtenido = puntaje_actual
+            for respuesta_data in respuestas_data
+        ])
+        # El guardado marca la verificación: su puntaje y el del prestador se recalculan
+        # una sola vez, en la cola de puntuación, al confirmarse la transacción.
         instance.save()
-        prestador = instance.prestador
-        puntaje_total_prestador = sum(v.puntaje_obtenido for v in prestador.verificaciones_recibidas.all())
-        prestador.puntuacion_total = puntaje_total_prestador
-        prestador.save()
         return instance
 
 
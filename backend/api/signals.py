@@ -1,113 +1,74 @@
 print("DEBUG: Entrando en api/signals.py")
 print("DEBUG: Entrando en api/signals.py")
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.contrib.contenttypes.models import ContentType
 
 # Models are now imported inside the functions to prevent app-loading deadlocks.
 
+# --- Puntuación de prestadores y artesanos ---
+# Las señales solo marcan la entidad afectada; `api/scoring.py` la recalcula con agregados
+# por conjunto (una vez por lote dentro de `score_batch()`, o al momento fuera de él).
+
 @receiver(post_save, sender='api.Resena')
-def actualizar_puntuacion_por_resena(sender, instance, created, **kwargs):
+def actualizar_puntuacion_por_resena(sender, instance, created=False, **kwargs):
     """
-    Actualiza la puntuación de un Prestador o Artesano cuando se crea
-    o actualiza una reseña aprobada.
+    Actualiza la puntuación del Prestador o Artesano reseñado. Una reseña nueva sin
+    aprobar no cambia nada; si se aprueba, se edita o se retira, sí.
     """
-    from .models import PrestadorServicio, Artesano, ScoringRule, Resena
-
-    if not instance.aprobada:
-        return
+    from .scoring import mark_review_targets
 
-    content_object = instance.content_object
-    if not isinstance(content_object, (PrestadorServicio, Artesano)):
+    if created and not instance.aprobada:
         return
-
-    try:
-        rules = ScoringRule.load()
-        puntos_por_estrella = rules.puntos_por_estrella_reseña
-    except ScoringRule.DoesNotExist:
-        puntos_por_estrella = 2 # Valor por defecto si no hay reglas
-
-    # Recalcular el total de puntos de reseñas para el objeto
-    total_puntos_resenas = 0
-    content_type = ContentType.objects.get_for_model(content_object)
-    resenas_aprobadas = Resena.objects.filter(
-        content_type=content_type,
-        object_id=content_object.id,
-        aprobada=True
-    )
-
-    for resena in resenas_aprobadas:
-        total_puntos_resenas += resena.calificacion * puntos_por_estrella
-
-    content_object.puntuacion_reseñas = total_puntos_resenas
-    content_object.recalcular_puntuacion_total()
+    mark_review_targets([(instance.content_type_id, instance.object_id)])
 
 
 @receiver(post_save, sender='api.Verificacion')
-def actualizar_puntuacion_por_verificacion(sender, instance, created, **kwargs):
+def actualizar_puntuacion_por_verificacion(sender, instance, created=False, **kwargs):
     """
-    Actualiza la puntuación de un Prestador de Servicio cuando se crea
-    o actualiza una verificación.
+    Recalcula el puntaje de la verificación (ítems cumplidos) y la puntuación
+    por verificaciones de su prestador.
     """
-    from .models import Verificacion, RespuestaItemVerificacion
-
-    prestador = instance.prestador
-
-    # Primero, se calcula el puntaje de esta verificación específica
-    puntaje_calculado = 0
-    respuestas = RespuestaItemVerificacion.objects.filter(verificacion=instance, cumple=True)
-    for respuesta in respuestas:
-        puntaje_calculado += respuesta.item_original.puntaje
+    from .scoring import mark_prestadores, mark_verificaciones
+    mark_verificaciones([instance.pk])
+    mark_prestadores([instance.prestador_id])
 
-    # Se actualiza el puntaje_obtenido de la instancia de Verificacion
-    # Se usa update para evitar recursión de la señal post_save
-    Verificacion.objects.filter(pk=instance.pk).update(puntaje_obtenido=puntaje_calculado)
 
-    # Ahora, se recalcula la puntuación total del prestador
-    total_puntos_verificacion = 0
-    verificaciones = Verificacion.objects.filter(prestador=prestador)
-
-    for v in verificaciones:
-        total_puntos_verificacion += v.puntaje_obtenido
-
-    prestador.puntuacion_verificacion = total_puntos_verificacion
-    prestador.recalcular_puntuacion_total()
+@receiver(post_save, sender='api.RespuestaItemVerificacion')
+def actualizar_puntuacion_por_respuesta_item(sender, instance, **kwargs):
+    """Cada respuesta a un ítem cambia el puntaje de su verificación."""
+    from .scoring import mark_verificaciones
+    mark_verificaciones([instance.verificacion_id])
 
 
 @receiver(post_save, sender='api.AsistenciaCapacitacion')
-def actualizar_puntuacion_por_capacitacion(sender, instance, created, **kwargs):
+def actualizar_puntuacion_por_capacitacion(sender, instance, created=False, **kwargs):
     """
-    Actualiza la puntuación de un Prestador o Artesano cuando se registra
-    la asistencia a una capacitación.
+    Actualiza la puntuación del Prestador o Artesano del usuario cuando se registra
+    (o elimina) su asistencia a una capacitación.
     """
-    from .models import ScoringRule, AsistenciaCapacitacion
-
-    usuario = instance.usuario
+    from .scoring import mark_usuarios
+    mark_usuarios([instance.usuario_id])
 
-    if hasattr(usuario, 'perfil_prestador'):
-        entidad = usuario.perfil_prestador
-    elif hasattr(usuario, 'perfil_artesano'):
-        entidad = usuario.perfil_artesano
-    else:
-        return # El usuario no es ni prestador ni artesano
 
-    try:
-        rules = ScoringRule.load()
-        puntos_base = rules.puntos_asistencia_capacitacion
-    except ScoringRule.DoesNotExist:
-        puntos_base = 10 # Valor por defecto
+@receiver(post_save, sender='api.ScoringRule')
+def recalcular_puntuaciones_por_reglas(sender, instance, **kwargs):
+    """Nuevas reglas de puntuación: se recalculan todas las entidades (pocas consultas en total)."""
+    from .scoring import mark_everything
+    mark_everything()
 
-    # Recalcular el total de puntos por capacitación
-    total_puntos_capacitacion = 0
-    asistencias = AsistenciaCapacitacion.objects.filter(usuario=usuario)
+@receiver(post_save, sender='api.PrestadorServicio')
+@receiver(post_delete, sender='api.PrestadorServicio')
+def actualizar_ranking_prestador(sender, instance, **kwargs):
+    """Aprobación, nombre o categoría pueden cambiar: se refresca su posición en los rankings."""
+    from .scoring import mark_ranking
+    mark_ranking('prestador', [instance.pk])
 
-    for asistencia in asistencias:
-        # Usar los puntos definidos en la capacitación si existen, si no, los de las reglas
-        puntos_otorgados = asistencia.capacitacion.puntos_asistencia if asistencia.capacitacion.puntos_asistencia > 0 else puntos_base
-        total_puntos_capacitacion += puntos_otorgados
 
-    entidad.puntuacion_capacitacion = total_puntos_capacitacion
-    entidad.recalcular_puntuacion_total()
+@receiver(post_save, sender='api.Artesano')
+@receiver(post_delete, sender='api.Artesano')
+def actualizar_ranking_artesano(sender, instance, **kwargs):
+    from .scoring import mark_ranking
+    mark_ranking('artesano', [instance.pk])
 
 # --- Señales post_delete para mantener la consistencia ---
 
@@ -118,8 +79,142 @@ def recalcular_puntuacion_al_borrar_asistencia(sender, instance, **kwargs):
 
 @receiver(post_delete, sender='api.Verificacion')
 def recalcular_puntuacion_al_borrar_verificacion(sender, instance, **kwargs):
-    actualizar_puntuacion_por_verificacion(sender, instance, created=False, **kwargs)
+    from .scoring import mark_prestadores
+    mark_prestadores([instance.prestador_id])
+
+@receiver(post_delete, sender='api.RespuestaItemVerificacion')
+def recalcular_puntuacion_al_borrar_respuesta_item(sender, instance, **kwargs):
+    actualizar_puntuacion_por_respuesta_item(sender, instance, **kwargs)
 
 @receiver(post_delete, sender='api.Resena')
 def recalcular_puntuacion_al_borrar_resena(sender, instance, **kwargs):
-    actualizar_puntuacion_por_resena(sender, instance, created=False, **kwargs)
\ No newline at end of file
+    actualizar_puntuacion_por_resena(sender, instance, created=False, **kwargs)
+
+# --- Invalidación de la caché de respuestas de LLM ---
+# Los agentes responden sobre estos datos: si cambian, las respuestas guardadas pueden quedar obsoletas.
+LLM_CACHE_SOURCE_MODELS = [
+    'api.PrestadorServicio', 'api.CategoriaPrestador', 'api.Artesano', 'api.RubroArtesano',
+    'api.AtractivoTuristico', 'api.RutaTuristica', 'api.Publicacion', 'api.Video',
+    'api.ContenidoMunicipio', 'api.PaginaInstitucional', 'api.HechoHistorico', 'api.SiteConfiguration',
+]
+
+def invalidar_cache_llm(sender, **kwargs):
+    """Retira de la caché del router de LLM las respuestas que dependen del modelo que cambió."""
+    from ai_models.response_cache import llm_response_cache
+    llm_response_cache.invalidate([sender._meta.label_lower])
+
+for _model_label in LLM_CACHE_SOURCE_MODELS:
+    post_save.connect(invalidar_cache_llm, sender=_model_label, dispatch_uid=f"llm_cache_save_{_model_label}")
+    post_delete.connect(invalidar_cache_llm, sender=_model_label, dispatch_uid=f"llm_cache_delete_{_model_label}")
+
+
+# --- ÍNDICE DE BÚSQUEDA DE TEXTO COMPLETO ---
+SEARCH_INDEX_MODELS = ['api.PrestadorServicio', 'api.Artesano', 'api.AtractivoTuristico', 'api.Publicacion']
+
+def actualizar_indice_busqueda(sender, instance, **kwargs):
+    """Reindexa el objeto guardado en `SearchDocument` (una fila por idioma)."""
+    from .search import index_instance
+    index_instance(instance)
+
+def eliminar_de_indice_busqueda(sender, instance, **kwargs):
+    """Retira del índice de búsqueda el objeto eliminado."""
+    from .search import remove_instance
+    remove_instance(instance)
+
+for _model_label in SEARCH_INDEX_MODELS:
+    post_save.connect(actualizar_indice_busqueda, sender=_model_label, dispatch_uid=f"search_index_save_{_model_label}")
+    post_delete.connect(eliminar_de_indice_busqueda, sender=_model_label, dispatch_uid=f"search_index_delete_{_model_label}")
+
+
+
+# --- ÍNDICE GEOESPACIAL ---
+GEO_INDEX_MODELS = ['api.PrestadorServicio', 'api.Artesano', 'api.AtractivoTuristico']
+
+def actualizar_indice_geografico(sender, instance, **kwargs):
+    """Copia las coordenadas del objeto guardado a `GeoPoint` (o lo retira si ya no tiene)."""
+    from .geo import index_location
+    index_location(instance)
+
+def eliminar_de_indice_geografico(sender, instance, **kwargs):
+    from .geo import remove_location
+    remove_location(instance)
+
+for _model_label in GEO_INDEX_MODELS:
+    post_save.connect(actualizar_indice_geografico, sender=_model_label, dispatch_uid=f"geo_index_save_{_model_label}")
+    post_delete.connect(eliminar_de_indice_geografico, sender=_model_label, dispatch_uid=f"geo_index_delete_{_model_label}")
+
+# --- COPIA DE "MI VIAJE" ---
+# Cada elemento guardado copia nombre, imagen y coordenadas de su destino (api/trip_plan.py).
+TRIP_PLAN_MODELS = ['api.AtractivoTuristico', 'api.Publicacion', 'api.PrestadorServicio', 'api.Artesano']
+
+@receiver(pre_save, sender='api.ElementoGuardado', dispatch_uid="trip_snapshot_fill")
+def copiar_destino_guardado(sender, instance, **kwargs):
+    from .trip_plan import fill_snapshot
+    fill_snapshot(instance)
+
+def actualizar_copias_mi_viaje(sender, instance, **kwargs):
+    from .trip_plan import refresh_for_target
+    refresh_for_target(instance)
+
+def retirar_de_mi_viaje(sender, instance, **kwargs):
+    from .trip_plan import remove_for_target
+    remove_for_target(instance)
+
+for _model_label in TRIP_PLAN_MODELS:
+    post_save.connect(actualizar_copias_mi_viaje, sender=_model_label, dispatch_uid=f"trip_snapshot_save_{_model_label}")
+    post_delete.connect(retirar_de_mi_viaje, sender=_model_label, dispatch_uid=f"trip_snapshot_delete_{_model_label}")
+
+# --- ÍNDICE VECTORIAL (BÚSQUEDA SEMÁNTICA) ---
+VECTOR_INDEX_MODELS = SEARCH_INDEX_MODELS + ['api.PaginaInstitucional']
+
+def reindexar_vectores(sender, instance, **kwargs):
+    """Marca el objeto para recalcular sus embeddings al confirmar la transacción."""
+    from .vector_search import schedule_reindex
+    schedule_reindex(instance)
+
+def retirar_vectores(sender, instance, **kwargs):
+    """Marca el objeto eliminado para retirarlo del índice vectorial."""
+    from .vector_search import schedule_reindex
+    schedule_reindex(instance, deleted=True)
+
+for _model_label in VECTOR_INDEX_MODELS:
+    post_save.connect(reindexar_vectores, sender=_model_label, dispatch_uid=f"vector_index_save_{_model_label}")
+    post_delete.connect(retirar_vectores, sender=_model_label, dispatch_uid=f"vector_index_delete_{_model_label}")
+
+
+# --- VERSIONES PARA RESPUESTAS CONDICIONALES (ETag / Last-Modified) ---
+HTTP_CACHE_MODELS = [
+    'api.MenuItem', 'api.HomePageComponent', 'api.PaginaInstitucional', 'api.ImagenPaginaInstitucional',
+    'api.ContenidoMunicipio', 'api.HechoHistorico', 'api.Video', 'api.CategoriaPrestador', 'api.SiteConfiguration',
+]
+
+def incrementar_version_contenido(sender, **kwargs):
+    """Incrementa el contador de versión del modelo: los ETag de sus endpoints cambian."""
+    from .http_cache import bump_versions
+    bump_versions(sender)
+
+for _model_label in HTTP_CACHE_MODELS:
+    post_save.connect(incrementar_version_contenido, sender=_model_label, dispatch_uid=f"http_cache_save_{_model_label}")
+    post_delete.connect(incrementar_version_contenido, sender=_model_label, dispatch_uid=f"http_cache_delete_{_model_label}")
+
+
+# --- VERSIÓN DE LAS PÁGINAS INSTITUCIONALES AL CAMBIAR SU GALERÍA ---
+# La representación cacheada de una página incluye su galería y se identifica por
+# `fecha_actualizacion`: cambiar una imagen debe mover esa fecha.
+@receiver([post_save, post_delete], sender='api.ImagenPaginaInstitucional', dispatch_uid="pagina_galeria_version")
+def actualizar_version_pagina(sender, instance, **kwargs):
+    from django.utils import timezone
+    from .models import PaginaInstitucional
+    PaginaInstitucional.objects.filter(pk=instance.pagina_id).update(fecha_actualizacion=timezone.now())
+
+
+# --- DERIVADAS DE IMÁGENES (ANCHOS Y FORMATOS) ---
+# Las imágenes se procesan al confirmar la transacción, en el grupo de hilos de api/image_variants.py.
+from .image_variants import IMAGE_VARIANT_MODELS
+
+def generar_derivadas_de_imagen(sender, instance, **kwargs):
+    from .image_variants import schedule_variants
+    schedule_variants(instance)
+
+for _model_label in IMAGE_VARIANT_MODELS:
+    post_save.connect(generar_derivadas_de_imagen, sender=_model_label, dispatch_uid=f"image_variants_save_{_model_label}")
@@ -0,0 +1,178 @@
+import copy
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .commit_batches import on_commit_pending
+
+# --- CACHÉ DE SINGLETONS (SiteConfiguration, ScoringRule) ---
+#
+# La configuración del sitio y las reglas de puntuación se leen en cada prompt del
+# router LLM, en cada recálculo de puntuaciones y en cada carga del sitio público,
+# pero cambian muy pocas veces. Cada proceso guarda su copia en memoria junto con un
+# "sello" de versión; cada `CHECK_INTERVAL_SECONDS` compara su sello con el vigente
+# (tabla `SingletonVersion`, o una caché compartida tipo Redis si se configura) y solo
+# recarga la fila cuando otro proceso la guardó. Guardar el modelo renueva el sello.
+#
+# Los cambios hechos con `QuerySet.update()` no pasan por `save()` y no invalidan:
+# para los singletons se usa siempre `save()`.
+
+DEFAULT_SINGLETON_CACHE_SETTINGS = {
+    "ENABLED": True,
+    "CHECK_INTERVAL_SECONDS": 5.0,
+    # Alias de una caché compartida entre procesos (Redis, Memcached). Con None el sello
+    # se consulta en la base de datos: una lectura de una fila por intervalo y proceso.
+    "SHARED_CACHE_ALIAS": None,
+}
+
+VERSION_KEY = "singleton-version:{label}"
+
+
+def get_singleton_cache_settings() -> Dict:
+    return {**DEFAULT_SINGLETON_CACHE_SETTINGS, **getattr(settings, "SINGLETON_CACHE", {})}
+
+
+class SingletonCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, tuple] = {}  # label -> (instancia, sello, último chequeo)
+        # Singletons guardados en una transacción aún sin confirmar: mientras tanto la copia
+        # local no es confiable y se lee de la base de datos. label -> [(conexión, callback
+        # de on_commit)]; una marca cae al confirmarse o al revertirse su transacción.
+        self._unconfirmed: Dict[str, List[Tuple]] = {}
+        self._stats = {"hits": 0, "checks": 0, "reloads": 0, "invalidations": 0}
+
+    # --- SELLOS DE VERSIÓN ---
+
+    def _shared_cache(self, config):
+        alias = config["SHARED_CACHE_ALIAS"]
+        return caches[alias] if alias else None
+
+    def _current_token(self, label: str, config) -> Optional[str]:
+        from .models import SingletonVersion
+
+        shared = self._shared_cache(config)
+        if shared is not None:
+            token = shared.get(VERSION_KEY.format(label=label))
+            if token is not None:
+                return token
+        token = SingletonVersion.objects.filter(label=label).values_list("token", flat=True).first()
+        if shared is not None and token is not None:
+            shared.set(VERSION_KEY.format(label=label), token, timeout=None)
+        return token
+
+    # --- LECTURA ---
+
+    def _fetch(self, model, create: bool):
+        if create:
+            return model.objects.get_or_create(pk=1)[0]
+        return model.objects.filter(pk=1).first() or model()
+
+    def load(self, model, create: bool = True):
+        """
+        Instancia del singleton `model` (pk=1). Devuelve una copia: quien la modifique
+        y la guarde no altera la de los demás hasta confirmar. Con `create=False` no
+        crea la fila y, si no existe, devuelve una instancia con los valores por defecto.
+        """
+        config = get_singleton_cache_settings()
+        label = model._meta.label_lower
+        if not config["ENABLED"] or self._is_unconfirmed(label):
+            return self._fetch(model, create)
+
+        now = time.monotonic()
+        entry = self._entries.get(label)
+        # Una instancia sin guardar (create=False sin fila) no sirve a quien pide crearla.
+        if entry is not None and (entry[0].pk is not None or not create):
+            instance, token, checked_at = entry
+            if now - checked_at < config["CHECK_INTERVAL_SECONDS"]:
+                self._stats["hits"] += 1
+                return copy.copy(instance)
+            self._stats["checks"] += 1
+            if self._current_token(label, config) == token:
+                with self._lock:
+                    self._entries[label] = (instance, token, now)
+                return copy.copy(instance)
+
+        # El sello se lee antes que la fila: si alguien guarda entre ambas lecturas, el
+        # sello guardado queda viejo y el próximo chequeo recarga.
+        self._stats["reloads"] += 1
+        token = self._current_token(label, config)
+        instance = self._fetch(model, create)
+        with self._lock:
+            if label not in self._unconfirmed:
+                self._entries[label] = (instance, token, now)
+        return copy.copy(instance)
+
+    def _is_unconfirmed(self, label: str) -> bool:
+        """
+        Si hay un guardado de `label` sin confirmar. Las marcas cuyo callback ya no está
+        registrado son de transacciones (o savepoints) revertidos y se descartan: sin esto,
+        un rollback dejaba al proceso leyendo de la base de datos en cada `load()`.
+        """
+        if label not in self._unconfirmed:
+            return False
+        with self._lock:
+            pending = [
+                (connection, callback) for connection, callback in self._unconfirmed.get(label, [])
+                if on_commit_pending(connection, callback)
+            ]
+            if pending:
+                self._unconfirmed[label] = pending
+            else:
+                self._unconfirmed.pop(label, None)
+                self._entries.pop(label, None)
+            return bool(pending)
+
+    # --- INVALIDACIÓN ---
+
+    def invalidate(self, model):
+        """Renueva el sello del singleton tras `save()`/`delete()`; los demás procesos recargan."""
+        from .models import SingletonVersion
+
+        label = model._meta.label_lower
+        token = uuid.uuid4().hex
+        SingletonVersion.objects.update_or_create(label=label, defaults={"token": token})
+        connection = transaction.get_connection()
+
+        def confirmed():
+            with self._lock:
+                pending = [entry for entry in self._unconfirmed.get(label, []) if entry[1] is not confirmed]
+                if pending:
+                    self._unconfirmed[label] = pending
+                else:
+                    self._unconfirmed.pop(label, None)
+                self._entries.pop(label, None)
+            shared = self._shared_cache(get_singleton_cache_settings())
+            if shared is not None:
+                shared.set(VERSION_KEY.format(label=label), token, timeout=None)
+
+        with self._lock:
+            self._entries.pop(label, None)
+            self._stats["invalidations"] += 1
+            if connection.in_atomic_block:
+                self._unconfirmed.setdefault(label, []).append((connection, confirmed))
+        transaction.on_commit(confirmed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._unconfirmed.clear()
+
+    def stats(self) -> Dict:
+        return {**self._stats, "cached": sorted(self._entries)}
+
+
+singleton_cache = SingletonCache()
+
+
+def load_singleton(model, create: bool = True):
+    return singleton_cache.load(model, create=create)
+
+
+def invalidate_singleton(model):
+    singleton_cache.invalidate(model)
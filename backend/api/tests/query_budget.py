@@ -0,0 +1,24 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Verifica que un endpoint no degenere en N+1: se puebla la base con 10, 100 y 1000
+    filas y en cada tamaño la petición debe caber en el mismo presupuesto de consultas.
+    `populate(n)` debe dejar al menos `n` filas visibles (puede crear solo las que faltan).
+    """
+    budget_sizes = (10, 100, 1000)
+
+    def assertQueryBudget(self, url, max_queries, populate, params=None, sizes=None):
+        for size in sizes or self.budget_sizes:
+            populate(size)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params or {})
+            self.assertEqual(response.status_code, 200, f"{url} con {size} filas")
+            executed = "\n".join(query["sql"] for query in queries.captured_queries)
+            self.assertLessEqual(
+                len(queries), max_queries,
+                f"{url} ejecutó {len(queries)} consultas con {size} filas (presupuesto {max_queries}):\n{executed}",
+            )
+        return response
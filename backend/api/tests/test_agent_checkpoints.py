@@ -0,0 +1,157 @@
+import asyncio
+import json
+import uuid
+from datetime import timedelta
+from typing import TypedDict, Any
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import StateGraph, END
+
+from agents.corps import turismo_coronel
+from agents.corps.checkpoints import AgentStateSerializer, agent_checkpointer, select_prunable_threads
+from agents.corps.turismo_coronel import TacticalPlan, get_turismo_coronel_graph, stream_general_order
+from api.models import AgentTask, CustomUser
+
+PLAN_JSON = json.dumps({"plan": [
+    {"task_description": "Buscar hoteles", "responsible_captain": "Turista", "depends_on": []},
+    {"task_description": "Reservar el mejor", "responsible_captain": "Prestadores", "depends_on": [0]},
+]})
+
+MEMORY_CHECKPOINTS = {"ENABLED": True, "BACKEND": "memory"}
+
+
+class SimulatedCrash(BaseException):
+    """Imita la caída del worker: no la captura el despliegue por oleadas."""
+
+
+class CaptainState(TypedDict):
+    coronel_order: str
+    app_context: Any
+    final_report: str
+
+
+class AgentStateSerializerTests(SimpleTestCase):
+    """Pruebas del serializador de estado: el usuario del app_context debe sobrevivir al checkpoint."""
+
+    def setUp(self):
+        self.serde = AgentStateSerializer()
+
+    def roundtrip(self, value):
+        return self.serde.loads_typed(self.serde.dumps_typed(value))
+
+    def test_user_roundtrip_without_password(self):
+        user = CustomUser(id=7, username="general", role=CustomUser.Role.TURISTA, password="secreto")
+        restored = self.roundtrip({"app_context": {"user": user}})["app_context"]["user"]
+        self.assertIsInstance(restored, CustomUser)
+        self.assertEqual((restored.pk, restored.username, restored.role), (7, "general", CustomUser.Role.TURISTA))
+        self.assertIn("password", restored.get_deferred_fields())
+        self.assertNotIn(b"secreto", self.serde.dumps_typed({"user": user})[1])
+
+    def test_anonymous_user_and_plan_roundtrip(self):
+        plan = TacticalPlan.parse_raw(PLAN_JSON)
+        restored = self.roundtrip({"user": AnonymousUser(), "plan": plan})
+        self.assertTrue(restored["user"].is_anonymous)
+        self.assertEqual(restored["plan"].plan[1].depends_on, [0])
+
+
+@override_settings(AGENT_CHECKPOINTS=MEMORY_CHECKPOINTS)
+class CoronelResumeTests(SimpleTestCase):
+    """
+    Pruebas de reanudación: una orden interrumpida continúa desde su último punto de
+    control sin repetir la planificación ni las misiones ya completadas.
+    """
+    def setUp(self):
+        self.llm_calls = 0
+        self.captain_runs = []
+        self.crash_once = True
+        self.coronel = get_turismo_coronel_graph()
+        self.captain = self.build_captain()
+
+    def build_captain(self):
+        async def work(state):
+            self.captain_runs.append(state["coronel_order"])
+            if state["coronel_order"] == "Reservar el mejor" and self.crash_once:
+                self.crash_once = False
+                raise SimulatedCrash()
+            return {"final_report": f"hecho: {state['coronel_order']}"}
+
+        workflow = StateGraph(CaptainState)
+        workflow.add_node("work", work)
+        workflow.set_entry_point("work")
+        workflow.add_edge("work", END)
+        return workflow.compile()
+
+    async def fake_router(self, *args, **kwargs):
+        self.llm_calls += 1
+
+        async def chunks():
+            yield PLAN_JSON
+        return chunks()
+
+    async def fake_aget(self, key):
+        return self.coronel if key == "coronel" else self.captain
+
+    async def run_order(self, task_id):
+        events = []
+        with patch.object(turismo_coronel, "route_llm_request", side_effect=self.fake_router), \
+             patch.object(turismo_coronel.graph_registry, "aget", side_effect=self.fake_aget):
+            async for event in stream_general_order("Reserva un hotel", {"user": AnonymousUser()}, task_id=task_id):
+                events.append(event)
+        return events
+
+    def test_interrupted_order_resumes_from_last_completed_mission(self):
+        task_id = uuid.uuid4()
+        with self.assertRaises(SimulatedCrash):
+            asyncio.run(self.run_order(task_id))
+        self.assertEqual(self.captain_runs, ["Buscar hoteles", "Reservar el mejor"])
+
+        events = asyncio.run(self.run_order(task_id))
+        self.assertEqual(events[0]["event"], "resumed")
+        self.assertEqual(events[-1]["event"], "report")
+        self.assertIsNone(events[-1]["error"])
+        self.assertIn("hecho: Reservar el mejor", events[-1]["report"])
+        # Ni el plan ni la misión ya completada se repiten.
+        self.assertEqual(self.llm_calls, 1)
+        self.assertEqual(self.captain_runs, ["Buscar hoteles", "Reservar el mejor", "Reservar el mejor"])
+
+    def test_finished_order_returns_stored_report(self):
+        self.crash_once = False
+        task_id = uuid.uuid4()
+        first = asyncio.run(self.run_order(task_id))
+        second = asyncio.run(self.run_order(task_id))
+        self.assertEqual(second, [first[-1]])
+        self.assertEqual(self.llm_calls, 1)
+        self.assertEqual(len(self.captain_runs), 2)
+
+
+@override_settings(AGENT_CHECKPOINTS=MEMORY_CHECKPOINTS)
+class CheckpointPruningTests(TestCase):
+    """Pruebas de la purga: solo se borran hilos de tareas terminadas y antiguas, o huérfanos."""
+
+    def test_select_prunable_threads(self):
+        old = timezone.now() - timedelta(days=30)
+        finished_old = AgentTask.objects.create(command="a", status=AgentTask.Status.COMPLETED)
+        finished_recent = AgentTask.objects.create(command="b", status=AgentTask.Status.FAILED)
+        running_old = AgentTask.objects.create(command="c", status=AgentTask.Status.RUNNING)
+        AgentTask.objects.filter(pk__in=[finished_old.pk, running_old.pk]).update(updated_at=old)
+        orphan = str(uuid.uuid4())
+
+        threads = [str(finished_old.pk), str(finished_recent.pk), str(running_old.pk), orphan, "hilo-de-prueba"]
+        self.assertEqual(
+            sorted(select_prunable_threads(threads, retention_days=7)),
+            sorted([str(finished_old.pk), orphan, "hilo-de-prueba"]),
+        )
+
+    async def test_delete_threads_removes_checkpoints(self):
+        config = {"configurable": {"thread_id": "hilo-a-borrar", "checkpoint_ns": ""}}
+        saver = await agent_checkpointer.saver()
+        await agent_checkpointer.aput(config, empty_checkpoint(), {}, {})
+        self.assertIn("hilo-a-borrar", await agent_checkpointer.alist_thread_ids())
+
+        self.assertEqual(await agent_checkpointer.adelete_threads(["hilo-a-borrar"]), 1)
+        self.assertNotIn("hilo-a-borrar", await agent_checkpointer.alist_thread_ids())
+        self.assertIs(saver, await agent_checkpointer.saver())
@@ -0,0 +1,98 @@
+import asyncio
+from unittest.mock import patch
+from django.test import SimpleTestCase, override_settings
+
+from agents.corps.dispatch import execute_plan_in_waves, get_max_concurrent_missions, plan_waves
+from agents.corps.turismo_coronel import CaptainTask, execute_tactical_plan
+
+
+def task(description, depends_on=None, captain="Turista"):
+    return CaptainTask(task_description=description, responsible_captain=captain, depends_on=depends_on)
+
+
+class FakeCaptain:
+    """Capitán de prueba: tarda más en las primeras misiones para desordenar las respuestas."""
+    def __init__(self, delays):
+        self.delays = delays
+
+    async def ainvoke(self, payload):
+        await asyncio.sleep(self.delays.get(payload["coronel_order"], 0))
+        return {"final_report": f"hecho: {payload['coronel_order']}"}
+
+
+class PlanWavesTests(SimpleTestCase):
+    """
+    Pruebas para el despliegue por oleadas de los planes tácticos.
+    Verifica la agrupación por dependencias, el tope de concurrencia y el orden determinista de los reportes.
+    """
+    def test_missing_dependencies_keep_sequential_order(self):
+        self.assertEqual(plan_waves([task("a"), task("b"), task("c")]), [[0], [1], [2]])
+
+    def test_independent_missions_share_a_wave(self):
+        plan = [task("a", []), task("b", []), task("c", [0, 1]), task("d", [0])]
+        self.assertEqual(plan_waves(plan), [[0, 1], [2, 3]])
+
+    def test_forward_and_invalid_references_are_ignored(self):
+        plan = [task("a", [1, 7]), task("b", [1, -1])]
+        self.assertEqual(plan_waves(plan), [[0, 1]])
+
+    @override_settings(AGENT_MAX_CONCURRENT_MISSIONS=2)
+    def test_concurrency_cap_is_respected(self):
+        self.assertEqual(get_max_concurrent_missions(), 2)
+        running = {"now": 0, "peak": 0}
+
+        async def run_mission(index, mission):
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            return {"mission": mission.task_description}
+
+        plan = [task(str(i), []) for i in range(6)]
+        completed, error = asyncio.run(execute_plan_in_waves(plan, run_mission))
+        self.assertIsNone(error)
+        self.assertEqual(running["peak"], 2)
+        self.assertEqual([m["mission"] for m in completed], [str(i) for i in range(6)])
+
+    def test_failure_stops_later_waves(self):
+        calls = []
+
+        async def run_mission(index, mission):
+            calls.append(index)
+            if index == 1:
+                raise RuntimeError("sin conexión")
+            return {"mission": mission.task_description}
+
+        plan = [task("a", []), task("b", []), task("c", [0])]
+        completed, error = asyncio.run(execute_plan_in_waves(plan, run_mission))
+        self.assertEqual(error, "sin conexión")
+        self.assertEqual(sorted(calls), [0, 1])
+        self.assertEqual(completed, [{"mission": "a"}])
+
+
+class CoronelExecutionTests(SimpleTestCase):
+    """Pruebas del nodo de despliegue del Coronel con Capitanes simulados."""
+
+    def test_reports_are_merged_in_plan_order(self):
+        captain = FakeCaptain({"primera": 0.05, "segunda": 0.0})
+        state = {
+            "app_context": None,
+            "task_queue": [task("primera", []), task("segunda", [], captain="Videos")],
+            "completed_missions": [],
+            "error": None,
+        }
+
+        async def fake_aget(key):
+            return captain
+
+        with patch("agents.corps.turismo_coronel.graph_registry.aget", side_effect=fake_aget):
+            result = asyncio.run(execute_tactical_plan(state))
+
+        self.assertIsNone(result["error"])
+        self.assertEqual([m["mission"] for m in result["completed_missions"]], ["primera", "segunda"])
+        self.assertEqual(result["completed_missions"][1]["captain"], "Videos")
+
+    def test_unknown_captain_is_reported(self):
+        state = {"app_context": None, "task_queue": [task("x", [], captain="Fantasma")], "completed_missions": [], "error": None}
+        result = asyncio.run(execute_tactical_plan(state))
+        self.assertIn("Fantasma", result["error"])
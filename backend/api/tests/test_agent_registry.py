@@ -0,0 +1,77 @@
+import asyncio
+from django.test import SimpleTestCase
+
+from agents.corps.registry import GraphRegistry, graph_registry
+
+BUILD_CALLS = []
+
+
+def build_dummy_unit(name="dummy"):
+    """Constructor de prueba: registra cada compilación y devuelve un 'grafo' falso."""
+    BUILD_CALLS.append(name)
+    return {"unit": name}
+
+
+BUILDER_PATH = "api.tests.test_agent_registry:build_dummy_unit"
+
+
+class GraphRegistryTests(SimpleTestCase):
+    """
+    Pruebas para el arsenal de grafos de agentes.
+    Verifica que la compilación sea perezosa, se cachee y que el alistamiento recorra ramas completas.
+    """
+    def setUp(self):
+        BUILD_CALLS.clear()
+        self.registry = GraphRegistry()
+        self.registry.register("sargento.a", BUILDER_PATH, name="sargento.a")
+        self.registry.register("sargento.b", BUILDER_PATH, name="sargento.b")
+        self.registry.register("teniente.x", BUILDER_PATH, subordinados=["sargento.a", "sargento.b"], name="teniente.x")
+        self.registry.register("capitan.y", BUILDER_PATH, subordinados=["teniente.x", "sargento.a"], name="capitan.y")
+
+    def test_register_does_not_compile(self):
+        self.assertEqual(BUILD_CALLS, [])
+        self.assertFalse(self.registry.is_compiled("capitan.y"))
+
+    def test_get_compiles_once_and_caches(self):
+        first = self.registry.get("teniente.x")
+        second = self.registry.get("teniente.x")
+        self.assertIs(first, second)
+        self.assertEqual(BUILD_CALLS, ["teniente.x"])
+        # Compilar un teniente no arrastra a sus sargentos.
+        self.assertFalse(self.registry.is_compiled("sargento.a"))
+
+    def test_aget_compiles_once_under_concurrency(self):
+        async def run():
+            return await asyncio.gather(*(self.registry.aget("sargento.a") for _ in range(5)))
+
+        graphs = asyncio.run(run())
+        self.assertTrue(all(g is graphs[0] for g in graphs))
+        self.assertEqual(BUILD_CALLS, ["sargento.a"])
+
+    def test_unknown_unit_raises(self):
+        with self.assertRaises(KeyError):
+            self.registry.get("capitan.fantasma")
+
+    def test_branch_and_warm_up(self):
+        self.assertEqual(self.registry.branch("capitan.y"), ["capitan.y", "teniente.x", "sargento.a", "sargento.b"])
+        compiled = self.registry.warm_up(["capitan.y"])
+        self.assertEqual(sorted(compiled), sorted(BUILD_CALLS))
+        self.assertEqual(len(BUILD_CALLS), 4)
+
+    def test_stats_report_compile_time_and_memory(self):
+        self.registry.track_memory = True
+        self.registry.get("sargento.b")
+        stats = {row["key"]: row for row in self.registry.stats()}
+        self.assertTrue(stats["sargento.b"]["compiled"])
+        self.assertIsNotNone(stats["sargento.b"]["compile_seconds"])
+        self.assertIsNotNone(stats["sargento.b"]["memory_bytes"])
+        self.assertFalse(stats["sargento.a"]["compiled"])
+        self.assertIsNone(stats["sargento.a"]["compile_seconds"])
+
+    def test_army_hierarchy_is_fully_registered(self):
+        """Toda unidad subordinada declarada en el arsenal real debe estar registrada."""
+        branch = graph_registry.branch("coronel")
+        self.assertEqual(set(branch), set(graph_registry.keys()) - {
+            "teniente.hoteles", "teniente.restaurantes", "teniente.guias",
+            "teniente.agencias", "teniente.transporte",
+        })
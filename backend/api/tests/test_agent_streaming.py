@@ -0,0 +1,211 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ai_models import llm_router, local_llm_service
+from ai_models.local_llm_service import StreamError
+from agents.corps import task_queue
+from agents.corps.registry import graph_registry
+from api.models import AgentTask, CustomUser
+
+PLAN_JSON = json.dumps({"plan": [
+    {"task_description": "Buscar hoteles", "responsible_captain": "Turista", "depends_on": []},
+    {"task_description": "Buscar eventos", "responsible_captain": "Publicaciones", "depends_on": []},
+]})
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Servidor de prueba que imita el streaming de Ollama (NDJSON) y de Groq (SSE)."""
+    protocol_version = "HTTP/1.1"
+    ollama_text = "Hola mundo"
+    truncated = False  # Corta el stream antes del cierre (`done` / `[DONE]`).
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        text = self.ollama_text
+        pieces = [text[i:i + 10] for i in range(0, len(text), 10)]
+        if self.path == "/groq":
+            lines = [f"data: {json.dumps({'choices': [{'delta': {'content': p}}]})}\n\n" for p in pieces]
+            body = "".join(lines + ([] if self.truncated else ["data: [DONE]\n\n"]))
+        else:
+            lines = [json.dumps({"message": {"content": p}, "done": False}) for p in pieces]
+            closing = [] if self.truncated else [json.dumps({"message": {"content": ""}, "done": True})]
+            body = "\n".join(lines + closing) + "\n"
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeCaptain:
+    async def ainvoke(self, payload):
+        return {"final_report": f"hecho: {payload['coronel_order']}"}
+
+
+class FakeServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLLMHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+
+class LLMStreamingTests(FakeServerMixin, SimpleTestCase):
+    """Pruebas de los generadores de streaming de Ollama y Groq."""
+
+    async def collect(self, chunks):
+        return [chunk async for chunk in chunks]
+
+    def test_ollama_ndjson_stream(self):
+        with patch.object(local_llm_service, "OLLAMA_API_BASE_URL", f"{self.base_url}/api/chat"):
+            chunks = asyncio.run(self.collect(local_llm_service.stream_local_llm("hola")))
+        self.assertGreater(len(chunks), 0)
+        self.assertEqual("".join(chunks), "Hola mundo")
+
+    def test_groq_sse_stream(self):
+        with patch.object(llm_router, "GROQ_API_URL", f"{self.base_url}/groq"):
+            chunks = asyncio.run(self.collect(llm_router.stream_groq_api("hola", "clave", [])))
+        self.assertEqual("".join(chunks), "Hola mundo")
+
+    def test_groq_stream_without_key_reports_error(self):
+        chunks = asyncio.run(self.collect(llm_router.stream_groq_api("hola", "", [])))
+        self.assertEqual(chunks, ["Error: No se ha proporcionado una clave API para Groq."])
+        self.assertIsInstance(chunks[0], StreamError)
+
+    def test_truncated_streams_end_with_error(self):
+        with patch.object(FakeLLMHandler, "truncated", True), \
+             patch.object(local_llm_service, "OLLAMA_API_BASE_URL", f"{self.base_url}/api/chat"), \
+             patch.object(llm_router, "GROQ_API_URL", f"{self.base_url}/groq"):
+            streams = [
+                asyncio.run(self.collect(local_llm_service.stream_local_llm("hola"))),
+                asyncio.run(self.collect(llm_router.stream_groq_api("hola", "clave", []))),
+            ]
+        for chunks in streams:
+            self.assertEqual("".join(chunks[:-1]), "Hola mundo")
+            self.assertIsInstance(chunks[-1], StreamError)
+            self.assertFalse(any(isinstance(chunk, StreamError) for chunk in chunks[:-1]))
+
+
+QUEUE_SETTINGS = {
+    "MAX_RUNNING_PER_USER": 1,
+    "MAX_PENDING_PER_USER": 2,
+    "TIMEOUT_SECONDS": 10,
+    "HEARTBEAT_SECONDS": 0.05,
+    "EMBEDDED_WORKER": False,
+}
+
+
+@override_settings(AGENT_CHECKPOINTS={"ENABLED": True, "BACKEND": "memory"}, AGENT_TASK_QUEUE=QUEUE_SETTINGS)
+class AgentCommandStreamViewTests(FakeServerMixin, TransactionTestCase):
+    """
+    Pruebas para la vista de streaming del Coronel.
+    Verifica que los tokens del plan y el progreso de las misiones lleguen como eventos SSE.
+    TransactionTestCase: la orden corre en otro hilo, con su propia conexión a la base de datos.
+    """
+    def parse_events(self, body):
+        events = []
+        for block in body.strip().split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in block.split("\n"))
+            events.append((lines["event"], json.loads(lines["data"])))
+        return events
+
+    def parse_event(self, chunk):
+        return self.parse_events(chunk.decode())[0]
+
+    def post_order(self, orden="Planea mi fin de semana"):
+        return self.client.post(reverse("agent-command-stream"), {"orden": orden}, content_type="application/json")
+
+    def blocking_order(self, release, cancelled):
+        """Orden falsa que emite un evento y espera a `release` (o a ser cancelada)."""
+        async def fake_stream(general_order, app_context, task_id=None):
+            yield {"event": "mission_started", "task": "Buscar hoteles"}
+            try:
+                while not release.is_set():
+                    await asyncio.sleep(0.01)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            yield {"event": "report", "report": "hecho", "error": None}
+        return patch("agents.corps.turismo_coronel.stream_general_order", side_effect=fake_stream)
+
+    def test_stream_forwards_tokens_missions_and_report(self):
+        def fake_aget(key):
+            if key == "coronel":
+                return graph_registry.get("coronel")
+            return FakeCaptain()
+
+        with patch.object(FakeLLMHandler, "ollama_text", PLAN_JSON), \
+             patch.object(local_llm_service, "OLLAMA_API_BASE_URL", f"{self.base_url}/api/chat"), \
+             patch("agents.corps.turismo_coronel.graph_registry.aget", side_effect=fake_aget):
+            response = self.post_order()
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            chunks = [chunk for chunk in response.streaming_content if not chunk.startswith(b":")]
+
+        events = [self.parse_event(chunk) for chunk in chunks]
+        types = [event_type for event_type, _ in events]
+        self.assertEqual(types[0], "task")
+        self.assertIn("token", types)
+        self.assertLess(types.index("token"), types.index("plan"))
+        self.assertEqual(types.count("mission_completed"), 2)
+        self.assertEqual(types[-2:], ["report", "done"])
+
+        report = events[-2][1]
+        self.assertIsNone(report["error"])
+        self.assertIn("hecho: Buscar hoteles", report["report"])
+
+        task = AgentTask.objects.get(id=events[0][1]["task_id"])
+        self.assertEqual(task.status, AgentTask.Status.COMPLETED)
+        self.assertEqual(task.report, report["report"])
+
+    def test_events_arrive_while_the_order_runs(self):
+        release, cancelled = threading.Event(), threading.Event()
+        with self.blocking_order(release, cancelled):
+            chunks = iter(self.post_order().streaming_content)
+            task_id = self.parse_event(next(chunks))[1]["task_id"]
+            # El progreso llega antes de que la orden termine (no se acumula el stream entero).
+            self.assertEqual(self.parse_event(next(chunks))[0], "mission_started")
+            self.assertEqual(next(chunks), b": keep-alive\n\n")
+            self.assertEqual(AgentTask.objects.get(id=task_id).status, AgentTask.Status.RUNNING)
+            release.set()
+            events = [self.parse_event(chunk) for chunk in chunks if not chunk.startswith(b":")]
+
+        self.assertEqual([event_type for event_type, _ in events], ["report", "done"])
+        self.assertEqual(events[-1][1]["status"], AgentTask.Status.COMPLETED)
+        self.assertEqual(AgentTask.objects.get(id=task_id).status, AgentTask.Status.COMPLETED)
+
+    def test_client_disconnect_cancels_the_order(self):
+        release, cancelled = threading.Event(), threading.Event()
+        with self.blocking_order(release, cancelled):
+            response = self.post_order()
+            chunks = iter(response.streaming_content)
+            task_id = self.parse_event(next(chunks))[1]["task_id"]
+            next(chunks)
+            response.close()  # Lo que hace el servidor WSGI cuando el cliente se desconecta.
+            self.assertTrue(cancelled.wait(timeout=2))
+
+        task = AgentTask.objects.get(id=task_id)
+        self.assertEqual((task.status, task.report), (AgentTask.Status.FAILED, task_queue.CANCELLED_REPORT))
+
+    def test_stream_respects_running_limit_per_user(self):
+        user = CustomUser.objects.create_user(username='general', email='general@example.com', password='password123')
+        AgentTask.objects.create(user=user, command='en curso', status=AgentTask.Status.RUNNING)
+        self.client.force_login(user)
+
+        response = self.post_order()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(AgentTask.objects.filter(user=user).count(), 1)
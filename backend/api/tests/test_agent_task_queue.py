@@ -0,0 +1,214 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from agents.corps import task_queue
+from agents.corps.task_queue import (
+    AgentTaskWorker, TaskQueueFull, claim_tasks, claimable_tasks, enqueue_agent_task, heartbeat_tasks, requeue_stale_tasks,
+)
+from api.models import AgentTask, CustomUser
+
+QUEUE_SETTINGS = {
+    "WORKERS": 4,
+    "MAX_RUNNING_PER_USER": 1,
+    "MAX_PENDING_PER_USER": 2,
+    "TIMEOUT_SECONDS": 5,
+    "POLL_INTERVAL_SECONDS": 0.1,
+    "HEARTBEAT_SECONDS": 30,
+    "STALE_AFTER_SECONDS": 120,
+    "MAX_ATTEMPTS": 2,
+    "EMBEDDED_WORKER": False,
+}
+
+
+@override_settings(AGENT_TASK_QUEUE=QUEUE_SETTINGS)
+class AgentTaskAPITests(APITestCase):
+    """Pruebas de los endpoints de órdenes: encolado, límites por usuario y consulta del estado."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='general', email='general@example.com', password='password123')
+        self.other = CustomUser.objects.create_user(username='otro', email='otro@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    def test_command_enqueues_task(self):
+        response = self.client.post(reverse('agent-command'), {'orden': 'Planea mi viaje'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        task = AgentTask.objects.get(id=response.data['task_id'])
+        self.assertEqual((task.user, task.status, task.command), (self.user, AgentTask.Status.PENDING, 'Planea mi viaje'))
+
+    def test_pending_limit_per_user(self):
+        for _ in range(QUEUE_SETTINGS["MAX_PENDING_PER_USER"]):
+            self.client.post(reverse('agent-command'), {'orden': 'orden'}, format='json')
+        response = self.client.post(reverse('agent-command'), {'orden': 'una más'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(AgentTask.objects.filter(user=self.user).count(), QUEUE_SETTINGS["MAX_PENDING_PER_USER"])
+
+    def test_status_uses_etag_and_hides_foreign_tasks(self):
+        task = AgentTask.objects.create(user=self.user, command='orden')
+        url = reverse('agent-task-status', kwargs={'id': task.id})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], AgentTask.Status.PENDING)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        task.status = AgentTask.Status.COMPLETED
+        task.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        foreign = AgentTask.objects.create(user=self.other, command='ajena')
+        response = self.client.get(reverse('agent-task-status', kwargs={'id': foreign.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_guests_have_separate_quotas_and_can_read_their_tasks(self):
+        self.client.force_authenticate(None)
+        for _ in range(QUEUE_SETTINGS["MAX_PENDING_PER_USER"]):
+            self.client.post(reverse('agent-command'), {'orden': 'orden'}, format='json', REMOTE_ADDR='10.0.0.1')
+        response = self.client.post(reverse('agent-command'), {'orden': 'una más'}, format='json', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post(reverse('agent-command'), {'orden': 'otro turista'}, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.get(reverse('agent-task-status', kwargs={'id': response.data['task_id']}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['command'], 'otro turista')
+
+        foreign = AgentTask.objects.create(user=self.user, command='privada')
+        response = self.client.get(reverse('agent-task-status', kwargs={'id': foreign.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(AGENT_TASK_QUEUE=QUEUE_SETTINGS)
+class AgentTaskWorkerTests(TestCase):
+    """Pruebas de la cola: reclamo con tope por usuario, ejecución, tiempo máximo y recuperación."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='general', email='general@example.com', password='password123')
+        self.other = CustomUser.objects.create_user(username='otro', email='otro@example.com', password='password123')
+
+    def test_claim_respects_running_limit_per_user(self):
+        first = enqueue_agent_task('primera', self.user)
+        enqueue_agent_task('segunda', self.user)
+        foreign = enqueue_agent_task('ajena', self.other)
+
+        claimed = claim_tasks(limit=4)
+        self.assertEqual([task.pk for task in claimed], [first.pk, foreign.pk])
+        self.assertEqual(AgentTask.objects.filter(status=AgentTask.Status.RUNNING).count(), 2)
+        self.assertEqual(claim_tasks(limit=4), [])
+
+    def test_claim_limits_each_guest_separately(self):
+        first = enqueue_agent_task('primera', None, 'visitante-a')
+        enqueue_agent_task('segunda', None, 'visitante-a')
+        other_guest = enqueue_agent_task('otra', None, 'visitante-b')
+
+        claimed = claim_tasks(limit=4)
+        self.assertEqual([task.pk for task in claimed], [first.pk, other_guest.pk])
+
+    def test_enqueue_raises_when_queue_full(self):
+        for _ in range(QUEUE_SETTINGS["MAX_PENDING_PER_USER"]):
+            enqueue_agent_task('orden', self.user)
+        with self.assertRaises(TaskQueueFull):
+            enqueue_agent_task('orden', self.user)
+
+    def test_requeue_stale_tasks(self):
+        stale = AgentTask.objects.create(user=self.user, command='caída', status=AgentTask.Status.RUNNING)
+        fresh = AgentTask.objects.create(user=self.other, command='viva', status=AgentTask.Status.RUNNING)
+        AgentTask.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale_tasks(), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, fresh.status), (AgentTask.Status.PENDING, AgentTask.Status.RUNNING))
+
+    def test_task_that_keeps_killing_its_worker_fails(self):
+        task = enqueue_agent_task('letal', self.user)
+        for attempt in range(1, QUEUE_SETTINGS["MAX_ATTEMPTS"] + 1):
+            self.assertEqual([claimed.attempts for claimed in claim_tasks(limit=1)], [attempt])
+            AgentTask.objects.filter(pk=task.pk).update(updated_at=timezone.now() - timedelta(hours=1))  # Worker caído.
+            requeue_stale_tasks()
+
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (AgentTask.Status.FAILED, QUEUE_SETTINGS["MAX_ATTEMPTS"]))
+        self.assertIn("2 intentos", task.report)
+        self.assertEqual(claim_tasks(limit=1), [])
+
+    def test_claim_locks_only_task_rows_on_postgres(self):
+        from django.db.backends.postgresql.base import DatabaseWrapper
+
+        # Se compila sin servidor: FOR UPDATE sobre el LEFT JOIN con el usuario falla en Postgres.
+        postgres = DatabaseWrapper({
+            "NAME": "turismo", "USER": "", "PASSWORD": "", "HOST": "", "PORT": "", "OPTIONS": {}, "TIME_ZONE": None,
+            "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "AUTOCOMMIT": True, "ATOMIC_REQUESTS": False, "TEST": {},
+        }, alias="postgres-sql")
+        postgres.connection, postgres.autocommit = object(), False
+        sql = claimable_tasks(5).query.get_compiler(connection=postgres).as_sql()[0]
+        self.assertIn('LEFT OUTER JOIN "api_customuser"', sql)
+        self.assertTrue(sql.endswith('FOR UPDATE OF "api_agenttask" SKIP LOCKED'))
+
+    def test_heartbeat_keeps_running_tasks_fresh(self):
+        task = AgentTask.objects.create(user=self.user, command='larga', status=AgentTask.Status.RUNNING)
+        AgentTask.objects.filter(pk=task.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(heartbeat_tasks([str(task.pk)]), 1)
+        self.assertEqual(requeue_stale_tasks(), 0)
+
+    async def test_worker_loop_requeues_abandoned_tasks(self):
+        calls = []
+
+        async def fake_run(command, app_context, task_id=None):
+            calls.append(command)
+            await asyncio.sleep(0.3)  # Más que STALE_AFTER_SECONDS: solo el latido la mantiene viva.
+            return {"event": "report", "report": f"hecho: {command}", "error": None}
+
+        abandoned = await AgentTask.objects.acreate(user=self.user, command='abandonada', status=AgentTask.Status.RUNNING)
+        await AgentTask.objects.filter(pk=abandoned.pk).aupdate(updated_at=timezone.now() - timedelta(hours=1))
+
+        stop = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.8, stop.set)
+        fast = {**QUEUE_SETTINGS, "HEARTBEAT_SECONDS": 0.05, "STALE_AFTER_SECONDS": 0.15}
+        with override_settings(AGENT_TASK_QUEUE=fast), \
+             patch('agents.corps.turismo_coronel.run_general_order', side_effect=fake_run):
+            await AgentTaskWorker().run(stop)
+
+        await abandoned.arefresh_from_db()
+        self.assertEqual(abandoned.status, AgentTask.Status.COMPLETED)
+        self.assertEqual(calls, ['abandonada'])  # El latido evitó que se volviera a encolar.
+
+    async def test_worker_runs_tasks_and_stores_reports(self):
+        calls = []
+
+        async def fake_run(command, app_context, task_id=None):
+            calls.append((command, app_context["user"].username, str(task_id)))
+            return {"event": "report", "report": f"hecho: {command}", "error": None}
+
+        first = await sync_to_async(enqueue_agent_task)('primera', self.user)
+        second = await sync_to_async(enqueue_agent_task)('segunda', self.user)
+        with patch('agents.corps.turismo_coronel.run_general_order', side_effect=fake_run):
+            await AgentTaskWorker().drain()
+
+        self.assertEqual(calls, [('primera', 'general', str(first.id)), ('segunda', 'general', str(second.id))])
+        for task in (first, second):
+            await task.arefresh_from_db()
+            self.assertEqual(task.status, AgentTask.Status.COMPLETED)
+            self.assertEqual(task.report, f"hecho: {task.command}")
+
+    async def test_worker_enforces_timeout(self):
+        async def slow_run(*args, **kwargs):
+            await asyncio.sleep(1)
+
+        task = await sync_to_async(enqueue_agent_task)('lenta', self.user)
+        with override_settings(AGENT_TASK_QUEUE={**QUEUE_SETTINGS, "TIMEOUT_SECONDS": 0.05}), \
+             patch('agents.corps.turismo_coronel.run_general_order', side_effect=slow_run):
+            await AgentTaskWorker().drain()
+
+        await task.arefresh_from_db()
+        self.assertEqual(task.status, AgentTask.Status.FAILED)
+        self.assertEqual(task.report, task_queue.TIMEOUT_REPORT.format(seconds=0.05))
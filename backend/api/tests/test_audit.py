@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.audit import (
+    add_months, archive_table, archived_months, audit_batch, export_path, month_start, read_export, record_audit,
+)
+from api.models import AuditLog, CustomUser
+
+
+class AuditTrailTests(APITestCase):
+    """Pruebas de la escritura de la bitácora: solo lo confirmado, por lotes y con detalles en JSON."""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            username='jefa', email='jefa@example.com', password='password123', role=CustomUser.Role.ADMIN
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_api_writes_are_audited_with_structured_details(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('contenido-municipio-list'), {
+                "seccion": "INTRODUCCION", "titulo": "Bienvenida", "contenido": "Texto",
+            })
+        self.assertEqual(response.status_code, 201)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('contenido-municipio-detail', args=[response.data["id"]]))
+
+        created, deleted = AuditLog.objects.order_by('id')
+        self.assertEqual(created.action, AuditLog.Action.CONTENIDO_CREATE)
+        self.assertEqual(created.user, self.admin)
+        self.assertEqual(created.details["campos"], ["contenido", "seccion", "titulo"])
+        self.assertEqual(created.content_type.model, "contenidomunicipio")
+        self.assertEqual((deleted.action, deleted.object_id), (AuditLog.Action.CONTENIDO_DELETE, response.data["id"]))
+        self.assertEqual(deleted.details["objeto"], "Introducción General - Bienvenida")
+
+    def test_user_changes_never_store_values(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('user-admin-detail', args=[self.admin.pk]), {"password": "otra-clave-123"})
+        log = AuditLog.objects.get()
+        self.assertEqual(log.action, AuditLog.Action.USER_UPDATE)
+        self.assertEqual(log.details["campos"], ["password"])
+        self.assertNotIn("otra-clave-123", str(log.details))
+
+    def test_batch_is_flushed_with_one_insert(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            with audit_batch():
+                for i in range(5):
+                    record_audit(AuditLog.Action.MENU_UPDATE, user=self.admin, details={"paso": i})
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(sorted(log.details["paso"] for log in AuditLog.objects.all()), [0, 1, 2, 3, 4])
+
+    def test_rolled_back_actions_leave_no_trace(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with audit_batch():
+                record_audit(AuditLog.Action.MENU_CREATE, details={"ok": True})
+                try:
+                    with transaction.atomic():
+                        record_audit(AuditLog.Action.MENU_DELETE)
+                        raise ValueError
+                except ValueError:
+                    pass
+        self.assertEqual(list(AuditLog.objects.values_list('action', flat=True)), [AuditLog.Action.MENU_CREATE])
+
+    def test_api_is_read_only_and_filterable(self):
+        AuditLog.objects.create(user=self.admin, action=AuditLog.Action.MENU_CREATE)
+        AuditLog.objects.create(user=self.admin, action=AuditLog.Action.USER_DELETE)
+        url = reverse('audit-log-list')
+        self.assertEqual(self.client.post(url, {"action": "MENU_CREATE"}).status_code, 405)
+        response = self.client.get(url, {"action": "USER_DELETE"})
+        self.assertEqual([item["action"] for item in response.data["results"]], ["USER_DELETE"])
+
+
+class AuditRetentionTests(TestCase):
+    """Pruebas del archivo mensual, la exportación comprimida y la eliminación de meses vencidos."""
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir)
+        self.current = month_start(timezone.localdate())
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            for month in archived_months():
+                cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(archive_table(month))}")
+
+    def log_in_month(self, month, count, action=AuditLog.Action.MENU_UPDATE):
+        logs = AuditLog.objects.bulk_create([AuditLog(action=action, details={"n": i}) for i in range(count)])
+        moment = timezone.make_aware(timezone.datetime(month.year, month.month, 15, 12))
+        AuditLog.objects.filter(pk__in=[log.pk for log in logs]).update(timestamp=moment)
+
+    def run_retention(self, **options):
+        out = StringIO()
+        call_command('audit_retention', export_dir=self.export_dir, stdout=out, **options)
+        return out.getvalue()
+
+    def test_old_months_are_archived_and_exported(self):
+        old, recent = add_months(self.current, -8), add_months(self.current, -1)
+        self.log_in_month(old, 3)
+        self.log_in_month(recent, 2)
+
+        self.run_retention(keep_months=6)
+
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.assertEqual(archived_months(), [old])
+        rows = list(read_export(export_path(self.export_dir, old)))
+        self.assertEqual(sorted(row["details"]["n"] for row in rows), [0, 1, 2])
+        self.assertEqual(rows[0]["action"], AuditLog.Action.MENU_UPDATE)
+
+    def test_expired_archives_are_dropped_only_after_export(self):
+        expired = add_months(self.current, -30)
+        self.log_in_month(expired, 1)
+
+        output = StringIO()
+        call_command('audit_retention', keep_months=6, archive_months=24, stdout=output)  # Sin carpeta de exportación.
+        self.assertEqual(archived_months(), [expired])
+        self.assertIn("sin exportar", output.getvalue())
+
+        self.run_retention(keep_months=6, archive_months=24)
+        self.assertEqual(archived_months(), [])
+        self.assertTrue(export_path(self.export_dir, expired).exists())
+
+    def test_dry_run_changes_nothing(self):
+        self.log_in_month(add_months(self.current, -12), 2)
+        output = self.run_retention(keep_months=3, dry_run=True)
+        self.assertIn("Se archivaría", output)
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.assertEqual(archived_months(), [])
+
+    def test_month_helpers(self):
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(add_months(date(2026, 11, 1), 2), date(2027, 1, 1))
+        self.assertEqual(month_start(date(2026, 3, 31) + timedelta(days=1)), date(2026, 4, 1))
@@ -0,0 +1,85 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.generic_relations import prefetch_generic_objects
+from api.models import (
+    AtractivoTuristico, AuditLog, CustomUser, ElementoGuardado, ImagenGaleria, PrestadorServicio, Publicacion,
+)
+from api.tests.query_budget import QueryBudgetMixin
+from api.trip_plan import rebuild_snapshots
+from tools.herramientas_turista import ver_elementos_guardados
+
+
+class GenericRelationBatchTests(QueryBudgetMixin, APITestCase):
+    """Pruebas de la resolución en lote de GenericForeignKey en 'Mi Viaje', auditoría y herramientas."""
+
+    def setUp(self):
+        self.turista = CustomUser.objects.create_user(
+            username='viajera', email='viajera@example.com', password='password123', role=CustomUser.Role.TURISTA
+        )
+        self.admin = CustomUser.objects.create_user(
+            username='jefa', email='jefa@example.com', password='password123', role=CustomUser.Role.ADMIN
+        )
+        owner = CustomUser.objects.create_user(username='dueno', email='dueno@example.com', password='password123')
+        self.prestador = PrestadorServicio.objects.create(usuario=owner, nombre_negocio="Hotel Casanare", aprobado=True)
+
+    def populate_mi_viaje(self, count):
+        # Mitad atractivos, mitad publicaciones; carga masiva sin señales.
+        start = ElementoGuardado.objects.count()
+        atractivos = AtractivoTuristico.objects.bulk_create([
+            AtractivoTuristico(nombre=f"Atractivo {i}", slug=f"atractivo-{i}", descripcion="-", como_llegar="-")
+            for i in range(start, count, 2)
+        ])
+        publicaciones = Publicacion.objects.bulk_create([
+            Publicacion(titulo=f"Evento {i}", slug=f"evento-{i}", contenido="-", tipo=Publicacion.Tipo.EVENTO)
+            for i in range(start + 1, count, 2)
+        ])
+        ElementoGuardado.objects.bulk_create([
+            ElementoGuardado(usuario=self.turista, content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk)
+            for obj in atractivos + publicaciones
+        ])
+        rebuild_snapshots(self.turista)  # Lo que hace `manage.py rebuild_trip_snapshots` tras una carga masiva.
+
+    def populate_audit_logs(self, count):
+        start = AuditLog.objects.count()
+        imagenes = ImagenGaleria.objects.bulk_create([
+            ImagenGaleria(prestador=self.prestador, imagen=f"galeria/{i}.jpg") for i in range(start, count)
+        ])
+        AuditLog.objects.bulk_create([
+            AuditLog(user=self.admin, action=AuditLog.Action.CONTENIDO_UPDATE, content_type=ContentType.objects.get_for_model(imagen),
+                     object_id=imagen.pk)
+            for imagen in imagenes
+        ])
+
+    def test_mi_viaje_query_count_is_constant(self):
+        self.client.force_authenticate(self.turista)
+        # Conteo de la paginación y la página, desde la copia: sin consultas por tipo destino.
+        response = self.assertQueryBudget(reverse('elemento-guardado-list'), 2, self.populate_mi_viaje)
+        types = {item['content_type_name'] for item in response.data['results']}
+        self.assertLessEqual(types, {'atractivoturistico', 'publicacion'})
+        self.assertTrue(all(item['content_object'] for item in response.data['results']))
+
+    def test_audit_log_query_count_is_constant(self):
+        self.client.force_authenticate(self.admin)
+        response = self.assertQueryBudget(reverse('audit-log-list'), 3, self.populate_audit_logs)
+        self.assertEqual(response.data['results'][0]['content_object_str'], "Imagen de Hotel Casanare")
+
+    def test_missing_targets_resolve_to_none_without_extra_queries(self):
+        self.populate_mi_viaje(4)
+        # Destinos inexistentes (p. ej. borrados con SQL directo): los guardados quedan huérfanos.
+        ElementoGuardado.objects.filter(content_type=ContentType.objects.get_for_model(AtractivoTuristico)).update(
+            object_id=F('object_id') + 10 ** 6
+        )
+        with self.assertNumQueries(3):  # Elementos + un in_bulk por cada tipo destino.
+            elementos = prefetch_generic_objects(ElementoGuardado.objects.all())
+        with self.assertNumQueries(0):
+            nombres = sorted(str(el.content_object) for el in elementos)
+        self.assertEqual(nombres, ["None", "None", "[Evento] Evento 1", "[Evento] Evento 3"])
+
+    def test_turista_tool_lists_saved_items_in_batch(self):
+        self.populate_mi_viaje(20)
+        with self.assertNumQueries(2):  # Turista y elementos (desde la copia, sin resolver destinos).
+            result = ver_elementos_guardados.invoke({"turista_id": self.turista.pk})
+        self.assertEqual(len(result["mi_viaje"]), 20)
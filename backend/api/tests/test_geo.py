@@ -0,0 +1,139 @@
+import random
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.geo import covering_cells, geohash_encode, geohash_successor, haversine_km, nearby, refresh_locations
+from api.models import (
+    Artesano, AtractivoTuristico, CategoriaPrestador, CustomUser, GeoPoint, PrestadorServicio, RubroArtesano,
+)
+
+CENTER = (4.3155, -72.0819)  # Puerto Gaitán
+
+
+class GeoIndexTests(APITestCase):
+    """Índice geoespacial: mantenimiento al guardar y búsqueda por cercanía."""
+
+    def setUp(self):
+        self.categoria = CategoriaPrestador.objects.create(nombre="Hoteles", slug="hoteles")
+        self.rubro = RubroArtesano.objects.create(nombre="Tejidos", slug="tejidos")
+
+    def create_prestador(self, name, lat, lng, aprobado=True):
+        user = CustomUser.objects.create_user(username=name, email=f"{name}@example.com", password="password123")
+        return PrestadorServicio.objects.create(
+            usuario=user, categoria=self.categoria, nombre_negocio=name, latitud=lat, longitud=lng, aprobado=aprobado,
+        )
+
+    def create_artesano(self, name, lat, lng):
+        user = CustomUser.objects.create_user(username=name, email=f"{name}@example.com", password="password123")
+        return Artesano.objects.create(
+            usuario=user, rubro=self.rubro, nombre_taller=name, nombre_artesano="Ana", latitud=lat, longitud=lng, aprobado=True,
+        )
+
+    def create_atractivo(self, name, lat, lng):
+        return AtractivoTuristico.objects.create(
+            nombre=name, slug=name, descripcion="-", como_llegar="-", categoria_color="BLANCO",
+            latitud=lat, longitud=lng, es_publicado=True,
+        )
+
+    def test_geohash_known_value(self):
+        self.assertEqual(geohash_encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    def test_prefix_bound_uses_only_geohash_characters(self):
+        # Con "~" como cota, las collations de locale de Postgres ordenan "6r3x5" antes que "6r3~".
+        self.assertEqual(geohash_successor("6r3x"), "6r3y")
+        self.assertEqual(geohash_successor("d2zz"), "d3")
+        self.assertIsNone(geohash_successor("zz"))
+        for value in ("6r3x0", "6r3x5", "6r3xzzzzz"):
+            self.assertTrue("6r3x" <= value < geohash_successor("6r3x"))
+
+    def test_index_follows_saves_and_deletes(self):
+        prestador = self.create_prestador("hotel", *CENTER)
+        point = GeoPoint.objects.get(entity_type="prestador", object_id=prestador.pk)
+        self.assertEqual(point.tipo, "hoteles")
+        self.assertEqual(point.geohash, geohash_encode(*CENTER))
+
+        prestador.latitud = 4.4
+        prestador.save()
+        self.assertEqual(GeoPoint.objects.get(object_id=prestador.pk).latitud, 4.4)
+
+        prestador.latitud = None
+        prestador.save()
+        self.assertFalse(GeoPoint.objects.exists())
+
+        atractivo = self.create_atractivo("laguna", *CENTER)
+        self.assertEqual(GeoPoint.objects.get().tipo, "atractivo_blanco")
+        atractivo.delete()
+        self.assertFalse(GeoPoint.objects.exists())
+
+    def test_bulk_updates_are_refreshed(self):
+        prestador = self.create_prestador("hotel", *CENTER, aprobado=False)
+        self.assertEqual(nearby(*CENTER, 1), [])
+        queryset = PrestadorServicio.objects.filter(pk=prestador.pk)
+        queryset.update(aprobado=True)  # Sin señales.
+        self.assertEqual(nearby(*CENTER, 1), [])
+        self.assertEqual(refresh_locations(queryset), 1)
+        self.assertEqual([location["id"] for location in nearby(*CENTER, 1)], [f"prestador-{prestador.pk}"])
+
+    def test_nearby_is_sorted_limited_and_typed(self):
+        far = self.create_prestador("lejos", CENTER[0] + 0.03, CENTER[1])
+        near = self.create_artesano("cerca", CENTER[0] + 0.01, CENTER[1])
+        self.create_atractivo("medio", CENTER[0], CENTER[1] + 0.02)
+        self.create_prestador("fuera", CENTER[0] + 1, CENTER[1])
+
+        results = nearby(*CENTER, 10)
+        self.assertEqual([location["nombre"] for location in results], ["cerca", "medio", "lejos"])
+        self.assertEqual(results[0]["id"], f"artesano-{near.pk}")
+        self.assertAlmostEqual(results[0]["distancia_km"], 1.11, places=2)
+        self.assertEqual(len(nearby(*CENTER, 10, k=2)), 2)
+        self.assertEqual([location["id"] for location in nearby(*CENTER, 10, types=["prestador"])], [f"prestador-{far.pk}"])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        points = []
+        for index in range(1500):
+            lat, lng = CENTER[0] + rng.uniform(-0.5, 0.5), CENTER[1] + rng.uniform(-0.5, 0.5)
+            points.append(GeoPoint(
+                entity_type="prestador", object_id=index, nombre=str(index), tipo="hoteles", url_detalle="",
+                latitud=lat, longitud=lng, geohash=geohash_encode(lat, lng), is_public=True,
+            ))
+        GeoPoint.objects.bulk_create(points)
+
+        for _ in range(10):
+            lat, lng = CENTER[0] + rng.uniform(-0.4, 0.4), CENTER[1] + rng.uniform(-0.4, 0.4)
+            radius = rng.choice([0.5, 2, 5, 15, 40])
+            expected = sorted(
+                (haversine_km(lat, lng, p.latitud, p.longitud), p.object_id) for p in points
+                if haversine_km(lat, lng, p.latitud, p.longitud) <= radius
+            )[:50]
+            found = [location["id"] for location in nearby(lat, lng, radius, k=50)]
+            self.assertEqual(found, [f"prestador-{object_id}" for _, object_id in expected])
+
+    def test_covering_cells_contain_the_circle(self):
+        for radius in (0.1, 1, 5, 50):
+            cells = covering_cells(*CENTER, radius)
+            self.assertLessEqual(len(cells), 9)
+            self.assertTrue(any(geohash_encode(*CENTER).startswith(cell) for cell in cells))
+
+    def test_locations_endpoint(self):
+        prestador = self.create_prestador("hotel", *CENTER)
+        self.create_prestador("oculto", *CENTER, aprobado=False)
+        self.create_atractivo("lejano", CENTER[0] + 1, CENTER[1])
+        url = reverse('locations-list')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(
+            {key: response.data[1][key] for key in ("id", "tipo", "url_detalle")},
+            {"id": f"prestador-{prestador.pk}", "tipo": "hoteles", "url_detalle": f"/directorio/prestadores/{prestador.pk}"},
+        )
+        self.assertEqual(len(self.client.get(url, {"types": "atractivo"}).data), 1)
+
+        response = self.client.get(url, {"lat": CENTER[0], "lng": CENTER[1], "radius": 3})
+        self.assertEqual([location["id"] for location in response.data], [f"prestador-{prestador.pk}"])
+        self.assertEqual(response.data[0]["distancia_km"], 0.0)
+
+        for params in ({"lat": CENTER[0]}, {"lat": "x", "lng": 1}, {"lat": 100, "lng": 0},
+                       {"lat": 0, "lng": 0, "radius": 0}, {"types": "hotel"}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
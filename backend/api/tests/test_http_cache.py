@@ -0,0 +1,79 @@
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.http_cache import bump_versions, reset_stats, stats
+from api.models import CategoriaPrestador, ContentVersion, CustomUser, MenuItem, SiteConfiguration, Video
+
+
+@override_settings(HTTP_CACHE={"CACHE_ALIAS": "default"})
+class ConditionalResponseTests(APITestCase):
+    """Pruebas de la capa condicional: ETag/Last-Modified, 304, JSON pre-renderizado e invalidación."""
+
+    def setUp(self):
+        caches["default"].clear()
+        reset_stats()
+        self.root = MenuItem.objects.create(nombre="Inicio", url="/", orden=1)
+        MenuItem.objects.create(nombre="Historia", url="/historia", parent=self.root, orden=1)
+        self.url = reverse('menu-item-list')
+
+    def test_unchanged_content_answers_304_without_touching_tables(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["children"][0]["nombre"], "Historia")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):  # Solo los contadores de versión.
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_rendered_json_is_reused_across_clients(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], "application/json")
+        self.assertEqual(stats(), {"hits": 1, "misses": 1, "not_modified": 0, "hit_ratio": 0.5})
+
+    def test_saving_a_model_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.root.nombre = "Portada"
+        self.root.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["nombre"], "Portada")
+        self.assertEqual(ContentVersion.objects.get(label="api.menuitem").version, 3)
+
+    def test_language_and_query_string_are_part_of_the_key(self):
+        categoria = CategoriaPrestador.objects.create(nombre="Hoteles", nombre_en="Hotels", slug="hoteles")
+        url = reverse('prestador-categorias-list')
+        spanish = self.client.get(url, HTTP_ACCEPT_LANGUAGE="es")
+        english = self.client.get(url, HTTP_ACCEPT_LANGUAGE="en")
+        self.assertNotEqual(spanish["ETag"], english["ETag"])
+        self.assertEqual(english.data["results"][0]["nombre"], "Hotels")
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT_LANGUAGE="es").data["results"][0]["id"], categoria.pk)
+        self.assertNotEqual(self.client.get(url, {"page": 1})["ETag"], spanish["ETag"])
+
+    def test_manual_bump_and_other_endpoints(self):
+        video = Video.objects.create(titulo="Llanos", url_youtube="https://youtu.be/x", es_publicado=True)
+        etag = self.client.get(reverse('videos-list'))["ETag"]
+        Video.objects.filter(pk=video.pk).update(titulo="Llanos orientales")  # Sin señales...
+        self.assertEqual(self.client.get(reverse('videos-list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        bump_versions(Video)  # ...hasta avisar a mano.
+        self.assertEqual(self.client.get(reverse('videos-list'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        SiteConfiguration.load()
+        response = self.client.get(reverse('site-configuration'))
+        self.assertIn("ETag", response)
+
+    def test_disabled_cache_and_stats_endpoint(self):
+        with override_settings(HTTP_CACHE={"ENABLED": False}):
+            self.assertNotIn("ETag", self.client.get(self.url))
+        admin = CustomUser.objects.create_user(
+            username="jefa", email="jefa@example.com", password="password123", role=CustomUser.Role.ADMIN
+        )
+        self.client.force_authenticate(admin)
+        self.assertIn("hit_ratio", self.client.get(reverse('admin-cache-stats')).data["http"])
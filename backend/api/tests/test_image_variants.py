@@ -0,0 +1,160 @@
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from api.image_variants import cached_variants, generate_variants, load_into_cache, supported_formats
+from api.models import HechoHistorico, ImageVariant, ImagenPaginaInstitucional, PaginaInstitucional, Publicacion
+from api.serializers import PaginaInstitucionalSerializer
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_bytes(width, height, mode="RGB", fmt="PNG"):
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), (200, 120, 40, 128) if mode == "RGBA" else (200, 120, 40)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS={"BACKGROUND": False, "WIDTHS": (320, 640, 1600)})
+class ImageVariantTests(APITestCase):
+    """Derivadas de imágenes: generación por anchos y formatos, caché y serializadores."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_widths_formats_and_content_hash_names(self):
+        name = default_storage.save("atractivos/laguna.png", io.BytesIO(image_bytes(2000, 1000, "RGBA")))
+        self.assertTrue(generate_variants(name))
+        variant = ImageVariant.objects.get(original=name)
+        self.assertEqual((variant.width, variant.height), (2000, 1000))
+        self.assertEqual(set(variant.variants), set(supported_formats()))
+        self.assertIn("webp", variant.variants)
+
+        path = variant.variants["jpeg"]["640"]
+        self.assertTrue(path.startswith("atractivos/variantes/laguna-") and path.endswith("-640w.jpg"))
+        self.assertIn(variant.content_hash[:12], path)
+        with default_storage.open(path) as handle:
+            derived = Image.open(handle)
+            self.assertEqual((derived.size, derived.mode), ((640, 320), "RGB"))
+        self.assertEqual(set(variant.variants["webp"]), {"320", "640", "1600"})
+
+        self.assertFalse(generate_variants(name))  # Mismo contenido: no se rehace.
+
+        small = default_storage.save("atractivos/icono.png", io.BytesIO(image_bytes(200, 100)))
+        generate_variants(small)
+        self.assertEqual(set(ImageVariant.objects.get(original=small).variants["jpeg"]), {"200"})
+
+    def test_invalid_or_missing_originals_are_skipped(self):
+        name = default_storage.save("atractivos/roto.jpg", io.BytesIO(b"no es una imagen"))
+        self.assertFalse(generate_variants(name))
+        self.assertFalse(generate_variants("atractivos/no-existe.jpg"))
+        self.assertFalse(ImageVariant.objects.exists())
+
+    def test_saving_a_model_generates_and_serializes_variants(self):
+        url = reverse('publicaciones-list')
+        with self.captureOnCommitCallbacks() as callbacks:  # Las pruebas no confirman la transacción.
+            evento = Publicacion.objects.create(
+                titulo="Festival", slug="festival", contenido="-", tipo=Publicacion.Tipo.EVENTO,
+                imagen_principal=SimpleUploadedFile("festival.jpg", image_bytes(1200, 800, fmt="JPEG"), content_type="image/jpeg"),
+            )
+        name = evento.imagen_principal.name
+        self.assertIsNone(self.client.get(url).data["results"][0]["imagen_principal_variantes"])
+
+        for callback in callbacks:
+            callback()
+        # La generación movió la versión: la representación cacheada del listado se rehace.
+        self.assertIsNotNone(self.client.get(url).data["results"][0]["imagen_principal_variantes"])
+
+        response = self.client.get(reverse('publicaciones-detail', args=[evento.slug]))
+        variantes = response.data["imagen_principal_variantes"]
+        self.assertEqual((variantes["ancho"], variantes["alto"]), (1200, 800))
+        self.assertEqual(list(variantes["formatos"]["webp"]), ["320", "640", "1200"])
+        self.assertTrue(variantes["srcset"]["webp"].startswith("http://testserver/media/"))
+        self.assertTrue(variantes["srcset"]["webp"].endswith(" 1200w"))
+
+        # Con la caché fría, la entrada sale de la tabla y queda en la caché.
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(cached_variants([name])[name])
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(cached_variants([name])[name])
+
+    def test_representation_with_variants_still_loading_is_not_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            evento = Publicacion.objects.create(
+                titulo="Feria", slug="feria", contenido="-", tipo=Publicacion.Tipo.EVENTO,
+                imagen_principal=SimpleUploadedFile("feria.jpg", image_bytes(800, 600, fmt="JPEG"), content_type="image/jpeg"),
+            )
+        url = reverse('publicaciones-list')
+        cache.clear()  # Reinicio o desalojo: el mapa de derivadas ya no está en la caché.
+
+        submitted = []
+        with override_settings(IMAGE_VARIANTS={"BACKGROUND": True, "WIDTHS": (320, 640, 1600)}), \
+                patch("api.image_variants._get_executor") as executor:
+            executor.return_value.submit.side_effect = lambda function, *args: submitted.append(args)
+            self.assertIsNone(self.client.get(url).data["results"][0]["imagen_principal_variantes"])
+            load_into_cache(submitted[0][1])  # Lo que haría el grupo de hilos.
+            variantes = self.client.get(url).data["results"][0]["imagen_principal_variantes"]
+        self.assertEqual((variantes["ancho"], variantes["alto"]), (800, 600))
+        self.assertEqual(evento.imagen_principal.name, submitted[0][1][0])
+
+    def test_http_cache_skips_responses_with_variants_still_loading(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            HechoHistorico.objects.create(
+                ano=1969, titulo="Fundación", descripcion="-", es_publicado=True,
+                imagen=SimpleUploadedFile("fundacion.jpg", image_bytes(800, 600, fmt="JPEG"), content_type="image/jpeg"),
+            )
+        url = reverse('hecho-historico-list')
+        cache.clear()
+
+        submitted = []
+        with override_settings(IMAGE_VARIANTS={"BACKGROUND": True, "WIDTHS": (320, 640, 1600)}), \
+                patch("api.image_variants._get_executor") as executor:
+            executor.return_value.submit.side_effect = lambda function, *args: submitted.append(args)
+            provisional = self.client.get(url)
+            self.assertIsNone(provisional.data["results"][0]["imagen_variantes"])
+            self.assertNotIn("ETag", provisional)  # Sin ETag: el cliente no puede fijarla con un 304.
+            load_into_cache(submitted[0][1])
+            response = self.client.get(url)
+        self.assertEqual(response.data["results"][0]["imagen_variantes"]["ancho"], 800)
+        self.assertIn("ETag", response)
+
+    def test_nested_gallery_with_variants_still_loading_is_not_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pagina = PaginaInstitucional.objects.create(
+                nombre="Secretaría", slug="secretaria", titulo_banner="Bienvenidos",
+                banner=SimpleUploadedFile("banner.jpg", image_bytes(1200, 400, fmt="JPEG"), content_type="image/jpeg"),
+            )
+            ImagenPaginaInstitucional.objects.create(
+                pagina=pagina,
+                imagen=SimpleUploadedFile("galeria.jpg", image_bytes(640, 480, fmt="JPEG"), content_type="image/jpeg"),
+            )
+        pagina.refresh_from_db()
+        cache.clear()
+
+        def gallery_variants():
+            return PaginaInstitucionalSerializer(pagina).data["galeria_imagenes"][0]["imagen_variantes"]
+
+        submitted = []
+        with override_settings(IMAGE_VARIANTS={"BACKGROUND": True, "WIDTHS": (320, 640, 1600)}), \
+                patch("api.image_variants._get_executor") as executor:
+            executor.return_value.submit.side_effect = lambda function, *args: submitted.append(args)
+            load_into_cache([pagina.banner.name])  # Solo falta la galería, que va anidada.
+            self.assertIsNone(gallery_variants())
+            for args in submitted:
+                load_into_cache(args[1])
+            self.assertEqual(gallery_variants()["ancho"], 640)
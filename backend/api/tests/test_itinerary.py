@@ -0,0 +1,138 @@
+import itertools
+import random
+from datetime import date
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.itinerary import Stop, get_itinerary_settings, optimize, parse_opening_hours, plan_itinerary
+from api.models import (
+    AtractivoTuristico, CategoriaPrestador, CustomUser, ElementoGuardado, PrestadorServicio, RutaTuristica,
+)
+from tools.herramientas_turista import planificar_itinerario
+
+CENTER = (4.3155, -72.0819)  # Puerto Gaitán
+MONDAY = date(2026, 10, 19)
+
+
+class OpeningHoursTests(SimpleTestCase):
+    def test_common_formats(self):
+        hours = parse_opening_hours("Lunes a Viernes de 9am a 5pm. Fines de semana de 10am a 6pm.")
+        self.assertEqual(hours[0], [(540, 1020)])
+        self.assertEqual(hours[6], [(600, 1080)])
+
+        hours = parse_opening_hours("Martes a domingo de 8 a 12 y de 2 a 6pm. Lunes cerrado.")
+        self.assertEqual(hours[0], [])
+        self.assertEqual(hours[3], [(480, 720), (840, 1080)])
+
+        self.assertEqual(parse_opening_hours("8:00 a.m. a 12:00 m. y 2:00 p.m. a 6:00 p.m.")[2], [(480, 720), (840, 1080)])
+        self.assertEqual(parse_opening_hours("Sábados y domingos de 7 a 4")[5], [(420, 960)])
+        self.assertEqual(parse_opening_hours("Abierto 24 horas")[1], [(0, 1440)])
+
+    def test_unparseable_text_means_unknown(self):
+        self.assertIsNone(parse_opening_hours(""))
+        self.assertIsNone(parse_opening_hours("Consultar previamente con el guía"))
+
+
+class RouteOptimizerTests(SimpleTestCase):
+    def test_matches_exhaustive_search_on_small_routes(self):
+        rng = random.Random(11)
+        config = get_itinerary_settings()
+        for _ in range(25):
+            stops = [
+                Stop(id=str(i), nombre=str(i), tipo="atractivo", url_detalle="",
+                     lat=CENTER[0] + rng.uniform(-0.3, 0.3), lng=CENTER[1] + rng.uniform(-0.3, 0.3))
+                for i in range(rng.randint(2, 7))
+            ]
+            order, matrix = optimize(stops, None, 480, config)
+            self.assertEqual(sorted(order), list(range(len(stops) + 1)))
+            length = sum(matrix[a][b] for a, b in zip(order, order[1:]))
+            best = min(
+                sum(matrix[a][b] for a, b in zip((0,) + path, path))
+                for path in itertools.permutations(range(1, len(stops) + 1))
+            )
+            self.assertLessEqual(length, best * 1.02)
+
+    def test_opening_hours_reorder_the_visit(self):
+        config = get_itinerary_settings()
+        # La parada más cercana solo abre por la tarde: conviene visitarla al final.
+        stops = [
+            Stop(id="tarde", nombre="tarde", tipo="atractivo", url_detalle="", lat=CENTER[0] + 0.01, lng=CENTER[1],
+                 visit_minutes=60, windows=[(840, 1080)]),
+            Stop(id="lejos", nombre="lejos", tipo="atractivo", url_detalle="", lat=CENTER[0] + 0.05, lng=CENTER[1],
+                 visit_minutes=60),
+        ]
+        order, _ = optimize(stops, CENTER, 480, config)
+        self.assertEqual([stops[node - 1].id for node in order[1:]], ["lejos", "tarde"])
+
+
+class ItineraryApiTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.categoria = CategoriaPrestador.objects.create(nombre="Hoteles", slug="hoteles")
+        self.turista = CustomUser.objects.create_user(
+            username="viajera", email="viajera@example.com", password="password123", role=CustomUser.Role.TURISTA
+        )
+        self.museo = self.create_atractivo("Museo", CENTER[0] + 0.02, CENTER[1], "Martes a domingo de 9am a 5pm. Lunes cerrado.")
+        self.parque = self.create_atractivo("Parque", CENTER[0] + 0.01, CENTER[1], "")
+        self.sin_mapa = self.create_atractivo("Sin mapa", None, None, "")
+        user = CustomUser.objects.create_user(username="hotel", email="hotel@example.com", password="password123")
+        self.hotel = PrestadorServicio.objects.create(
+            usuario=user, categoria=self.categoria, nombre_negocio="Hotel", latitud=CENTER[0], longitud=CENTER[1], aprobado=True,
+        )
+        self.ruta = RutaTuristica.objects.create(nombre="Ruta", slug="ruta", descripcion="-", imagen_principal="rutas/x.jpg")
+        self.ruta.atractivos.add(self.museo, self.parque, self.sin_mapa)
+        self.ruta.prestadores.add(self.hotel)
+
+    def create_atractivo(self, name, lat, lng, horario):
+        return AtractivoTuristico.objects.create(
+            nombre=name, slug=name.lower().replace(" ", "-"), descripcion="-", como_llegar="-", categoria_color="BLANCO",
+            latitud=lat, longitud=lng, horario_funcionamiento=horario, es_publicado=True,
+        )
+
+    def test_route_itinerary(self):
+        url = reverse('ruta-turistica-itinerario', args=[self.ruta.pk])
+        response = self.client.get(url, {"fecha": "2026-10-20", "inicio": "09:00", "lat": CENTER[0], "lng": CENTER[1]})
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual([stop["nombre"] for stop in data["paradas"]], ["Hotel", "Parque", "Museo"])
+        self.assertEqual(data["omitidas"], 1)
+        self.assertEqual(data["paradas"][0]["llegada"], "09:00")
+        self.assertTrue(data["horarios_respetados"])
+        self.assertAlmostEqual(data["distancia_total_km"], 2.22, places=1)
+
+        # El lunes el museo está cerrado.
+        monday = self.client.get(url, {"fecha": MONDAY.isoformat()}).data
+        self.assertFalse(monday["horarios_respetados"])
+        self.assertTrue(next(stop for stop in monday["paradas"] if stop["nombre"] == "Museo")["fuera_de_horario"])
+
+        for params in ({"fecha": "20-10-2026"}, {"inicio": "25:00"}, {"lat": CENTER[0]}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+    def test_result_is_cached_until_the_stops_change(self):
+        items = [("atractivo", self.museo.pk), ("atractivo", self.parque.pk)]
+        first = plan_itinerary(items, day=MONDAY)
+        with self.assertNumQueries(2):  # Solo la lectura de las paradas.
+            self.assertEqual(plan_itinerary(items, day=MONDAY), first)
+        self.parque.latitud = CENTER[0] + 0.5
+        self.parque.save()
+        self.assertNotEqual(plan_itinerary(items, day=MONDAY)["distancia_total_km"], first["distancia_total_km"])
+
+    def test_mi_viaje_itinerary_and_tool(self):
+        for obj in (self.museo, self.hotel):
+            ElementoGuardado.objects.create(
+                usuario=self.turista, content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk
+            )
+        self.client.force_authenticate(self.turista)
+        response = self.client.get(reverse('elemento-guardado-itinerario'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({stop["id"] for stop in response.data["paradas"]}, {f"atractivo-{self.museo.pk}", f"prestador-{self.hotel.pk}"})
+
+        result = planificar_itinerario.invoke({"turista_id": self.turista.pk, "fecha": "2026-10-20"})
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(len(result["itinerario"]["paradas"]), 2)
+        result = planificar_itinerario.invoke({"ruta_id": self.ruta.pk})
+        self.assertEqual(result["status"], "error")  # La ruta no está publicada.
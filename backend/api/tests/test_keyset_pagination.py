@@ -0,0 +1,89 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.models import AuditLog, CustomUser, Sugerencia
+
+
+class KeysetPaginationTests(APITestCase):
+    """Pruebas de la paginación por cursor opcional de las tablas grandes."""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            username='jefa', email='jefa@example.com', password='password123', role=CustomUser.Role.ADMIN
+        )
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('audit-log-list')
+
+    def populate(self, count, same_timestamp=False):
+        AuditLog.objects.bulk_create([
+            AuditLog(user=self.admin, action=AuditLog.Action.CONTENIDO_UPDATE, details=f"cambio {i}") for i in range(count)
+        ])
+        if same_timestamp:  # Empates en la primera columna: decide el id.
+            AuditLog.objects.update(timestamp=timezone.now())
+
+    def walk(self, url, params):
+        ids, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item["id"] for item in response.data["results"])
+            pages += 1
+            if not response.data["next"]:
+                return ids, pages, response
+            response = self.client.get(response.data["next"])
+
+    def test_default_pagination_is_unchanged(self):
+        self.populate(12)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["count"], 12)
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_cursor_mode_walks_every_row_once_in_order(self):
+        self.populate(25, same_timestamp=True)
+        ids, pages, _ = self.walk(self.url, {"pagination": "cursor"})
+        expected = list(AuditLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_previous_link_returns_the_earlier_page(self):
+        self.populate(25)
+        first = self.client.get(self.url, {"pagination": "cursor", "page_size": 5})
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual([item["id"] for item in back.data["results"]], [item["id"] for item in first.data["results"]])
+        self.assertIsNone(back.data["previous"])
+        self.assertEqual(back.data["next"], first.data["next"].replace("pagination=cursor&", ""))
+
+    def test_cursor_pages_skip_count_and_keep_a_constant_cost(self):
+        self.populate(60)
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(self.url, {"pagination": "cursor"})
+        self.assertNotIn("count", response.data)
+        for _ in range(4):
+            response = self.client.get(response.data["next"])
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(response.data["next"])
+        self.assertEqual(len(deep), len(first))
+        self.assertFalse(any("COUNT(" in query["sql"].upper() or "OFFSET" in query["sql"].upper() for query in deep.captured_queries))
+
+    def test_optional_counts(self):
+        self.populate(7)
+        exact = self.client.get(self.url, {"pagination": "cursor", "count": "exact"})
+        self.assertEqual((exact.data["count"], exact.data["count_is_approximate"]), (7, False))
+        # Fuera de PostgreSQL (o con tablas pequeñas) la cuenta "aproximada" es la exacta.
+        approx = self.client.get(self.url, {"pagination": "cursor", "count": "approx"})
+        self.assertEqual(approx.data["count"], 7)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get(self.url, {"cursor": "no-es-un-cursor"}).status_code, 404)
+
+    def test_other_views_opt_in(self):
+        Sugerencia.objects.bulk_create([Sugerencia(mensaje=f"Idea {i}") for i in range(3)])
+        ids, _, _ = self.walk(reverse('sugerencia-admin-list'), {"pagination": "cursor", "page_size": 2})
+        self.assertEqual(ids, list(Sugerencia.objects.order_by('-fecha_envio', '-id').values_list('id', flat=True)))
+        ids, _, _ = self.walk(reverse('admin-usuario-list'), {"pagination": "cursor"})
+        self.assertEqual(ids, [self.admin.pk])
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from django.test import SimpleTestCase
+
+from ai_models import local_llm_service
+from ai_models.http_clients import LLMClientLifespanMiddleware, LLMClientManager, llm_clients
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Servidor Ollama de prueba con keep-alive (HTTP/1.1)."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps({"message": {"content": f"eco: {payload['messages'][-1]['content']}"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LLMClientPoolTests(SimpleTestCase):
+    """
+    Pruebas para el pool de clientes HTTP de los LLM.
+    Verifica la reutilización de conexiones, las métricas y el cierre en el lifespan ASGI.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/api/chat"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_connections_are_reused_within_a_loop(self):
+        manager = LLMClientManager()
+
+        async def run():
+            for i in range(3):
+                response = await manager.post("ollama", self.url, json={"messages": [{"content": str(i)}]})
+                self.assertEqual(response.status_code, 200)
+            self.assertIs(manager.get_client("ollama"), manager.get_client("ollama"))
+            await manager.aclose()
+
+        asyncio.run(run())
+        stats = manager.stats()["ollama"]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertEqual(stats["reused_connections"], 2)
+
+    def test_local_llm_uses_shared_pool(self):
+        llm_clients.reset_stats()
+
+        async def run():
+            first = await local_llm_service.invoke_local_llm("hola")
+            second = await local_llm_service.invoke_local_llm("adiós")
+            await llm_clients.aclose()
+            return first, second
+
+        with patch.object(local_llm_service, "OLLAMA_API_BASE_URL", self.url):
+            first, second = asyncio.run(run())
+        self.assertEqual((first, second), ("eco: hola", "eco: adiós"))
+        self.assertEqual(llm_clients.stats()["ollama"]["new_connections"], 1)
+
+    def test_clients_are_closed_when_their_loop_ends(self):
+        manager = LLMClientManager()
+
+        async def run():
+            return manager.get_client("ollama")
+
+        client = asyncio.run(run())  # Como async_to_sync: un loop efímero sin `aclose()` explícito.
+        self.assertTrue(client.is_closed)
+
+    def test_lifespan_shutdown_closes_clients(self):
+        async def run():
+            client = llm_clients.get_client("groq")
+            messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+            sent = []
+
+            async def receive():
+                return next(messages)
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await LLMClientLifespanMiddleware(app=None)({"type": "lifespan"}, receive, send)
+            return client, sent
+
+        client, sent = asyncio.run(run())
+        self.assertTrue(client.is_closed)
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
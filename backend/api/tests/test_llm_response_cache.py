@@ -0,0 +1,153 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ai_models import llm_router
+from ai_models.local_llm_service import StreamError
+from ai_models.response_cache import build_cache_key, llm_response_cache
+from api.models import CategoriaPrestador, CustomUser, LLMResponseCache, PrestadorServicio, Video
+from api.scoring import recompute_scores
+
+MESSAGES = [{"role": "user", "content": "¿Qué hoteles hay cerca del río?"}]
+
+
+class LLMResponseCacheTests(TestCase):
+    """
+    Pruebas para la caché de respuestas del router de LLM.
+    Verifica la normalización de la clave, los dos niveles, el TTL, la invalidación y los contadores.
+    """
+    def setUp(self):
+        llm_response_cache.reset()
+
+    async def store(self, response="Hotel El Río", messages=MESSAGES, **kwargs):
+        return await llm_response_cache.aset("local", "phi3:mini", messages, 0.7, response, **kwargs)
+
+    async def lookup(self, messages=MESSAGES, **kwargs):
+        return await llm_response_cache.aget("local", "phi3:mini", messages, 0.7, **kwargs)
+
+    def test_key_is_normalized(self):
+        variant = [{"role": "user", "content": "  ¿qué   HOTELES hay cerca del río? "}]
+        self.assertEqual(build_cache_key("local", "phi3:mini", MESSAGES, 0.7), build_cache_key("local", "phi3:mini", variant, 0.7))
+        self.assertNotEqual(build_cache_key("local", "phi3:mini", MESSAGES, 0.7), build_cache_key("groq", "phi3:mini", MESSAGES, 0.7))
+
+    async def test_memory_then_persistent_tier(self):
+        self.assertIsNone(await self.lookup())
+        self.assertTrue(await self.store())
+        self.assertEqual(await self.lookup(), "Hotel El Río")
+        llm_response_cache.reset()  # Simula otro worker: memoria vacía, tabla compartida
+        self.assertEqual(await self.lookup(), "Hotel El Río")
+        self.assertEqual((await LLMResponseCache.objects.aget()).hit_count, 1)
+        self.assertEqual(llm_response_cache.stats()["persistent_hits"], 1)
+
+    async def test_errors_are_not_cached(self):
+        self.assertFalse(await self.store("Error: No se pudo conectar al servicio local de LLM."))
+        self.assertFalse(await LLMResponseCache.objects.aexists())
+
+    async def test_expired_entries_are_ignored_and_pruned(self):
+        await self.store()
+        await LLMResponseCache.objects.aupdate(expires_at=timezone.now() - timedelta(seconds=1))
+        llm_response_cache.reset()
+        self.assertIsNone(await self.lookup())
+        self.assertEqual(await sync_to_async(llm_response_cache.prune_expired)(), 1)
+
+    @override_settings(LLM_RESPONSE_CACHE={"MEMORY_MAX_ENTRIES": 2})
+    async def test_memory_tier_is_bounded(self):
+        for i in range(3):
+            await self.store(messages=[{"role": "user", "content": f"orden {i}"}])
+        stats = llm_response_cache.stats()
+        self.assertEqual(stats["memory_entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+
+    async def test_content_changes_invalidate_cache(self):
+        await self.store()
+        await Video.objects.acreate(titulo="Nuevo video", url_youtube="https://example.com/v")
+        self.assertFalse(await LLMResponseCache.objects.aexists())
+        self.assertIsNone(await self.lookup())
+
+    async def test_invalidation_is_scoped_to_dependent_entries(self):
+        def orden(text):
+            return [{"role": "user", "content": text}]
+
+        await self.store("videos", messages=orden("videos"), depends_on=["api.Video"])
+        await self.store("eventos", messages=orden("eventos"), depends_on=["api.Publicacion"])
+        await self.store("plan", messages=orden("plan"), depends_on=[])
+        await Video.objects.acreate(titulo="Nuevo video", url_youtube="https://example.com/v")
+
+        self.assertIsNone(await self.lookup(messages=orden("videos")))
+        self.assertEqual(await self.lookup(messages=orden("eventos")), "eventos")
+        self.assertEqual(await self.lookup(messages=orden("plan")), "plan")
+        self.assertEqual(await LLMResponseCache.objects.acount(), 2)
+
+    def test_score_updates_invalidate_dependent_entries(self):
+        owner = CustomUser.objects.create_user(username="hotel", email="hotel@example.com", password="password123")
+        categoria = CategoriaPrestador.objects.create(nombre="Hoteles", slug="hoteles")
+        PrestadorServicio.objects.create(usuario=owner, categoria=categoria, nombre_negocio="Hotel", aprobado=True)
+        async_to_sync(self.store)(depends_on=["api.PrestadorServicio"])
+        async_to_sync(self.store)(response="Video", messages=[{"role": "user", "content": "videos"}], depends_on=["api.Video"])
+
+        self.assertGreater(recompute_scores()["prestadores"], 0)
+        self.assertEqual(list(LLMResponseCache.objects.values_list("response", flat=True)), ["Video"])
+
+    @override_settings(LLM_RESPONSE_CACHE={"SIMILARITY_THRESHOLD": 0.9})
+    async def test_similar_orders_share_response(self):
+        prompt = "Eres el Coronel. Orden: {}"
+        first, second = "hoteles cerca del río", "hoteles junto al río"
+        embeddings = {first: [1.0, 0.0], second: [0.99, 0.05]}
+        with patch("ai_models.response_cache.embed_text", AsyncMock(side_effect=lambda text, model=None: embeddings[text])):
+            await self.store(messages=[{"role": "user", "content": prompt.format(first)}], semantic_text=first)
+            llm_response_cache.reset()
+            cached = await self.lookup(messages=[{"role": "user", "content": prompt.format(second)}], semantic_text=second)
+        self.assertEqual(cached, "Hotel El Río")
+        self.assertEqual(llm_response_cache.stats()["similar_hits"], 1)
+
+    async def test_router_serves_repeated_prompt_from_cache(self):
+        invoke = AsyncMock(return_value="Respuesta del modelo")
+        with patch.object(llm_router, "invoke_local_llm", invoke):
+            first = await llm_router.route_llm_request("hola", [], None)
+            second = await llm_router.route_llm_request("  HOLA ", [], None)
+        self.assertEqual((first, second), ("Respuesta del modelo", "Respuesta del modelo"))
+        self.assertEqual(invoke.await_count, 1)
+
+    async def test_router_caches_only_complete_streams(self):
+        streams = [["Hotel ", StreamError("Error: El servicio local reportó un fallo: sin memoria")], ["Hotel ", "El Río"]]
+
+        def fake_stream(prompt, model_name=None, conversation_history=None):
+            async def chunks():
+                for chunk in streams.pop(0):
+                    yield chunk
+            return chunks()
+
+        async def collect():
+            return "".join([chunk async for chunk in await llm_router.route_llm_request("hola", [], None, stream=True)])
+
+        with patch.object(llm_router, "stream_local_llm", side_effect=fake_stream) as stream:
+            await collect()  # Respuesta parcial seguida de un error: no se guarda.
+            self.assertFalse(await LLMResponseCache.objects.aexists())
+            await collect()
+            self.assertEqual(await collect(), "Hotel El Río")
+        self.assertEqual(stream.call_count, 2)
+        self.assertEqual((await LLMResponseCache.objects.aget()).response, "Hotel El Río")
+
+    async def test_router_skips_responses_rejected_by_validator(self):
+        from agents.corps.turismo_coronel import parse_tactical_plan
+
+        streams = [["{\"plan\": [", "{\"roto"], ["{\"plan\": []}"]]
+
+        def fake_stream(prompt, model_name=None, conversation_history=None):
+            async def chunks():
+                for chunk in streams.pop(0):
+                    yield chunk
+            return chunks()
+
+        async def collect():
+            chunks = await llm_router.route_llm_request("plan", [], None, stream=True, validate=parse_tactical_plan)
+            return "".join([chunk async for chunk in chunks])
+
+        with patch.object(llm_router, "stream_local_llm", side_effect=fake_stream) as stream:
+            await collect()  # JSON inválido: el plan no se guarda y la próxima orden vuelve al modelo.
+            self.assertFalse(await LLMResponseCache.objects.aexists())
+            self.assertEqual(await collect(), "{\"plan\": []}")
+            self.assertEqual(await collect(), "{\"plan\": []}")
+        self.assertEqual(stream.call_count, 2)
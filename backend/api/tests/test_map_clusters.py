@@ -0,0 +1,129 @@
+import math
+import random
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.geo import geohash_encode
+from api.map_clusters import precision_for_zoom, rebuild_clusters, tile, tile_bounds
+from api.models import AtractivoTuristico, CategoriaPrestador, CustomUser, GeoPoint, MarkerCluster, PrestadorServicio
+
+CENTER = (4.3155, -72.0819)  # Puerto Gaitán
+
+
+def tile_for(lat, lng, z):
+    """Tile XYZ que contiene el punto (para las pruebas)."""
+    n = 2 ** z
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+class MarkerClusterTests(APITestCase):
+    """Pirámide de agrupación del mapa: mantenimiento incremental y tiles."""
+
+    def setUp(self):
+        self.categoria = CategoriaPrestador.objects.create(nombre="Hoteles", slug="hoteles")
+
+    def create_prestador(self, name, lat, lng, aprobado=True):
+        user = CustomUser.objects.create_user(username=name, email=f"{name}@example.com", password="password123")
+        with self.captureOnCommitCallbacks(execute=True):  # Las pruebas no confirman la transacción.
+            return PrestadorServicio.objects.create(
+                usuario=user, categoria=self.categoria, nombre_negocio=name, latitud=lat, longitud=lng, aprobado=aprobado,
+            )
+
+    def snapshot(self):
+        return {
+            c.cell: (c.count, round(c.latitud, 9), round(c.longitud, 9), c.tipos, c.punto)
+            for c in MarkerCluster.objects.all()
+        }
+
+    def test_tile_geometry(self):
+        self.assertEqual(tile_bounds(0, 0, 0)[2:], (-180.0, 180.0))
+        lat_min, lat_max, lng_min, lng_max = tile_bounds(12, *tile_for(*CENTER, 12))
+        self.assertTrue(lat_min <= CENTER[0] < lat_max and lng_min <= CENTER[1] < lng_max)
+        precisions = [precision_for_zoom(z) for z in range(0, 23)]
+        self.assertEqual(precisions[0], 1)
+        self.assertEqual(precisions, sorted(precisions, key=lambda p: p or 99))
+        self.assertIsNone(precisions[22])
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        first = self.create_prestador("uno", *CENTER)
+        self.create_prestador("dos", CENTER[0] + 0.001, CENTER[1] + 0.001)
+        self.create_prestador("oculto", *CENTER, aprobado=False)
+        top = MarkerCluster.objects.get(cell=geohash_encode(*CENTER, 1))
+        self.assertEqual((top.count, top.tipos, top.punto), (2, {"hoteles": 2}, None))
+
+        first.latitud, first.longitud = CENTER[0] + 2, CENTER[1] + 2
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        incremental = self.snapshot()
+        # Las celdas se actualizan en su sitio (upsert), no se borran y reinsertan.
+        self.assertEqual(MarkerCluster.objects.get(cell=top.cell).pk, top.pk)
+        rebuild_clusters()
+        self.assertEqual(incremental, self.snapshot())
+
+        lone = MarkerCluster.objects.get(cell=geohash_encode(CENTER[0] + 2, CENTER[1] + 2, 7))
+        self.assertEqual(lone.punto["id"], f"prestador-{first.pk}")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PrestadorServicio.objects.all().delete()
+        self.assertFalse(MarkerCluster.objects.exists())
+
+    def test_counts_add_up_at_every_zoom(self):
+        rng = random.Random(3)
+        points = []
+        for index in range(400):
+            lat, lng = CENTER[0] + rng.uniform(-1, 1), CENTER[1] + rng.uniform(-1, 1)
+            points.append(GeoPoint(
+                entity_type="prestador", object_id=index, nombre=str(index), tipo=rng.choice(["hoteles", "artesano"]),
+                url_detalle="", latitud=lat, longitud=lng, geohash=geohash_encode(lat, lng), is_public=True,
+            ))
+        GeoPoint.objects.bulk_create(points)
+        rebuild_clusters()
+
+        # Los 3x3 tiles alrededor del centro cubren los ±1° de los puntos hasta z=8.
+        for z in (0, 4, 8):
+            x, y = tile_for(*CENTER, z)
+            rows = [
+                row for dx in (-1, 0, 1) for dy in (-1, 0, 1) if 0 <= x + dx < 2 ** z and 0 <= y + dy < 2 ** z
+                for row in tile(z, x + dx, y + dy)["clusters"]
+            ]
+            self.assertEqual(sum(row[2] for row in rows), 400, z)
+            self.assertTrue(all(sum(row[3].values()) == row[2] for row in rows))
+
+    def test_tile_endpoint_is_cached_per_version(self):
+        self.create_prestador("uno", *CENTER)
+        x, y = tile_for(*CENTER, 10)
+        url = reverse('locations-tile', args=[10, x, y])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.data["fields"], ["lat", "lng", "count", "tipos", "punto"])
+        self.assertEqual([row[2] for row in response.data["clusters"]], [1])
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Un cambio en otro tile no invalida este.
+        self.create_prestador("lejos", CENTER[0] + 20, CENTER[1] + 20)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.create_prestador("dos", CENTER[0] + 0.0001, CENTER[1])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row[2] for row in response.data["clusters"]], [2])
+
+        self.assertEqual(self.client.get(reverse('locations-tile', args=[2, 4, 0])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('locations-tile', args=[30, 0, 0])).status_code, 400)
+
+    def test_deep_zoom_returns_single_points(self):
+        atractivo = AtractivoTuristico.objects.create(
+            nombre="Laguna", slug="laguna", descripcion="-", como_llegar="-", categoria_color="BLANCO",
+            latitud=CENTER[0], longitud=CENTER[1], es_publicado=True,
+        )
+        rows = tile(20, *tile_for(*CENTER, 20))["clusters"]
+        self.assertEqual(rows[0][2:], [1, {"atractivo_blanco": 1}, {
+            "id": f"atractivo-{atractivo.pk}", "nombre": "Laguna", "tipo": "atractivo_blanco",
+            "url_detalle": "/descubre/atractivos/laguna",
+        }])
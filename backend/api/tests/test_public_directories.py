@@ -0,0 +1,61 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.models import (
+    Artesano, CategoriaPrestador, CustomUser, ImagenArtesano, ImagenGaleria, PrestadorServicio, RubroArtesano,
+)
+from api.tests.query_budget import QueryBudgetMixin
+
+
+class PublicDirectoryQueryTests(QueryBudgetMixin, APITestCase):
+    """Pruebas de los directorios públicos: solo perfiles aprobados y consultas acotadas."""
+
+    def setUp(self):
+        self.categoria = CategoriaPrestador.objects.create(nombre="Hoteles", slug="hoteles")
+        self.rubro = RubroArtesano.objects.create(nombre="Tejidos", slug="tejidos")
+
+    def create_profiles(self, model, count, **extra):
+        # Carga masiva sin señales: solo interesa el costo de leerlos.
+        start = model.objects.count()
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f"{model._meta.model_name}-{i}", email=f"{model._meta.model_name}-{i}@example.com")
+            for i in range(start, count)
+        ])
+        return model.objects.bulk_create([model(usuario=user, aprobado=True, **extra) for user in users])
+
+    def populate_prestadores(self, count):
+        prestadores = self.create_profiles(PrestadorServicio, count, categoria=self.categoria, nombre_negocio="Hotel")
+        ImagenGaleria.objects.bulk_create([ImagenGaleria(prestador=p, imagen="galeria/foto.jpg") for p in prestadores])
+
+    def populate_artesanos(self, count):
+        artesanos = self.create_profiles(Artesano, count, rubro=self.rubro, nombre_taller="Taller", nombre_artesano="Ana")
+        ImagenArtesano.objects.bulk_create([ImagenArtesano(artesano=a, imagen="galeria/foto.jpg") for a in artesanos])
+
+    def test_list_endpoints_query_budget(self):
+        response = self.assertQueryBudget(reverse('prestador-public-list'), 2, self.populate_prestadores)
+        self.assertEqual(response.data['results'][0]['categoria_nombre'], "Hoteles")
+        response = self.assertQueryBudget(reverse('artesano-public-list'), 2, self.populate_artesanos)
+        self.assertEqual(response.data['results'][0]['rubro_nombre'], "Tejidos")
+
+    def test_detail_endpoints_query_budget(self):
+        self.populate_prestadores(1)
+        self.populate_artesanos(1)
+        prestador = PrestadorServicio.objects.get()
+        artesano = Artesano.objects.get()
+        ImagenGaleria.objects.create(prestador=prestador, imagen="galeria/otra.jpg")
+
+        url = reverse('prestador-public-detail', args=[prestador.pk])
+        response = self.assertQueryBudget(url, 2, lambda n: None, sizes=[1])
+        self.assertEqual(response.data['categoria']['slug'], "hoteles")
+        self.assertEqual(len(response.data['galeria_imagenes']), 2)
+        url = reverse('artesano-public-detail', args=[artesano.pk])
+        response = self.assertQueryBudget(url, 2, lambda n: None, sizes=[1])
+        self.assertEqual(response.data['rubro']['nombre'], "Tejidos")
+
+    def test_only_approved_profiles_are_public(self):
+        self.populate_prestadores(2)
+        hidden = PrestadorServicio.objects.order_by('id').last()
+        PrestadorServicio.objects.filter(pk=hidden.pk).update(aprobado=False)
+        response = self.client.get(reverse('prestador-public-list'))
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(self.client.get(reverse('prestador-public-detail', args=[hidden.pk])).status_code, 404)
@@ -0,0 +1,122 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.models import Artesano, CategoriaPrestador, CustomUser, PrestadorServicio, RankingEntry, RubroArtesano
+from api.rankings import RANKED_SPECS, _refresh_partition, refresh_rankings
+
+SYNC_SCORING = {"DEFERRED": False}
+
+
+class RankingFixturesMixin:
+    def setUp(self):
+        super().setUp()
+        self.hoteles = CategoriaPrestador.objects.create(nombre="Hoteles", slug="hoteles")
+        self.restaurantes = CategoriaPrestador.objects.create(nombre="Restaurantes", slug="restaurantes")
+        self.prestadores = {}
+        for nombre, categoria in [
+            ("Hotel Llanero", self.hoteles), ("Hotel Garza", self.hoteles),
+            ("Asadero Mamona", self.restaurantes), ("Café Sabana", self.restaurantes),
+        ]:
+            user = CustomUser.objects.create_user(
+                username=nombre.lower().replace(" ", "_"), email=f"{nombre.split()[1].lower()}@example.com", password="password123"
+            )
+            self.prestadores[nombre] = PrestadorServicio.objects.create(
+                usuario=user, nombre_negocio=nombre, categoria=categoria, aprobado=True
+            )
+        self.set_points({"Hotel Llanero": 30, "Hotel Garza": 20, "Asadero Mamona": 20, "Café Sabana": 10})
+
+    def set_points(self, points):
+        # Puntuaciones fijadas a mano (sin señales) y ranking refrescado por completo.
+        for nombre, puntos in points.items():
+            PrestadorServicio.objects.filter(pk=self.prestadores[nombre].pk).update(puntuacion_total=puntos)
+        refresh_rankings()
+
+    def ranking(self, group_id=RankingEntry.GLOBAL_GROUP, entity_type="prestador"):
+        return list(
+            RankingEntry.objects.filter(entity_type=entity_type, group_id=group_id)
+            .order_by("rank", "object_id").values_list("nombre", "rank", "percentile")
+        )
+
+
+@override_settings(SCORING_QUEUE=SYNC_SCORING)
+class RankingTableTests(RankingFixturesMixin, TestCase):
+    """Pruebas de la tabla de rankings: empates, particiones y refresco incremental."""
+
+    def test_global_ranking_with_ties_and_percentiles(self):
+        self.assertEqual(self.ranking(), [
+            ("Hotel Llanero", 1, 100.0), ("Hotel Garza", 2, 75.0), ("Asadero Mamona", 2, 75.0), ("Café Sabana", 4, 25.0),
+        ])
+
+    def test_partitions_per_category(self):
+        self.assertEqual(self.ranking(self.restaurantes.pk), [("Asadero Mamona", 1, 100.0), ("Café Sabana", 2, 50.0)])
+
+    def test_unapproved_entities_leave_the_ranking(self):
+        llanero = self.prestadores["Hotel Llanero"]
+        llanero.aprobado = False
+        llanero.save()
+        self.assertEqual([row[0] for row in self.ranking(self.hoteles.pk)], ["Hotel Garza"])
+        self.assertEqual(self.ranking()[0][:2], ("Hotel Garza", 1))
+
+    def test_category_change_moves_the_entry(self):
+        garza = self.prestadores["Hotel Garza"]
+        garza.categoria = self.restaurantes
+        garza.save()
+        self.assertEqual([row[0] for row in self.ranking(self.hoteles.pk)], ["Hotel Llanero"])
+        self.assertEqual(len(self.ranking(self.restaurantes.pk)), 3)
+
+    def test_artisans_are_ranked_by_rubro(self):
+        rubro = RubroArtesano.objects.create(nombre="Tejidos", slug="tejidos")
+        user = CustomUser.objects.create_user(username="tejedora", email="tejedora@example.com", password="password123")
+        Artesano.objects.create(usuario=user, nombre_taller="Taller Moriche", rubro=rubro, aprobado=True)
+        self.assertEqual(self.ranking(rubro.pk, "artesano"), [("Taller Moriche", 1, 100.0)])
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        self.assertEqual(refresh_rankings(), {"prestador": 0, "artesano": 0})
+
+    def test_entry_written_concurrently_is_upserted(self):
+        user = CustomUser.objects.create_user(username="nuevo", email="nuevo@example.com", password="password123")
+        nuevo = PrestadorServicio.objects.create(usuario=user, nombre_negocio="Hotel Nuevo", categoria=self.hoteles)
+        PrestadorServicio.objects.filter(pk=nuevo.pk).update(aprobado=True, puntuacion_total=40)
+        now = timezone.now()
+
+        def other_worker_refreshed():
+            # Otro worker inserta la fila entre la lectura de `existing` y el insert.
+            RankingEntry.objects.get_or_create(
+                entity_type="prestador", group_id=RankingEntry.GLOBAL_GROUP, object_id=nuevo.pk,
+                defaults={"nombre": "Hotel Nuevo", "puntuacion": 40, "rank": 1, "percentile": 100, "updated_at": now},
+            )
+            return now
+
+        with patch("api.rankings.timezone.now", side_effect=other_worker_refreshed):
+            _refresh_partition(RANKED_SPECS["prestador"], RankingEntry.GLOBAL_GROUP)
+        self.assertEqual(self.ranking()[:2], [("Hotel Nuevo", 1, 100.0), ("Hotel Llanero", 2, 80.0)])
+
+@override_settings(SCORING_QUEUE=SYNC_SCORING)
+class RankingEndpointTests(RankingFixturesMixin, APITestCase):
+    """Pruebas del endpoint público de rankings: filtros, cursor y ETag."""
+
+    def test_cursor_pagination_and_group_filter(self):
+        url = reverse("ranking-list", args=["prestador"])
+        response = self.client.get(url, {"page_size": 3})
+        self.assertEqual([item["rank"] for item in response.data["results"]], [1, 2, 2])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"][0]["nombre"], "Café Sabana")
+
+        response = self.client.get(url, {"categoria": "hoteles"})
+        self.assertEqual([item["id"] for item in response.data["results"]],
+                         [self.prestadores["Hotel Llanero"].pk, self.prestadores["Hotel Garza"].pk])
+        self.assertEqual(self.client.get(url, {"categoria": "inexistente"}).status_code, 404)
+        self.assertEqual(self.client.get(reverse("ranking-list", args=["foo"])).status_code, 404)
+
+    def test_etag_changes_only_when_ranking_changes(self):
+        url = reverse("ranking-list", args=["prestador"])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.set_points({"Café Sabana": 40})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["nombre"], "Café Sabana")
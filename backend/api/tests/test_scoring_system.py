@@ -1,4 +1,12 @@
-from django.test import TestCase
+from datetime import date
+
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import connection, transaction
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.contenttypes.models import ContentType
 from api.models import (
     CustomUser,
@@ -7,9 +15,18 @@ from api.models import (
     Publicacion,
     AsistenciaCapacitacion,
     Resena,
-    ScoringRule
+    ScoringRule,
+    PlantillaVerificacion,
+    ItemVerificacion,
+    Verificacion,
+    RespuestaItemVerificacion,
 )
+from api import scoring
+from api.scoring import PendingScores, score_batch, score_queue
 
+SYNC_SCORING = {"DEFERRED": False}
+
+@override_settings(SCORING_QUEUE=SYNC_SCORING)
 class ScoringSystemTests(TestCase):
     """
     Pruebas para el sistema de puntuación unificado.
@@ -111,4 +128,164 @@ class ScoringSystemTests(TestCase):
 
         # Verificar que no se pueden crear nuevas instancias
         with self.assertRaises(Exception):
-             ScoringRule.objects.create(puntos_asistencia_capacitacion=100)
\ No newline at end of file
+             ScoringRule.objects.create(puntos_asistencia_capacitacion=100)
+
+@override_settings(SCORING_QUEUE=SYNC_SCORING)
+class SetBasedScoringTests(TestCase):
+    """
+    Pruebas del motor de puntuación por conjuntos: agregados en la base de datos,
+    lotes que recalculan una sola vez y reconstrucción completa.
+    """
+
+    def setUp(self):
+        self.rules = ScoringRule.load()
+        self.rules.puntos_por_estrella_reseña = 2
+        self.rules.puntos_asistencia_capacitacion = 10
+        self.rules.save()
+        self.prestadores = [
+            PrestadorServicio.objects.create(
+                usuario=CustomUser.objects.create_user(f'prestador{i}', f'prestador{i}@example.com', 'password123'),
+                nombre_negocio=f"Negocio {i}",
+            )
+            for i in range(2)
+        ]
+        self.artesano = Artesano.objects.create(
+            usuario=CustomUser.objects.create_user('artesano', 'artesano@example.com', 'password123'),
+            nombre_taller="Taller", nombre_artesano="Artesano",
+        )
+
+    def create_reviews(self, count, target):
+        reviews = []
+        for _ in range(count):
+            n = CustomUser.objects.count()
+            turista = CustomUser.objects.create_user(f'turista{n}', f'turista{n}@example.com', 'password123')
+            reviews.append(Resena.objects.create(usuario=turista, content_object=target, calificacion=5, comentario="Excelente."))
+        return reviews
+
+    def approve_in_admin(self, reviews):
+        model_admin = admin.site._registry[Resena]
+        with CaptureQueriesContext(connection) as queries:
+            model_admin.aprobar_resenas(None, Resena.objects.filter(pk__in=[r.pk for r in reviews]))
+        return len(queries)
+
+    def test_bulk_admin_approval_uses_constant_queries(self):
+        few = self.approve_in_admin(self.create_reviews(2, self.prestadores[0]) + self.create_reviews(1, self.artesano))
+        many = self.approve_in_admin(self.create_reviews(20, self.prestadores[1]) + self.create_reviews(5, self.artesano))
+        self.assertEqual(few, many)
+
+        for entity, expected in ((self.prestadores[0], 20), (self.prestadores[1], 200), (self.artesano, 60)):
+            entity.refresh_from_db()
+            self.assertEqual((entity.puntuacion_reseñas, entity.puntuacion_total), (expected, expected))
+
+    def test_unapproving_a_review_removes_its_points(self):
+        review = self.create_reviews(1, self.prestadores[0])[0]
+        review.aprobada = True
+        review.save()
+        review.aprobada = False
+        review.save()
+        self.prestadores[0].refresh_from_db()
+        self.assertEqual(self.prestadores[0].puntuacion_reseñas, 0)
+
+    def test_verification_points_follow_checklist_answers(self):
+        plantilla = PlantillaVerificacion.objects.create(nombre="Plantilla")
+        items = [ItemVerificacion.objects.create(plantilla=plantilla, texto_requisito=f"Ítem {p}", puntaje=p) for p in (3, 7)]
+        verificacion = Verificacion.objects.create(plantilla_usada=plantilla, prestador=self.prestadores[0], fecha_visita=date.today())
+        for item in items:
+            RespuestaItemVerificacion.objects.create(verificacion=verificacion, item_original=item, cumple=True)
+        verificacion.refresh_from_db()
+        self.prestadores[0].refresh_from_db()
+        self.assertEqual(verificacion.puntaje_obtenido, 10)
+        self.assertEqual((self.prestadores[0].puntuacion_verificacion, self.prestadores[0].puntuacion_total), (10, 10))
+
+        verificacion.delete()
+        self.prestadores[0].refresh_from_db()
+        self.assertEqual(self.prestadores[0].puntuacion_total, 0)
+
+    def test_batch_recalculates_once_per_block(self):
+        capacitaciones = [
+            Publicacion.objects.create(titulo=f"Capacitación {i}", slug=f"capacitacion-{i}", tipo=Publicacion.Tipo.CAPACITACION,
+                                       puntos_asistencia=puntos)
+            for i, puntos in enumerate((15, 0, 0))
+        ]
+        # El refresco de rankings tiene sus propias pruebas (test_rankings): aquí solo se cuenta el recálculo.
+        with patch("api.rankings.refresh_rankings"), CaptureQueriesContext(connection) as queries, score_batch():
+            for capacitacion in capacitaciones:
+                AsistenciaCapacitacion.objects.create(capacitacion=capacitacion, usuario=self.artesano.usuario)
+            inserts_only = len(queries)
+        self.assertLessEqual(len(queries) - inserts_only, 8)
+        self.artesano.refresh_from_db()
+        self.assertEqual(self.artesano.puntuacion_capacitacion, 15 + 10 + 10)
+
+    def test_rule_changes_and_recompute_command(self):
+        Resena.objects.filter(pk=self.create_reviews(1, self.prestadores[0])[0].pk).update(aprobada=True)  # Sin señales.
+        PrestadorServicio.objects.update(puntuacion_total=999)
+        call_command('recompute_scores', stdout=open('/dev/null', 'w'))
+        self.prestadores[0].refresh_from_db()
+        self.assertEqual(self.prestadores[0].puntuacion_total, 10)
+
+        self.rules.puntos_por_estrella_reseña = 3
+        self.rules.save()
+        self.prestadores[0].refresh_from_db()
+        self.assertEqual(self.prestadores[0].puntuacion_total, 15)
+
+
+@override_settings(SCORING_QUEUE={"DEFERRED": True, "BACKGROUND": False, "BATCH_SIZE": 2})
+class DeferredScoringTests(TestCase):
+    """Pruebas de la cola diferida: recálculo al confirmar, sin duplicados y por lotes."""
+
+    def setUp(self):
+        self.prestador = PrestadorServicio.objects.create(
+            usuario=CustomUser.objects.create_user('diferido', 'diferido@example.com', 'password123'),
+            nombre_negocio="Negocio diferido",
+        )
+        self.turistas = [
+            CustomUser.objects.create_user(f'visitante{i}', f'visitante{i}@example.com', 'password123') for i in range(3)
+        ]
+
+    def test_scores_are_recalculated_after_commit_once_per_entity(self):
+        with patch('api.scoring.apply_scores', wraps=scoring.apply_scores) as apply:
+            with self.captureOnCommitCallbacks(execute=True):
+                with score_batch():  # Como una petición.
+                    for turista in self.turistas:
+                        Resena.objects.create(usuario=turista, content_object=self.prestador, calificacion=5,
+                                              comentario="Bien.", aprobada=True)
+                self.prestador.refresh_from_db()
+                self.assertEqual(self.prestador.puntuacion_reseñas, 0)  # Aún sin confirmar.
+                apply.assert_not_called()
+        self.assertEqual(apply.call_count, 1)
+        self.assertEqual(apply.call_args.args[0].prestador_ids, {self.prestador.pk})
+        self.prestador.refresh_from_db()
+        self.assertEqual(self.prestador.puntuacion_reseñas, 3 * 5 * ScoringRule.load().puntos_por_estrella_reseña)
+
+        stats = score_queue.stats()
+        self.assertEqual(stats["pending_entities"], 0)
+        self.assertGreaterEqual(stats["last_lag_seconds"], 0)
+
+    def test_rolled_back_changes_are_not_enqueued(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Resena.objects.create(usuario=self.turistas[0], content_object=self.prestador, calificacion=5,
+                                          comentario="Bien.", aprobada=True)
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+
+    def test_pending_marks_are_split_in_batches(self):
+        pending = PendingScores(prestador_ids={1, 2, 3}, usuario_ids={4})
+        self.assertEqual([len(chunk) for chunk in pending.chunks(3)], [3, 1])
+        self.assertEqual(len(PendingScores(everything=True).chunks(3)), 1)
+
+    @override_settings(SCORING_QUEUE={"DEFERRED": True, "BACKGROUND": True, "FLUSH_DELAY_SECONDS": 0, "BATCH_SIZE": 500})
+    def test_background_worker_merges_marks(self):
+        calls = []
+        with patch('api.scoring.apply_scores', side_effect=lambda pending: calls.append(pending)):
+            score_queue.enqueue(PendingScores(prestador_ids={1}))
+            score_queue.enqueue(PendingScores(prestador_ids={1}, artesano_ids={2}))
+            score_queue.join(timeout=5)
+        merged = PendingScores()
+        for pending in calls:
+            merged.merge(pending)
+        self.assertEqual((merged.prestador_ids, merged.artesano_ids), ({1}, {2}))
+        self.assertEqual(score_queue.stats()["pending_entities"], 0)
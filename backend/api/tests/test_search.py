@@ -0,0 +1,90 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import translation
+from rest_framework.test import APITestCase
+
+from api.models import AtractivoTuristico, CustomUser, PrestadorServicio, Publicacion, SearchDocument
+from api.search import rebuild_index, search
+from tools.herramientas_turista import buscar_informacion_general
+
+
+class SearchFixturesMixin:
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(username='roca', email='roca@example.com', password='password123')
+        self.other_user = CustomUser.objects.create_user(username='llano', email='llano@example.com', password='password123')
+        self.cafe = PrestadorServicio.objects.create(
+            usuario=self.user, nombre_negocio="Café La Roca", descripcion="Desayunos típicos llaneros.", aprobado=True
+        )
+        self.hidden = PrestadorServicio.objects.create(
+            usuario=self.other_user, nombre_negocio="Hotel Oculto", descripcion="Perfil sin aprobar.", aprobado=False
+        )
+        self.laguna = AtractivoTuristico.objects.create(
+            nombre="Laguna Azul", slug="laguna-azul", descripcion="Aguas tranquilas junto al hotel del pueblo.",
+            como_llegar="Por la vía principal.", categoria_color=AtractivoTuristico.CategoriaColor.BLANCO,
+            es_publicado=True, nombre_en="Blue Lagoon", descripcion_en="Calm waters next to the town hotel.",
+        )
+        self.noticia = Publicacion.objects.create(
+            tipo=Publicacion.Tipo.NOTICIA, titulo="Festival del hotel llanero", slug="festival-hotel",
+            contenido="Música y gastronomía.", estado=Publicacion.Status.PUBLICADO,
+        )
+
+
+class SearchEngineTests(SearchFixturesMixin, TestCase):
+    """Pruebas del motor de búsqueda: índice mantenido al guardar, tildes, prefijos, ranking e idiomas."""
+
+    def test_index_is_maintained_on_save_and_delete(self):
+        self.assertEqual(SearchDocument.objects.filter(object_id=self.cafe.pk, title="Café La Roca").count(), 2)
+        self.cafe.nombre_negocio = "Café El Llano"
+        self.cafe.save()
+        self.assertEqual(search("llano", types=["prestador"])[1][0]["title"], "Café El Llano")
+        self.cafe.delete()
+        self.assertEqual(search("cafe")[0], 0)
+
+    def test_accent_insensitive_prefix_search(self):
+        total, results = search("cafe roc")
+        self.assertEqual(total, 1)
+        self.assertEqual((results[0]["type"], results[0]["id"]), ("prestador", self.cafe.pk))
+
+    def test_ranking_prefers_title_and_hides_non_public(self):
+        total, results = search("hotel")
+        self.assertEqual(total, 2)  # El prestador sin aprobar no aparece.
+        self.assertEqual([r["type"] for r in results], ["publicacion", "atractivo"])
+
+    def test_translated_fields_are_indexed_per_language(self):
+        self.assertEqual(search("lagoon", language="en")[1][0]["id"], self.laguna.pk)
+        self.assertEqual(search("lagoon", language="es")[0], 0)
+        with translation.override("en"):
+            self.assertEqual(search("lagoon")[0], 1)
+
+    def test_pagination_and_rebuild(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(search("hotel")[0], 0)
+        self.assertEqual(rebuild_index()["prestador"], 2)
+        total, page = search("hotel", limit=1, offset=1)
+        self.assertEqual((total, len(page)), (2, 1))
+        self.assertEqual(page[0]["type"], "atractivo")
+
+    def test_agent_tool_uses_search_engine(self):
+        result = buscar_informacion_general.invoke({"termino_busqueda": "cafe"})
+        self.assertEqual(result["data"]["prestadores"], [{"id": self.cafe.pk, "nombre": "Café La Roca"}])
+
+
+class SearchEndpointTests(SearchFixturesMixin, APITestCase):
+    """Pruebas del endpoint de búsqueda global y del parámetro ?q= de los listados públicos."""
+
+    def test_global_search_endpoint(self):
+        response = self.client.get(reverse('global-search'), {'q': 'hotel', 'page_size': 1, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['type'], 'atractivo')
+        self.assertEqual(self.client.get(reverse('global-search'), {'q': 'hotel', 'types': 'foo'}).status_code, 400)
+
+    def test_public_list_q_parameter(self):
+        response = self.client.get('/api/prestadores/', {'q': 'cafe'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.cafe.pk])
+        # El listado decide la visibilidad: el índice solo filtra y ordena.
+        self.assertEqual(self.client.get('/api/prestadores/', {'q': 'hotel'}).data['count'], 0)
+        response = self.client.get('/api/prestadores/', {'q': 'inexistente'})
+        self.assertEqual(response.data['count'], 0)
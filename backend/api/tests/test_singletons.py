@@ -0,0 +1,87 @@
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from api.models import ScoringRule, SingletonVersion, SiteConfiguration
+from api.scoring import _scoring_values
+from api.singletons import singleton_cache
+
+
+@override_settings(SINGLETON_CACHE={"CHECK_INTERVAL_SECONDS": 60}, SCORING_QUEUE={"DEFERRED": False})
+class SingletonCacheTests(TestCase):
+    """Pruebas de la caché de singletons: lecturas en memoria e invalidación entre procesos."""
+
+    def setUp(self):
+        singleton_cache.clear()
+        self.addCleanup(singleton_cache.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            SiteConfiguration(nombre_secretaria="Secretaría", google_maps_api_key="clave-secreta").save()
+
+    def other_process_saves(self, **values):
+        # Otro worker guarda: cambia la fila y renueva el sello, sin tocar la memoria de este proceso.
+        SiteConfiguration.objects.filter(pk=1).update(**values)
+        SingletonVersion.objects.filter(label="api.siteconfiguration").update(token="otro-proceso")
+
+    def test_reads_are_memory_lookups(self):
+        SiteConfiguration.load()
+        with self.assertNumQueries(0):
+            config = SiteConfiguration.load()
+        self.assertEqual(config.google_maps_api_key, "clave-secreta")
+
+    def test_returned_copies_are_independent(self):
+        config = SiteConfiguration.load()
+        config.nombre_secretaria = "Cambio sin guardar"
+        self.assertEqual(SiteConfiguration.load().nombre_secretaria, "Secretaría")
+
+    def test_save_invalidates_this_process(self):
+        config = SiteConfiguration.load()
+        config.nombre_secretaria = "Nueva Secretaría"
+        with self.captureOnCommitCallbacks(execute=True):
+            config.save()
+        self.assertEqual(SiteConfiguration.load().nombre_secretaria, "Nueva Secretaría")
+
+    def test_other_processes_are_seen_after_check_interval(self):
+        SiteConfiguration.load()
+        self.other_process_saves(nombre_secretaria="Desde otro worker")
+        self.assertEqual(SiteConfiguration.load().nombre_secretaria, "Secretaría")  # Aún dentro del intervalo.
+        with override_settings(SINGLETON_CACHE={"CHECK_INTERVAL_SECONDS": 0}):
+            self.assertEqual(SiteConfiguration.load().nombre_secretaria, "Desde otro worker")
+            with self.assertNumQueries(1):  # Solo el sello: la copia sigue vigente.
+                SiteConfiguration.load()
+
+    def test_shared_cache_carries_the_version(self):
+        shared = {"SHARED_CACHE_ALIAS": "default", "CHECK_INTERVAL_SECONDS": 0}
+        with override_settings(SINGLETON_CACHE=shared):
+            caches["default"].clear()
+            SiteConfiguration.load()
+            with self.assertNumQueries(0):
+                SiteConfiguration.load()
+            config = SiteConfiguration.load()
+            config.nombre_secretaria = "Vía caché compartida"
+            with self.captureOnCommitCallbacks(execute=True):
+                config.save()
+            self.assertEqual(SiteConfiguration.load().nombre_secretaria, "Vía caché compartida")
+
+    def test_rolled_back_save_is_not_cached(self):
+        try:
+            with transaction.atomic():
+                config = SiteConfiguration.load()
+                config.nombre_secretaria = "Revertida"
+                config.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(SiteConfiguration.load().nombre_secretaria, "Secretaría")
+        # El guardado revertido no deja al proceso leyendo de la base de datos.
+        with self.assertNumQueries(0):
+            SiteConfiguration.load()
+
+    def test_scoring_rules_without_row_use_defaults(self):
+        self.assertFalse(ScoringRule.objects.exists())
+        self.assertEqual(_scoring_values(), (2, 10))
+        with self.assertNumQueries(0):
+            _scoring_values()
+        self.assertFalse(ScoringRule.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            ScoringRule(puntos_por_estrella_reseña=4).save()
+        self.assertEqual(_scoring_values(), (4, 10))
@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+from django.test import SimpleTestCase
+
+from ai_models import llm_router
+from agents.corps.turismo_coronel import compile_final_report
+
+
+class TokenCountingTests(SimpleTestCase):
+    """
+    Pruebas para el conteo de tokens del router de LLM.
+    Verifica que el codificador se cargue una vez y que el total del historial sea incremental.
+    """
+    def test_encoder_is_loaded_once(self):
+        llm_router.get_token_encoder.cache_clear()
+        try:
+            with patch.object(llm_router.tiktoken, "get_encoding", side_effect=Exception("sin red")) as get_encoding:
+                self.assertEqual(llm_router.count_tokens("uno dos tres"), 3)
+                self.assertEqual(llm_router.count_tokens("cuatro cinco"), 2)
+            self.assertEqual(get_encoding.call_count, 1)
+        finally:
+            llm_router.get_token_encoder.cache_clear()
+
+    def test_message_counts_are_memoized(self):
+        llm_router.count_message_tokens.cache_clear()
+        history = [{"role": "user", "content": "hola coronel"}, {"role": "assistant", "content": "a sus órdenes"}]
+        llm_router.count_history_tokens(history)
+        with patch.object(llm_router, "count_tokens") as count_tokens:
+            llm_router.count_history_tokens(history)
+        count_tokens.assert_not_called()
+
+    def test_coronel_keeps_incremental_running_total(self):
+        state = {
+            "general_order": "¿Qué hoteles hay cerca del río?",
+            "conversation_history": [],
+            "history_tokens": 0,
+            "completed_missions": [],
+            "error": None,
+        }
+        for _ in range(3):
+            state = self.run_async(compile_final_report(state))
+            self.assertEqual(state["history_tokens"], llm_router.count_history_tokens(state["conversation_history"]))
+        self.assertEqual(len(state["conversation_history"]), 6)
+
+    def test_router_uses_running_total_instead_of_recounting(self):
+        history = [{"role": "user", "content": "mensaje antiguo"}] * 50
+        config = AsyncMock(return_value={"groq_api_key": "clave", "token_threshold": 1500})
+        with patch.object(llm_router, "get_system_llm_config", config), \
+             patch.object(llm_router, "get_user_llm_config", AsyncMock(return_value=None)), \
+             patch.object(llm_router, "count_history_tokens") as count_history:
+            backend, _ = self.run_async(llm_router.select_llm_backend("hola", history, None, history_tokens=5000))
+        self.assertEqual(backend, "groq")
+        count_history.assert_not_called()
+
+    @staticmethod
+    def run_async(coro):
+        return asyncio.run(coro)
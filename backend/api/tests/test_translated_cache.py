@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import translation
+from rest_framework.test import APITestCase
+
+from api.models import AtractivoTuristico, CustomUser, ImagenPaginaInstitucional, PaginaInstitucional, Publicacion
+from api.serializers import AtractivoTuristicoListSerializer, PublicacionListSerializer
+from api.translated_cache import only_active_language
+
+
+@override_settings(TRANSLATED_CACHE={"CACHE_ALIAS": "default"}, HTTP_CACHE={"ENABLED": False})
+class TranslatedCacheTests(APITestCase):
+    """Pruebas de las representaciones cacheadas por idioma y de la carga de columnas del idioma activo."""
+
+    def setUp(self):
+        caches["default"].clear()
+        self.autor = CustomUser.objects.create_user(username="editor", password="password123", first_name="Ana")
+        self.publicaciones = [
+            Publicacion.objects.create(
+                tipo=Publicacion.Tipo.NOTICIA, titulo=f"Noticia {i}", titulo_en=f"News {i}",
+                slug=f"noticia-{i}", contenido="Contenido", contenido_en="Content", autor=self.autor,
+            )
+            for i in range(3)
+        ]
+        self.url = reverse('publicaciones-list')
+
+    def _titles(self, response):
+        data = response.data["results"] if isinstance(response.data, dict) else response.data
+        return [item["titulo"] for item in data]
+
+    def test_each_language_has_its_own_representation(self):
+        spanish = self._titles(self.client.get(self.url, HTTP_ACCEPT_LANGUAGE="es"))
+        english = self._titles(self.client.get(self.url, HTTP_ACCEPT_LANGUAGE="en"))
+        self.assertIn("Noticia 0", spanish)
+        self.assertIn("News 0", english)
+        self.assertEqual(self._titles(self.client.get(self.url, HTTP_ACCEPT_LANGUAGE="es")), spanish)
+
+    def test_cache_hit_skips_serialization(self):
+        self.client.get(self.url)
+        with mock.patch.object(PublicacionListSerializer, "render", autospec=True) as render:
+            response = self.client.get(self.url)
+        render.assert_not_called()
+        self.assertEqual(len(self._titles(response)), 3)
+
+    def test_saving_invalidates_only_that_object(self):
+        self.client.get(self.url)
+        cambiada = self.publicaciones[1]
+        cambiada.titulo = "Noticia editada"
+        cambiada.save()
+
+        rendered = []
+        original = PublicacionListSerializer.render
+
+        def spy(serializer, instance):
+            rendered.append(instance.pk)
+            return original(serializer, instance)
+
+        with mock.patch.object(PublicacionListSerializer, "render", spy):
+            response = self.client.get(self.url)
+        self.assertEqual(rendered, [cambiada.pk])
+        self.assertIn("Noticia editada", self._titles(response))
+
+    def test_detail_uses_cache_and_active_language(self):
+        url = reverse('publicaciones-detail', kwargs={"slug": "noticia-0"})
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT_LANGUAGE="en").data["titulo"], "News 0")
+        response = self.client.get(url, HTTP_ACCEPT_LANGUAGE="es")
+        self.assertEqual(response.data["titulo"], "Noticia 0")
+        self.assertEqual(response.data["autor_nombre"], "Ana")
+
+    def test_only_loads_active_language_columns(self):
+        with translation.override("en"):
+            queryset = only_active_language(Publicacion.objects.all(), PublicacionListSerializer)
+            deferred = queryset.query.deferred_loading
+            self.assertFalse(deferred[1])  # Modo `only()`: lo listado es lo único que se carga.
+            self.assertIn("titulo_en", deferred[0])
+            self.assertIn("titulo_es", deferred[0])  # Idioma de respaldo.
+            self.assertNotIn("titulo", deferred[0])
+            self.assertNotIn("contenido_en", deferred[0])
+            with self.assertNumQueries(1):
+                titles = [item.titulo for item in queryset]
+        self.assertIn("News 0", titles)
+
+        atractivos = only_active_language(AtractivoTuristico.objects.all(), AtractivoTuristicoListSerializer)
+        self.assertIn("fecha_actualizacion", atractivos.query.deferred_loading[0])
+        self.assertNotIn("como_llegar_es", atractivos.query.deferred_loading[0])
+
+    def test_gallery_change_refreshes_page_representation(self):
+        pagina = PaginaInstitucional.objects.create(nombre="Secretaría", slug="secretaria", titulo_banner="Bienvenidos", banner="banner.jpg")
+        url = reverse('pagina-institucional-detail', kwargs={"pk": pagina.pk})
+        self.assertEqual(self.client.get(url).data["galeria_imagenes"], [])
+        ImagenPaginaInstitucional.objects.create(pagina=pagina, imagen="foto.jpg")
+        self.assertEqual(len(self.client.get(url).data["galeria_imagenes"]), 1)
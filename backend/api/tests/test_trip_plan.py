@@ -0,0 +1,137 @@
+from io import StringIO
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import translation
+from rest_framework.test import APITestCase
+
+from api.geo import geohash_encode
+from api.models import (
+    Artesano, AtractivoTuristico, CategoriaPrestador, CustomUser, ElementoGuardado, PrestadorServicio, Publicacion,
+    RubroArtesano,
+)
+from api.trip_plan import build_plan
+
+CENTER = (4.3155, -72.0819)  # Puerto Gaitán
+
+
+class TripPlanTests(APITestCase):
+    """Copia de "Mi Viaje": mantenimiento por señales, lista y plan por días y zonas."""
+
+    def setUp(self):
+        self.turista = CustomUser.objects.create_user(
+            username="viajera", email="viajera@example.com", password="password123", role=CustomUser.Role.TURISTA
+        )
+        self.categoria = CategoriaPrestador.objects.create(nombre="Hoteles", slug="hoteles")
+        self.rubro = RubroArtesano.objects.create(nombre="Tejidos", slug="tejidos")
+
+    def create_atractivo(self, name, lat=None, lng=None):
+        return AtractivoTuristico.objects.create(
+            nombre=name, slug=name.lower().replace(" ", "-"), descripcion="-", como_llegar="-",
+            latitud=lat, longitud=lng, imagen_principal=f"atractivos/{name}.jpg", es_publicado=True,
+        )
+
+    def save_item(self, obj, **extra):
+        return ElementoGuardado.objects.create(
+            usuario=self.turista, content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk, **extra
+        )
+
+    def test_snapshot_follows_the_target(self):
+        laguna = self.create_atractivo("Laguna", *CENTER)
+        elemento = self.save_item(laguna)
+        self.assertEqual(
+            (elemento.tipo, elemento.nombre, elemento.url_detalle, elemento.imagen, elemento.zona),
+            ("atractivo", "Laguna", "/descubre/atractivos/laguna", "atractivos/Laguna.jpg", geohash_encode(*CENTER, 5)),
+        )
+
+        laguna.nombre = "Laguna Azul"
+        laguna.latitud = None
+        laguna.save()
+        elemento.refresh_from_db()
+        self.assertEqual((elemento.nombre, elemento.latitud, elemento.zona), ("Laguna Azul", None, ""))
+
+        owner = CustomUser.objects.create_user(username="tejedora", email="t@example.com", password="password123")
+        taller = Artesano.objects.create(usuario=owner, rubro=self.rubro, nombre_taller="Taller", nombre_artesano="Ana")
+        self.assertEqual(self.save_item(taller).url_detalle, f"/directorio/artesanos/{taller.pk}")
+
+        laguna.delete()
+        self.assertEqual(list(ElementoGuardado.objects.values_list("tipo", flat=True)), ["artesano"])
+
+    def test_list_is_served_from_the_snapshot(self):
+        evento = Publicacion.objects.create(titulo="Festival", slug="festival", contenido="-", tipo=Publicacion.Tipo.EVENTO)
+        self.save_item(evento)
+        self.save_item(self.create_atractivo("Laguna", *CENTER))
+        self.client.force_authenticate(self.turista)
+
+        url = reverse('elemento-guardado-list')
+        with self.assertNumQueries(2):  # Conteo y página.
+            response = self.client.get(url)
+        items = {item["content_type_name"]: item for item in response.data["results"]}
+        self.assertEqual(items["publicacion"]["content_object"]["titulo"], "Festival")
+        self.assertEqual(items["publicacion"]["url_detalle"], "/publicaciones/festival")
+        self.assertTrue(items["atractivoturistico"]["content_object"]["imagen_principal"].endswith("atractivos/Laguna.jpg"))
+
+        detail = reverse('elemento-guardado-detail', args=[items["publicacion"]["id"]])
+        self.assertEqual(self.client.patch(detail, {"dia": 2, "nombre": "x"}).data["dia"], 2)
+        self.assertEqual(ElementoGuardado.objects.get(pk=items["publicacion"]["id"]).nombre, "Festival")
+        self.assertEqual(self.client.patch(detail, {"dia": 0}).status_code, 400)
+
+        owner = CustomUser.objects.create_user(username="hotel", email="hotel@example.com", password="password123")
+        hotel = PrestadorServicio.objects.create(usuario=owner, categoria=self.categoria, nombre_negocio="Hotel")
+        response = self.client.post(url, {"content_type": "prestadorservicio", "object_id": hotel.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ElementoGuardado.objects.get(object_id=hotel.pk, tipo="prestador").nombre, "Hotel")
+
+    @override_settings(TRIP_PLAN={"STOPS_PER_DAY": 2})
+    def test_plan_groups_by_day_and_zone(self):
+        near = [self.create_atractivo(f"Cerca {i}", CENTER[0] + 0.001 * i, CENTER[1]) for i in range(3)]
+        far = self.create_atractivo("Lejos", CENTER[0] + 1, CENTER[1] + 1)
+        chosen = self.create_atractivo("Elegido", CENTER[0] - 1, CENTER[1])
+        unknown = self.create_atractivo("Sin mapa")
+        for obj in near + [far, unknown]:
+            self.save_item(obj)
+        self.save_item(chosen, dia=1)
+
+        with self.assertNumQueries(1):
+            plan = build_plan(self.turista)
+        self.assertEqual(plan["total"], 6)
+        days = [[item["nombre"] for zone in day["zonas"] for item in zone["elementos"]] for day in plan["dias"]]
+        # El día 1 lo eligió la turista; la zona de tres elementos no cabe en un día de dos
+        # y lo que sobra comparte día con la zona siguiente.
+        self.assertEqual(days, [["Elegido"], ["Cerca 0", "Cerca 1"], ["Cerca 2", "Lejos"]])
+        self.assertEqual([len(day["zonas"]) for day in plan["dias"]], [1, 1, 2])
+        self.assertEqual([item["nombre"] for item in plan["sin_ubicacion"]], ["Sin mapa"])
+
+        self.client.force_authenticate(self.turista)
+        response = self.client.get(reverse('elemento-guardado-plan'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total"], 6)
+
+    def test_names_follow_the_active_language(self):
+        laguna = self.create_atractivo("Laguna", *CENTER)
+        laguna.nombre_en = "Lagoon"
+        laguna.save()
+        self.save_item(laguna)
+        hotel_owner = CustomUser.objects.create_user(username="hotel", email="hotel@example.com", password="password123")
+        self.save_item(PrestadorServicio.objects.create(usuario=hotel_owner, categoria=self.categoria, nombre_negocio="Hotel"))
+
+        def names(plan):
+            return sorted(item["nombre"] for day in plan["dias"] for zone in day["zonas"] for item in zone["elementos"]) + \
+                sorted(item["nombre"] for item in plan["sin_ubicacion"])
+
+        with translation.override("en"):
+            self.assertEqual(names(build_plan(self.turista)), ["Lagoon", "Hotel"])
+            self.assertEqual(ElementoGuardado.objects.get(tipo="atractivo").nombre, "Lagoon")
+        with translation.override("es"):
+            self.assertEqual(names(build_plan(self.turista)), ["Laguna", "Hotel"])
+
+    def test_rebuild_command_fills_bulk_loaded_items(self):
+        laguna = self.create_atractivo("Laguna", *CENTER)
+        ElementoGuardado.objects.bulk_create([
+            ElementoGuardado(usuario=self.turista, content_type=ContentType.objects.get_for_model(laguna), object_id=laguna.pk)
+        ])
+        self.assertEqual(ElementoGuardado.objects.get().tipo, "")
+        call_command("rebuild_trip_snapshots", stdout=StringIO())
+        self.assertEqual(ElementoGuardado.objects.get().nombre, "Laguna")
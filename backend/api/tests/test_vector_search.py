@@ -0,0 +1,162 @@
+import shutil
+import tempfile
+import threading
+import unicodedata
+from unittest.mock import patch
+
+from django.db import connections, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import vector_search
+from api.commit_batches import defer_until_commit
+from api.models import AtractivoTuristico, CustomUser, PaginaInstitucional, PrestadorServicio
+from api.vector_search import get_vector_store, rebuild_vector_index, semantic_search, split_passages
+from tools.herramientas_turista import buscar_pasajes_relevantes
+
+# Cada dimensión agrupa palabras de un mismo concepto: un "modelo" de juguete pero con semántica.
+CONCEPTS = [
+    {"ave", "aves", "pajaro", "pajaros", "garza", "birds"},
+    {"comida", "restaurante", "desayuno", "almuerzo", "platos"},
+    {"rio", "laguna", "agua", "pesca"},
+    {"secretaria", "turismo", "programas"},
+]
+
+
+def fake_vector(text):
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    words = {word.strip("¿?¡!.,") for word in text.split()}
+    return [float(len(words & concept)) for concept in CONCEPTS] + [0.01]
+
+
+class VectorIndexMixin:
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        settings_override = override_settings(VECTOR_INDEX={
+            "PATH": f"{self.tmpdir}/vector_index.sqlite3", "BACKGROUND": False, "CHUNK_CHARS": 60,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.embedded_texts = []
+        self.embeddings_up = True
+
+        async def fake_embed_texts(texts, model_name=None):
+            if not self.embeddings_up:
+                return None
+            self.embedded_texts.extend(texts)
+            return [fake_vector(text) for text in texts]
+
+        embed_patch = patch.object(vector_search, "embed_texts", side_effect=fake_embed_texts)
+        embed_patch.start()
+        self.addCleanup(embed_patch.stop)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = CustomUser.objects.create_user(username='llanero', email='llanero@example.com', password='password123')
+            self.mirador = AtractivoTuristico.objects.create(
+                nombre="Mirador del Manacacías", slug="mirador", descripcion="Al atardecer llegan garzas y otras aves.",
+                como_llegar="A pie.", categoria_color=AtractivoTuristico.CategoriaColor.BLANCO, es_publicado=True,
+            )
+            self.restaurante = PrestadorServicio.objects.create(
+                usuario=self.user, nombre_negocio="Restaurante El Llano", descripcion="Desayuno y almuerzo con platos típicos.",
+                aprobado=True,
+            )
+
+
+class VectorIndexTests(VectorIndexMixin, TestCase):
+    """Pruebas del índice vectorial: reindexación incremental por señales, k-NN y filtros."""
+
+    def test_saved_objects_are_searchable_by_meaning(self):
+        results = semantic_search("¿Dónde puedo ver pájaros?", k=1)
+        self.assertEqual((results[0]["type"], results[0]["id"]), ("atractivo", self.mirador.pk))
+        self.assertEqual(semantic_search("un buen restaurante", k=1)[0]["id"], self.restaurante.pk)
+
+    def test_unchanged_passages_are_not_embedded_again(self):
+        self.embedded_texts.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurante.save()
+        self.assertEqual(self.embedded_texts, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurante.promociones_ofertas = "Pesca deportiva en el río."
+            self.restaurante.save()
+        # Solo el pasaje nuevo; español e inglés comparten texto y embedding.
+        self.assertEqual(len(self.embedded_texts), 1)
+        self.assertEqual(semantic_search("pesca", k=1)[0]["passage"], "Pesca deportiva en el río.")
+
+    def test_long_texts_are_split_into_passages(self):
+        self.assertEqual(split_passages("uno dos\n\ntres", 60), ["uno dos\n\ntres"])
+        self.assertEqual(split_passages("a" * 10 + " " + "b" * 10, 12), ["a" * 10, "b" * 10])
+        with self.captureOnCommitCallbacks(execute=True):
+            PaginaInstitucional.objects.create(
+                nombre="Secretaría", slug="secretaria", titulo_banner="Secretaría de Turismo",
+                contenido_principal="Objetivos de la secretaría.", programas_proyectos="Programas de avistamiento de aves " * 4,
+            )
+        results = semantic_search("programas de la secretaria", k=3, types=["pagina"])
+        self.assertGreater(len(results), 1)
+        self.assertTrue(all(r["title"].startswith("Secretaría") for r in results))
+
+    def test_delete_and_visibility(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurante.aprobado = False
+            self.restaurante.save()
+        self.assertEqual(semantic_search("restaurante", types=["prestador"]), [])
+        self.assertEqual(len(semantic_search("restaurante", types=["prestador"], public_only=False)), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mirador.delete()
+        self.assertNotIn("atractivo", {r["type"] for r in semantic_search("aves", k=10)})
+
+    def test_embedding_outage_keeps_previous_index(self):
+        self.embeddings_up = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mirador.descripcion = "Texto nuevo."
+            self.mirador.save()
+        self.assertIsNone(semantic_search("aves"))
+        self.embeddings_up = True
+        self.assertIn("garzas", semantic_search("aves", k=1)[0]["passage"])
+
+    def test_another_threads_commit_does_not_take_this_transactions_marks(self):
+        received = []
+
+        def commit_elsewhere():
+            defer_until_commit("prueba", {"ajena": True}, received.append)  # Sin transacción: se entrega ya.
+            connections.close_all()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            defer_until_commit("prueba", {"propia": True}, received.append)
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                defer_until_commit("prueba", {"revertida": True}, received.append)
+                raise RuntimeError
+            worker = threading.Thread(target=commit_elsewhere)
+            worker.start()
+            worker.join()
+            self.assertEqual(received, [{"ajena": True}])
+        self.assertEqual(received, [{"ajena": True}, {"propia": True, "revertida": True}])
+
+    def test_rebuild_purges_missing_objects(self):
+        AtractivoTuristico.objects.filter(pk=self.mirador.pk).delete()  # Sin señales: queda huérfano.
+        self.assertEqual(rebuild_vector_index(["atractivo"]), {"atractivo": 0})
+        self.assertEqual(get_vector_store().count(), 2)  # El restaurante, en español e inglés.
+
+    def test_turista_tool_returns_context_passages(self):
+        result = buscar_pasajes_relevantes.invoke({"pregunta": "aves", "cantidad": 1})
+        self.assertEqual(result["data"][0]["titulo"], "Mirador del Manacacías")
+        self.embeddings_up = False
+        self.assertEqual(buscar_pasajes_relevantes.invoke({"pregunta": "aves"})["status"], "error")
+
+
+class SemanticSearchEndpointTests(VectorIndexMixin, APITestCase):
+    """Pruebas del endpoint de búsqueda semántica."""
+
+    def test_semantic_search_endpoint(self):
+        response = self.client.get(reverse('semantic-search'), {'q': 'aves', 'k': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['id'], self.mirador.pk)
+        self.assertEqual(self.client.get(reverse('semantic-search'), {'q': 'x', 'types': 'foo'}).status_code, 400)
+        self.embeddings_up = False
+        self.assertEqual(self.client.get(reverse('semantic-search'), {'q': 'x'}).status_code, 503)
@@ -0,0 +1,174 @@
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from modeltranslation.translator import NotRegistered, translator
+from modeltranslation.utils import build_localized_fieldname, get_language, resolution_order
+from rest_framework import serializers
+
+# --- REPRESENTACIONES CACHEADAS POR IDIOMA ---
+#
+# Con `LocaleMiddleware` cada petición serializa las mismas filas en español o en inglés.
+# Para los modelos traducidos (Publicacion, AtractivoTuristico, PaginaInstitucional) la
+# representación de cada objeto se guarda por serializador, idioma y versión de la fila
+# (`fecha_actualizacion`, que cambia en cada `save()`): guardar un objeto invalida solo
+# sus entradas, y otro proceso nunca sirve una versión vieja porque la versión viaja en
+# la fila que igual se lee.
+#
+# Una representación que salió con datos provisionales (p. ej. derivadas de imagen aún
+# cargándose en segundo plano, ver `ImageVariantsField`) no se guarda: su contenido no
+# depende de la versión de la fila y quedaría fijada hasta `TIMEOUT_SECONDS`.
+#
+# `only_active_language()` complementa lo anterior: pide a la base de datos solo las
+# columnas `_<idioma>` del idioma activo (y las de su idioma de respaldo), no todas.
+
+DEFAULT_TRANSLATED_CACHE_SETTINGS = {
+    "ENABLED": True,
+    "CACHE_ALIAS": "default",
+    "TIMEOUT_SECONDS": 24 * 3600,
+}
+
+VERSION_FIELDS = ("fecha_actualizacion", "updated_at")
+
+
+def get_translated_cache_settings() -> Dict:
+    return {**DEFAULT_TRANSLATED_CACHE_SETTINGS, **getattr(settings, "TRANSLATED_CACHE", {})}
+
+
+def _translated_fields(model) -> tuple:
+    try:
+        return tuple(translator.get_options_for_model(model).fields)
+    except NotRegistered:
+        return ()
+
+
+def version_field(model) -> Optional[str]:
+    for name in VERSION_FIELDS:
+        try:
+            model._meta.get_field(name)
+            return name
+        except FieldDoesNotExist:
+            continue
+    return None
+
+
+# --- COLUMNAS DEL IDIOMA ACTIVO ---
+
+def active_language_columns(model, fields) -> List[str]:
+    """
+    Columnas a pedir para `fields`: un campo traducido se reemplaza por su columna del
+    idioma activo más las de respaldo (p. ej. `nombre_en`, `nombre_es`), sin la columna base.
+    """
+    translated = set(_translated_fields(model))
+    languages = resolution_order(get_language())
+    columns = []
+    for name in fields:
+        if name in translated:
+            columns.extend(build_localized_fieldname(name, language) for language in languages)
+        else:
+            columns.append(name)
+    return list(dict.fromkeys(columns))
+
+
+@lru_cache(maxsize=None)
+def serializer_columns(serializer_class) -> tuple:
+    """Campos locales del modelo que lee `serializer_class` (por `source`), más la versión de la fila."""
+    model = serializer_class.Meta.model
+    names = ["pk"]
+    for field in serializer_class().fields.values():
+        if field.write_only or field.source == "*":
+            continue
+        root = field.source.split(".")[0]
+        try:
+            model_field = model._meta.get_field(root)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete and not model_field.many_to_many:
+            names.append(root)
+    if version_field(model):
+        names.append(version_field(model))
+    return tuple(names)
+
+
+def only_active_language(queryset, serializer_class):
+    """Restringe `queryset` a las columnas que serializa `serializer_class`, en el idioma activo."""
+    return queryset.only(*active_language_columns(queryset.model, serializer_columns(serializer_class)))
+
+
+# --- SERIALIZADORES ---
+
+def _cache(config):
+    return caches[config["CACHE_ALIAS"]]
+
+
+class CachedRepresentationListSerializer(serializers.ListSerializer):
+    """Lee de la caché las representaciones de toda la página con un solo `get_many`."""
+
+    def to_representation(self, data):
+        iterable = list(data.all() if hasattr(data, "all") else data)
+        config = get_translated_cache_settings()
+        keys = [self.child.representation_key(item) for item in iterable]
+        if not config["ENABLED"] or not any(keys):
+            return [self.child.render(item) for item in iterable]
+
+        cache = _cache(config)
+        cached = cache.get_many([key for key in keys if key])
+        result, missing = [], {}
+        for item, key in zip(iterable, keys):
+            if key in cached:
+                result.append(cached[key])
+                continue
+            representation, complete = self.child.render_checked(item)
+            if key and complete:
+                missing[key] = representation
+            result.append(representation)
+        if missing:
+            cache.set_many(missing, timeout=config["TIMEOUT_SECONDS"])
+        return result
+
+
+class CachedRepresentationMixin:
+    """
+    Mixin para ModelSerializer de modelos traducidos: guarda `to_representation` por
+    objeto, idioma y versión. Sin campo de versión en el modelo no cachea nada.
+    """
+
+    def representation_key(self, instance) -> Optional[str]:
+        name = version_field(type(instance))
+        version = getattr(instance, name, None) if name else None
+        if instance.pk is None or version is None:
+            return None
+        request = self.context.get("request")
+        host = request.build_absolute_uri("/") if request is not None else ""  # Las URLs de imágenes son absolutas.
+        serializer = f"{type(self).__module__}.{type(self).__qualname__}"
+        identity = f"{serializer}|{get_language()}|{host}|{instance.pk}|{version.isoformat()}"
+        return f"representation:{hashlib.sha1(identity.encode()).hexdigest()}"
+
+    def render(self, instance):
+        return super().to_representation(instance)
+
+    def mark_incomplete(self) -> None:
+        """Lo llaman los campos cuyo valor es provisional: esta representación no se guarda."""
+        self._representation_complete = False
+
+    def render_checked(self, instance):
+        """`(representación, completa)`: completa si ningún campo llamó a `mark_incomplete`."""
+        self._representation_complete = True
+        representation = self.render(instance)
+        return representation, self._representation_complete
+
+    def to_representation(self, instance):
+        config = get_translated_cache_settings()
+        key = self.representation_key(instance) if config["ENABLED"] else None
+        if key is None:
+            return self.render(instance)
+        cache = _cache(config)
+        representation = cache.get(key)
+        if representation is None:
+            representation, complete = self.render_checked(instance)
+            if complete:
+                cache.set(key, representation, timeout=config["TIMEOUT_SECONDS"])
+        return representation
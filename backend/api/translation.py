@@ -10,7 +10,8 @@ from .models import (
     PrestadorServicio,
     Artesano,
     Video,
-    ConsejoConsultivo
+    ConsejoConsultivo,
+    ElementoGuardado
 )
 
 @register(Publicacion)
@@ -55,4 +56,9 @@ class VideoTranslationOptions(TranslationOptions):
 
 @register(ConsejoConsultivo)
 class ConsejoConsultivoTranslationOptions(TranslationOptions):
-    fields = ('titulo', 'contenido')
\ No newline at end of file
+    fields = ('titulo', 'contenido')
+
+@register(ElementoGuardado)
+class ElementoGuardadoTranslationOptions(TranslationOptions):
+    # Copia del nombre del destino en cada idioma (ver `api/trip_plan.py`).
+    fields = ('nombre',)
@@ -0,0 +1,294 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import default_storage
+from django.utils import translation
+from modeltranslation.settings import AVAILABLE_LANGUAGES
+from modeltranslation.utils import build_localized_fieldname, get_language, resolution_order
+
+from .geo import geohash_encode, haversine_km
+
+# --- COPIA DE "MI VIAJE" ---
+#
+# "Mi Viaje" resolvía cada elemento guardado con su `content_object` (una consulta por
+# modelo destino y la serialización completa del destino) solo para mostrar nombre,
+# imagen y enlace. Cada `ElementoGuardado` guarda ahora una copia de esos datos (tipo,
+# nombre, slug, URL, imagen, coordenadas y zona): la lista y el plan por días salen de
+# una sola consulta sobre la tabla de elementos guardados. El nombre se copia en cada
+# idioma (`nombre_es`, `nombre_en`, registrado en modeltranslation) y se lee en el activo.
+#
+# Mantenimiento:
+#   - Al crear el elemento (pre_save) se copia el destino.
+#   - Al guardar un destino (post_save) se actualizan sus copias con un solo UPDATE.
+#   - Al borrar un destino (post_delete) se retiran los elementos que lo guardaban.
+#   - `manage.py rebuild_trip_snapshots` rellena las filas antiguas y las que se
+#     cambiaron con `update()` masivos (que no emiten señales).
+#
+# La zona es el prefijo de geohash de `ZONE_PRECISION` (5: celdas de ~5 km): el plan
+# agrupa por zona los elementos sin día asignado y reparte las zonas en días.
+
+DEFAULT_TRIP_PLAN_SETTINGS = {
+    "ZONE_PRECISION": 5,
+    "STOPS_PER_DAY": 6,
+}
+
+
+def get_trip_plan_settings() -> Dict:
+    return {**DEFAULT_TRIP_PLAN_SETTINGS, **getattr(settings, "TRIP_PLAN", {})}
+
+
+# --- REGISTRO DE MODELOS ---
+
+@dataclass
+class TripSpec:
+    """Cómo copiar un destino de "Mi Viaje": nombre, slug, URL pública e imagen."""
+    tipo: str
+    model: Any
+    name: Callable[[Any], str]
+    url: Callable[[Any], str]
+    image_field: str
+    slug: Callable[[Any], str] = lambda obj: ""
+
+
+def _build_registry() -> Dict[str, TripSpec]:
+    from .models import Artesano, AtractivoTuristico, PrestadorServicio, Publicacion
+
+    specs = [
+        TripSpec("atractivo", AtractivoTuristico, lambda obj: obj.nombre,
+                 lambda obj: f"/descubre/atractivos/{obj.slug}", "imagen_principal", lambda obj: obj.slug),
+        TripSpec("publicacion", Publicacion, lambda obj: obj.titulo,
+                 lambda obj: f"/publicaciones/{obj.slug}", "imagen_principal", lambda obj: obj.slug),
+        TripSpec("prestador", PrestadorServicio, lambda obj: obj.nombre_negocio,
+                 lambda obj: f"/directorio/prestadores/{obj.pk}", "foto_principal"),
+        TripSpec("artesano", Artesano, lambda obj: obj.nombre_taller,
+                 lambda obj: f"/directorio/artesanos/{obj.pk}", "foto_principal"),
+    ]
+    return {spec.tipo: spec for spec in specs}
+
+
+_registry: Optional[Dict[str, TripSpec]] = None
+
+
+def get_registry() -> Dict[str, TripSpec]:
+    global _registry
+    if _registry is None:
+        _registry = _build_registry()
+    return _registry
+
+
+def spec_for_model(model) -> Optional[TripSpec]:
+    for spec in get_registry().values():
+        if spec.model is model:
+            return spec
+    return None
+
+
+# --- COPIA ---
+
+NAME_FIELDS = tuple(build_localized_fieldname("nombre", code) for code in AVAILABLE_LANGUAGES)
+SNAPSHOT_FIELDS = ("tipo",) + NAME_FIELDS + ("slug", "url_detalle", "imagen", "latitud", "longitud", "zona")
+
+
+def localized_name(row: Dict) -> str:
+    """Nombre copiado en el idioma activo (o el primero disponible según los respaldos)."""
+    for code in resolution_order(get_language()):
+        value = row.get(build_localized_fieldname("nombre", code))
+        if value:
+            return value
+    return ""
+
+
+def snapshot_values(spec: TripSpec, obj) -> Dict:
+    """Valores de la copia para el destino `obj`; el nombre en cada idioma, como lo serviría el destino."""
+    latitud, longitud = getattr(obj, "latitud", None), getattr(obj, "longitud", None)
+    located = latitud is not None and longitud is not None
+    image = getattr(obj, spec.image_field, None)
+    names = {}
+    for code, field in zip(AVAILABLE_LANGUAGES, NAME_FIELDS):
+        with translation.override(code):
+            names[field] = (spec.name(obj) or "")[:255]
+    return {
+        "tipo": spec.tipo,
+        **names,
+        "slug": (spec.slug(obj) or "")[:255],
+        "url_detalle": spec.url(obj)[:255],
+        "imagen": image.name if image else "",
+        "latitud": latitud if located else None,
+        "longitud": longitud if located else None,
+        "zona": geohash_encode(latitud, longitud, get_trip_plan_settings()["ZONE_PRECISION"]) if located else "",
+    }
+
+
+def fill_snapshot(elemento) -> None:
+    """Copia el destino de un elemento nuevo (o sin copia) antes de guardarlo."""
+    if elemento.pk is not None and elemento.tipo:
+        return
+    model = ContentType.objects.get_for_id(elemento.content_type_id).model_class()
+    spec = spec_for_model(model)
+    if spec is None:
+        return
+    target = model._base_manager.filter(pk=elemento.object_id).first()
+    if target is None:
+        return
+    for name, value in snapshot_values(spec, target).items():
+        setattr(elemento, name, value)
+
+
+def refresh_for_target(instance) -> int:
+    """Actualiza las copias de los elementos que guardan `instance`. Devuelve cuántas."""
+    from .models import ElementoGuardado
+
+    spec = spec_for_model(type(instance))
+    if spec is None:
+        return 0
+    return ElementoGuardado.objects.filter(
+        content_type=ContentType.objects.get_for_model(spec.model), object_id=instance.pk,
+    ).update(**snapshot_values(spec, instance))
+
+
+def remove_for_target(instance) -> None:
+    """El destino ya no existe: se retira de "Mi Viaje" de todos los turistas."""
+    from .models import ElementoGuardado
+
+    spec = spec_for_model(type(instance))
+    if spec is not None:
+        ElementoGuardado.objects.filter(
+            content_type=ContentType.objects.get_for_model(spec.model), object_id=instance.pk,
+        ).delete()
+
+
+def rebuild_snapshots(usuario=None, batch_size: int = 500) -> int:
+    """
+    Recalcula las copias (de un turista o de todos) con una consulta por modelo destino
+    y por lote. Devuelve cuántos elementos se actualizaron.
+    """
+    from .generic_relations import prefetch_generic_objects
+    from .models import ElementoGuardado
+
+    queryset = ElementoGuardado.objects.order_by("pk")
+    if usuario is not None:
+        queryset = queryset.filter(usuario=usuario)
+    updated = 0
+    last_pk = 0
+    while True:
+        batch = prefetch_generic_objects(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return updated
+        last_pk = batch[-1].pk
+        changed = []
+        for elemento in batch:
+            target = elemento.content_object
+            spec = spec_for_model(type(target)) if target is not None else None
+            if spec is None:
+                continue
+            for name, value in snapshot_values(spec, target).items():
+                setattr(elemento, name, value)
+            changed.append(elemento)
+        ElementoGuardado.objects.bulk_update(changed, SNAPSHOT_FIELDS)
+        updated += len(changed)
+
+
+def image_url(path: str, request=None) -> Optional[str]:
+    """URL de la imagen copiada (absoluta si hay petición), como la daría un ImageField de DRF."""
+    if not path:
+        return None
+    url = default_storage.url(path)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+# --- PLAN POR DÍAS ---
+
+PLAN_FIELDS = ("id", "content_type_id", "object_id", "fecha_guardado", "dia") + SNAPSHOT_FIELDS
+
+
+def _as_item(row: Dict, request=None) -> Dict:
+    return {
+        "id": row["id"],
+        "content_type_name": ContentType.objects.get_for_id(row["content_type_id"]).model,
+        "object_id": row["object_id"],
+        "tipo": row["tipo"],
+        "nombre": localized_name(row),
+        "slug": row["slug"],
+        "url_detalle": row["url_detalle"],
+        "imagen": image_url(row["imagen"], request),
+        "latitud": row["latitud"],
+        "longitud": row["longitud"],
+        "zona": row["zona"],
+        "dia": row["dia"],
+        "fecha_guardado": row["fecha_guardado"],
+    }
+
+
+def _chain_zones(zones: Dict[str, List[Dict]]) -> List[str]:
+    """
+    Orden de recorrido de las zonas: empieza por la que tiene más elementos y sigue
+    siempre por la zona más cercana (centroides) aún no visitada.
+    """
+    centroids = {
+        zona: (sum(row["latitud"] for row in rows) / len(rows), sum(row["longitud"] for row in rows) / len(rows))
+        for zona, rows in zones.items()
+    }
+    remaining = set(zones)
+    current = min(remaining, key=lambda zona: (-len(zones[zona]), zona))
+    order = [current]
+    remaining.discard(current)
+    while remaining:
+        lat, lng = centroids[current]
+        current = min(remaining, key=lambda zona: (haversine_km(lat, lng, *centroids[zona]), zona))
+        order.append(current)
+        remaining.discard(current)
+    return order
+
+
+def build_plan(usuario, request=None) -> Dict:
+    """
+    "Mi Viaje" agrupado por días y, dentro de cada día, por zona. Los días elegidos por
+    el turista se respetan; el resto de elementos con coordenadas se reparte por zonas
+    cercanas en días de hasta `STOPS_PER_DAY` elementos, a continuación. Los que no
+    tienen coordenadas ni día van en `sin_ubicacion`. Una sola consulta.
+    """
+    from .models import ElementoGuardado
+
+    per_day = max(1, get_trip_plan_settings()["STOPS_PER_DAY"])
+    rows = list(ElementoGuardado.objects.filter(usuario=usuario).order_by("fecha_guardado", "id").values(*PLAN_FIELDS))
+
+    days: Dict[int, List[Dict]] = {}
+    zones: Dict[str, List[Dict]] = {}
+    unplaced = []
+    for row in rows:
+        if row["dia"]:
+            days.setdefault(row["dia"], []).append(row)
+        elif row["zona"]:
+            zones.setdefault(row["zona"], []).append(row)
+        else:
+            unplaced.append(row)
+
+    if zones:
+        day = max(days, default=0) + 1
+        current: List[Dict] = []
+        for zona in _chain_zones(zones):
+            members = zones[zona]
+            if current and len(current) + len(members) > per_day:
+                days[day], day, current = current, day + 1, []
+            for row in members:
+                if len(current) == per_day:
+                    days[day], day, current = current, day + 1, []
+                current.append(row)
+        days[day] = current
+
+    plan = []
+    for day in sorted(days):
+        grouped: Dict[str, List[Dict]] = {}
+        for row in days[day]:
+            grouped.setdefault(row["zona"], []).append(_as_item(row, request))
+        plan.append({
+            "dia": day,
+            "zonas": [{"zona": zona, "elementos": items} for zona, items in grouped.items()],
+        })
+    return {
+        "total": len(rows),
+        "dias": plan,
+        "sin_ubicacion": [_as_item(row, request) for row in unplaced],
+    }
@@ -101,14 +101,22 @@ path(
     path('consejo-consultivo/', views.ConsejoConsultivoListView.as_view(), name='consejo-consultivo-list'),
     path('videos/', views.VideoListView.as_view(), name='videos-list'),
     path('locations/', views.LocationListView.as_view(), name='locations-list'),
+    path('locations/tiles/<int:z>/<int:x>/<int:y>/', views.LocationTileView.as_view(), name='locations-tile'),
     path('galeria-media/', views.GaleriaListView.as_view(), name='galeria-media-list'),
 
+    # --- Búsqueda de texto completo ---
+    path('search/', views.GlobalSearchView.as_view(), name='global-search'),
+    path('search/semantic/', views.SemanticSearchView.as_view(), name='semantic-search'),
+    path('rankings/<str:entity_type>/', views.RankingListView.as_view(), name='ranking-list'),
+
     # --- Vistas para el Sistema de Agentes ---
     path('agent/tasks/', views.AgentCommandView.as_view(), name='agent-command'),
+    path('agent/tasks/stream/', views.AgentCommandStreamView.as_view(), name='agent-command-stream'),
     path('agent/tasks/<uuid:id>/', views.AgentTaskStatusView.as_view(), name='agent-task-status'),
 
     # --- Vistas de Administración y Análisis (endpoints específicos no cubiertos por el router) ---
     path('dashboard/analytics/', views.AnalyticsDataView.as_view(), name='dashboard-analytics'),
     path('admin/statistics/detailed/', views.DetailedStatisticsView.as_view(), name='admin-detailed-statistics'),
+    path('admin/cache-stats/', views.CacheStatsView.as_view(), name='admin-cache-stats'),
     path('admin/usuarios/', views.AdminUsuarioListView.as_view(), name='admin-usuario-list'),
 ]
\ No newline at end of file
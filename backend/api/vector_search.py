@@ -0,0 +1,567 @@
+import hashlib
+import heapq
+import re
+import sqlite3
+import struct
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import connections
+
+from ai_models.embeddings import DEFAULT_EMBEDDING_MODEL, cosine_similarity, embed_texts
+from .commit_batches import defer_until_commit
+from .search import SearchableSpec, _field_text, current_language, get_registry, search_languages
+
+try:
+    import sqlite_vec
+except ImportError:  # Sin la extensión se usa la búsqueda exhaustiva en Python.
+    sqlite_vec = None
+
+# --- ÍNDICE VECTORIAL (BÚSQUEDA SEMÁNTICA) ---
+#
+# El Turista solo podía buscar por coincidencia de palabras, y para responder
+# preguntas abiertas ("¿dónde puedo ver aves al atardecer?") los agentes acababan
+# volcando tablas enteras en el prompt. Aquí el texto de atractivos, prestadores,
+# artesanos, publicaciones y páginas institucionales se parte en pasajes, cada
+# pasaje se convierte en embedding con el modelo local de Ollama (por lotes) y se
+# guarda en un archivo SQLite aparte con una tabla `vec0` de sqlite-vec, que
+# resuelve las consultas k-NN por distancia coseno.
+#
+#   - La reindexación es incremental: `post_save` marca el objeto y, al confirmar
+#     la transacción, un hilo en segundo plano recalcula solo los pasajes cuyo
+#     texto cambió (los demás reutilizan su embedding por hash de contenido).
+#   - Si el intérprete no permite cargar extensiones de SQLite, la consulta k-NN
+#     se resuelve recorriendo los vectores en Python (suficiente en desarrollo).
+
+DEFAULT_VECTOR_INDEX_SETTINGS = {
+    "ENABLED": True,
+    "PATH": None,  # None = BASE_DIR / "vector_index.sqlite3"
+    "EMBEDDING_MODEL": None,  # None = OLLAMA_EMBEDDING_MODEL
+    "BATCH_SIZE": 16,
+    "CHUNK_CHARS": 800,
+    "BACKGROUND": True,
+}
+
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+SQLITE_MAX_VARIABLES = 500
+
+
+def get_vector_index_settings() -> Dict[str, Any]:
+    config = {**DEFAULT_VECTOR_INDEX_SETTINGS, **getattr(settings, "VECTOR_INDEX", {})}
+    config["PATH"] = str(config["PATH"] or settings.BASE_DIR / "vector_index.sqlite3")
+    config["EMBEDDING_MODEL"] = config["EMBEDDING_MODEL"] or DEFAULT_EMBEDDING_MODEL
+    return config
+
+
+def _build_registry() -> Dict[str, SearchableSpec]:
+    from .models import PaginaInstitucional
+
+    registry = dict(get_registry())
+    registry["pagina"] = SearchableSpec(
+        "pagina", ("nombre", "titulo_banner"),
+        ("subtitulo_banner", "contenido_principal", "programas_proyectos", "estrategias_apoyo",
+         "politicas_locales", "convenios_asociaciones", "informes_resultados"),
+        lambda obj: True, PaginaInstitucional,
+    )
+    return registry
+
+
+_registry: Optional[Dict[str, SearchableSpec]] = None
+
+
+def get_vector_registry() -> Dict[str, SearchableSpec]:
+    global _registry
+    if _registry is None:
+        _registry = _build_registry()
+    return _registry
+
+
+def vector_spec_for_model(model) -> Optional[SearchableSpec]:
+    for spec in get_vector_registry().values():
+        if spec.model is model:
+            return spec
+    return None
+
+
+# --- PASAJES ---
+
+@dataclass
+class Passage:
+    type_name: str
+    object_id: int
+    language: str
+    chunk: int
+    title: str
+    text: str
+    is_public: bool
+
+    @property
+    def content(self) -> str:
+        """Texto que se convierte en embedding: el título da contexto a cada pasaje."""
+        return f"{self.title}\n{self.text}".strip()
+
+    @property
+    def content_hash(self) -> str:
+        return hashlib.sha1(self.content.encode("utf-8")).hexdigest()
+
+
+def split_passages(text: str, max_chars: int) -> List[str]:
+    """Divide un texto en pasajes de hasta `max_chars`, sin partir los párrafos que caben enteros."""
+    pieces = []
+    for paragraph in PARAGRAPH_RE.split(text or ""):
+        paragraph = " ".join(paragraph.split())
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars + 1)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    passages: List[str] = []
+    for piece in pieces:
+        if passages and len(passages[-1]) + 2 + len(piece) <= max_chars:
+            passages[-1] = f"{passages[-1]}\n\n{piece}"
+        else:
+            passages.append(piece)
+    return passages
+
+
+def build_passages(instance, spec: SearchableSpec, max_chars: int) -> List[Passage]:
+    """Pasajes de un objeto en cada idioma (los campos traducidos caen al idioma por defecto)."""
+    is_public = bool(spec.is_public(instance))
+    passages = []
+    for language in search_languages():
+        title = " ".join(t for t in (_field_text(instance, name, language) for name in spec.title_fields) if t)
+        body = "\n\n".join(t for t in (_field_text(instance, name, language) for name in spec.body_fields) if t)
+        for chunk, text in enumerate(split_passages(body, max_chars) or [""]):
+            passages.append(Passage(spec.type_name, instance.pk, language, chunk, title, text, is_public))
+    return passages
+
+
+def pack_vector(vector: Iterable[float]) -> bytes:
+    """Serializa un vector como float32 contiguos (el formato que espera sqlite-vec)."""
+    values = list(vector)
+    return struct.pack(f"{len(values)}f", *values)
+
+
+def unpack_vector(blob: bytes) -> Tuple[float, ...]:
+    return struct.unpack(f"{len(blob) // 4}f", blob)
+
+
+# --- ALMACÉN SQLITE ---
+
+class VectorStore:
+    """
+    Pasajes y embeddings en un archivo SQLite propio, independiente de la base de datos
+    principal: es un índice derivado que se puede borrar y reconstruir en cualquier momento.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.vec_enabled = False
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @staticmethod
+    def _load_sqlite_vec(conn: sqlite3.Connection) -> bool:
+        if sqlite_vec is None or not hasattr(conn, "enable_load_extension"):
+            return False
+        try:
+            conn.enable_load_extension(True)
+            sqlite_vec.load(conn)
+            conn.enable_load_extension(False)
+            return True
+        except (sqlite3.Error, AttributeError):
+            return False
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            self.vec_enabled = self._load_sqlite_vec(conn)
+            if not self._ready:
+                self._create_schema(conn)
+                self._ready = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection) -> None:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS passages (
+                id INTEGER PRIMARY KEY,
+                type TEXT NOT NULL,
+                object_id INTEGER NOT NULL,
+                language TEXT NOT NULL,
+                chunk INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                text TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                is_public INTEGER NOT NULL,
+                embedding BLOB NOT NULL,
+                UNIQUE (type, object_id, language, chunk)
+            );
+            CREATE INDEX IF NOT EXISTS passages_hash_idx ON passages (content_hash);
+            CREATE INDEX IF NOT EXISTS passages_filter_idx ON passages (language, is_public, type);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    @staticmethod
+    def _has_vec_table(conn: sqlite3.Connection) -> bool:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'vec_passages'").fetchone() is not None
+
+    def _ensure_vec_table(self, conn: sqlite3.Connection, dimensions: int) -> None:
+        """Crea la tabla `vec0` y, si los pasajes ya existían (extensión recién instalada), la rellena."""
+        if not self.vec_enabled or self._has_vec_table(conn):
+            return
+        conn.execute(
+            f"CREATE VIRTUAL TABLE vec_passages USING vec0("
+            f"embedding float[{dimensions}] distance_metric=cosine, language text, type text, is_public integer)"
+        )
+        conn.execute(
+            "INSERT INTO vec_passages (rowid, embedding, language, type, is_public) "
+            "SELECT id, embedding, language, type, is_public FROM passages"
+        )
+
+    def _ensure_model(self, conn: sqlite3.Connection, model: str, dimensions: int) -> None:
+        """Un cambio de modelo (o de dimensión) invalida todos los vectores guardados."""
+        meta = self._meta(conn)
+        if meta and (meta.get("model"), meta.get("dimensions")) != (model, str(dimensions)):
+            print(f"--- ♻️ ÍNDICE VECTORIAL: Cambio de modelo ({meta.get('model')} -> {model}), se descarta el índice. ---")
+            conn.execute("DELETE FROM passages")
+            conn.execute("DROP TABLE IF EXISTS vec_passages")
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("model", model), ("dimensions", str(dimensions))],
+        )
+        self._ensure_vec_table(conn, dimensions)
+
+    def _delete_rows(self, conn: sqlite3.Connection, ids: List[int]) -> None:
+        for start in range(0, len(ids), SQLITE_MAX_VARIABLES):
+            chunk = ids[start:start + SQLITE_MAX_VARIABLES]
+            marks = ", ".join("?" * len(chunk))
+            if self.vec_enabled and self._has_vec_table(conn):
+                conn.execute(f"DELETE FROM vec_passages WHERE rowid IN ({marks})", chunk)
+            conn.execute(f"DELETE FROM passages WHERE id IN ({marks})", chunk)
+
+    def known_embeddings(self, model: str, hashes: Iterable[str]) -> Dict[str, bytes]:
+        """Embeddings ya calculados para esos textos (por hash), si el índice es del mismo modelo."""
+        hashes = list(set(hashes))
+        with self.connection() as conn:
+            if self._meta(conn).get("model") != model:
+                return {}
+            found = {}
+            for start in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+                chunk = hashes[start:start + SQLITE_MAX_VARIABLES]
+                rows = conn.execute(
+                    f"SELECT content_hash, embedding FROM passages WHERE content_hash IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+                found.update(rows.fetchall())
+            return found
+
+    def replace_objects(self, model: str, objects: Dict[Tuple[str, int], List[Tuple[Passage, bytes]]]) -> None:
+        """Sustituye todos los pasajes de cada objeto por los nuevos."""
+        dimensions = next((len(blob) // 4 for items in objects.values() for _, blob in items), None)
+        if dimensions is None:
+            return
+        with self._lock, self.connection() as conn:
+            self._ensure_model(conn, model, dimensions)
+            for (type_name, object_id), items in objects.items():
+                old_ids = [row[0] for row in conn.execute(
+                    "SELECT id FROM passages WHERE type = ? AND object_id = ?", (type_name, object_id)
+                )]
+                self._delete_rows(conn, old_ids)
+                for passage, blob in items:
+                    cursor = conn.execute(
+                        "INSERT INTO passages (type, object_id, language, chunk, title, text, content_hash, is_public, embedding) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (passage.type_name, passage.object_id, passage.language, passage.chunk, passage.title,
+                         passage.text, passage.content_hash, int(passage.is_public), blob),
+                    )
+                    if self.vec_enabled:
+                        conn.execute(
+                            "INSERT INTO vec_passages (rowid, embedding, language, type, is_public) VALUES (?, ?, ?, ?, ?)",
+                            (cursor.lastrowid, blob, passage.language, passage.type_name, int(passage.is_public)),
+                        )
+
+    def delete_objects(self, keys: Iterable[Tuple[str, int]]) -> None:
+        with self._lock, self.connection() as conn:
+            ids = []
+            for type_name, object_id in keys:
+                ids.extend(row[0] for row in conn.execute(
+                    "SELECT id FROM passages WHERE type = ? AND object_id = ?", (type_name, object_id)
+                ))
+            self._delete_rows(conn, ids)
+
+    def delete_missing(self, type_name: str, keep_ids: Iterable[int]) -> int:
+        """Elimina los pasajes de objetos de ese tipo que ya no existen en la base principal."""
+        keep = set(keep_ids)
+        with self._lock, self.connection() as conn:
+            stale = [
+                row[0] for row in conn.execute("SELECT id, object_id FROM passages WHERE type = ?", (type_name,))
+                if row[1] not in keep
+            ]
+            self._delete_rows(conn, stale)
+        return len(stale)
+
+    def count(self) -> int:
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+
+    def query(
+        self, vector: bytes, k: int, language: str, types: Optional[List[str]], public_only: bool, model: str
+    ) -> List[Tuple[str, int, str, str, float]]:
+        """Los `k` pasajes más cercanos: filas (type, object_id, title, text, similitud coseno)."""
+        with self.connection() as conn:
+            meta = self._meta(conn)
+            if meta.get("model") != model or meta.get("dimensions") != str(len(vector) // 4):
+                return []
+            if self.vec_enabled:
+                self._ensure_vec_table(conn, len(vector) // 4)
+                rows = []
+                # Los filtros de metadatos de vec0 solo admiten igualdad: una consulta k-NN por tipo.
+                for type_name in (types or [None]):
+                    where = ["embedding MATCH ?", "k = ?", "language = ?"]
+                    params: List[Any] = [vector, k, language]
+                    if public_only:
+                        where.append("is_public = 1")
+                    if type_name:
+                        where.append("type = ?")
+                        params.append(type_name)
+                    rows.extend(conn.execute(
+                        f"WITH knn AS (SELECT rowid, distance FROM vec_passages WHERE {' AND '.join(where)}) "
+                        "SELECT p.type, p.object_id, p.title, p.text, 1 - knn.distance "
+                        "FROM knn JOIN passages p ON p.id = knn.rowid",
+                        params,
+                    ).fetchall())
+                return sorted(rows, key=lambda row: row[4], reverse=True)[:k]
+
+            where, params = ["language = ?"], [language]
+            if public_only:
+                where.append("is_public = 1")
+            if types:
+                where.append(f"type IN ({', '.join('?' * len(types))})")
+                params.extend(types)
+            target = unpack_vector(vector)
+            candidates = conn.execute(
+                f"SELECT type, object_id, title, text, embedding FROM passages WHERE {' AND '.join(where)}", params
+            )
+            scored = (
+                (type_name, object_id, title, text, cosine_similarity(unpack_vector(blob), target))
+                for type_name, object_id, title, text, blob in candidates
+            )
+            return heapq.nlargest(k, scored, key=lambda row: row[4])
+
+
+_stores: Dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    path = get_vector_index_settings()["PATH"]
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = VectorStore(path)
+        return _stores[path]
+
+
+# --- INDEXACIÓN ---
+
+def index_objects(instances: Iterable[Any]) -> int:
+    """
+    Reindexa los objetos dados. Solo se piden a Ollama los pasajes cuyo texto no tiene
+    ya un embedding; si el servicio no responde, esos objetos conservan su versión anterior.
+
+    Returns:
+        Número de pasajes nuevos enviados al modelo de embeddings.
+    """
+    config = get_vector_index_settings()
+    model, store = config["EMBEDDING_MODEL"], get_vector_store()
+
+    passages_by_key: Dict[Tuple[str, int], List[Passage]] = {}
+    for instance in instances:
+        spec = vector_spec_for_model(type(instance))
+        if spec is not None:
+            passages_by_key[(spec.type_name, instance.pk)] = build_passages(instance, spec, config["CHUNK_CHARS"])
+    if not passages_by_key:
+        return 0
+
+    all_passages = [p for passages in passages_by_key.values() for p in passages]
+    vectors = store.known_embeddings(model, (p.content_hash for p in all_passages))
+    missing = {p.content_hash: p.content for p in all_passages if p.content_hash not in vectors}
+
+    hashes = list(missing)
+    embedded = 0
+    for start in range(0, len(hashes), config["BATCH_SIZE"]):
+        batch = hashes[start:start + config["BATCH_SIZE"]]
+        result = async_to_sync(embed_texts)([missing[h] for h in batch], model)
+        if not result:
+            print(f"--- ⚠️ ÍNDICE VECTORIAL: Sin embeddings para {len(batch)} pasajes; se reintentará en el próximo cambio. ---")
+            continue
+        vectors.update((h, pack_vector(vector)) for h, vector in zip(batch, result))
+        embedded += len(batch)
+
+    ready = {
+        key: [(p, vectors[p.content_hash]) for p in passages]
+        for key, passages in passages_by_key.items()
+        if all(p.content_hash in vectors for p in passages)
+    }
+    store.replace_objects(model, ready)
+    return embedded
+
+
+def _process(batch: Dict[Tuple[str, int], bool]) -> None:
+    """Aplica un lote de cambios pendientes: borra los eliminados y reindexa el resto."""
+    store, registry = get_vector_store(), get_vector_registry()
+    removed = [key for key, deleted in batch.items() if deleted]
+    by_type: Dict[str, List[int]] = {}
+    for (type_name, object_id), deleted in batch.items():
+        if not deleted:
+            by_type.setdefault(type_name, []).append(object_id)
+
+    instances = []
+    for type_name, ids in by_type.items():
+        found = list(registry[type_name].model.objects.filter(pk__in=ids))
+        instances.extend(found)
+        found_ids = {obj.pk for obj in found}
+        removed.extend((type_name, object_id) for object_id in ids if object_id not in found_ids)
+    if removed:
+        store.delete_objects(removed)
+    if instances:
+        index_objects(instances)
+
+
+# --- REINDEXACIÓN INCREMENTAL (SEÑALES) ---
+
+# Cambios ya confirmados, a la espera del worker. Las marcas de una transacción solo
+# llegan aquí al confirmarse ella misma (`defer_until_commit`).
+_pending: Dict[Tuple[str, int], bool] = {}  # (tipo, id) -> eliminado
+_pending_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+
+def schedule_reindex(instance, deleted: bool = False) -> None:
+    """Marca un objeto para reindexar (o retirar) cuando se confirme la transacción en curso."""
+    if not get_vector_index_settings()["ENABLED"]:
+        return
+    spec = vector_spec_for_model(type(instance))
+    if spec is None:
+        return
+    defer_until_commit("vector_index", {(spec.type_name, instance.pk): deleted}, _enqueue_committed)
+
+
+def _enqueue_committed(batch: Dict[Tuple[str, int], bool]) -> None:
+    with _pending_lock:
+        _pending.update(batch)
+    flush_pending()
+
+
+def _take_pending(release_worker: bool = False) -> Dict[Tuple[str, int], bool]:
+    global _worker
+    with _pending_lock:
+        batch = dict(_pending)
+        _pending.clear()
+        if not batch and release_worker:
+            _worker = None
+        return batch
+
+
+def process_pending() -> int:
+    """Procesa en este hilo todos los cambios pendientes. Devuelve cuántos objetos trató."""
+    batch = _take_pending()
+    if batch:
+        _process(batch)
+    return len(batch)
+
+
+def _drain() -> None:
+    try:
+        while True:
+            batch = _take_pending(release_worker=True)
+            if not batch:
+                return
+            try:
+                _process(batch)
+            except Exception as e:
+                print(f"--- ⚠️ ÍNDICE VECTORIAL: Error al reindexar {len(batch)} objetos: {e} ---")
+    finally:
+        connections.close_all()
+
+
+def flush_pending() -> None:
+    """Vacía la cola de cambios: en un hilo demonio (por defecto) o en el hilo actual."""
+    global _worker
+    if not get_vector_index_settings()["BACKGROUND"]:
+        process_pending()
+        return
+    with _pending_lock:
+        if _worker is not None or not _pending:
+            return
+        _worker = threading.Thread(target=_drain, name="vector-index-worker", daemon=True)
+        _worker.start()
+
+
+def rebuild_vector_index(type_names: Optional[Iterable[str]] = None, batch_size: int = 200) -> Dict[str, int]:
+    """Reindexa los tipos indicados (todos por defecto) y purga los objetos que ya no existen."""
+    registry, store = get_vector_registry(), get_vector_store()
+    counts = {}
+    for type_name in (type_names or registry.keys()):
+        ids, batch = [], []
+        for instance in registry[type_name].model.objects.all().iterator(chunk_size=batch_size):
+            ids.append(instance.pk)
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                index_objects(batch)
+                batch = []
+        if batch:
+            index_objects(batch)
+        store.delete_missing(type_name, ids)
+        counts[type_name] = len(ids)
+    return counts
+
+
+# --- CONSULTA ---
+
+def semantic_search(
+    query: str,
+    k: int = 5,
+    types: Optional[Iterable[str]] = None,
+    language: Optional[str] = None,
+    public_only: bool = True,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Los `k` pasajes más cercanos en significado a `query`.
+
+    Returns:
+        Lista de `{type, id, title, passage, score}` ordenada por similitud, o None si
+        el servicio de embeddings no está disponible.
+    """
+    config = get_vector_index_settings()
+    if not (query or "").strip():
+        return []
+    vectors = async_to_sync(embed_texts)([query], config["EMBEDDING_MODEL"])
+    if not vectors:
+        return None
+    rows = get_vector_store().query(
+        pack_vector(vectors[0]), k, language or current_language(),
+        list(types) if types else None, public_only, config["EMBEDDING_MODEL"],
+    )
+    return [
+        {"type": type_name, "id": object_id, "title": title, "passage": text, "score": round(float(score), 4)}
+        for type_name, object_id, title, text, score in rows
+    ]
@@ -1,9 +1,10 @@
 from rest_framework import generics, views, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, SAFE_METHODS
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from dj_rest_auth.registration.views import RegisterView
 import asyncio
@@ -12,12 +13,13 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import models, transaction
 from django.utils import timezone
 from asgiref.sync import async_to_sync
+from django.http import Http404, StreamingHttpResponse
 import json
 from datetime import datetime, timedelta
 from itertools import groupby
 from operator import attrgetter
 from django.db.models.functions import TruncDay
-from django.db.models import Count
+from django.db.models import Count, Prefetch
 from .models import (
     CustomUser,
     PrestadorServicio,
@@ -38,6 +40,7 @@ from .models import (
     HomePageComponent,
     AuditLog,
     PaginaInstitucional,
+    ImagenPaginaInstitucional,
     ImagenAtractivo,
     Artesano,
     RubroArtesano,
@@ -54,7 +57,8 @@ from .models import (
     ItemVerificacion,
     Verificacion,
     RespuestaItemVerificacion,
-    AsistenciaCapacitacion
+    AsistenciaCapacitacion,
+    RankingEntry
 )
 from .serializers import (
     GaleriaItemSerializer,
@@ -127,7 +131,8 @@ from .serializers import (
     IniciarVerificacionSerializer,
     GuardarVerificacionSerializer,
     CapacitacionDetailSerializer,
-    RegistrarAsistenciaSerializer
+    RegistrarAsistenciaSerializer,
+    RankingEntrySerializer
 )
 from .permissions import (
     IsTurista,
@@ -138,7 +143,12 @@ from .permissions import (
     IsAdminOrDirectivo,
     CanManageAtractivos
 )
-from .filters import AuditLogFilter
+from .filters import AuditLogFilter, FullTextSearchFilter
+from .http_cache import ConditionalCacheMixin
+from .map_clusters import ORJSONRenderer
+from .translated_cache import only_active_language
+from .pagination import KeysetPaginationMixin
+from .audit import AuditTrailMixin
 
 
 class FormularioViewSet(viewsets.ModelViewSet):
@@ -187,6 +197,27 @@ class DocumentoLegalizacionDetailView(generics.RetrieveDestroyAPIView):
     def get_queryset(self):
         return DocumentoLegalizacion.objects.filter(prestador=self.request.user.perfil_prestador)
 
+def itinerary_response(request, items):
+    """
+    Itinerario de un día para `items` (ver `api/itinerary.py`). Parámetros opcionales:
+    `fecha` (AAAA-MM-DD, para los horarios), `inicio` (HH:MM) y `lat`/`lng` del punto de partida.
+    """
+    from .itinerary import plan_itinerary
+
+    params = request.query_params
+    try:
+        day = datetime.strptime(params['fecha'], '%Y-%m-%d').date() if params.get('fecha') else None
+        origin = None
+        if 'lat' in params or 'lng' in params:
+            origin = (float(params['lat']), float(params['lng']))
+            if not (-90 <= origin[0] <= 90 and -180 <= origin[1] <= 180):
+                raise ValueError("Coordenadas del punto de partida fuera de rango.")
+        return Response(plan_itinerary(items, day=day, start=params.get('inicio'), origin=origin))
+    except KeyError:
+        return Response({"error": "'lat' y 'lng' deben enviarse juntos."}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
 class ElementoGuardadoViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsTurista]
     def get_queryset(self):
@@ -198,8 +229,21 @@ class ElementoGuardadoViewSet(viewsets.ModelViewSet):
     def get_serializer_context(self):
         return {'request': self.request}
 
-class ResenaViewSet(viewsets.ModelViewSet):
-    queryset = Resena.objects.all().order_by('-fecha_creacion')
+    @action(detail=False, methods=['get'])
+    def itinerario(self, request):
+        """Orden de visita sugerido para los elementos de "Mi Viaje"."""
+        from .itinerary import saved_items
+        return itinerary_response(request, saved_items(request.user))
+
+    @action(detail=False, methods=['get'])
+    def plan(self, request):
+        """Elementos de "Mi Viaje" agrupados por día y zona, desde la copia guardada (una consulta)."""
+        from .trip_plan import build_plan
+        return Response(build_plan(request.user, request))
+
+class ResenaViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
+    queryset = Resena.objects.select_related('usuario').order_by('-fecha_creacion')
+    keyset_ordering = ('-fecha_creacion', '-id')
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -262,8 +306,9 @@ class SugerenciaViewSet(viewsets.mixins.CreateModelMixin, viewsets.GenericViewSe
         else:
             serializer.save()
 
-class SugerenciaAdminViewSet(viewsets.ModelViewSet):
+class SugerenciaAdminViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     queryset = Sugerencia.objects.all().order_by('-fecha_envio')
+    keyset_ordering = ('-fecha_envio', '-id')
     serializer_class = SugerenciaAdminSerializer
     permission_classes = [IsAdminOrFuncionario]
     filter_backends = [OrderingFilter, SearchFilter]
@@ -271,8 +316,9 @@ class SugerenciaAdminViewSet(viewsets.ModelViewSet):
     ordering_fields = ['fecha_envio', 'estado', 'tipo_mensaje']
 
 # Minimal ViewSets to fix startup errors
-class NotificacionViewSet(viewsets.ModelViewSet):
+class NotificacionViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     queryset = Notificacion.objects.all()
+    keyset_ordering = ('-fecha_creacion', '-id')
     serializer_class = NotificacionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -280,18 +326,34 @@ class AtractivoTuristicoViewSet(viewsets.ModelViewSet):
     queryset = AtractivoTuristico.objects.all()
     serializer_class = AtractivoTuristicoListSerializer
     permission_classes = [AllowAny]
+    filter_backends = [FullTextSearchFilter]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS:
+            # Solo las columnas del idioma activo; el resto lo sirve la caché del serializador.
+            return only_active_language(queryset, self.get_serializer_class())
+        return queryset
 
 class RutaTuristicaViewSet(viewsets.ModelViewSet):
     queryset = RutaTuristica.objects.all()
     serializer_class = RutaTuristicaListSerializer
     permission_classes = [AllowAny]
 
-class HechoHistoricoViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def itinerario(self, request, pk=None):
+        """Orden de visita sugerido para los atractivos y prestadores de la ruta."""
+        from .itinerary import route_items
+        return itinerary_response(request, route_items(self.get_object()))
+
+class HechoHistoricoViewSet(ConditionalCacheMixin, viewsets.ModelViewSet):
+    cache_models = (HechoHistorico,)
     queryset = HechoHistorico.objects.all()
     serializer_class = HechoHistoricoSerializer
     permission_classes = [AllowAny]
 
-class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
+class MenuItemViewSet(ConditionalCacheMixin, viewsets.ReadOnlyModelViewSet):
+    cache_models = (MenuItem,)
     serializer_class = MenuItemSerializer
     permission_classes = [AllowAny]
 
@@ -301,6 +363,9 @@ class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
         return MenuItem.objects.filter(parent__isnull=True).order_by('orden')
 
     def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.build_tree, *args, **kwargs)
+
+    def build_tree(self, request, *args, **kwargs):
         all_items = MenuItem.objects.all().order_by('orden')
         items_map = {item.id: item for item in all_items}
 
@@ -319,18 +384,37 @@ class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(root_items, many=True)
         return Response(serializer.data)
 
-class ContenidoMunicipioViewSet(viewsets.ModelViewSet):
+class ContenidoMunicipioViewSet(AuditTrailMixin, ConditionalCacheMixin, viewsets.ModelViewSet):
+    cache_models = (ContenidoMunicipio,)
+    audit_actions = {
+        'create': AuditLog.Action.CONTENIDO_CREATE,
+        'update': AuditLog.Action.CONTENIDO_UPDATE,
+        'destroy': AuditLog.Action.CONTENIDO_DELETE,
+    }
     queryset = ContenidoMunicipio.objects.all()
     serializer_class = ContenidoMunicipioSerializer
     permission_classes = [AllowAny]
 
-class PaginaInstitucionalViewSet(viewsets.ModelViewSet):
+class PaginaInstitucionalViewSet(ConditionalCacheMixin, viewsets.ModelViewSet):
+    cache_models = (PaginaInstitucional, ImagenPaginaInstitucional)
     queryset = PaginaInstitucional.objects.all()
     serializer_class = PaginaInstitucionalSerializer
     permission_classes = [AllowAny]
 
-class UserViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS:
+            queryset = only_active_language(queryset, self.get_serializer_class())
+            return queryset.select_related('actualizado_por').prefetch_related('galeria_imagenes')
+        return queryset
+
+class UserViewSet(AuditTrailMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
+    audit_actions = {
+        'create': AuditLog.Action.USER_CREATE,
+        'update': AuditLog.Action.USER_UPDATE,
+        'destroy': AuditLog.Action.USER_DELETE,
+    }
     serializer_class = AdminUserSerializer
     permission_classes = [IsAdmin]
 
@@ -339,15 +423,25 @@ class AdminPublicacionViewSet(viewsets.ModelViewSet):
     serializer_class = AdminPublicacionSerializer
     permission_classes = [IsAdminOrFuncionario]
 
-class HomePageComponentViewSet(viewsets.ModelViewSet):
+class HomePageComponentViewSet(AuditTrailMixin, ConditionalCacheMixin, viewsets.ModelViewSet):
+    cache_models = (HomePageComponent,)
+    audit_actions = {
+        'create': AuditLog.Action.COMPONENT_CREATE,
+        'update': AuditLog.Action.COMPONENT_UPDATE,
+        'destroy': AuditLog.Action.COMPONENT_DELETE,
+    }
     queryset = HomePageComponent.objects.all()
     serializer_class = HomePageComponentSerializer
     permission_classes = [AllowAny]
 
-class AuditLogViewSet(viewsets.ModelViewSet):
-    queryset = AuditLog.objects.all()
+class AuditLogViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
+    # La bitácora solo se escribe desde `api/audit.py`: por la API es de solo lectura.
+    queryset = AuditLog.objects.select_related('user')
+    keyset_ordering = ('-timestamp', '-id')
     serializer_class = AuditLogSerializer
     permission_classes = [IsAdmin]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AuditLogFilter
 
 class ScoringRuleViewSet(viewsets.ModelViewSet):
     queryset = ScoringRule.objects.all()
@@ -384,7 +478,9 @@ class OpcionRespuestaViewSet(viewsets.ModelViewSet):
     serializer_class = OpcionRespuestaSerializer
     permission_classes = [IsAdminOrDirectivo]
 
-class SiteConfigurationView(generics.RetrieveUpdateAPIView):
+class SiteConfigurationView(AuditTrailMixin, ConditionalCacheMixin, generics.RetrieveUpdateAPIView):
+    cache_models = (SiteConfiguration,)
+    audit_actions = {'update': AuditLog.Action.SITE_CONFIG_UPDATE}
     queryset = SiteConfiguration.objects.all()
     serializer_class = SiteConfigurationSerializer
     permission_classes = [AllowAny]
@@ -450,87 +546,417 @@ class PublicacionListView(generics.ListAPIView):
     queryset = Publicacion.objects.all()
     serializer_class = PublicacionListSerializer
     permission_classes = [AllowAny]
+    filter_backends = [FullTextSearchFilter]
+
+    def get_queryset(self):
+        return only_active_language(super().get_queryset(), self.get_serializer_class())
 
 class PublicacionDetailView(generics.RetrieveAPIView):
     queryset = Publicacion.objects.all()
     serializer_class = PublicacionDetailSerializer
     permission_classes = [AllowAny]
+    lookup_field = 'slug'
+
+    def get_queryset(self):
+        queryset = only_active_language(super().get_queryset(), self.get_serializer_class())
+        return queryset.select_related('autor')
 
 class ConsejoConsultivoListView(generics.ListAPIView):
     queryset = ConsejoConsultivo.objects.all()
     serializer_class = ConsejoConsultivoSerializer
     permission_classes = [AllowAny]
 
-class VideoListView(generics.ListAPIView):
+class VideoListView(ConditionalCacheMixin, generics.ListAPIView):
+    cache_models = (Video,)
     queryset = Video.objects.all()
     serializer_class = VideoSerializer
     permission_classes = [AllowAny]
 
-class LocationListView(generics.ListAPIView):
-    queryset = PrestadorServicio.objects.all() # Placeholder
-    serializer_class = LocationSerializer
+class LocationListView(views.APIView):
+    """
+    Puntos del mapa desde el índice geoespacial (`GeoPoint`, ver `api/geo.py`). Sin
+    coordenadas devuelve todos los puntos públicos; con `lat` y `lng`, los `k` más cercanos
+    dentro de `radius` km, con su `distancia_km`. `types` filtra por prestador, artesano
+    o atractivo (separados por comas).
+    """
     permission_classes = [AllowAny]
 
+    def get(self, request, *args, **kwargs):
+        from .geo import all_locations, get_geo_index_settings, nearby, parse_types
+
+        config = get_geo_index_settings()
+        params = request.query_params
+        try:
+            types = parse_types(params.get('types'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if 'lat' not in params and 'lng' not in params:
+            return Response(LocationSerializer(all_locations(types), many=True).data)
+
+        try:
+            lat, lng = float(params['lat']), float(params['lng'])
+            radius = float(params.get('radius', config["DEFAULT_RADIUS_KM"]))
+            k = int(params.get('k', config["DEFAULT_LIMIT"]))
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "'lat' y 'lng' son obligatorios y, como 'radius', numéricos; 'k' debe ser un número entero."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0:
+            return Response({"error": "Coordenadas fuera de rango o radio no positivo."}, status=status.HTTP_400_BAD_REQUEST)
+
+        radius = min(radius, config["MAX_RADIUS_KM"])
+        k = min(max(k, 1), config["MAX_LIMIT"])
+        results = nearby(lat, lng, radius, types=types, k=k)
+        return Response(LocationSerializer(results, many=True).data)
+
+class LocationTileView(ConditionalCacheMixin, views.APIView):
+    """
+    Tile `z/x/y` del mapa público con los marcadores ya agrupados (`api/map_clusters.py`):
+    cantidad, centroide y desglose por tipo de cada agrupación, en filas compactas. Cada
+    tile tiene su propio ETag, que sale de las celdas que cubre: un cambio en el mapa solo
+    invalida los tiles donde se ve, y el JSON de cada uno se renderiza una vez por versión.
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = [ORJSONRenderer]
+
+    def get(self, request, z, x, y):
+        return self.conditional_response(request, self.build_tile, z=z, x=x, y=y)
+
+    def cache_signature(self, request, z, x, y):
+        from .map_clusters import tile_signature
+
+        return tile_signature(z, x, y)
+
+    def build_tile(self, request, z, x, y):
+        from .geo import get_geo_index_settings
+        from .map_clusters import tile
+
+        if z > get_geo_index_settings()["MAX_TILE_ZOOM"]:
+            return Response({"error": "Nivel de zoom no soportado."}, status=status.HTTP_400_BAD_REQUEST)
+        if x >= 2 ** z or y >= 2 ** z:
+            raise Http404("El tile no existe en este nivel de zoom.")
+        return Response(tile(z, x, y))
+
 class GaleriaListView(generics.ListAPIView):
     queryset = ImagenGaleria.objects.all() # Placeholder
     serializer_class = GaleriaItemSerializer
     permission_classes = [AllowAny]
 
+class GlobalSearchView(views.APIView):
+    """
+    Búsqueda de texto completo en prestadores, artesanos, atractivos y publicaciones,
+    ordenada por relevancia. Parámetros: `q`, `types` (separados por comas), `page`, `page_size`.
+    """
+    permission_classes = [AllowAny]
+    max_page_size = 50
+
+    def get(self, request, *args, **kwargs):
+        from .search import get_registry, search
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "El parámetro 'q' es obligatorio."}, status=status.HTTP_400_BAD_REQUEST)
+        types = [t for t in request.query_params.get('types', '').split(',') if t.strip()]
+        unknown = set(types) - set(get_registry())
+        if unknown:
+            return Response({"error": f"Tipos desconocidos: {', '.join(sorted(unknown))}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', 10)), 1), self.max_page_size)
+        except ValueError:
+            return Response({"error": "'page' y 'page_size' deben ser números enteros."}, status=status.HTTP_400_BAD_REQUEST)
+
+        total, results = search(query, types=types or None, limit=page_size, offset=(page - 1) * page_size)
+        return Response({"count": total, "page": page, "page_size": page_size, "results": results})
+
+class SemanticSearchView(views.APIView):
+    """
+    Búsqueda semántica (k-NN sobre embeddings) en atractivos, prestadores, artesanos,
+    publicaciones y páginas institucionales. Parámetros: `q`, `k`, `types` (separados por comas).
+    Devuelve los pasajes más cercanos en significado, no solo los que contienen las palabras.
+    """
+    permission_classes = [AllowAny]
+    max_k = 20
+
+    def get(self, request, *args, **kwargs):
+        from .vector_search import get_vector_registry, semantic_search
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "El parámetro 'q' es obligatorio."}, status=status.HTTP_400_BAD_REQUEST)
+        types = [t for t in request.query_params.get('types', '').split(',') if t.strip()]
+        unknown = set(types) - set(get_vector_registry())
+        if unknown:
+            return Response({"error": f"Tipos desconocidos: {', '.join(sorted(unknown))}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = min(max(int(request.query_params.get('k', 5)), 1), self.max_k)
+        except ValueError:
+            return Response({"error": "'k' debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = semantic_search(query, k=k, types=types or None)
+        if results is None:
+            return Response(
+                {"error": "El servicio de embeddings no está disponible en este momento."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response({"count": len(results), "results": results})
+
 class AgentCommandView(views.APIView):
+    """
+    Recibe una orden para el Coronel y la encola como `AgentTask` (PENDING). La orden se
+    ejecuta en segundo plano (ver `agents/corps/task_queue.py`); el cliente consulta su
+    estado en `AgentTaskStatusView` con el `task_id` devuelto.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        from agents.corps.task_queue import TaskQueueFull, enqueue_agent_task, guest_key_for
+
+        serializer = AgentCommandSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            task = enqueue_agent_task(serializer.validated_data['orden'], request.user, guest_key_for(request))
+        except TaskQueueFull as e:
+            return Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        return Response(
+            {"message": "Comando recibido.", "task_id": str(task.id), "status": task.status},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+class AgentCommandStreamView(views.APIView):
+    """
+    Variante en streaming de `AgentCommandView`: ejecuta la orden en la misma petición y
+    reenvía como Server-Sent Events los fragmentos del plan y el progreso de cada misión
+    del Coronel, terminando con el informe final. La orden pasa por los topes por usuario
+    de la cola (429 si se superan) y queda registrada en `AgentTask`; el stream es un
+    iterador síncrono (`StreamedTaskRun`), así que los eventos llegan a medida que se
+    producen también bajo WSGI.
+    """
     permission_classes = [AllowAny]
+
     def post(self, request, *args, **kwargs):
-        return Response({"message": "Comando recibido."})
+        from agents.corps.task_queue import StreamedTaskRun, TaskQueueFull, guest_key_for, start_streamed_task
+
+        serializer = AgentCommandSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            task = start_streamed_task(serializer.validated_data['orden'], request.user, guest_key_for(request))
+        except TaskQueueFull as e:
+            return Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response = StreamingHttpResponse(
+            StreamedTaskRun(task, {"user": request.user}, render=self.render_event),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # Evita que Nginx acumule el stream
+        return response
+
+    @staticmethod
+    def format_event(event_type, data):
+        return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+    @classmethod
+    def render_event(cls, event):
+        if event is None:
+            return ": keep-alive\n\n"  # Comentario SSE: mantiene viva la conexión mientras no hay eventos.
+        return cls.format_event(event.get("event", "progress"), event)
 
 class AgentTaskStatusView(generics.RetrieveAPIView):
-    queryset = AgentTask.objects.all()
+    """
+    Estado de una orden del usuario. El frontend la consulta cada pocos segundos, así que
+    responde con un ETag (estado + última modificación) y devuelve 304 mientras no cambie.
+    Las órdenes de visitantes anónimos se consultan solo por su `task_id`, un UUID4 que
+    únicamente conoce quien la envió; las de un usuario registrado, solo por su dueño.
+    """
     serializer_class = AgentTaskSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
+    lookup_field = 'id'
+
+    def get_queryset(self):
+        queryset = AgentTask.objects.only(*AgentTaskSerializer.Meta.fields)
+        if self.request.user.is_authenticated:
+            return queryset.filter(models.Q(user=self.request.user) | models.Q(user__isnull=True))
+        return queryset.filter(user__isnull=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        task = self.get_object()
+        etag = f'"{task.status}-{task.updated_at.timestamp():.6f}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(self.get_serializer(task).data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
 class AnalyticsDataView(views.APIView):
     permission_classes = [IsAdminOrFuncionario]
     def get(self, request, *args, **kwargs):
         return Response({"message": "Datos de analítica."})
 
-class AdminUsuarioListView(generics.ListAPIView):
+class AdminUsuarioListView(KeysetPaginationMixin, generics.ListAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UsuarioListSerializer
     permission_classes = [IsAdminOrFuncionario]
 
-class CategoriaPrestadorListView(generics.ListAPIView):
+class CategoriaPrestadorListView(ConditionalCacheMixin, generics.ListAPIView):
+    cache_models = (CategoriaPrestador,)
     queryset = CategoriaPrestador.objects.all()
     serializer_class = CategoriaPrestadorSerializer
     permission_classes = [AllowAny]
 
+# --- DIRECTORIOS PÚBLICOS ---
+# Los listados y fichas públicas solo muestran perfiles aprobados y piden a la base de
+# datos exactamente lo que serializan: la categoría/rubro en el mismo JOIN, la galería
+# en una sola consulta adicional y nada de columnas que no viajan al cliente. El número
+# de consultas queda fijo sin importar cuántos perfiles haya (ver test_public_directories).
+
+PRESTADOR_PUBLIC_LIST_FIELDS = (
+    'id', 'nombre_negocio', 'descripcion', 'foto_principal', 'telefono', 'email_contacto',
+    'red_social_facebook', 'red_social_instagram', 'red_social_tiktok', 'red_social_whatsapp',
+    'latitud', 'longitud', 'categoria__nombre',
+)
+PRESTADOR_PUBLIC_DETAIL_FIELDS = PRESTADOR_PUBLIC_LIST_FIELDS + ('promociones_ofertas', 'categoria__slug')
+ARTESANO_PUBLIC_LIST_FIELDS = (
+    'id', 'nombre_taller', 'nombre_artesano', 'descripcion', 'foto_principal', 'telefono', 'email_contacto',
+    'red_social_facebook', 'red_social_instagram', 'red_social_tiktok', 'red_social_whatsapp',
+    'latitud', 'longitud', 'rubro__nombre',
+)
+ARTESANO_PUBLIC_DETAIL_FIELDS = ARTESANO_PUBLIC_LIST_FIELDS + ('rubro__slug',)
+
+
+def public_prestadores(fields=PRESTADOR_PUBLIC_LIST_FIELDS, with_gallery=False):
+    queryset = (
+        PrestadorServicio.objects.filter(aprobado=True)
+        .select_related('categoria')
+        .only(*fields)
+        .order_by('-puntuacion_total', 'id')
+    )
+    if with_gallery:
+        queryset = queryset.prefetch_related(
+            Prefetch('galeria_imagenes', queryset=ImagenGaleria.objects.only('id', 'imagen', 'alt_text', 'prestador_id'))
+        )
+    return queryset
+
+
+def public_artesanos(fields=ARTESANO_PUBLIC_LIST_FIELDS, with_gallery=False):
+    queryset = (
+        Artesano.objects.filter(aprobado=True)
+        .select_related('rubro')
+        .only(*fields)
+        .order_by('-puntuacion_total', 'id')
+    )
+    if with_gallery:
+        queryset = queryset.prefetch_related(
+            Prefetch('galeria_imagenes', queryset=ImagenArtesano.objects.only('id', 'imagen', 'alt_text', 'artesano_id'))
+        )
+    return queryset
+
+
 class PrestadorServicioPublicListView(generics.ListAPIView):
-    queryset = PrestadorServicio.objects.all()
     serializer_class = PrestadorServicioPublicListSerializer
     permission_classes = [AllowAny]
+    filter_backends = [FullTextSearchFilter]
+
+    def get_queryset(self):
+        return public_prestadores()
 
 class PrestadorServicioPublicDetailView(generics.RetrieveAPIView):
-    queryset = PrestadorServicio.objects.all()
     serializer_class = PrestadorServicioPublicDetailSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        return public_prestadores(PRESTADOR_PUBLIC_DETAIL_FIELDS, with_gallery=True)
+
 class RubroArtesanoListView(generics.ListAPIView):
     queryset = RubroArtesano.objects.all()
     serializer_class = RubroArtesanoSerializer
     permission_classes = [AllowAny]
 
 class ArtesanoPublicListView(generics.ListAPIView):
-    queryset = Artesano.objects.all()
     serializer_class = ArtesanoPublicListSerializer
     permission_classes = [AllowAny]
+    filter_backends = [FullTextSearchFilter]
+
+    def get_queryset(self):
+        return public_artesanos()
 
 class ArtesanoPublicDetailView(generics.RetrieveAPIView):
-    queryset = Artesano.objects.all()
     serializer_class = ArtesanoPublicDetailSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        return public_artesanos(ARTESANO_PUBLIC_DETAIL_FIELDS, with_gallery=True)
+
+class RankingPagination(CursorPagination):
+    ordering = ('rank', 'object_id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class RankingListView(generics.ListAPIView):
+    """
+    Ranking público de prestadores o artesanos aprobados, servido desde la tabla
+    precalculada `RankingEntry`. Sin filtros es el ranking global del tipo; con
+    `?categoria=<id|slug>` (prestadores) o `?rubro=<id|slug>` (artesanos), el del grupo.
+    Paginado por cursor y con ETag por partición: 304 mientras el ranking no cambie.
+    """
+    serializer_class = RankingEntrySerializer
+    permission_classes = [AllowAny]
+    pagination_class = RankingPagination
+    group_params = {
+        RankingEntry.EntityType.PRESTADOR: ('categoria', CategoriaPrestador),
+        RankingEntry.EntityType.ARTESANO: ('rubro', RubroArtesano),
+    }
+
+    def get_partition(self):
+        entity_type = self.kwargs['entity_type']
+        if entity_type not in self.group_params:
+            raise Http404
+        param, group_model = self.group_params[entity_type]
+        value = self.request.query_params.get(param)
+        if not value:
+            return entity_type, RankingEntry.GLOBAL_GROUP
+        lookup = {'pk': value} if value.isdigit() else {'slug': value}
+        group_id = group_model.objects.filter(**lookup).values_list('pk', flat=True).first()
+        if group_id is None:
+            raise Http404
+        return entity_type, group_id
+
+    def get_queryset(self):
+        entity_type, group_id = self.get_partition()
+        return RankingEntry.objects.filter(entity_type=entity_type, group_id=group_id).only(
+            'object_id', 'nombre', 'puntuacion', 'rank', 'percentile'
+        )
+
+    def list(self, request, *args, **kwargs):
+        from .rankings import ranking_version
+
+        entity_type, group_id = self.get_partition()
+        total, last = ranking_version(entity_type, group_id)
+        etag = f'"ranking-{entity_type}-{group_id}-{total}-{last}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, no-cache'
+        return response
+
 class DetailedStatisticsView(views.APIView):
     permission_classes = [IsAdmin]
     def get(self, request, *args, **kwargs):
         return Response({"message": "Datos de estadísticas detalladas."})
 
+class CacheStatsView(views.APIView):
+    """Aciertos de la caché HTTP de los endpoints públicos y de la caché de singletons."""
+    permission_classes = [IsAdmin]
+    def get(self, request, *args, **kwargs):
+        from .http_cache import stats as http_cache_stats
+        from .singletons import singleton_cache
+        return Response({"http": http_cache_stats(), "singletons": singleton_cache.stats()})
+
 class ExportExcelView(views.APIView):
     permission_classes = [IsAdmin]
 
@@ -14,3 +14,14 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "puerto_gaitan_turismo.settings")
 
 application = get_asgi_application()
+
+# Alistamiento previo de los grafos de agentes configurados en AGENT_GRAPH_WARMUP,
+# para que la primera orden de cada worker no pague la compilación.
+from agents.corps.registry import warm_up_from_settings  # noqa: E402
+
+warm_up_from_settings()
+
+# Atiende el protocolo lifespan para cerrar los pools HTTP de los LLM al apagar el worker.
+from ai_models.http_clients import LLMClientLifespanMiddleware  # noqa: E402
+
+application = LLMClientLifespanMiddleware(application)
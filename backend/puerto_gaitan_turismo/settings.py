@@ -75,6 +75,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "api.middleware.ScoreBatchMiddleware",
+    "api.middleware.AuditBatchMiddleware",
 ]
 
 ROOT_URLCONF = "puerto_gaitan_turismo.urls"
@@ -208,3 +210,155 @@ else:
         ADMINS = [("Admin", ADMIN_EMAIL)]
     else:
         ADMINS = []
+
+# --- Sistema de Agentes (LangGraph) ---
+
+# Ramas de la jerarquía que cada worker compila al arrancar, separadas por comas
+# (ej. "capitan.turista,capitan.prestadores" o "coronel"). Vacío = todo bajo demanda.
+AGENT_GRAPH_WARMUP = [
+    key.strip()
+    for key in os.environ.get("AGENT_GRAPH_WARMUP", "").split(",")
+    if key.strip()
+]
+# Máximo de misiones independientes que una misma unidad (Coronel, Capitán o
+# Teniente orquestador) despliega en paralelo.
+AGENT_MAX_CONCURRENT_MISSIONS = int(os.environ.get("AGENT_MAX_CONCURRENT_MISSIONS", "4"))
+# Pool de conexiones HTTP hacia los proveedores de LLM (Groq, Ollama).
+LLM_HTTP_CLIENT = {
+    "MAX_CONNECTIONS": int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "20")),
+    "MAX_KEEPALIVE_CONNECTIONS": int(os.environ.get("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "10")),
+    "KEEPALIVE_EXPIRY": float(os.environ.get("LLM_HTTP_KEEPALIVE_EXPIRY", "60")),
+    "TIMEOUT": float(os.environ.get("LLM_HTTP_TIMEOUT", "90")),
+    "CONNECT_TIMEOUT": float(os.environ.get("LLM_HTTP_CONNECT_TIMEOUT", "10")),
+    "HTTP2": os.environ.get("LLM_HTTP2", "True").lower() == "true",
+}
+# Caché de respuestas del router de LLM (memoria LRU + tabla LLMResponseCache).
+# LLM_CACHE_SIMILARITY_THRESHOLD (ej. 0.92) activa la búsqueda por similitud de embeddings.
+LLM_RESPONSE_CACHE = {
+    "ENABLED": os.environ.get("LLM_CACHE_ENABLED", "True").lower() == "true",
+    "TTL_SECONDS": int(os.environ.get("LLM_CACHE_TTL_SECONDS", "3600")),
+    "MEMORY_MAX_ENTRIES": int(os.environ.get("LLM_CACHE_MEMORY_MAX_ENTRIES", "512")),
+    "MEMORY_TTL_SECONDS": int(os.environ.get("LLM_CACHE_MEMORY_TTL_SECONDS", "300")),
+    "SIMILARITY_THRESHOLD": (
+        float(os.environ["LLM_CACHE_SIMILARITY_THRESHOLD"])
+        if os.environ.get("LLM_CACHE_SIMILARITY_THRESHOLD") else None
+    ),
+    "SIMILARITY_CANDIDATES": int(os.environ.get("LLM_CACHE_SIMILARITY_CANDIDATES", "200")),
+    "EMBEDDING_MODEL": os.environ.get("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text"),
+}
+# Mide la memoria reservada por cada grafo al compilarlo (usa tracemalloc; tiene coste).
+AGENT_GRAPH_TRACK_MEMORY = (
+    os.environ.get("AGENT_GRAPH_TRACK_MEMORY", "False").lower() == "true"
+)
+# Checkpoints de LangGraph: cada orden del Coronel se guarda bajo el id de su
+# AgentTask y puede reanudarse tras una caída. "auto" usa Postgres (DATABASE_URL)
+# si langgraph-checkpoint-postgres está instalado; si no, un archivo SQLite local.
+AGENT_CHECKPOINTS = {
+    "ENABLED": os.environ.get("AGENT_CHECKPOINTS_ENABLED", "True").lower() == "true",
+    "BACKEND": os.environ.get("AGENT_CHECKPOINTS_BACKEND", "auto"),
+    "SQLITE_PATH": os.environ.get("AGENT_CHECKPOINTS_SQLITE_PATH", str(BASE_DIR / "agent_checkpoints.sqlite3")),
+    "POSTGRES_URL": os.environ.get("AGENT_CHECKPOINTS_POSTGRES_URL") or os.environ.get("DATABASE_URL"),
+    "RETENTION_DAYS": int(os.environ.get("AGENT_CHECKPOINTS_RETENTION_DAYS", "7")),
+}
+# Cola de órdenes del Coronel (tabla AgentTask). Los workers dedicados se lanzan con
+# `python manage.py run_agent_worker`; el worker embebido corre en cada proceso web.
+AGENT_TASK_QUEUE = {
+    "WORKERS": int(os.environ.get("AGENT_TASK_WORKERS", "4")),
+    "MAX_RUNNING_PER_USER": int(os.environ.get("AGENT_TASK_MAX_RUNNING_PER_USER", "1")),
+    "MAX_PENDING_PER_USER": int(os.environ.get("AGENT_TASK_MAX_PENDING_PER_USER", "5")),
+    "TIMEOUT_SECONDS": int(os.environ.get("AGENT_TASK_TIMEOUT_SECONDS", "300")),
+    "POLL_INTERVAL_SECONDS": float(os.environ.get("AGENT_TASK_POLL_INTERVAL_SECONDS", "2")),
+    "HEARTBEAT_SECONDS": float(os.environ.get("AGENT_TASK_HEARTBEAT_SECONDS", "30")),
+    "STALE_AFTER_SECONDS": float(os.environ.get("AGENT_TASK_STALE_AFTER_SECONDS", "120")),
+    "MAX_ATTEMPTS": int(os.environ.get("AGENT_TASK_MAX_ATTEMPTS", "3")),
+    "EMBEDDED_WORKER": os.environ.get("AGENT_TASK_EMBEDDED_WORKER", "True").lower() == "true",
+}
+# Índice vectorial (sqlite-vec) para la búsqueda semántica y las herramientas RAG.
+# Es un archivo derivado: se reconstruye con `python manage.py rebuild_vector_index`.
+VECTOR_INDEX = {
+    "ENABLED": os.environ.get("VECTOR_INDEX_ENABLED", "True").lower() == "true",
+    "PATH": os.environ.get("VECTOR_INDEX_PATH", str(BASE_DIR / "vector_index.sqlite3")),
+    "EMBEDDING_MODEL": os.environ.get("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text"),
+    "BATCH_SIZE": int(os.environ.get("VECTOR_INDEX_BATCH_SIZE", "16")),
+    "CHUNK_CHARS": int(os.environ.get("VECTOR_INDEX_CHUNK_CHARS", "800")),
+    "BACKGROUND": os.environ.get("VECTOR_INDEX_BACKGROUND", "True").lower() == "true",
+}
+# Recálculo de puntuaciones de prestadores y artesanos (api/scoring.py). Diferido: las
+# entidades marcadas se recalculan por lotes en segundo plano al confirmar la transacción.
+SCORING_QUEUE = {
+    "DEFERRED": os.environ.get("SCORING_DEFERRED", "True").lower() == "true",
+    "BACKGROUND": os.environ.get("SCORING_BACKGROUND", "True").lower() == "true",
+    "BATCH_SIZE": int(os.environ.get("SCORING_BATCH_SIZE", "500")),
+    "FLUSH_DELAY_SECONDS": float(os.environ.get("SCORING_FLUSH_DELAY_SECONDS", "0.5")),
+}
+# Caché en memoria de SiteConfiguration y ScoringRule (api/singletons.py). Cada proceso
+# verifica su copia cada CHECK_INTERVAL_SECONDS contra el sello de versión en la base de
+# datos, o en la caché compartida indicada por SINGLETON_SHARED_CACHE (p. ej. Redis).
+SINGLETON_CACHE = {
+    "ENABLED": os.environ.get("SINGLETON_CACHE_ENABLED", "True").lower() == "true",
+    "CHECK_INTERVAL_SECONDS": float(os.environ.get("SINGLETON_CACHE_CHECK_INTERVAL_SECONDS", "5")),
+    "SHARED_CACHE_ALIAS": os.environ.get("SINGLETON_SHARED_CACHE") or None,
+}
+# Respuestas condicionales (ETag/Last-Modified) y JSON pre-renderizado de los endpoints
+# públicos de contenido (api/http_cache.py). HTTP_CACHE_ALIAS debe ser una caché
+# compartida (Redis, Memcached) para que los procesos reutilicen lo ya renderizado.
+HTTP_CACHE = {
+    "ENABLED": os.environ.get("HTTP_CACHE_ENABLED", "True").lower() == "true",
+    "CACHE_ALIAS": os.environ.get("HTTP_CACHE_ALIAS", "default"),
+    "TIMEOUT_SECONDS": int(os.environ.get("HTTP_CACHE_TIMEOUT_SECONDS", "86400")),
+}
+# Representaciones por idioma de publicaciones, atractivos y páginas institucionales
+# (api/translated_cache.py), identificadas por la fecha de actualización de cada fila.
+TRANSLATED_CACHE = {
+    "ENABLED": os.environ.get("TRANSLATED_CACHE_ENABLED", "True").lower() == "true",
+    "CACHE_ALIAS": os.environ.get("TRANSLATED_CACHE_ALIAS", "default"),
+    "TIMEOUT_SECONDS": int(os.environ.get("TRANSLATED_CACHE_TIMEOUT_SECONDS", "86400")),
+}
+# Paginación por cursor opcional (?pagination=cursor) de las tablas grandes (api/pagination.py).
+KEYSET_PAGINATION = {
+    "MAX_PAGE_SIZE": int(os.environ.get("KEYSET_PAGINATION_MAX_PAGE_SIZE", "100")),
+    "EXACT_COUNT_BELOW": int(os.environ.get("KEYSET_PAGINATION_EXACT_COUNT_BELOW", "10000")),
+}
+# Bitácora de auditoría (api/audit.py): escritura por lotes al confirmar y retención por
+# meses con `manage.py audit_retention` (archivo mensual + exportación .jsonl.zst).
+AUDIT_LOG = {
+    "BATCH_SIZE": int(os.environ.get("AUDIT_LOG_BATCH_SIZE", "500")),
+    "RETENTION_MONTHS": int(os.environ.get("AUDIT_LOG_RETENTION_MONTHS", "6")),
+    "ARCHIVE_RETENTION_MONTHS": int(os.environ.get("AUDIT_LOG_ARCHIVE_RETENTION_MONTHS", "24")),
+    "EXPORT_DIR": os.environ.get("AUDIT_LOG_EXPORT_DIR") or None,
+}
+# Índice geoespacial del mapa y de la búsqueda por cercanía (api/geo.py). "postgis"
+# requiere PostgreSQL con la extensión y `manage.py rebuild_geo_index` para el índice GiST.
+GEO_INDEX = {
+    "BACKEND": os.environ.get("GEO_INDEX_BACKEND", "geohash"),
+    "DEFAULT_RADIUS_KM": float(os.environ.get("GEO_INDEX_DEFAULT_RADIUS_KM", "5")),
+    "MAX_RADIUS_KM": float(os.environ.get("GEO_INDEX_MAX_RADIUS_KM", "200")),
+    "DEFAULT_LIMIT": int(os.environ.get("GEO_INDEX_DEFAULT_LIMIT", "20")),
+    "MAX_LIMIT": int(os.environ.get("GEO_INDEX_MAX_LIMIT", "200")),
+    "CLUSTER_MAX_PRECISION": int(os.environ.get("GEO_INDEX_CLUSTER_MAX_PRECISION", "7")),
+    "CLUSTER_CELLS_PER_TILE": int(os.environ.get("GEO_INDEX_CLUSTER_CELLS_PER_TILE", "4")),
+    "MAX_TILE_ZOOM": int(os.environ.get("GEO_INDEX_MAX_TILE_ZOOM", "22")),
+}
+# Planificador de itinerarios de rutas y de "Mi Viaje" (api/itinerary.py).
+ITINERARY = {
+    "SPEED_KMH": float(os.environ.get("ITINERARY_SPEED_KMH", "35")),
+    "ROAD_FACTOR": float(os.environ.get("ITINERARY_ROAD_FACTOR", "1.3")),
+    "DAY_START": os.environ.get("ITINERARY_DAY_START", "08:00"),
+    "MAX_STOPS": int(os.environ.get("ITINERARY_MAX_STOPS", "40")),
+    "CACHE_ALIAS": os.environ.get("ITINERARY_CACHE_ALIAS", "default"),
+}
+# Copia de "Mi Viaje" y plan por días y zonas (api/trip_plan.py). Las filas antiguas se
+# rellenan con `manage.py rebuild_trip_snapshots`.
+TRIP_PLAN = {
+    "ZONE_PRECISION": int(os.environ.get("TRIP_PLAN_ZONE_PRECISION", "5")),
+    "STOPS_PER_DAY": int(os.environ.get("TRIP_PLAN_STOPS_PER_DAY", "6")),
+}
+# Derivadas de imágenes (api/image_variants.py): anchos y formatos generados en segundo
+# plano; `manage.py generate_image_variants` procesa las imágenes ya subidas.
+IMAGE_VARIANTS = {
+    "ENABLED": os.environ.get("IMAGE_VARIANTS_ENABLED", "True").lower() == "true",
+    "WIDTHS": tuple(int(width) for width in os.environ.get("IMAGE_VARIANTS_WIDTHS", "320,640,1024,1600").split(",")),
+    "FORMATS": tuple(os.environ.get("IMAGE_VARIANTS_FORMATS", "avif,webp,jpeg").split(",")),
+    "WORKERS": int(os.environ.get("IMAGE_VARIANTS_WORKERS", "2")),
+    "BACKGROUND": os.environ.get("IMAGE_VARIANTS_BACKGROUND", "True").lower() == "true",
+}
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "puerto_gaitan_turismo.settings")
 
 application = get_wsgi_application()
+
+# Alistamiento previo de los grafos de agentes configurados en AGENT_GRAPH_WARMUP,
+# para que la primera orden de cada worker no pague la compilación.
+from agents.corps.registry import warm_up_from_settings  # noqa: E402
+
+warm_up_from_settings()
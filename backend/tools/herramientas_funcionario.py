@@ -14,6 +14,8 @@ from api.models import (
     Publicacion
 )
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from api.scoring import score_batch
 
 # --- SOLDADOS DE GESTIÓN DE CONTENIDO INSTITUCIONAL ---
 
@@ -122,7 +124,7 @@ def registrar_respuesta_item_verificacion(verificacion_id: int, item_id: int, cu
             item_original_id=item_id,
             defaults={'cumple': cumple, 'justificacion': justificacion}
         )
-        # La señal post_save en Verificacion se encargará de recalcular el puntaje total.
+        # La señal post_save en RespuestaItemVerificacion recalcula el puntaje de la verificación.
         accion = "registrada" if created else "actualizada"
         return {"status": "success", "message": f"Respuesta {accion}."}
     except Exception as e:
@@ -143,15 +145,17 @@ def registrar_asistencia_capacitacion(capacitacion_id: int, lista_emails_asisten
         usuarios = CustomUser.objects.filter(email__in=lista_emails_asistentes)
 
         asistencias_creadas = 0
-        for usuario in usuarios:
-            asistencia, created = AsistenciaCapacitacion.objects.get_or_create(
-                capacitacion=capacitacion,
-                usuario=usuario
-            )
-            if created:
-                asistencias_creadas += 1
+        # La señal post_save en AsistenciaCapacitacion marca a cada asistente; el lote recalcula
+        # todos los puntajes con unas pocas consultas al final, dentro de la misma transacción.
+        with transaction.atomic(), score_batch():
+            for usuario in usuarios:
+                asistencia, created = AsistenciaCapacitacion.objects.get_or_create(
+                    capacitacion=capacitacion,
+                    usuario=usuario
+                )
+                if created:
+                    asistencias_creadas += 1
 
-        # La señal post_save en AsistenciaCapacitacion recalculará los puntajes.
         return {"status": "success", "message": f"Se registraron {asistencias_creadas} nuevas asistencias de {len(lista_emails_asistentes)} usuarios."}
     except ObjectDoesNotExist:
         return {"status": "error", "message": f"No se encontró una capacitación con el ID {capacitacion_id}."}
@@ -1,18 +1,25 @@
 from langchain_core.tools import tool
+from datetime import datetime
 from typing import List, Dict, Optional
 from api.models import (
     CustomUser,
     PrestadorServicio,
     Artesano,
     AtractivoTuristico,
-    Publicacion,
     ElementoGuardado,
     Resena,
     Sugerencia
 )
-from django.db.models import Q
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
+from api.itinerary import plan_itinerary, route_items, saved_items
+from api.models import RutaTuristica
+from api.search import search
+from api.trip_plan import NAME_FIELDS, localized_name
+from api.vector_search import semantic_search
+
+MAX_RESULTADOS_BUSQUEDA = 30
+MAX_PASAJES_CONTEXTO = 8
 
 # --- SOLDADOS DE INTERACCIÓN Y PLANIFICACIÓN DE VIAJE ---
 
@@ -59,16 +66,18 @@ def ver_elementos_guardados(turista_id: int) -> Dict:
     print(f"--- 💥 SOLDADO (Reconocimiento): ¡ACCIÓN! Consultando 'Mi Viaje' para el turista ID {turista_id}. ---")
     try:
         usuario = CustomUser.objects.get(id=turista_id, role=CustomUser.Role.TURISTA)
-        elementos = ElementoGuardado.objects.filter(usuario=usuario).select_related('content_type')
+        # Desde la copia guardada en cada elemento: una consulta, sin resolver los destinos.
+        elementos = ElementoGuardado.objects.filter(usuario=usuario).values("id", "content_type_id", "dia", *NAME_FIELDS)
 
-        if not elementos.exists():
+        if not elementos:
             return {"status": "success", "message": "La lista 'Mi Viaje' está vacía."}
 
         lista_viaje = [
             {
-                "id_guardado": el.id,
-                "tipo": el.content_type.model,
-                "nombre": str(el.content_object)
+                "id_guardado": el["id"],
+                "tipo": ContentType.objects.get_for_id(el["content_type_id"]).model,
+                "nombre": localized_name(el),
+                "dia": el["dia"],
             }
             for el in elementos
         ]
@@ -84,12 +93,38 @@ def eliminar_elemento_guardado(elemento_guardado_id: int) -> Dict:
     print(f"--- 💥 SOLDADO (Planificación): ¡ACCIÓN! Eliminando elemento guardado ID {elemento_guardado_id}. ---")
     try:
         elemento = ElementoGuardado.objects.get(id=elemento_guardado_id)
-        nombre_elemento = str(elemento.content_object)
+        nombre_elemento = elemento.nombre or str(elemento.content_object)
         elemento.delete()
         return {"status": "success", "message": f"Elemento '{nombre_elemento}' eliminado de 'Mi Viaje'."}
     except ObjectDoesNotExist:
         return {"status": "error", "message": f"No se encontró un elemento guardado con el ID {elemento_guardado_id}."}
 
+@tool
+def planificar_itinerario(turista_id: Optional[int] = None, ruta_id: Optional[int] = None, fecha: Optional[str] = None, hora_inicio: Optional[str] = None) -> Dict:
+    """
+    (SOLDADO DE PLANIFICACIÓN) Propone el orden de visita de un día, con horas de llegada y salida,
+    distancia y tiempo total, respetando los horarios de los atractivos cuando se conocen.
+    Planifica la ruta turística `ruta_id` o, si no se indica, la lista 'Mi Viaje' del turista `turista_id`.
+    `fecha` en formato AAAA-MM-DD y `hora_inicio` en formato HH:MM (opcionales).
+    """
+    print(f"--- 💥 SOLDADO (Planificación): ¡ACCIÓN! Planificando itinerario (ruta {ruta_id}, turista {turista_id}). ---")
+    try:
+        if ruta_id is not None:
+            items = route_items(RutaTuristica.objects.get(id=ruta_id, es_publicado=True))
+        elif turista_id is not None:
+            items = saved_items(CustomUser.objects.get(id=turista_id, role=CustomUser.Role.TURISTA))
+        else:
+            return {"status": "error", "message": "Indique una ruta (ruta_id) o un turista (turista_id)."}
+        day = datetime.strptime(fecha, "%Y-%m-%d").date() if fecha else None
+        itinerario = plan_itinerary(items, day=day, start=hora_inicio)
+        if not itinerario["paradas"]:
+            return {"status": "info", "message": "No hay paradas con ubicación en el mapa para planificar."}
+        return {"status": "success", "itinerario": itinerario}
+    except ObjectDoesNotExist:
+        return {"status": "error", "message": "No se encontró la ruta publicada o el turista indicado."}
+    except ValueError as e:
+        return {"status": "error", "message": f"Datos inválidos: {e}"}
+
 # --- SOLDADOS DE FEEDBACK Y PUNTUACIÓN ---
 
 @tool
@@ -168,40 +203,62 @@ def buscar_informacion_general(termino_busqueda: str) -> Dict:
     """
     print(f"--- 💥 SOLDADO (Inteligencia): ¡ACCIÓN! Buscando información sobre '{termino_busqueda}'. ---")
     try:
-        prestadores = PrestadorServicio.objects.filter(
-            Q(nombre_negocio__icontains=termino_busqueda) | Q(descripcion__icontains=termino_busqueda),
-            aprobado=True
-        )
-        atractivos = AtractivoTuristico.objects.filter(
-            Q(nombre__icontains=termino_busqueda) | Q(descripcion__icontains=termino_busqueda),
-            es_publicado=True
-        )
-        publicaciones = Publicacion.objects.filter(
-            Q(titulo__icontains=termino_busqueda) | Q(contenido__icontains=termino_busqueda),
-            estado=Publicacion.Status.PUBLICADO
+        # Índice de texto completo: resultados ordenados por relevancia e insensibles a tildes.
+        total, encontrados = search(
+            termino_busqueda, types=["prestador", "atractivo", "publicacion"], limit=MAX_RESULTADOS_BUSQUEDA
         )
 
-        resultados = {
-            "prestadores": [{"id": p.id, "nombre": p.nombre_negocio} for p in prestadores],
-            "atractivos": [{"id": a.id, "nombre": a.nombre} for a in atractivos],
-            "publicaciones": [{"id": p.id, "titulo": p.titulo} for p in publicaciones]
-        }
+        resultados = {"prestadores": [], "atractivos": [], "publicaciones": []}
+        for item in encontrados:
+            if item["type"] == "prestador":
+                resultados["prestadores"].append({"id": item["id"], "nombre": item["title"]})
+            elif item["type"] == "atractivo":
+                resultados["atractivos"].append({"id": item["id"], "nombre": item["title"]})
+            else:
+                resultados["publicaciones"].append({"id": item["id"], "titulo": item["title"]})
 
-        if not any(resultados.values()):
+        if not total:
             return {"status": "success", "message": f"No se encontró información para '{termino_busqueda}'."}
 
-        return {"status": "success", "data": resultados}
+        return {"status": "success", "data": resultados, "total": total}
     except Exception as e:
         return {"status": "error", "message": f"Ocurrió un error inesperado durante la búsqueda: {e}"}
 
 
+@tool
+def buscar_pasajes_relevantes(pregunta: str, cantidad: int = 5) -> Dict:
+    """
+    (SOLDADO DE INTELIGENCIA) Recupera los pasajes de atractivos, prestadores, artesanos, publicaciones
+    y páginas institucionales más relacionados en significado con la pregunta del turista.
+    Úsalo para responder preguntas abiertas basándote solo en el contexto devuelto.
+    """
+    print(f"--- 💥 SOLDADO (Inteligencia): ¡ACCIÓN! Recuperando contexto para '{pregunta}'. ---")
+    try:
+        pasajes = semantic_search(pregunta, k=min(max(cantidad, 1), MAX_PASAJES_CONTEXTO))
+        if pasajes is None:
+            return {"status": "error", "message": "El servicio de embeddings no está disponible. Usa buscar_informacion_general."}
+        if not pasajes:
+            return {"status": "success", "message": f"No se encontró contexto relevante para '{pregunta}'."}
+        return {
+            "status": "success",
+            "data": [
+                {"tipo": p["type"], "id": p["id"], "titulo": p["title"], "pasaje": p["passage"], "similitud": p["score"]}
+                for p in pasajes
+            ],
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Ocurrió un error inesperado al recuperar el contexto: {e}"}
+
+
 def get_turista_soldiers() -> List:
     """ Recluta y devuelve la Escuadra de Asistencia al Turista completa. """
     return [
         guardar_elemento_viaje,
         ver_elementos_guardados,
         eliminar_elemento_guardado,
+        planificar_itinerario,
         dejar_resena,
         enviar_sugerencia_queja_felicitacion,
         buscar_informacion_general,
+        buscar_pasajes_relevantes,
     ]
\ No newline at end of file